@@ -0,0 +1,51 @@
+"""Compteurs de numérotation des factures (par type de document et par année).
+
+Revision ID: a2b3c4d5e6f7
+Revises: f1a2b3c4d5e6
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a2b3c4d5e6f7"
+down_revision: str | Sequence[str] | None = "f1a2b3c4d5e6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Idempotent : la table peut déjà exister via apply_adhoc_migrations
+    # (chemin desktop) ou create_all (base neuve).
+    bind = op.get_bind()
+    existing = bind.execute(
+        sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name='invoice_sequences'")
+    ).fetchone()
+    if not existing:
+        op.create_table(
+            "invoice_sequences",
+            sa.Column("prefix", sa.String(), nullable=False),
+            sa.Column("year", sa.Integer(), nullable=False),
+            sa.Column("last_number", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("prefix", "year"),
+        )
+    # Amorçage depuis les numéros existants (PREFIXE-AAAA-N, comparaison numérique)
+    op.execute(
+        """
+        INSERT INTO invoice_sequences (prefix, year, last_number)
+        SELECT prefix, year, MAX(number) FROM (
+            SELECT substr(invoice_number, 1, instr(invoice_number, '-') - 1) AS prefix,
+                   CAST(substr(invoice_number, instr(invoice_number, '-') + 1, 4) AS INTEGER) AS year,
+                   CAST(substr(invoice_number, instr(invoice_number, '-') + 6) AS INTEGER) AS number
+            FROM invoices
+            WHERE invoice_number GLOB '[A-Z]*-[0-9][0-9][0-9][0-9]-[0-9]*'
+        )
+        GROUP BY prefix, year
+        ON CONFLICT (prefix, year) DO UPDATE SET last_number = MAX(last_number, excluded.last_number)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("invoice_sequences")
@@ -0,0 +1,30 @@
+"""Index des agrégats de facturation et de l'anti-jointure des relances.
+
+Revision ID: b3c4d5e6f7a8
+Revises: a2b3c4d5e6f7
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "b3c4d5e6f7a8"
+down_revision: str | Sequence[str] | None = "a2b3c4d5e6f7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_invoices_status_due_date", "invoices", ["status", "due_date"], if_not_exists=True)
+    op.create_index(
+        "ix_invoices_contact_id_issue_date", "invoices", ["contact_id", "issue_date"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_notifications_source_action_url", "notifications", ["source", "action_url"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_source_action_url", table_name="notifications")
+    op.drop_index("ix_invoices_contact_id_issue_date", table_name="invoices")
+    op.drop_index("ix_invoices_status_due_date", table_name="invoices")
@@ -0,0 +1,43 @@
+"""Exceptions de série et bornes indexées des événements calendrier.
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "e0f1a2b3c4d5"
+down_revision: str | Sequence[str] | None = "d9e0f1a2b3c4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("calendar_events", sa.Column("recurring_event_id", sa.String(), nullable=True))
+    op.add_column("calendar_events", sa.Column("original_start", sa.String(), nullable=True))
+    op.add_column("calendar_events", sa.Column("range_start", sa.DateTime(), nullable=True))
+    op.add_column("calendar_events", sa.Column("range_end", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_calendar_events_recurring_event_id", "calendar_events", ["recurring_event_id"]
+    )
+    op.create_index(
+        "ix_calendar_events_range", "calendar_events", ["calendar_id", "range_start", "range_end"]
+    )
+    # Événements simples : bornes = début. Les séries restent NULL (toujours
+    # candidates) jusqu'à leur prochaine écriture.
+    op.execute(
+        "UPDATE calendar_events SET"
+        " range_start = COALESCE(start_datetime, start_date || ' 00:00:00.000000'),"
+        " range_end = COALESCE(start_datetime, start_date || ' 00:00:00.000000')"
+        " WHERE COALESCE(recurrence, '') IN ('', '[]', 'null')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_calendar_events_range", table_name="calendar_events")
+    op.drop_index("ix_calendar_events_recurring_event_id", table_name="calendar_events")
+    for column_name in ("range_end", "range_start", "original_start", "recurring_event_id"):
+        op.drop_column("calendar_events", column_name)
@@ -0,0 +1,29 @@
+"""Synchronisation incrémentale des calendriers (jetons, ctag, ETag).
+
+Revision ID: f1a2b3c4d5e6
+Revises: e0f1a2b3c4d5
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "f1a2b3c4d5e6"
+down_revision: str | Sequence[str] | None = "e0f1a2b3c4d5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("calendars", sa.Column("sync_token", sa.String(), nullable=True))
+    op.add_column("calendars", sa.Column("ctag", sa.String(), nullable=True))
+    op.add_column("calendar_events", sa.Column("etag", sa.String(), nullable=True))
+    op.add_column("calendar_events", sa.Column("remote_href", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    for column_name in ("remote_href", "etag"):
+        op.drop_column("calendar_events", column_name)
+    for column_name in ("ctag", "sync_token"):
+        op.drop_column("calendars", column_name)
@@ -40,6 +40,8 @@ class Settings(BaseSettings):
     anthropic_api_key: str | None = None
     mistral_api_key: str | None = None
     ollama_base_url: str = "http://localhost:11434"
+    # Catalogue des modèles Ollama (capacités) : intervalle d'interrogation
+    ollama_catalog_refresh_seconds: int = 60
 
     # Default models
     claude_model: str = "claude-sonnet-4-6"
@@ -58,6 +60,24 @@ class Settings(BaseSettings):
     max_memory_results: int = 10
     chunk_size: int = 500
     chunk_overlap: int = 50
+    # Compteurs d'emails par priorité gardés en mémoire (dashboard sans SQLite)
+    email_stats_cache: bool = True
+    # Agrégats pipeline / RGPD / tableau de bord servis depuis la mémoire
+    aggregates_cache: bool = True
+    # Calendriers distants (CalDAV, Google) synchronisés en parallèle
+    calendar_sync_concurrency: int = 4
+    # Rendu des factures PDF par lots : processus de rendu (0 = un par cœur)
+    invoice_pdf_workers: int = 0
+    # Sandbox des skills Office : workers pré-chauffés en attente
+    # (0 = un processus lancé à chaque génération)
+    code_sandbox_workers: int = 2
+    # Documents générés par les skills : taille maximale du répertoire de
+    # sortie, les moins récemment téléchargés sont supprimés au-delà
+    skills_output_max_mb: int = 2048
+    # Board (mode cloud) : synthèse provisoire lancée dès que ce nombre de
+    # conseillers a répondu (0 = après tous), puis délai laissé aux retardataires
+    board_synthesis_quorum: int = 3
+    board_straggler_timeout_seconds: float = 30.0
 
     # Voix locale souveraine (STT/TTS) - OPTIONNELLE (groupe pip 'voice-local')
     voice_local_enabled: bool = False
@@ -319,6 +319,34 @@ async def lifespan(app: FastAPI):
                     logger.error(f"RGPD purge scheduler error: {e}")
 
         rgpd_purge_task = asyncio.create_task(_rgpd_purge_scheduler())
+
+        # Decay des scores CRM : incrémental, une fois par jour
+        from app.services.scoring import run_score_decay
+
+        async def _score_decay_scheduler():
+            while True:
+                try:
+                    await run_score_decay()
+                except Exception as e:
+                    logger.error(f"Score decay scheduler error: {e}")
+                await asyncio.sleep(86400)
+
+        score_decay_task = asyncio.create_task(_score_decay_scheduler())
+
+        # Catalogue des modèles Ollama (capacités tools / thinking / contexte)
+        from app.services.ollama_catalog import poll_ollama_catalog
+        from app.services.ollama_warmup import warm_default_ollama_model
+
+        ollama_catalog_task = asyncio.create_task(poll_ollama_catalog())
+        ollama_warmup_task = asyncio.create_task(warm_default_ollama_model())
+
+        # File d'envoi SMTP persistante (factures, campagnes de relance)
+        from app.services.email.outbound_queue import get_outbound_queue
+        await get_outbound_queue().start()
+
+        # Push des modifications CRM locales vers Google Sheets
+        from app.services.sheets_push import get_sheets_push_worker
+        await get_sheets_push_worker().start()
     else:
         logger.info("Mode test : services externes ignorés (THERESE_SKIP_SERVICES=1)")
         oauth_cleanup_task = None
@@ -372,6 +400,33 @@ async def lifespan(app: FastAPI):
     except (asyncio.CancelledError, NameError):
         pass
 
+    # Cancel score decay scheduler
+    try:
+        score_decay_task.cancel()
+        await score_decay_task
+    except (asyncio.CancelledError, NameError):
+        pass
+
+    try:
+        ollama_catalog_task.cancel()
+        await ollama_catalog_task
+    except (asyncio.CancelledError, NameError):
+        pass
+    try:
+        ollama_warmup_task.cancel()
+        await ollama_warmup_task
+    except (asyncio.CancelledError, NameError):
+        pass
+    except Exception as e:
+        # Ne doit pas empêcher l'arrêt des files d'envoi ci-dessous
+        logger.warning(f"Préchargement Ollama interrompu sur erreur : {e}")
+
+    if not skip_services:
+        from app.services.email.outbound_queue import get_outbound_queue
+        await get_outbound_queue().stop()
+        from app.services.sheets_push import get_sheets_push_worker
+        await get_sheets_push_worker().stop()
+
     # Cleanup session token
     try:
         token_path = FilePath(settings.data_dir) / ".session_token"
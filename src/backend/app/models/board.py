@@ -155,6 +155,9 @@ class AdvisorOpinion(BaseModel):
     input_tokens: int | None = None
     output_tokens: int | None = None
     cost_eur: float | None = None
+    # Cache du préfixe commun (prompt caching cloud / KV cache Ollama)
+    cached_input_tokens: int | None = None
+    prompt_eval_ms: float | None = None
     generated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
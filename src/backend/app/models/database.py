@@ -55,6 +55,25 @@ ATELIER_HISTORY_COLUMN_DEFINITIONS: dict[str, str] = {
     "commit_hash": "TEXT",
 }
 
+CALENDAR_RECURRENCE_COLUMN_DEFINITIONS: dict[str, str] = {
+    "recurring_event_id": "TEXT",
+    "original_start": "TEXT",
+    "range_start": "DATETIME",
+    "range_end": "DATETIME",
+}
+
+# Synchronisation incrémentale : jeton (CalDAV sync-collection, Google
+# syncToken) et ctag par calendrier, ETag et URL distante par événement
+CALENDAR_SYNC_COLUMN_DEFINITIONS: dict[str, str] = {
+    "sync_token": "TEXT",
+    "ctag": "TEXT",
+}
+
+EVENT_SYNC_COLUMN_DEFINITIONS: dict[str, str] = {
+    "etag": "TEXT",
+    "remote_href": "TEXT",
+}
+
 
 def ensure_invoice_currency_column(db_path: Path | None) -> bool:
     """Ajoute la colonne invoices.currency si elle manque sur une DB legacy."""
@@ -97,6 +116,33 @@ def ensure_invoice_legacy_columns(
     return added_columns
 
 
+# Index des agrégats de facturation et de l'anti-jointure des relances
+ANALYTICS_INDEX_DEFINITIONS = {
+    "ix_invoices_status_due_date": ("invoices", ("status", "due_date")),
+    "ix_invoices_contact_id_issue_date": ("invoices", ("contact_id", "issue_date")),
+    "ix_notifications_source_action_url": ("notifications", ("source", "action_url")),
+}
+
+INVOICE_SEQUENCES_DDL = (
+    "CREATE TABLE IF NOT EXISTS invoice_sequences ("
+    "prefix VARCHAR NOT NULL, year INTEGER NOT NULL, last_number INTEGER NOT NULL, "
+    "PRIMARY KEY (prefix, year))"
+)
+# Numéros PREFIXE-AAAA-N : plus grand N par (préfixe, année)
+INVOICE_SEQUENCES_SEED = """
+    INSERT INTO invoice_sequences (prefix, year, last_number)
+    SELECT prefix, year, MAX(number) FROM (
+        SELECT substr(invoice_number, 1, instr(invoice_number, '-') - 1) AS prefix,
+               CAST(substr(invoice_number, instr(invoice_number, '-') + 1, 4) AS INTEGER) AS year,
+               CAST(substr(invoice_number, instr(invoice_number, '-') + 6) AS INTEGER) AS number
+        FROM invoices
+        WHERE invoice_number GLOB '[A-Z]*-[0-9][0-9][0-9][0-9]-[0-9]*'
+    )
+    GROUP BY prefix, year
+    ON CONFLICT (prefix, year) DO UPDATE SET last_number = MAX(last_number, excluded.last_number)
+"""
+
+
 def apply_adhoc_migrations(db_path) -> None:
     """Migrations ad-hoc idempotentes (desktop : pas d'alembic auto historique).
 
@@ -206,6 +252,62 @@ def apply_adhoc_migrations(db_path) -> None:
                     "Migration auto : colonne '%s' ajoutée à agent_tasks",
                     column_name,
                 )
+        # Récurrence des événements : exceptions d'une série et bornes
+        # indexées. Les bornes des événements simples se déduisent du début ;
+        # celles des séries restent NULL (toujours candidates) jusqu'à leur
+        # prochaine écriture, qui les calcule.
+        cursor = conn.execute("PRAGMA table_info(calendar_events)")
+        event_columns = {row[1] for row in cursor.fetchall()}
+        missing = [
+            column_name
+            for column_name in CALENDAR_RECURRENCE_COLUMN_DEFINITIONS
+            if event_columns and column_name not in event_columns
+        ]
+        for column_name in missing:
+            conn.execute(
+                f"ALTER TABLE calendar_events ADD COLUMN {column_name} "
+                f"{CALENDAR_RECURRENCE_COLUMN_DEFINITIONS[column_name]}"
+            )
+        if event_columns:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_calendar_events_recurring_event_id "
+                "ON calendar_events (recurring_event_id)"
+            )
+        if "calendar_id" in event_columns:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_calendar_events_range "
+                "ON calendar_events (calendar_id, range_start, range_end)"
+            )
+        if "range_start" in missing and {"start_datetime", "start_date", "recurrence"} <= event_columns:
+            conn.execute(
+                "UPDATE calendar_events SET"
+                " range_start = COALESCE(start_datetime, start_date || ' 00:00:00.000000'),"
+                " range_end = COALESCE(start_datetime, start_date || ' 00:00:00.000000')"
+                " WHERE COALESCE(recurrence, '') IN ('', '[]', 'null')"
+            )
+        if event_columns:
+            conn.commit()
+        if missing:
+            logger.info(
+                "Migration auto : colonnes calendar_events ajoutées (%s)",
+                ", ".join(missing),
+            )
+        # Synchronisation incrémentale CalDAV / Google
+        for table, definitions in (
+            ("calendars", CALENDAR_SYNC_COLUMN_DEFINITIONS),
+            ("calendar_events", EVENT_SYNC_COLUMN_DEFINITIONS),
+        ):
+            cursor = conn.execute(f"PRAGMA table_info({table})")
+            table_columns = {row[1] for row in cursor.fetchall()}
+            for column_name, definition in definitions.items():
+                if table_columns and column_name not in table_columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column_name} {definition}")
+                    conn.commit()
+                    logger.info(
+                        "Migration auto : colonne '%s' ajoutée à %s",
+                        column_name,
+                        table,
+                    )
         # US-017 : purge_excluded sur contacts
         cursor = conn.execute("PRAGMA table_info(contacts)")
         contact_columns = [row[1] for row in cursor.fetchall()]
@@ -270,6 +372,23 @@ def apply_adhoc_migrations(db_path) -> None:
             )
             conn.commit()
             logger.info("Migration auto : table 'variables' créée")
+        # Numérotation des documents : compteur par (préfixe, année), amorcé
+        # depuis les numéros existants. Comparaison NUMÉRIQUE : le MAX lexical
+        # plaçait FACT-2026-999 après FACT-2026-1000. Rejoué à chaque
+        # démarrage, le compteur ne fait que monter.
+        conn.execute(INVOICE_SEQUENCES_DDL)
+        inv_columns = {row[1] for row in conn.execute("PRAGMA table_info(invoices)")}
+        if "invoice_number" in inv_columns:
+            conn.execute(INVOICE_SEQUENCES_SEED)
+        conn.commit()
+        for index_name, (table_name, index_columns) in ANALYTICS_INDEX_DEFINITIONS.items():
+            table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+            if set(index_columns) <= table_columns:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} "
+                    f"ON {table_name} ({', '.join(index_columns)})"
+                )
+        conn.commit()
         # BUG-144 (0.41.1) : avant cette version, la fin « toute la journée »
         # des événements Google/CalDAV en cache était stockée EXCLUSIVE
         # (convention de ces protocoles) alors que l'app est INCLUSIVE.
@@ -333,7 +452,7 @@ def apply_adhoc_migrations(db_path) -> None:
 # Le test tests/test_alembic_stamp.py vérifie que cette constante suit la
 # vraie tête de src/backend/alembic/versions (épinglée en dur pour que
 # l'app PACKAGÉE puisse estampiller sans embarquer le dossier alembic/).
-ALEMBIC_HEAD_REVISION = "d9e0f1a2b3c4"
+ALEMBIC_HEAD_REVISION = "b3c4d5e6f7a8"
 
 
 def ensure_alembic_stamp(db_path) -> None:
@@ -399,11 +518,41 @@ def ensure_alembic_stamp(db_path) -> None:
                     has_atelier_history = (
                         ATELIER_HISTORY_COLUMN_DEFINITIONS.keys() <= atelier_cols
                     )
+                    event_cols = {
+                        row[1]
+                        for row in conn.execute("PRAGMA table_info(calendar_events)")
+                    }
+                    has_event_recurrence = (
+                        CALENDAR_RECURRENCE_COLUMN_DEFINITIONS.keys() <= event_cols
+                    )
+                    calendar_cols = {
+                        row[1]
+                        for row in conn.execute("PRAGMA table_info(calendars)")
+                    }
+                    has_calendar_sync = (
+                        CALENDAR_SYNC_COLUMN_DEFINITIONS.keys() <= calendar_cols
+                        and EVENT_SYNC_COLUMN_DEFINITIONS.keys() <= event_cols
+                    )
+                    has_invoice_sequences = conn.execute(
+                        "SELECT name FROM sqlite_master "
+                        "WHERE type='table' AND name='invoice_sequences'"
+                    ).fetchone()
+                    index_names = {
+                        row[0]
+                        for row in conn.execute(
+                            "SELECT name FROM sqlite_master WHERE type='index'"
+                        )
+                    }
+                    has_analytics_indexes = ANALYTICS_INDEX_DEFINITIONS.keys() <= index_names
                     if (
                         "validite_jours" in inv_cols
                         and has_variables
                         and has_board_history
                         and has_atelier_history
+                        and has_event_recurrence
+                        and has_calendar_sync
+                        and has_invoice_sequences
+                        and has_analytics_indexes
                     ):
                         conn.execute(
                             "UPDATE alembic_version SET version_num = ?",
@@ -677,6 +826,7 @@ async def init_db() -> None:
         processing,  # noqa: F401 - Traitements longs (J1a)
     )
     from app.services import audit  # noqa: F401 - ActivityLog model
+    from app.services.calendar import recurrence  # noqa: F401 - bornes des événements
 
     SQLModel.metadata.create_all(sync_engine)
 
@@ -709,6 +859,11 @@ async def init_db() -> None:
             "CREATE INDEX IF NOT EXISTS ix_activities_contact_id ON activities (contact_id)",
             "CREATE INDEX IF NOT EXISTS ix_deliverables_project_id ON deliverables (project_id)",
             "CREATE INDEX IF NOT EXISTS ix_calendar_events_calendar_id ON calendar_events (calendar_id)",
+            # US-EMAIL-12 : index couvrant de l'agrégat GET /email/messages/stats
+            "CREATE INDEX IF NOT EXISTS ix_email_messages_account_priority_read "
+            "ON email_messages (account_id, priority, is_read)",
+            # Résolution email -> contact par lot (lower(email) IN (...))
+            "CREATE INDEX IF NOT EXISTS ix_contacts_email_lower ON contacts (lower(email))",
         ]
         for stmt in index_statements:
             try:
@@ -721,6 +876,15 @@ async def init_db() -> None:
     # l'estampille, sinon la DB serait marquée head sans le schéma de head.
     apply_adhoc_migrations(settings.db_path)
 
+    # Nouvelle base (ou base restaurée) : les caches en mémoire sont caducs
+    from app.services.aggregates import get_aggregate_cache
+    from app.services.email_contact_matcher import invalidate_contact_cache
+    from app.services.email_stats import get_email_stats_cache
+
+    get_email_stats_cache().invalidate()
+    invalidate_contact_cache()
+    get_aggregate_cache().invalidate()
+
     # US-015 : estampiller la DB à la tête Alembic. Le bootstrap ci-dessus
     # (create_all + colonnes/index ad-hoc) amène la DB AU schéma courant ;
     # l'estampille fait d'Alembic l'unique voie d'évolution future
@@ -742,6 +906,14 @@ async def close_db() -> None:
         sync_engine.dispose()
         sync_engine = None
 
+    from app.services.aggregates import get_aggregate_cache
+    from app.services.email_contact_matcher import invalidate_contact_cache
+    from app.services.email_stats import get_email_stats_cache
+
+    get_email_stats_cache().invalidate()
+    invalidate_contact_cache()
+    get_aggregate_cache().invalidate()
+
     logger.info("Database connections closed")
 
 
@@ -8,6 +8,7 @@ from datetime import UTC, datetime
 from typing import Optional
 from uuid import uuid4
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -20,6 +21,10 @@ class Contact(SQLModel, table=True):
     """Contact entity for memory system."""
 
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Résolution email -> contact par lot (email_contact_matcher)
+        Index("ix_contacts_email_lower", text("lower(email)")),
+    )
 
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     first_name: str | None = None
@@ -177,6 +182,24 @@ class FileMetadata(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
+class GeneratedFile(SQLModel, table=True):
+    """Document produit par un skill (lien de téléchargement /api/skills/download)."""
+
+    __tablename__ = "generated_files"
+
+    id: str = Field(primary_key=True)  # file_id du SkillResult
+    skill_id: str
+    file_path: str
+    file_name: str
+    mime_type: str
+    format: str  # docx, pptx, xlsx, html, pdf, md
+    file_size: int
+    sha256: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    # Ordre d'éviction quand le répertoire de sortie dépasse son quota (LRU)
+    last_accessed_at: datetime = Field(default_factory=lambda: datetime.now(UTC), index=True)
+
+
 class Variable(SQLModel, table=True):
     """Variable utilisateur (chantier 4 Variables V1, design V4 11/07/2026).
 
@@ -225,6 +248,24 @@ class Preference(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
+class OllamaModel(SQLModel, table=True):
+    """Modèle Ollama installé et ses capacités (GET /api/tags + POST /api/show)."""
+
+    __tablename__ = "ollama_models"
+
+    name: str = Field(primary_key=True)  # ex. qwen3:8b
+    digest: str  # change quand le modèle est re-pullé -> nouvelle sonde
+    position: int = 0  # ordre de /api/tags
+    # JSON : ["completion", "tools", "thinking", ...] ; None = Ollama trop
+    # ancien pour annoncer ses capacités (détection au premier refus)
+    capabilities: str | None = None
+    context_length: int | None = None
+    quantization: str | None = None  # ex. Q4_K_M
+    family: str | None = None
+    parameter_size: str | None = None
+    probed_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
 class BoardDecisionDB(SQLModel, table=True):
     """Board decision stored in database."""
 
@@ -315,6 +356,10 @@ class EmailMessage(SQLModel, table=True):
     Phase 1 - Email (Gmail)
     """
     __tablename__ = "email_messages"
+    __table_args__ = (
+        # US-EMAIL-12 : index couvrant de l'agrégat GET /email/messages/stats
+        Index("ix_email_messages_account_priority_read", "account_id", "priority", "is_read"),
+    )
 
     # Gmail IDs
     id: str = Field(primary_key=True)  # Gmail message ID
@@ -425,6 +470,10 @@ class Calendar(SQLModel, table=True):
     sync_status: str = "idle"  # idle, syncing, error
     last_sync_error: str | None = None
     synced_at: datetime | None = None
+    # Synchronisation incrémentale (services/calendar/sync.py) : jeton
+    # sync-collection (CalDAV) ou nextSyncToken (Google), ctag CalDAV
+    sync_token: str | None = None
+    ctag: str | None = None
 
     # Metadata
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -438,6 +487,10 @@ class CalendarEvent(SQLModel, table=True):
     """Table événements calendrier."""
 
     __tablename__ = "calendar_events"
+    __table_args__ = (
+        # Recherche par fenêtre : événements dont [range_start, range_end] la coupe
+        Index("ix_calendar_events_range", "calendar_id", "range_start", "range_end"),
+    )
 
     id: str = Field(primary_key=True)  # Google event ID
     calendar_id: str = Field(foreign_key="calendars.id", index=True)
@@ -454,6 +507,18 @@ class CalendarEvent(SQLModel, table=True):
     status: str = "confirmed"  # confirmed, tentative, cancelled
     synced_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
+    # Occurrence modifiée d'une série : maître + clé de l'occurrence remplacée
+    recurring_event_id: str | None = Field(default=None, index=True)
+    original_start: str | None = None  # YYYYMMDDTHHMMSSZ (UTC) ou YYYYMMDD
+    # Début de la première / dernière occurrence (UTC, NULL = série sans fin),
+    # tenus à jour par services/calendar/recurrence.py
+    range_start: datetime | None = None
+    range_end: datetime | None = None
+    # Version distante : ETag (CalDAV / Google) et URL de la ressource CalDAV
+    # (un .ics porte le maître d'une série et ses exceptions)
+    etag: str | None = None
+    remote_href: str | None = None
+
     # Relationships
     calendar: Calendar | None = Relationship(back_populates="events")
 
@@ -492,6 +557,12 @@ class Invoice(SQLModel, table=True):
     """Table factures."""
 
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Créances et relances : statut puis échéance
+        Index("ix_invoices_status_due_date", "status", "due_date"),
+        # Historique et totaux par client
+        Index("ix_invoices_contact_id_issue_date", "contact_id", "issue_date"),
+    )
 
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     invoice_number: str = Field(unique=True, index=True)  # FACT-2026-001, DEV-2026-001, AV-2026-001
@@ -539,6 +610,20 @@ class InvoiceLine(SQLModel, table=True):
     invoice: Optional["Invoice"] = Relationship(back_populates="lines")
 
 
+class InvoiceSequence(SQLModel, table=True):
+    """Compteur de numérotation par type de document et par année.
+
+    Incrémenté dans la transaction qui crée le document : numérotation
+    continue, sans trou ni doublon (art. 242 nonies A, annexe II du CGI).
+    """
+
+    __tablename__ = "invoice_sequences"
+
+    prefix: str = Field(primary_key=True)  # FACT, DEV, AV
+    year: int = Field(primary_key=True)
+    last_number: int = 0  # Dernier numéro attribué
+
+
 # =============================================================================
 # CRM MODELS (Phase 5)
 # =============================================================================
@@ -600,6 +685,10 @@ class Notification(SQLModel, table=True):
     """Notifications push in-app avec rappels automatiques."""
 
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Notification récente d'un objet (anti-jointure des relances)
+        Index("ix_notifications_source_action_url", "source", "action_url"),
+    )
 
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     title: str
@@ -632,6 +721,73 @@ class EmailFollowUp(SQLModel, table=True):
     created_at: str = Field(default_factory=lambda: datetime.now(UTC).isoformat())
 
 
+class OutboundEmail(SQLModel, table=True):
+    """File d'envoi SMTP persistante (campagnes, factures de fin de mois)."""
+
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        # Sélection du worker : messages dus, dans l'ordre d'arrivée
+        Index("ix_outbound_emails_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: str = Field(default_factory=generate_uuid, primary_key=True)
+    job_id: str = Field(index=True)  # un lot soumis en une fois
+    account_id: str = Field(foreign_key="email_accounts.id", index=True)
+    invoice_id: str | None = Field(default=None, foreign_key="invoices.id", index=True)
+    to_emails: str  # JSON array
+    cc_emails: str = "[]"  # JSON array
+    bcc_emails: str = "[]"  # JSON array
+    subject: str
+    body: str
+    is_html: bool = False
+    attachment_paths: str = "[]"  # JSON array de chemins, lus au moment de l'envoi
+    status: str = Field(default="pending")  # pending, sending, sent, failed
+    attempts: int = 0
+    last_error: str | None = None
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    provider_message_id: str | None = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    sent_at: datetime | None = None
+
+
+# =============================================================================
+# CRM SYNC MODELS (Google Sheets)
+# =============================================================================
+
+
+class SheetRowFingerprint(SQLModel, table=True):
+    """Empreinte de la dernière version synchronisée d'une ligne Google Sheets."""
+
+    __tablename__ = "sheet_row_fingerprints"
+    __table_args__ = (
+        Index("ix_sheet_row_fingerprints_tab_row", "tab", "row_id", unique=True),
+    )
+
+    id: str = Field(default_factory=generate_uuid, primary_key=True)
+    tab: str  # Clients, Projects, Deliverables, Tasks
+    row_id: str  # colonne ID de la ligne
+    fingerprint: str  # blake2b des cellules normalisées
+    synced_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class SheetChange(SQLModel, table=True):
+    """Journal des modifications locales à pousser vers Google Sheets (une ligne par entité)."""
+
+    __tablename__ = "sheet_changes"
+    __table_args__ = (
+        Index("ix_sheet_changes_tab_row", "tab", "row_id", unique=True),
+    )
+
+    id: str = Field(default_factory=generate_uuid, primary_key=True)
+    tab: str  # Clients, Projects
+    row_id: str  # ID du contact ou du projet
+    operation: str = "upsert"  # upsert, delete
+    status: str = Field(default="pending", index=True)  # pending, conflict
+    version: int = 1  # incrémenté à chaque nouvelle modification
+    last_error: str | None = None
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
 # =============================================================================
 # DOCUMENT MODELS (Atelier Documentaire)
 # =============================================================================
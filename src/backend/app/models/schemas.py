@@ -910,6 +910,12 @@ class ConvertDevisRequest(BaseModel):
     payment_method: str = "Virement bancaire"
 
 
+class BatchInvoicePdfRequest(BaseModel):
+    """Request pour générer les PDFs de plusieurs factures (fin de mois)."""
+
+    invoice_ids: list[str] = Field(min_length=1, max_length=1000)
+
+
 
 # =============================================================================
 # CRM SCHEMAS (Phase 5)
@@ -1011,14 +1017,19 @@ class CRMSyncStatsResponse(BaseModel):
 
     contacts_created: int = 0
     contacts_updated: int = 0
+    contacts_unchanged: int = 0
     projects_created: int = 0
     projects_updated: int = 0
+    projects_unchanged: int = 0
     deliverables_created: int = 0
     deliverables_updated: int = 0
+    deliverables_unchanged: int = 0
     tasks_created: int = 0
     tasks_updated: int = 0
+    tasks_unchanged: int = 0
     errors: list[str] = []
     total_synced: int = 0
+    total_unchanged: int = 0  # lignes Sheets identiques a la derniere synchro
 
 
 class CRMSyncResponse(BaseModel):
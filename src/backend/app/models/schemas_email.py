@@ -6,7 +6,7 @@ Request/Response models pour les opérations email (OAuth, IMAP, messages, label
 
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # ============================================================
 # OAuth
@@ -105,6 +105,12 @@ class SendEmailRequest(BaseModel):
     html: bool = False
 
 
+class OutboxRequest(BaseModel):
+    """Bulk send request (persistent SMTP queue)."""
+
+    messages: list[SendEmailRequest] = Field(min_length=1, max_length=1000)
+
+
 class ModifyMessageRequest(BaseModel):
     """Modify message request."""
 
@@ -134,6 +140,14 @@ class ClassifyEmailRequest(BaseModel):
     force_reclassify: bool = False  # Force re-classification même si déjà classé
 
 
+class ClassifyBatchRequest(BaseModel):
+    """Classify a batch of cached emails request."""
+
+    message_ids: list[str] | None = Field(default=None, max_length=500)  # None = non classés
+    force_reclassify: bool = False
+    limit: int = Field(default=500, ge=1, le=500)
+
+
 class GenerateResponseRequest(BaseModel):
     """Generate email response request."""
 
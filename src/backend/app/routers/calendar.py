@@ -28,6 +28,9 @@ from app.models.schemas_calendar import (
     CalDAVTestRequest,
 )
 from app.routers.email import ensure_valid_access_token
+from app.services import export_stream
+from app.services.calendar import ics
+from app.services.calendar import sync as calendar_sync
 from app.services.calendar.base_provider import allday_end_from_wire, allday_end_to_wire
 from app.services.calendar.provider_factory import (
     get_calendar_provider,
@@ -37,6 +40,7 @@ from app.services.calendar.provider_factory import (
 from app.services.calendar_service import CalendarService
 from app.services.encryption import decrypt_value, encrypt_value, is_value_encrypted
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -592,8 +596,20 @@ async def _list_events_provider(
     time_max: str | None,
     max_results: int,
 ) -> list[CalendarEventResponse]:
-    """List events via abstract CalendarProvider (local or CalDAV)."""
-    provider = await _get_provider_for_calendar(calendar, session)
+    """List events via abstract CalendarProvider (local or CalDAV).
+
+    Un calendrier CalDAV est lu dans son miroir local, rafraîchi au préalable
+    par synchronisation incrémentale : si rien n'a changé, un PROPFIND getctag
+    sur la collection découverte lors d'une lecture précédente.
+    Serveur injoignable : le miroir est servi tel quel.
+    """
+    if calendar.provider == "caldav":
+        from app.services.calendar.local_provider import LocalCalendarProvider
+
+        await calendar_sync.sync_calendar(session, calendar.id)
+        provider = LocalCalendarProvider(session)
+    else:
+        provider = await _get_provider_for_calendar(calendar, session)
 
     def _parse_dt_naive(s: str) -> datetime:
         """Parse ISO datetime string to naive UTC datetime."""
@@ -690,6 +706,8 @@ async def _list_events_google(
                     [a["email"] for a in event_data.get("attendees", [])]
                 )
                 existing_event.recurrence = json.dumps(event_data.get("recurrence", []))
+                existing_event.recurring_event_id = event_data.get("recurringEventId")
+                existing_event.original_start = calendar_sync.google_original_key(event_data)
                 existing_event.status = event_data.get("status", "confirmed")
                 existing_event.synced_at = datetime.now(UTC)
                 session.add(existing_event)
@@ -718,6 +736,10 @@ async def _list_events_google(
                         [a["email"] for a in event_data.get("attendees", [])]
                     ),
                     recurrence=json.dumps(event_data.get("recurrence", [])),
+                    # Occurrence dépliée (singleEvents) : elle remplace celle
+                    # que le maître synchronisé produirait
+                    recurring_event_id=event_data.get("recurringEventId"),
+                    original_start=calendar_sync.google_original_key(event_data),
                     status=event_data.get("status", "confirmed"),
                     synced_at=datetime.now(UTC),
                 )
@@ -1281,6 +1303,11 @@ async def sync_calendar(
 
     - Avec account_id : sync Google Calendar
     - Sans account_id : sync tous les calendriers locaux et CalDAV
+
+    Synchronisation incrémentale (ctag / sync-collection CalDAV, syncToken
+    Google) des calendriers en parallèle ; `events_synced` compte les
+    événements écrits ou supprimés localement. L'échec d'un calendrier est
+    visible dans son sync_status, les autres sont synchronisés quand même.
     """
     try:
         calendars_result = await list_calendars(
@@ -1288,21 +1315,17 @@ async def sync_calendar(
             provider=None,
             session=session,
         )
-        calendars_count = len(calendars_result)
+        # Chaque calendrier est synchronisé dans sa propre session
+        await session.commit()
 
-        total_events = 0
-        for calendar in calendars_result:
-            events_result = await list_events(
-                calendar_id=calendar.id,
-                account_id=account_id,
-                max_results=250,
-                session=session,
-            )
-            total_events += len(events_result)
+        results = await calendar_sync.sync_calendars([calendar.id for calendar in calendars_result])
+        failed = [result for result in results if result.error]
+        for result in failed:
+            logger.warning(f"Sync calendrier {result.calendar_id} en échec : {result.error}")
 
         return CalendarSyncResponse(
-            calendars_synced=calendars_count,
-            events_synced=total_events,
+            calendars_synced=len(results) - len(failed),
+            events_synced=sum(result.updated + result.deleted for result in results),
             synced_at=datetime.now(UTC).isoformat(),
         )
 
@@ -1351,6 +1374,11 @@ async def get_sync_status(
 # Import ICS
 # ============================================================
 
+# Plusieurs années d'agenda : des dizaines de milliers de VEVENT
+ICS_IMPORT_MAX_BYTES = 50_000_000
+ICS_READ_CHUNK = 256 * 1024
+
+
 @router.post("/import-ics")
 async def import_ics_file(
     file: UploadFile = File(..., description="Fichier .ics (calendrier)"),
@@ -1361,27 +1389,15 @@ async def import_ics_file(
     Importe des événements depuis un fichier .ics dans le calendrier local.
 
     Si aucun calendar_id n'est fourni, utilise le premier calendrier local
-    ou en crée un ("Mon calendrier").
+    ou en crée un ("Mon calendrier"). Le fichier est lu et analysé par blocs ;
+    un événement déjà présent (même UID) est mis à jour.
     """
-    from app.services.import_service import parse_ics
-
     # Validation fichier
     if not file.filename or not file.filename.lower().endswith(".ics"):
         raise HTTPException(status_code=400, detail="Le fichier doit être au format .ics")
-
-    content = await file.read()
-    if len(content) > 1_000_000:  # 1 Mo max
-        raise HTTPException(status_code=400, detail="Fichier trop volumineux (max 1 Mo)")
-
-    # Parser le fichier
-    try:
-        events = parse_ics(content)
-    except Exception as e:
-        logger.error(f"Erreur parsing ICS: {e}")
-        raise HTTPException(status_code=400, detail=f"Fichier ICS invalide : {e}")
-
-    if not events:
-        return {"imported": 0, "message": "Aucun événement trouvé dans le fichier"}
+    too_large = HTTPException(status_code=400, detail="Fichier trop volumineux (max 50 Mo)")
+    if file.size is not None and file.size > ICS_IMPORT_MAX_BYTES:
+        raise too_large
 
     # Trouver ou créer le calendrier cible
     if calendar_id:
@@ -1405,55 +1421,47 @@ async def import_ics_file(
             session.add(cal)
             await session.flush()
 
-    # Importer les événements
-    imported = 0
-    skipped = 0
-    for event_data in events:
-        # Vérifier si l'événement existe déjà (par UID)
-        uid = event_data.get("uid", "")
-        if uid:
-            existing = await session.execute(
-                select(CalendarEvent).where(
-                    CalendarEvent.calendar_id == cal.id,
-                    CalendarEvent.id == uid,
-                )
-            )
-            if existing.scalar_one_or_none():
-                skipped += 1
-                continue
-
-        event = CalendarEvent(
-            id=uid or generate_uuid(),
-            calendar_id=cal.id,
-            summary=event_data["summary"][:200],
-            description=event_data.get("description"),
-            location=event_data.get("location"),
-            all_day=event_data.get("all_day", False),
-            status=event_data.get("status", "confirmed"),
-            attendees=json.dumps(event_data.get("attendees", [])),
-            recurrence=json.dumps(event_data.get("recurrence")) if event_data.get("recurrence") else None,
-        )
-
-        if event_data["all_day"]:
-            event.start_date = event_data["start"]
-            event.end_date = event_data["end"]
-        else:
-            event.start_datetime = datetime.fromisoformat(event_data["start"])
-            event.end_datetime = datetime.fromisoformat(event_data["end"])
+    # Lecture, analyse et écriture par lots, dans une seule transaction
+    parser = ics.IcsStreamParser()
+    importer = ics.IcsImporter(session, cal)
+    read = 0
+    try:
+        while chunk := await file.read(ICS_READ_CHUNK):
+            read += len(chunk)
+            if read > ICS_IMPORT_MAX_BYTES:
+                raise too_large
+            for vevent in parser.feed(chunk):
+                await importer.add(vevent)
+        for vevent in parser.close():
+            await importer.add(vevent)
+        await importer.flush()
+    except HTTPException:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Erreur parsing ICS: {e}")
+        raise HTTPException(status_code=400, detail=f"Fichier ICS invalide : {e}")
 
-        session.add(event)
-        imported += 1
+    if not importer.total:
+        await session.rollback()
+        return {"imported": 0, "message": "Aucun événement trouvé dans le fichier"}
 
     await session.commit()
 
-    logger.info(f"ICS import: {imported} imported, {skipped} skipped (duplicates)")
+    imported, updated, skipped = importer.imported, importer.updated, importer.skipped
+    logger.info(f"ICS import: {imported} imported, {updated} updated, {skipped} skipped")
 
+    details = [f"{updated} mis à jour"] if updated else []
+    if skipped:
+        details.append(f"{skipped} ignoré(s)")
     return {
         "imported": imported,
+        "updated": updated,
         "skipped": skipped,
         "calendar_id": cal.id,
         "calendar_name": cal.summary,
-        "message": f"{imported} événement(s) importé(s){f', {skipped} doublon(s) ignoré(s)' if skipped else ''}",
+        "message": f"{imported} événement(s) importé(s){''.join(f', {d}' for d in details)}",
     }
 
 
@@ -1466,74 +1474,18 @@ async def export_ics_file(
     Exporte les evenements d'un calendrier au format .ics.
 
     Si aucun calendar_id n'est fourni, exporte tous les evenements locaux.
+    Le fichier est produit en flux, lot par lot.
     """
-    from datetime import date as date_type
-
-    from fastapi.responses import Response as RawResponse
-    from icalendar import Calendar as ICalCalendar
-    from icalendar import Event as ICalEvent
-
     # Requete : evenements du calendrier specifie ou tous
-    query = select(CalendarEvent)
+    query = select(CalendarEvent).order_by(CalendarEvent.id)
     if calendar_id:
         cal = await session.get(Calendar, calendar_id)
         if not cal:
             raise HTTPException(status_code=404, detail="Calendrier non trouvé")
         query = query.where(CalendarEvent.calendar_id == calendar_id)
 
-    result = await session.execute(query)
-    events = result.scalars().all()
-
-    # Construire le fichier ICS
-    ical = ICalCalendar()
-    ical.add("prodid", "-//THERESE v2//FR")
-    ical.add("version", "2.0")
-    ical.add("calscale", "GREGORIAN")
-
-    for evt in events:
-        ie = ICalEvent()
-        ie.add("uid", evt.id)
-        ie.add("summary", evt.summary)
-        if evt.description:
-            ie.add("description", evt.description)
-        if evt.location:
-            ie.add("location", evt.location)
-        ie.add("status", evt.status.upper() if evt.status else "CONFIRMED")
-
-        if evt.all_day and evt.start_date:
-            ie.add("dtstart", date_type.fromisoformat(evt.start_date))
-            if evt.end_date:
-                # BUG-144 (F4 revue) : DTEND est EXCLUSIF (RFC 5545), la fin
-                # stockée est INCLUSIVE -> +1 jour à l'export.
-                ie.add("dtend", allday_end_to_wire(date_type.fromisoformat(evt.end_date)))
-        elif evt.start_datetime:
-            ie.add("dtstart", evt.start_datetime)
-            if evt.end_datetime:
-                ie.add("dtend", evt.end_datetime)
-
-        if evt.attendees:
-            try:
-                att_list = json.loads(evt.attendees)
-                for att in att_list:
-                    ie.add("attendee", f"mailto:{att}")
-            except (ValueError, TypeError):
-                pass
-
-        if evt.recurrence:
-            try:
-                rrules = json.loads(evt.recurrence)
-                for rule in rrules:
-                    if rule.startswith("RRULE:"):
-                        ie.add("rrule", rule[6:])
-            except (ValueError, TypeError):
-                pass
-
-        ical.add_component(ie)
-
-    ics_bytes = ical.to_ical()
-
-    return RawResponse(
-        content=ics_bytes,
+    return StreamingResponse(
+        export_stream.encode(ics.ics_calendar(export_stream.iter_batches(session, query))),
         media_type="text/calendar",
         headers={
             "Content-Disposition": "attachment; filename=therese-calendrier.ics",
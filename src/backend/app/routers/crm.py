@@ -7,6 +7,7 @@ Phase 5 - CRM Features + Local First Export/Import
 
 import json
 import logging
+from dataclasses import asdict
 from datetime import UTC, datetime
 from typing import Any
 
@@ -30,11 +31,13 @@ from app.models.schemas import (
     UpdateContactStageRequest,
     UpdateDeliverableRequest,
 )
+from app.services import aggregates
 from app.services.crm_export import CRMExportService, ExportFormat
-from app.services.crm_import import CRMImportService, _sanitize_field
+from app.services.crm_import import CRMImportService, ImportEntity, ImportProgress
 from app.services.crm_utils import (
     compute_total_synced,
     new_sync_stats,
+    sanitize_row,
     update_last_sync_time,
     upsert_contact,
     upsert_deliverable_from_import,
@@ -51,21 +54,13 @@ from app.services.oauth import (
 )
 from app.services.scoring import calculate_base_score, update_contact_score
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import func, select
+from sqlmodel import select
 
 logger = logging.getLogger(__name__)
 
 
-def _sanitize_row(row: dict) -> dict:
-    """Sanitize all string values in an import row (SEC-017)."""
-    sanitized = {}
-    for key, value in row.items():
-        sanitized[key] = _sanitize_field(value, key.lower()) if isinstance(value, str) else value
-    return sanitized
-
-
 router = APIRouter(tags=["crm"])
 
 
@@ -525,41 +520,10 @@ async def get_pipeline_stats(
     - Nombre de contacts par stage
     - Score moyen par stage
     - Taux de conversion
-    """
-    # Compter contacts par stage
-    stages_count_statement = (
-        select(Contact.stage, func.count(Contact.id))
-        .group_by(Contact.stage)
-    )
-    result = await session.execute(stages_count_statement)
-    stages_count = result.all()
-
-    # Score moyen par stage
-    stages_avg_score_statement = (
-        select(Contact.stage, func.avg(Contact.score))
-        .group_by(Contact.stage)
-    )
-    result = await session.execute(stages_avg_score_statement)
-    stages_avg_score = result.all()
-
-    # Total contacts
-    result = await session.execute(select(func.count(Contact.id)))
-    total_contacts = result.scalar_one()
-
-    # Construire la réponse
-    stages_data = {}
 
-    for stage, count in stages_count:
-        stages_data[stage] = {"count": count}
-
-    for stage, avg_score in stages_avg_score:
-        if stage in stages_data:
-            stages_data[stage]["avg_score"] = float(avg_score) if avg_score else 0.0
-
-    return {
-        "total_contacts": total_contacts,
-        "stages": stages_data,
-    }
+    Servies depuis le cache d'agrégats tant que les contacts n'ont pas changé.
+    """
+    return await aggregates.get_pipeline_stats(session)
 
 
 # =============================================================================
@@ -584,8 +548,8 @@ async def export_contacts(
 
     logger.info(f"Exported {result.row_count} contacts to {format}")
 
-    return Response(
-        content=result.data,
+    return StreamingResponse(
+        result.chunks,
         media_type=result.content_type,
         headers={
             "Content-Disposition": f'attachment; filename="{result.filename}"',
@@ -611,8 +575,8 @@ async def export_projects(
 
     logger.info(f"Exported {result.row_count} projects to {format}")
 
-    return Response(
-        content=result.data,
+    return StreamingResponse(
+        result.chunks,
         media_type=result.content_type,
         headers={
             "Content-Disposition": f'attachment; filename="{result.filename}"',
@@ -638,8 +602,8 @@ async def export_deliverables(
 
     logger.info(f"Exported {result.row_count} deliverables to {format}")
 
-    return Response(
-        content=result.data,
+    return StreamingResponse(
+        result.chunks,
         media_type=result.content_type,
         headers={
             "Content-Disposition": f'attachment; filename="{result.filename}"',
@@ -665,8 +629,8 @@ async def export_all_crm(
 
     logger.info(f"Exported all CRM data ({result.row_count} total rows) to {format}")
 
-    return Response(
-        content=result.data,
+    return StreamingResponse(
+        result.chunks,
         media_type=result.content_type,
         headers={
             "Content-Disposition": f'attachment; filename="{result.filename}"',
@@ -690,9 +654,9 @@ async def preview_contacts_import(
 
     Retourne un apercu des donnees et les erreurs de validation.
     """
-    content = await file.read()
+    # Upload spoole sur disque par Starlette : lu ligne a ligne, jamais charge en entier
     import_service = CRMImportService(session)
-    preview = await import_service.preview_contacts(content, filename=file.filename)
+    preview = await import_service.preview_contacts(file.file, filename=file.filename)
 
     return CRMImportPreviewSchema(
         total_rows=preview.total_rows,
@@ -723,10 +687,10 @@ async def import_contacts(
 
     Supporte le mapping automatique des colonnes en francais et anglais.
     """
-    content = await file.read()
+    # Upload spoole sur disque par Starlette : lu ligne a ligne, jamais charge en entier
     import_service = CRMImportService(session)
     result = await import_service.import_contacts(
-        content,
+        file.file,
         filename=file.filename,
         update_existing=update_existing,
     )
@@ -836,10 +800,10 @@ async def import_projects(
 
     Supporte le mapping automatique des colonnes en francais et anglais.
     """
-    content = await file.read()
+    # Upload spoole sur disque par Starlette : lu ligne a ligne, jamais charge en entier
     import_service = CRMImportService(session)
     result = await import_service.import_projects(
-        content,
+        file.file,
         filename=file.filename,
         update_existing=update_existing,
     )
@@ -876,10 +840,10 @@ async def import_deliverables(
 
     Supporte le mapping automatique des colonnes en francais et anglais.
     """
-    content = await file.read()
+    # Upload spoole sur disque par Starlette : lu ligne a ligne, jamais charge en entier
     import_service = CRMImportService(session)
     result = await import_service.import_deliverables(
-        content,
+        file.file,
         filename=file.filename,
         update_existing=update_existing,
     )
@@ -905,6 +869,55 @@ async def import_deliverables(
     )
 
 
+@router.post("/import/{entity}/stream")
+async def import_stream(
+    entity: ImportEntity,
+    file: UploadFile = File(..., description="Fichier CSV, Excel ou JSON"),
+    update_existing: bool = Query(True, description="Mettre a jour les lignes existantes"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Importe contacts, projets ou livrables en streaming SSE.
+
+    Un evenement `progress` par lot commite (lignes traitees, lignes/s),
+    puis un evenement `done` avec le resultat complet.
+    """
+    # Upload spoole sur disque par Starlette : lu ligne a ligne, jamais charge en entier
+    import_service = CRMImportService(session)
+
+    async def generate():
+        async for event in import_service.stream_import(
+            entity,
+            file.file,
+            filename=file.filename,
+            update_existing=update_existing,
+        ):
+            if isinstance(event, ImportProgress):
+                payload = {"type": "progress", **asdict(event), "rows_per_second": round(event.rows_per_second)}
+            else:
+                payload = {
+                    "type": "done",
+                    "success": event.success,
+                    "created": event.created,
+                    "updated": event.updated,
+                    "skipped": event.skipped,
+                    "errors": [asdict(e) for e in event.errors],
+                    "total_rows": event.total_rows,
+                    "message": event.message,
+                }
+            yield f"data: {json.dumps(payload, default=str)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 # =============================================================================
 # CRM SYNC (Google Sheets - Connecteur Optionnel)
 # =============================================================================
@@ -1305,7 +1318,7 @@ async def sync_crm(
     api_key = None
 
     # Try OAuth token first (avec refresh automatique si expiré)
-    from app.services.crm_sync import build_sync_message, ensure_valid_crm_token
+    from app.services.crm_sync import CRMSyncService, build_sync_message, ensure_valid_crm_token
     access_token = await ensure_valid_crm_token(session)
     if access_token:
         logger.info("Using OAuth token for CRM sync (auto-refreshed if needed)")
@@ -1336,90 +1349,20 @@ async def sync_crm(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # Run sync
-    stats = new_sync_stats()
-
+    # Run sync (delta : seules les lignes modifiees sont ecrites)
     try:
-        # Sync Clients
-        try:
-            clients_data = await sheets_service.get_all_data_as_dicts(spreadsheet_id, "Clients")
-            logger.info(f"Found {len(clients_data)} clients in Google Sheets")
-
-            for raw_row in clients_data:
-                try:
-                    row = _sanitize_row(raw_row)
-                    _, created = await upsert_contact(session, row, safe_get=True)
-                    if created:
-                        stats["contacts_created"] += 1
-                    else:
-                        stats["contacts_updated"] += 1
-                except ValueError:
-                    continue  # ID manquant, on saute
-                except Exception as e:
-                    logger.error(f"Error syncing contact {row.get('ID', 'unknown')}: {e}")
-                    stats["errors"].append(f"Contact {row.get('ID', 'unknown')}: {str(e)}")
-
-        except Exception as e:
-            logger.error(f"Error syncing clients: {e}")
-            stats["errors"].append(f"Clients: {str(e)}")
-
-        # Sync Projects
-        try:
-            projects_data = await sheets_service.get_all_data_as_dicts(spreadsheet_id, "Projects")
-            logger.info(f"Found {len(projects_data)} projects in Google Sheets")
-
-            for raw_row in projects_data:
-                try:
-                    row = _sanitize_row(raw_row)
-                    _, created = await upsert_project(session, row, safe_get=True)
-                    if created:
-                        stats["projects_created"] += 1
-                    else:
-                        stats["projects_updated"] += 1
-                except ValueError:
-                    continue
-                except Exception as e:
-                    logger.error(f"Error syncing project {row.get('ID', 'unknown')}: {e}")
-                    stats["errors"].append(f"Project {row.get('ID', 'unknown')}: {str(e)}")
-
-        except Exception as e:
-            logger.error(f"Error syncing projects: {e}")
-            stats["errors"].append(f"Projects: {str(e)}")
-
-        # Sync Tasks
-        try:
-            tasks_data = await sheets_service.get_all_data_as_dicts(spreadsheet_id, "Tasks")
-            logger.info(f"Found {len(tasks_data)} tasks in Google Sheets")
-
-            for raw_row in tasks_data:
-                try:
-                    row = _sanitize_row(raw_row)
-                    _, created = await upsert_task(session, row, safe_get=True)
-                    if created:
-                        stats["tasks_created"] += 1
-                    else:
-                        stats["tasks_updated"] += 1
-                except ValueError:
-                    continue
-                except Exception as e:
-                    logger.error(f"Error syncing task {row.get('ID', 'unknown')}: {e}")
-                    stats["errors"].append(f"Task {row.get('ID', 'unknown')}: {str(e)}")
-
-        except Exception as e:
-            logger.error(f"Error syncing tasks: {e}")
-            stats["errors"].append(f"Tasks: {str(e)}")
-
-        await session.commit()
+        sync_stats = await CRMSyncService(session, sheets_service).sync_all(spreadsheet_id)
 
         # Mettre a jour le timestamp de derniere synchronisation
         now = await update_last_sync_time(session)
 
-        total_synced = compute_total_synced(stats)
-
+        stats = sync_stats.to_dict()
         return CRMSyncResponse(
             success=len(stats["errors"]) == 0,
-            message=build_sync_message(total_synced, bool(stats["errors"])),
-            stats=CRMSyncStatsResponse(**stats, total_synced=total_synced),
+            message=build_sync_message(
+                stats["total_synced"], bool(stats["errors"]), unchanged=stats["total_unchanged"]
+            ),
+            stats=CRMSyncStatsResponse(**stats),
             sync_time=now,
         )
 
@@ -1433,6 +1376,35 @@ async def sync_crm(
         )
 
 
+@router.post("/sync/push")
+async def push_crm_changes(
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """
+    Pousse tout de suite les modifications locales en attente vers Google Sheets.
+
+    Le worker de fond le fait déjà quelques secondes après chaque écriture ;
+    cet endpoint sert au bouton « Envoyer maintenant ».
+    """
+    from app.services.crm_sync import ensure_valid_crm_token, get_crm_config
+    from app.services.sheets_push import push_changes
+    from app.services.sheets_service import GoogleSheetsService
+
+    config = await get_crm_config(session)
+    if not config["spreadsheet_id"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Spreadsheet ID non configuré. Utilise POST /api/crm/sync/config d'abord."
+        )
+    access_token = await ensure_valid_crm_token(session)
+    if not access_token:
+        # L'écriture exige OAuth : une clé API ne donne qu'un accès en lecture
+        raise HTTPException(status_code=401, detail="Connecte Google Sheets (OAuth) pour pousser les modifications.")
+
+    stats = await push_changes(session, GoogleSheetsService(access_token=access_token), config["spreadsheet_id"])
+    return {"success": not stats.errors, **stats.to_dict()}
+
+
 @router.post("/sync/import", response_model=CRMSyncResponse)
 async def import_crm_data(
     clients: list[dict[str, Any]] | None = None,
@@ -1462,7 +1434,7 @@ async def import_crm_data(
         logger.info(f"Importing {len(clients)} clients")
         for raw_row in clients:
             try:
-                row = _sanitize_row(raw_row)
+                row = sanitize_row(raw_row)
                 _, created = await upsert_contact(session, row, safe_get=True)
                 if created:
                     stats["contacts_created"] += 1
@@ -1479,7 +1451,7 @@ async def import_crm_data(
         logger.info(f"Importing {len(projects)} projects")
         for raw_row in projects:
             try:
-                row = _sanitize_row(raw_row)
+                row = sanitize_row(raw_row)
                 _, created = await upsert_project(session, row, safe_get=True)
                 if created:
                     stats["projects_created"] += 1
@@ -1496,7 +1468,7 @@ async def import_crm_data(
         logger.info(f"Importing {len(deliverables)} deliverables")
         for raw_row in deliverables:
             try:
-                row = _sanitize_row(raw_row)
+                row = sanitize_row(raw_row)
                 _, created = await upsert_deliverable_from_import(session, row, safe_get=True)
                 if created:
                     stats["deliverables_created"] += 1
@@ -1513,7 +1485,7 @@ async def import_crm_data(
         logger.info(f"Importing {len(tasks)} tasks")
         for raw_row in tasks:
             try:
-                row = _sanitize_row(raw_row)
+                row = sanitize_row(raw_row)
                 _, created = await upsert_task(session, row, safe_get=True)
                 if created:
                     stats["tasks_created"] += 1
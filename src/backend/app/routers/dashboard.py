@@ -8,7 +8,9 @@ Données 100% locales SQLite, pas d'appel LLM.
 import json
 import logging
 import os
-from datetime import date, datetime, timedelta
+import time
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
 
 from app.models.database import get_session
 from app.models.entities import (
@@ -22,9 +24,13 @@ from app.models.entities import (
     Preference,
     Task,
 )
+from app.services.aggregates import cached_aggregate
+from app.services.calendar import recurrence
+from app.services.calendar.recurrence import events_between
+from app.services.email_contact_matcher import resolve_contacts_by_email
 from app.services.user_profile import get_cached_profile
 from fastapi import APIRouter, Depends
-from sqlalchemy import and_, func, or_
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -49,6 +55,13 @@ def _attendee_emails(raw_attendees: str | None) -> list[str]:
             emails.append(email.strip().lower())
     return emails
 
+
+def _event_moment(stored: datetime | None, value: datetime | date | None) -> str | None:
+    """Horodatage d'une occurrence, naïf (UTC) si l'événement est stocké naïf."""
+    if stored is None or not isinstance(value, datetime):
+        return None
+    return (value if stored.tzinfo else value.replace(tzinfo=None)).isoformat()
+
 # US-012 : détection « au moins une clé LLM configurée » pour la checklist
 # de mise en route. Mêmes providers que le router config (env OU Preference DB).
 _LLM_KEY_SOURCES: list[tuple[list[str], str]] = [
@@ -161,74 +174,77 @@ async def get_setup_status(session: AsyncSession = Depends(get_session)):
     }
 
 
+# Tables lues par « Ma journée » : une écriture dans l'une d'elles recalcule
+_TODAY_TABLES = (
+    CalendarEvent.__tablename__,
+    Task.__tablename__,
+    EmailFollowUp.__tablename__,
+    EmailMessage.__tablename__,
+    Invoice.__tablename__,
+    Contact.__tablename__,
+)
+# Les seuils (aujourd'hui, J-15, J-30) suivent l'horloge : sans écriture,
+# une réponse reste servie au plus une minute.
+_TODAY_CACHE_SECONDS = 60
+
+
 @router.get("/today")
 async def get_today_dashboard(session: AsyncSession = Depends(get_session)):
     """Retourne les données du jour pour le tableau de bord.
 
     Agrège : RDV du jour, tâches urgentes, relances email proches,
     factures impayées > 30j et prospects sans interaction > 15j.
-    Conçu pour se charger en <500ms (SQLite local, pas d'appel réseau).
+    Conçu pour se charger en <500ms (SQLite local, pas d'appel réseau) ;
+    servi depuis le cache d'agrégats tant que les tables lues n'ont pas changé.
     """
+    return await cached_aggregate(
+        "dashboard_today",
+        _TODAY_TABLES,
+        lambda: _build_today_dashboard(session),
+        int(time.time() // _TODAY_CACHE_SECONDS),
+    )
+
+
+async def _build_today_dashboard(session: AsyncSession) -> dict[str, Any]:
+    """Calcule « Ma journée » (une requête par bloc)."""
     today = date.today()
     today_dt = datetime.combine(today, datetime.min.time())
     tomorrow_dt = datetime.combine(today + timedelta(days=1), datetime.min.time())
     thirty_days_ago = datetime.now() - timedelta(days=30)
     fifteen_days_ago = datetime.now() - timedelta(days=15)
-    today_str = today.isoformat()  # "YYYY-MM-DD" pour all-day events
     follow_up_horizon = (today + timedelta(days=2)).isoformat() + "T23:59:59"
 
     # --- RDV du jour (CalendarEvent) ---
     events_today = []
     try:
-        # Events avec heure (start_datetime dans la journée)
-        stmt_timed = select(CalendarEvent).where(
-            and_(
-                CalendarEvent.start_datetime >= today_dt,
-                CalendarEvent.start_datetime < tomorrow_dt,
-                CalendarEvent.status != "cancelled",
+        # Occurrences du jour, séries récurrentes comprises : horaires dans
+        # [aujourd'hui, demain[, journée entière datées d'aujourd'hui
+        occurrences = [
+            (ev, occ)
+            for ev, occ in await events_between(
+                session, today_dt, tomorrow_dt, include_cancelled=False
             )
-        )
-        result_timed = await session.execute(stmt_timed)
-        timed_events = result_timed.scalars().all()
-
-        # Events all-day (start_date == today)
-        stmt_allday = select(CalendarEvent).where(
-            and_(
-                CalendarEvent.all_day == True,  # noqa: E712
-                CalendarEvent.start_date == today_str,
-                CalendarEvent.status != "cancelled",
-            )
-        )
-        result_allday = await session.execute(stmt_allday)
-        allday_events = result_allday.scalars().all()
+            if (occ.start == today if ev.all_day else occ.start < tomorrow_dt.replace(tzinfo=UTC))
+        ]
+        timed_events = [(ev, occ) for ev, occ in occurrences if not ev.all_day]
+        allday_events = [(ev, occ) for ev, occ in occurrences if ev.all_day]
 
         attendee_emails_by_event = {
-            ev.id: _attendee_emails(ev.attendees) for ev in [*timed_events, *allday_events]
+            ev.id: _attendee_emails(ev.attendees) for ev, _ in occurrences
         }
         attendee_emails = {
             email for emails in attendee_emails_by_event.values() for email in emails
         }
-        contacts_by_email: dict[str, Contact] = {}
-        if attendee_emails:
-            contacts = (
-                await session.execute(
-                    select(Contact).where(func.lower(Contact.email).in_(attendee_emails))
-                )
-            ).scalars().all()
-            contacts_by_email = {
-                contact.email.strip().lower(): contact
-                for contact in contacts
-                if contact.email and contact.email.strip()
-            }
-
-        for ev in [*timed_events, *allday_events]:
+        contacts_by_email = await resolve_contacts_by_email(session, attendee_emails)
+
+        for ev, occ in [*timed_events, *allday_events]:
             event_attendees = attendee_emails_by_event[ev.id]
             events_today.append({
-                "id": ev.id,
+                "id": recurrence.instance_id(ev.id, occ.key) if recurrence.is_series(ev) else ev.id,
                 "summary": ev.summary,
-                "start_datetime": ev.start_datetime.isoformat() if ev.start_datetime else None,
-                "start_date": ev.start_date,
-                "end_datetime": ev.end_datetime.isoformat() if ev.end_datetime else None,
+                "start_datetime": _event_moment(ev.start_datetime, occ.start),
+                "start_date": occ.start.isoformat() if ev.all_day else ev.start_date,
+                "end_datetime": _event_moment(ev.end_datetime, occ.end),
                 "location": ev.location,
                 "all_day": ev.all_day,
                 "attendees_count": len(event_attendees),
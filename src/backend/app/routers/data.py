@@ -10,6 +10,7 @@ US-SEC-05: Logs d'activite
 import json
 import logging
 import re
+from collections.abc import AsyncIterator, Sequence
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
@@ -36,9 +37,12 @@ from app.models.entities import (
     InvoiceLine,
     Message,
     Notification,
+    OutboundEmail,
     Preference,
     Project,
     PromptTemplate,
+    SheetChange,
+    SheetRowFingerprint,
     Task,
     Variable,
 )
@@ -50,9 +54,10 @@ from app.services.audit import (
     log_activity,
 )
 from app.services.encryption import decrypt_backup_archive, encrypt_backup_archive
+from app.services.export_stream import dumps, encode, iter_batches, json_array, json_object
 from app.services.maintenance import maintenance_mode
 from fastapi import APIRouter, Body, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -100,7 +105,7 @@ async def export_all_data(
     """
     Export toutes les donnees utilisateur (RGPD Art. 20 - Portabilite).
 
-    Retourne un JSON complet avec :
+    Retourne un JSON complet, ecrit en flux, avec :
     - Contacts et projets
     - Conversations et messages
     - Fichiers indexes
@@ -118,133 +123,39 @@ async def export_all_data(
         details=json.dumps({"type": "full_export"}),
     )
 
-    # Contacts
-    contacts_result = await session.execute(select(Contact))
-    contacts = contacts_result.scalars().all()
-
-    # Projects
-    projects_result = await session.execute(select(Project))
-    projects = projects_result.scalars().all()
-
-    # Conversations
-    conversations_result = await session.execute(select(Conversation))
-    conversations = conversations_result.scalars().all()
-
-    # Messages
-    messages_result = await session.execute(select(Message))
-    messages = messages_result.scalars().all()
-
-    # Files
-    files_result = await session.execute(select(FileMetadata))
-    files = files_result.scalars().all()
-
-    # Preferences (excluding API keys)
-    prefs_result = await session.execute(select(Preference))
-    preferences = prefs_result.scalars().all()
-
-    # Board decisions
-    decisions_result = await session.execute(select(BoardDecisionDB))
-    decisions = decisions_result.scalars().all()
-
-    # Documents (atelier documentaire - US-SEC-02 / Art. 20)
-    documents_result = await session.execute(select(Document))
-    documents = documents_result.scalars().all()
-
-    document_sections_result = await session.execute(select(DocumentSection))
-    document_sections = document_sections_result.scalars().all()
-
-    document_pistes_result = await session.execute(select(DocumentPiste))
-    document_pistes = document_pistes_result.scalars().all()
-
-    # Variables utilisateur (chantier 4 - finding Codex 11 : énumération
-    # manuelle, ajout explicite obligatoire)
-    variables_result = await session.execute(select(Variable))
-    variables = variables_result.scalars().all()
-
-    # Données fonctionnelles et connexions. Les secrets des comptes externes
-    # sont volontairement exclus plus bas, mais leurs contenus synchronisés
-    # font partie du droit à la portabilité.
-    prompt_templates = (await session.execute(select(PromptTemplate))).scalars().all()
-    email_accounts = (await session.execute(select(EmailAccount))).scalars().all()
-    email_messages = (await session.execute(select(EmailMessage))).scalars().all()
-    email_labels = (await session.execute(select(EmailLabel))).scalars().all()
-    email_follow_ups = (await session.execute(select(EmailFollowUp))).scalars().all()
-    calendars = (await session.execute(select(Calendar))).scalars().all()
-    calendar_events = (await session.execute(select(CalendarEvent))).scalars().all()
-    tasks = (await session.execute(select(Task))).scalars().all()
-    invoices = (await session.execute(select(Invoice))).scalars().all()
-    invoice_lines = (await session.execute(select(InvoiceLine))).scalars().all()
-    activities = (await session.execute(select(Activity))).scalars().all()
-    deliverables = (await session.execute(select(Deliverable))).scalars().all()
-    notifications = (await session.execute(select(Notification))).scalars().all()
-    agent_tasks = (await session.execute(select(AgentTask))).scalars().all()
-    agent_messages = (await session.execute(select(AgentMessage))).scalars().all()
-    code_changes = (await session.execute(select(CodeChange))).scalars().all()
-    agent_sessions = (await session.execute(select(AgentSession))).scalars().all()
-
-    # Activity logs
-    logs_result = await session.execute(
-        select(ActivityLog).order_by(ActivityLog.timestamp.desc())
-    )
-    logs = logs_result.scalars().all()
+    def table(model, order_by=None, serialize=None, **options) -> AsyncIterator[str]:
+        statement = select(model)
+        if order_by is not None:
+            statement = statement.order_by(order_by)
+        return json_array(
+            iter_batches(session, statement),
+            serialize or (lambda item: _export_row(item, **options)),
+        )
 
-    export_data = {
-        "exported_at": datetime.now(UTC).isoformat(),
-        "app_version": settings.app_version,
-        "data_format_version": "1.2",  # 1.2 : couverture de toutes les tables utilisateur
-        "variables": [
-            {
-                "id": v.id,
-                "name": v.name,
-                "kind": v.kind,
-                "value": v.parsed_value,
-                "description": v.description,
-                "created_at": v.created_at.isoformat(),
-                "updated_at": v.updated_at.isoformat(),
-            }
-            for v in variables
-        ],
-        "contacts": [
-            _export_row(item, json_fields=("tags", "extra_data")) for item in contacts
-        ],
-        "projects": [
-            _export_row(item, json_fields=("tags", "extra_data")) for item in projects
-        ],
-        "conversations": [
-            {
-                "id": conv.id,
-                "title": conv.title,
-                "summary": conv.summary,
-                "created_at": conv.created_at.isoformat(),
-                "updated_at": conv.updated_at.isoformat(),
-                "messages": [
-                    _export_row(m, json_fields=("extra_data",))
-                    for m in messages
-                    if m.conversation_id == conv.id
-                ],
-            }
-            for conv in conversations
-        ],
-        "files": [_export_row(item) for item in files],
-        "preferences": [
-            {
-                "id": p.id,
-                "key": p.key,
-                "value": p.value if "api_key" not in p.key.lower() else "[REDACTED]",
-                "category": p.category,
-                "created_at": p.created_at.isoformat(),
-                "updated_at": p.updated_at.isoformat(),
-            }
-            for p in preferences
-        ],
-        "board_decisions": [
-            _export_row(item, json_fields=("opinions", "synthesis"))
-            for item in decisions
-        ],
-        "prompt_templates": [_export_row(item) for item in prompt_templates],
-        "email_accounts": [
-            _export_row(
-                item,
+    # Ecrit au fil de la lecture : chaque table est parcourue par lots et
+    # jamais chargee en entier, quel que soit le volume de la base.
+    fields = [
+        ("exported_at", datetime.now(UTC).isoformat()),
+        ("app_version", settings.app_version),
+        ("data_format_version", "1.2"),  # 1.2 : couverture de toutes les tables utilisateur
+        # Variables utilisateur (chantier 4 - finding Codex 11 : énumération
+        # manuelle, ajout explicite obligatoire)
+        ("variables", table(Variable, serialize=_export_variable)),
+        ("contacts", table(Contact, json_fields=("tags", "extra_data"))),
+        ("projects", table(Project, json_fields=("tags", "extra_data"))),
+        ("conversations", _export_conversations(session)),
+        ("files", table(FileMetadata)),
+        # Preferences (excluding API keys)
+        ("preferences", table(Preference, serialize=_export_preference)),
+        ("board_decisions", table(BoardDecisionDB, json_fields=("opinions", "synthesis"))),
+        # Données fonctionnelles et connexions. Les secrets des comptes externes
+        # sont volontairement exclus, mais leurs contenus synchronisés font
+        # partie du droit à la portabilité.
+        ("prompt_templates", table(PromptTemplate)),
+        (
+            "email_accounts",
+            table(
+                EmailAccount,
                 exclude={
                     "client_id",
                     "client_secret",
@@ -253,103 +164,168 @@ async def export_all_data(
                     "imap_password",
                 },
                 json_fields=("scopes",),
-            )
-            for item in email_accounts
-        ],
-        "email_messages": [
-            _export_row(
-                item,
-                json_fields=("to_emails", "cc_emails", "bcc_emails", "labels"),
-            )
-            for item in email_messages
-        ],
-        "email_labels": [_export_row(item) for item in email_labels],
-        "email_follow_ups": [_export_row(item) for item in email_follow_ups],
-        "calendars": [
-            _export_row(item, exclude={"caldav_password"}) for item in calendars
-        ],
-        "calendar_events": [
-            _export_row(item, json_fields=("attendees", "recurrence"))
-            for item in calendar_events
-        ],
-        "tasks": [_export_row(item, json_fields=("tags",)) for item in tasks],
-        "invoices": [_export_row(item) for item in invoices],
-        "invoice_lines": [_export_row(item) for item in invoice_lines],
-        "activities": [
-            _export_row(item, json_fields=("extra_data",)) for item in activities
-        ],
-        "deliverables": [_export_row(item) for item in deliverables],
-        "notifications": [_export_row(item) for item in notifications],
-        "agent_tasks": [
-            _export_row(item, json_fields=("files_changed",)) for item in agent_tasks
-        ],
-        "agent_messages": [
-            _export_row(item, json_fields=("tool_calls",)) for item in agent_messages
-        ],
-        "code_changes": [_export_row(item) for item in code_changes],
-        "agent_sessions": [_export_row(item) for item in agent_sessions],
-        "documents": [
-            {
-                "id": doc.id,
-                "title": doc.title,
-                "brief": doc.brief,
-                "status": doc.status,
-                "project_id": doc.project_id,
-                "contact_id": doc.contact_id,
-                "created_at": doc.created_at.isoformat(),
-                "updated_at": doc.updated_at.isoformat(),
-            }
-            for doc in documents
-        ],
-        "document_sections": [
-            {
-                "id": s.id,
-                "document_id": s.document_id,
-                "title": s.title,
-                "brief": s.brief,
-                "order": s.order,
-                "depth": s.depth,
-                "content": s.content,
-                "summary": s.summary,
-                "status": s.status,
-                "orphan": s.orphan,
-                "created_at": s.created_at.isoformat(),
-                "updated_at": s.updated_at.isoformat(),
-            }
-            for s in document_sections
-        ],
-        "document_pistes": [
-            {
-                "id": p.id,
-                "document_id": p.document_id,
-                "section_origine_id": p.section_origine_id,
-                "texte": p.texte,
-                "status": p.status,
-                "created_at": p.created_at.isoformat(),
-            }
-            for p in document_pistes
-        ],
-        "activity_logs": [
-            {
-                "id": log.id,
-                "timestamp": log.timestamp.isoformat(),
-                "action": log.action,
-                "resource_type": log.resource_type,
-                "resource_id": log.resource_id,
-                "details": log.details,
-            }
-            for log in logs
-        ],
-    }
+            ),
+        ),
+        (
+            "email_messages",
+            table(EmailMessage, json_fields=("to_emails", "cc_emails", "bcc_emails", "labels")),
+        ),
+        ("email_labels", table(EmailLabel)),
+        ("email_follow_ups", table(EmailFollowUp)),
+        ("calendars", table(Calendar, exclude={"caldav_password"})),
+        ("calendar_events", table(CalendarEvent, json_fields=("attendees", "recurrence"))),
+        ("tasks", table(Task, json_fields=("tags",))),
+        ("invoices", table(Invoice)),
+        ("invoice_lines", table(InvoiceLine)),
+        ("activities", table(Activity, json_fields=("extra_data",))),
+        ("deliverables", table(Deliverable)),
+        ("notifications", table(Notification)),
+        ("agent_tasks", table(AgentTask, json_fields=("files_changed",))),
+        ("agent_messages", table(AgentMessage, json_fields=("tool_calls",))),
+        ("code_changes", table(CodeChange)),
+        ("agent_sessions", table(AgentSession)),
+        # Documents (atelier documentaire - US-SEC-02 / Art. 20)
+        ("documents", table(Document, serialize=_export_document)),
+        ("document_sections", table(DocumentSection, serialize=_export_document_section)),
+        ("document_pistes", table(DocumentPiste, serialize=_export_document_piste)),
+        # Activity logs
+        (
+            "activity_logs",
+            table(ActivityLog, order_by=ActivityLog.timestamp.desc(), serialize=_export_log),
+        ),
+    ]
 
-    return JSONResponse(
-        content=export_data,
+    return StreamingResponse(
+        encode(json_object(fields)),
+        media_type="application/json",
         headers={
             "Content-Disposition": f'attachment; filename="therese-export-{datetime.now(UTC).strftime("%Y%m%d-%H%M%S")}.json"'
         },
     )
 
 
+async def _export_conversations(session: AsyncSession) -> AsyncIterator[str]:
+    """Conversations et leurs messages, en tableau JSON produit par lots.
+
+    Les deux tables sont lues en parallele, triees sur l'identifiant de
+    conversation : les messages d'une conversation sont regroupes au passage
+    (jointure par fusion), sans index en memoire de toute la table.
+    """
+    messages = _iter_items(
+        iter_batches(
+            session,
+            select(Message).order_by(Message.conversation_id, Message.created_at),
+        )
+    )
+    pending = await anext(messages, None)
+
+    yield "["
+    separator = "\n"
+    async for batch in iter_batches(session, select(Conversation).order_by(Conversation.id)):
+        items = []
+        for conv in batch:
+            # Messages orphelins (conversation supprimee hors ORM) : ignores
+            while pending is not None and pending.conversation_id < conv.id:
+                pending = await anext(messages, None)
+            conv_messages = []
+            while pending is not None and pending.conversation_id == conv.id:
+                conv_messages.append(_export_row(pending, json_fields=("extra_data",)))
+                pending = await anext(messages, None)
+            items.append(dumps({
+                "id": conv.id,
+                "title": conv.title,
+                "summary": conv.summary,
+                "created_at": conv.created_at.isoformat(),
+                "updated_at": conv.updated_at.isoformat(),
+                "messages": conv_messages,
+            }))
+        if items:
+            yield separator + ",\n".join(items)
+            separator = ",\n"
+    yield "\n]"
+
+
+async def _iter_items(batches: AsyncIterator[Sequence[Any]]) -> AsyncIterator[Any]:
+    async for batch in batches:
+        for item in batch:
+            yield item
+
+
+def _export_variable(v: Variable) -> dict[str, Any]:
+    return {
+        "id": v.id,
+        "name": v.name,
+        "kind": v.kind,
+        "value": v.parsed_value,
+        "description": v.description,
+        "created_at": v.created_at.isoformat(),
+        "updated_at": v.updated_at.isoformat(),
+    }
+
+
+def _export_preference(p: Preference) -> dict[str, Any]:
+    return {
+        "id": p.id,
+        "key": p.key,
+        "value": p.value if "api_key" not in p.key.lower() else "[REDACTED]",
+        "category": p.category,
+        "created_at": p.created_at.isoformat(),
+        "updated_at": p.updated_at.isoformat(),
+    }
+
+
+def _export_document(doc: Document) -> dict[str, Any]:
+    return {
+        "id": doc.id,
+        "title": doc.title,
+        "brief": doc.brief,
+        "status": doc.status,
+        "project_id": doc.project_id,
+        "contact_id": doc.contact_id,
+        "created_at": doc.created_at.isoformat(),
+        "updated_at": doc.updated_at.isoformat(),
+    }
+
+
+def _export_document_section(s: DocumentSection) -> dict[str, Any]:
+    return {
+        "id": s.id,
+        "document_id": s.document_id,
+        "title": s.title,
+        "brief": s.brief,
+        "order": s.order,
+        "depth": s.depth,
+        "content": s.content,
+        "summary": s.summary,
+        "status": s.status,
+        "orphan": s.orphan,
+        "created_at": s.created_at.isoformat(),
+        "updated_at": s.updated_at.isoformat(),
+    }
+
+
+def _export_document_piste(p: DocumentPiste) -> dict[str, Any]:
+    return {
+        "id": p.id,
+        "document_id": p.document_id,
+        "section_origine_id": p.section_origine_id,
+        "texte": p.texte,
+        "status": p.status,
+        "created_at": p.created_at.isoformat(),
+    }
+
+
+def _export_log(log: ActivityLog) -> dict[str, Any]:
+    return {
+        "id": log.id,
+        "timestamp": log.timestamp.isoformat(),
+        "action": log.action,
+        "resource_type": log.resource_type,
+        "resource_id": log.resource_id,
+        "details": log.details,
+    }
+
+
 @router.get("/export/conversations")
 async def export_conversations(
     format: str = "json",
@@ -464,6 +440,7 @@ async def delete_all_data(
     await session.execute(delete(DocumentSection))
     await session.execute(delete(Document))
     # -- Tables avec FK
+    await session.execute(delete(OutboundEmail))
     await session.execute(delete(InvoiceLine))
     await session.execute(delete(Invoice))
     await session.execute(delete(CalendarEvent))
@@ -477,6 +454,8 @@ async def delete_all_data(
     await session.execute(delete(Activity))
     await session.execute(delete(PromptTemplate))
     await session.execute(delete(Notification))
+    await session.execute(delete(SheetRowFingerprint))
+    await session.execute(delete(SheetChange))
     # -- Tables principales (deja presentes)
     await session.execute(delete(Message))
     await session.execute(delete(Conversation))
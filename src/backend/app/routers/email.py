@@ -11,12 +11,15 @@ Local First - IMAP/SMTP Provider
 import html
 import json
 import logging
+from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
+from email.utils import parseaddr
 from typing import Any
 
 from app.models.database import get_session
-from app.models.entities import Contact, EmailAccount, EmailMessage
+from app.models.entities import Contact, EmailAccount, EmailMessage, OutboundEmail
 from app.models.schemas_email import (
+    ClassifyBatchRequest,
     ClassifyEmailRequest,
     EmailAccountResponse,
     GenerateResponseRequest,
@@ -28,10 +31,18 @@ from app.models.schemas_email import (
     OAuthCallbackRequest,
     OAuthInitiateRequest,
     OAuthInitiateResponse,
+    OutboxRequest,
     SendEmailRequest,
     UpdatePriorityRequest,
     UpdateSignatureRequest,
 )
+from app.services.email.base_provider import SendEmailRequest as ProviderSendRequest
+from app.services.email.outbound_queue import (
+    apply_signature,
+    enqueue_emails,
+    get_job_status,
+    get_outbound_queue,
+)
 from app.services.email.provider_factory import (
     get_email_provider,
     list_common_providers,
@@ -48,7 +59,8 @@ from app.services.oauth import (
     get_oauth_service,
 )
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -144,6 +156,24 @@ async def get_crm_contact_by_email(
     return result.scalar_one_or_none()
 
 
+async def _attach_crm_contacts(
+    session: AsyncSession, messages: list[dict], sender_emails: list[str | None]
+) -> None:
+    """Ajoute contact_id/contact_name à chaque message (une requête pour toute la liste)."""
+    from app.services.email_contact_matcher import normalize_email, resolve_contacts_by_email
+
+    try:
+        contacts = await resolve_contacts_by_email(session, sender_emails)
+    except Exception as e:
+        logger.warning(f"CRM contact resolution failed for message list: {e}")
+        contacts = {}
+
+    for msg, sender_email in zip(messages, sender_emails, strict=True):
+        contact = contacts.get(normalize_email(sender_email))
+        msg['contact_id'] = contact.id if contact else None
+        msg['contact_name'] = contact.display_name if contact else None
+
+
 async def ensure_valid_access_token(
     account: EmailAccount,
     session: AsyncSession,
@@ -668,6 +698,9 @@ async def disconnect_account(
             # Ne pas bloquer la deconnexion si la revocation echoue
             logger.warning(f"Failed to revoke OAuth token for {account.email}: {e}. Continuing with deletion.")
 
+    # Abandonner les envois encore en file pour ce compte
+    await session.execute(delete(OutboundEmail).where(OutboundEmail.account_id == account_id))
+
     # Delete messages
     statement = select(EmailMessage).where(EmailMessage.account_id == account_id)
     result = await session.execute(statement)
@@ -813,7 +846,7 @@ async def list_messages(
 
     # Route based on provider
     if account.provider == "imap":
-        return await _list_messages_imap(account, max_results, query, label_ids)
+        return await _list_messages_imap(account, max_results, query, label_ids, session=session)
     else:
         return await _list_messages_gmail(account_id, session, max_results, page_token, query, label_ids)
 
@@ -878,6 +911,13 @@ async def _list_messages_gmail(
     if error_count:
         logger.warning(f"Email enrichment: {len(enriched_messages) - error_count}/{len(enriched_messages)} OK, {error_count} errors")
 
+    enriched_messages = list(enriched_messages)
+    await _attach_crm_contacts(
+        session,
+        enriched_messages,
+        [parseaddr(m.get('from', ''))[1] for m in enriched_messages],
+    )
+
     return {
         'messages': list(enriched_messages),
         'nextPageToken': result.get('nextPageToken'),
@@ -890,6 +930,7 @@ async def _list_messages_imap(
     max_results: int,
     query: str | None,
     label_ids: str | None = None,
+    session: AsyncSession | None = None,
 ) -> dict:
     """List messages via IMAP provider with proper error handling."""
     provider = get_email_provider(
@@ -981,6 +1022,9 @@ async def _list_messages_imap(
             'is_starred': msg.is_starred,
         })
 
+    if session is not None:
+        await _attach_crm_contacts(session, enriched, [msg.from_email for msg in messages])
+
     return {
         'messages': enriched,
         'nextPageToken': next_token,
@@ -1001,52 +1045,68 @@ async def get_email_stats(
     NOTE: This route MUST be defined before /messages/{message_id}
     to avoid FastAPI matching 'stats' as a message_id parameter.
     """
-    from sqlalchemy import func
+    from app.services.email_stats import get_email_stats as compute_email_stats
 
-    # High priority (unread)
-    statement_high = select(func.count(EmailMessage.id)).where(
-        EmailMessage.account_id == account_id,
-        EmailMessage.priority == 'high',
-        EmailMessage.is_read == False,  # noqa: E712 (SQLAlchemy column comparison)
-    )
-    result_high = await session.execute(statement_high)
-    high_count = result_high.scalar_one()
-
-    # Medium priority (unread)
-    statement_medium = select(func.count(EmailMessage.id)).where(
-        EmailMessage.account_id == account_id,
-        EmailMessage.priority == 'medium',
-        EmailMessage.is_read == False,  # noqa: E712 (SQLAlchemy column comparison)
-    )
-    result_medium = await session.execute(statement_medium)
-    medium_count = result_medium.scalar_one()
-
-    # Low priority (unread)
-    statement_low = select(func.count(EmailMessage.id)).where(
-        EmailMessage.account_id == account_id,
-        EmailMessage.priority == 'low',
-        EmailMessage.is_read == False,  # noqa: E712 (SQLAlchemy column comparison)
-    )
-    result_low = await session.execute(statement_low)
-    low_count = result_low.scalar_one()
+    return await compute_email_stats(session, account_id)
+
+
+@router.get("/messages/summary/stream")
+async def stream_messages_summary(
+    account_id: str = Query(...),
+    query: str | None = Query(None),
+    max_results: int = Query(20, ge=1, le=100),
+    unread_only: bool = Query(False),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Résumé map-reduce des derniers emails, en streaming SSE.
 
-    # Total unread
-    total_unread = high_count + medium_count + low_count
+    Événements : `progress` (lots résumés, dont `cached` déjà connus) puis
+    `chunk` (synthèse finale morceau par morceau) et `done`.
+    """
+    from app.services.email_digest import stream_email_summary
 
-    # Total messages
-    statement_total = select(func.count(EmailMessage.id)).where(
-        EmailMessage.account_id == account_id,
+    account = await session.get(EmailAccount, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Email account not found")
+
+    if account.provider == "imap":
+        provider = get_email_provider(
+            provider_type="imap",
+            email_address=account.email,
+            password=decrypt_value(account.imap_password),
+            imap_host=account.imap_host,
+            imap_port=account.imap_port,
+            smtp_host=account.smtp_host,
+            smtp_port=account.smtp_port,
+            smtp_use_tls=account.smtp_use_tls,
+        )
+    else:
+        access_token = await ensure_valid_access_token(account, session)
+        provider = get_email_provider("gmail", access_token=access_token)
+
+    messages, _ = await provider.list_messages(
+        max_results=max_results, query=query, unread_only=unread_only
     )
-    result_total = await session.execute(statement_total)
-    total_count = result_total.scalar_one()
 
-    return {
-        'high': high_count,
-        'medium': medium_count,
-        'low': low_count,
-        'total_unread': total_unread,
-        'total': total_count,
-    }
+    async def generate():
+        try:
+            async for event in stream_email_summary(messages):
+                yield f"data: {json.dumps(asdict(event), ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'type': 'done', 'total': len(messages)})}\n\n"
+        except Exception as e:
+            logger.exception("Email summary stream error")
+            yield f"data: {json.dumps({'type': 'error', 'content': str(e)}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @router.get("/messages/{message_id}")
@@ -1138,18 +1198,7 @@ async def send_email(
         raise HTTPException(status_code=404, detail="Email account not found")
 
     # Injection de la signature HTML si le compte en a une
-    body = request.body
-    is_html = request.html
-    if account.signature_html:
-        if is_html:
-            body = body + "<br><br>" + account.signature_html
-        else:
-            # Convertir le body texte en HTML pour ajouter la signature.
-            # Échapper le texte saisi (sinon < > & seraient interprétés comme du
-            # HTML) et restituer les sauts de ligne.
-            safe_body = html.escape(body).replace("\n", "<br>")
-            body = f"<p>{safe_body}</p><br>" + account.signature_html
-            is_html = True
+    body, is_html = apply_signature(account, request.body, request.html)
 
     if account.provider == "imap":
         provider = get_email_provider(
@@ -1162,7 +1211,6 @@ async def send_email(
             smtp_port=account.smtp_port,
             smtp_use_tls=account.smtp_use_tls,
         )
-        from app.services.email.base_provider import SendEmailRequest as ProviderSendRequest
         send_req = ProviderSendRequest(
             to=request.to,
             subject=request.subject,
@@ -1186,6 +1234,57 @@ async def send_email(
         return result
 
 
+@router.post("/outbox")
+async def queue_emails(
+    request: OutboxRequest,
+    account_id: str = Query(...),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """
+    Queue emails for background sending (IMAP/SMTP accounts).
+
+    Returns immediately with a job ID; the messages go out over one SMTP
+    connection per account, with rate limiting and retries.
+    """
+    account = await session.get(EmailAccount, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Email account not found")
+    if account.provider != "imap":
+        raise HTTPException(
+            status_code=400,
+            detail="La file d'envoi est réservée aux comptes IMAP/SMTP",
+        )
+
+    requests = []
+    for message in request.messages:
+        body, is_html = apply_signature(account, message.body, message.html)
+        requests.append(ProviderSendRequest(
+            to=message.to,
+            subject=message.subject,
+            body=body,
+            cc=message.cc or [],
+            bcc=message.bcc or [],
+            is_html=is_html,
+        ))
+    job_id, queued = await enqueue_emails(session, account_id, requests)
+    await session.commit()
+    get_outbound_queue().wake()
+
+    return {"job_id": job_id, "queued": queued}
+
+
+@router.get("/outbox/{job_id}")
+async def get_outbox_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Progress of a queued batch: counters per status and per-message detail."""
+    status = await get_job_status(session, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
 @router.post("/messages/draft")
 async def create_draft(
     request: SendEmailRequest,
@@ -1212,8 +1311,6 @@ async def create_draft(
             smtp_port=account.smtp_port,
             smtp_use_tls=account.smtp_use_tls,
         )
-        from app.services.email.base_provider import SendEmailRequest as ProviderSendRequest
-
         draft_id = await provider.create_draft(
             ProviderSendRequest(
                 to=request.to,
@@ -1412,6 +1509,74 @@ async def delete_label(
 # ============================================================
 
 
+@router.post("/messages/classify-batch")
+async def classify_emails_batch(
+    request: ClassifyBatchRequest,
+    account_id: str = Query(...),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """
+    Classifie en lot les emails déjà en cache local (non classés par défaut).
+
+    Les scores CRM des expéditeurs sont résolus en une requête pour tout le lot.
+
+    US-EMAIL-10: Classement automatique
+    """
+    from app.services.email_classifier_v2 import EmailClassifierV2
+    from app.services.email_contact_matcher import normalize_email, resolve_contacts_by_email
+
+    statement = select(EmailMessage).where(EmailMessage.account_id == account_id)
+    if request.message_ids:
+        statement = statement.where(EmailMessage.id.in_(request.message_ids))
+    if not request.force_reclassify:
+        statement = statement.where(EmailMessage.priority == None)  # noqa: E711 (SQLAlchemy column comparison)
+    statement = statement.order_by(EmailMessage.date.desc()).limit(request.limit)
+    messages = (await session.execute(statement)).scalars().all()
+
+    try:
+        contacts = await resolve_contacts_by_email(session, (m.from_email for m in messages))
+    except Exception as e:
+        logger.warning(f"Failed to get CRM scores for batch classification: {e}")
+        contacts = {}
+    scores = {address: contact.score for address, contact in contacts.items()}
+
+    results = EmailClassifierV2.classify_batch(
+        {
+            'subject': message.subject or '',
+            'from_email': message.from_email,
+            'from_name': message.from_name or '',
+            'snippet': message.snippet or '',
+            'labels': json.loads(message.labels) if message.labels else [],
+            'has_attachments': message.has_attachments,
+            'date': message.date,
+            'contact_score': scores.get(normalize_email(message.from_email)),
+            'message_id': message.id,
+        }
+        for message in messages
+    )
+
+    for message, result in zip(messages, results, strict=True):
+        message.priority = result.priority
+        message.priority_score = result.score
+        message.priority_reason = result.reason
+        message.category = result.category
+        session.add(message)
+    await session.commit()
+
+    return {
+        'classified': len(messages),
+        'results': [
+            {
+                'message_id': message.id,
+                'priority': result.priority,
+                'category': result.category,
+                'score': result.score,
+            }
+            for message, result in zip(messages, results, strict=True)
+        ],
+    }
+
+
 @router.post("/messages/{message_id}/classify")
 async def classify_email(
     message_id: str,
@@ -1426,6 +1591,7 @@ async def classify_email(
     US-EMAIL-10: Classement automatique
     """
     from app.services.email_classifier_v2 import EmailClassifierV2
+    from app.services.email_contact_matcher import normalize_email, resolve_contacts_by_email
 
     # Get message from DB or fetch from Gmail
     message = await session.get(EmailMessage, message_id)
@@ -1460,7 +1626,8 @@ async def classify_email(
     # est la source de vérité du score, le payload Qdrant ne le contient pas)
     contact_score = None
     try:
-        contact = await get_crm_contact_by_email(session, message.from_email)
+        contacts = await resolve_contacts_by_email(session, [message.from_email])
+        contact = contacts.get(normalize_email(message.from_email))
         if contact:
             contact_score = contact.score
     except Exception as e:
@@ -9,8 +9,16 @@ import logging
 from datetime import UTC, datetime, timedelta
 
 from app.models.database import get_session
-from app.models.entities import Contact, Invoice, InvoiceLine, Preference
+from app.models.entities import (
+    Contact,
+    EmailAccount,
+    Invoice,
+    InvoiceLine,
+    InvoiceSequence,
+    Preference,
+)
 from app.models.schemas import (
+    BatchInvoicePdfRequest,
     ConvertDevisRequest,
     CreateInvoiceRequest,
     InvoiceLineResponse,
@@ -18,6 +26,10 @@ from app.models.schemas import (
     MarkPaidRequest,
     UpdateInvoiceRequest,
 )
+from app.services import aggregates
+from app.services.email.base_provider import SendEmailRequest as ProviderSendRequest
+from app.services.email.outbound_queue import apply_signature, enqueue_emails, get_outbound_queue
+from app.services.invoice_batch import InvoiceRenderJob, render_invoices
 from app.services.invoice_pdf import InvoicePDFGenerator
 from app.services.user_profile import get_cached_profile
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -70,9 +82,13 @@ async def _generate_invoice_number(session: AsyncSession, document_type: str = "
     - facture : FACT-YYYY-NNN
     - avoir : AV-YYYY-NNN
 
-    Utilise MAX() pour éviter les race conditions (BUG-073).
+    Compteur `invoice_sequences` incrémenté DANS la transaction du document
+    (le verrou d'écriture SQLite sérialise les créations concurrentes,
+    BUG-073) : numérotation continue, un rollback rend le numéro. Appel en
+    temps constant, quel que soit l'historique.
     """
-    from sqlalchemy import func
+    from sqlalchemy import Integer, cast, func, update
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
     prefix_map = {
         "devis": "DEV",
@@ -82,22 +98,33 @@ async def _generate_invoice_number(session: AsyncSession, document_type: str = "
     prefix = prefix_map.get(document_type, "FACT")
     current_year = datetime.now(UTC).year
 
-    # Utiliser MAX pour trouver le numéro le plus élevé (plus fiable que order_by created_at)
-    statement = (
-        select(func.max(Invoice.invoice_number))
-        .where(Invoice.invoice_number.like(f"{prefix}-{current_year}-%"))
+    result = await session.execute(
+        update(InvoiceSequence)
+        .where(InvoiceSequence.prefix == prefix, InvoiceSequence.year == current_year)
+        .values(last_number=InvoiceSequence.last_number + 1)
+        .returning(InvoiceSequence.last_number)
     )
-    result = await session.execute(statement)
-    max_number = result.scalar_one_or_none()
-
-    if max_number:
-        try:
-            last_number = int(max_number.split("-")[-1])
-            next_number = last_number + 1
-        except ValueError:
-            next_number = 1
-    else:
-        next_number = 1
+    next_number = result.scalar_one_or_none()
+
+    if next_number is None:
+        # Premier document de l'année (ou base non amorcée) : reprise du plus
+        # grand numéro existant, comparé numériquement (FACT-2026-1000 > 999)
+        number_prefix = f"{prefix}-{current_year}-"
+        statement = (
+            select(func.max(cast(func.substr(Invoice.invoice_number, len(number_prefix) + 1), Integer)))
+            .where(Invoice.invoice_number.like(f"{number_prefix}%"))
+        )
+        last_number = (await session.execute(statement)).scalar_one_or_none() or 0
+        statement = sqlite_insert(InvoiceSequence).values(
+            prefix=prefix, year=current_year, last_number=last_number + 1
+        )
+        result = await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[InvoiceSequence.prefix, InvoiceSequence.year],
+                set_={"last_number": InvoiceSequence.last_number + 1},
+            ).returning(InvoiceSequence.last_number)
+        )
+        next_number = result.scalar_one()
 
     return f"{prefix}-{current_year}-{next_number:03d}"
 
@@ -196,6 +223,21 @@ async def list_invoices(
     return [_invoice_to_response(invoice) for invoice in invoices]
 
 
+@router.get("/analytics")
+async def get_invoice_analytics(
+    months: int = Query(12, ge=1, le=120, description="Mois de chiffre d'affaires (mois courant compris)"),
+    top: int = Query(20, ge=1, le=500, description="Nombre de clients par devise"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Chiffre d'affaires mensuel, créances par ancienneté et meilleurs clients.
+
+    Montants par devise, avoirs déduits ; servi depuis le cache d'agrégats
+    tant qu'aucune facture ni aucun contact n'a changé.
+    """
+    return await aggregates.get_invoice_analytics(session, months=months, top=top)
+
+
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
     invoice_id: str,
@@ -551,23 +593,16 @@ async def billing_profile_status(session: AsyncSession = Depends(get_session)):
     }
 
 
-@router.get("/{invoice_id}/pdf")
-async def generate_invoice_pdf(
-    invoice_id: str,
-    session: AsyncSession = Depends(get_session),
-):
-    """
-    Génère et retourne le chemin du PDF de la facture.
+async def _invoice_pdf_payload(
+    session: AsyncSession, invoice: Invoice
+) -> tuple[Contact, dict, dict, dict]:
+    """Rassemble les données du PDF d'une facture (lignes chargées).
 
-    - Utilise les données du profil utilisateur pour l'émetteur
-    - Récupère les données du contact pour le destinataire
-    - Génère un PDF conforme à la réglementation française
-    """
-    invoice = await _get_invoice_with_lines(session, invoice_id)
-
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
+    Lève HTTPException si le contact manque ou si le profil émetteur est incomplet.
 
+    Returns:
+        (contact, invoice_data, contact_data, user_profile_data)
+    """
     # Récupérer le contact
     contact = await session.get(Contact,invoice.contact_id)
     if not contact:
@@ -640,6 +675,30 @@ async def generate_invoice_pdf(
         "tva_intra": user_profile.get("tva_intra", ""),
     }
 
+    return contact, invoice_data, contact_data, user_profile_data
+
+
+@router.get("/{invoice_id}/pdf")
+async def generate_invoice_pdf(
+    invoice_id: str,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Génère et retourne le chemin du PDF de la facture.
+
+    - Utilise les données du profil utilisateur pour l'émetteur
+    - Récupère les données du contact pour le destinataire
+    - Génère un PDF conforme à la réglementation française
+    """
+    invoice = await _get_invoice_with_lines(session, invoice_id)
+
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    _contact, invoice_data, contact_data, user_profile_data = await _invoice_pdf_payload(
+        session, invoice
+    )
+
     # Générer le PDF (dans le dossier de travail si configuré)
     try:
         output_dir = await _get_invoice_output_dir(session)
@@ -662,6 +721,68 @@ async def generate_invoice_pdf(
     return {"pdf_path": pdf_path, "invoice_number": invoice.invoice_number}
 
 
+@router.post("/pdf/batch")
+async def generate_invoice_pdfs(
+    request: BatchInvoicePdfRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Génère les PDFs de plusieurs factures (facturation de fin de mois).
+
+    - Rendu en parallèle dans un pool de processus
+    - Une facture inchangée depuis son dernier rendu n'est pas régénérée
+    - Une facture introuvable ou en échec n'empêche pas les autres
+    """
+    invoice_ids = list(dict.fromkeys(request.invoice_ids))
+    result = await session.execute(
+        select(Invoice).where(Invoice.id.in_(invoice_ids)).options(selectinload(Invoice.lines))
+    )
+    invoices = {invoice.id: invoice for invoice in result.scalars().all()}
+
+    errors: list[dict] = []
+    batch: list[tuple[Invoice, InvoiceRenderJob]] = []
+    for invoice_id in invoice_ids:
+        invoice = invoices.get(invoice_id)
+        if invoice is None:
+            errors.append({"invoice_id": invoice_id, "detail": "Invoice not found"})
+            continue
+        try:
+            _contact, invoice_data, contact_data, user_profile_data = await _invoice_pdf_payload(
+                session, invoice
+            )
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise  # profil émetteur incomplet : vaut pour tout le lot
+            errors.append({"invoice_id": invoice_id, "detail": e.detail})
+            continue
+        batch.append((invoice, InvoiceRenderJob(invoice_data, contact_data, user_profile_data, invoice.currency)))
+
+    output_dir = await _get_invoice_output_dir(session)
+    rendered = await render_invoices([job for _invoice, job in batch], output_dir)
+
+    results = []
+    for (invoice, _job), outcome in zip(batch, rendered, strict=True):
+        if isinstance(outcome, Exception):
+            errors.append({"invoice_id": invoice.id, "detail": f"Erreur lors de la génération du PDF : {outcome}"})
+            continue
+        results.append({
+            "invoice_id": invoice.id,
+            "invoice_number": outcome.invoice_number,
+            "pdf_path": outcome.pdf_path,
+            "pages": outcome.pages,
+            "cached": outcome.cached,
+        })
+
+    logger.info(f"PDF batch: {len(results)} generated, {len(errors)} errors")
+
+    return {
+        "results": results,
+        "errors": errors,
+        "rendered": sum(1 for r in results if not r["cached"]),
+        "cached": sum(1 for r in results if r["cached"]),
+    }
+
+
 def generate_legal_mentions(
     late_penalty_rate: float = 11.62,
     due_date_str: str = "",
@@ -855,13 +976,18 @@ async def update_devis_status(
 @router.post("/{invoice_id}/send")
 async def send_invoice_by_email(
     invoice_id: str,
+    account_id: str | None = Query(None, description="Compte IMAP/SMTP expéditeur (défaut : le premier)"),
     session: AsyncSession = Depends(get_session),
 ):
     """
-    Envoie la facture par email au contact.
+    Envoie la facture par email au contact (PDF en pièce jointe).
+
+    L'email passe par la file d'envoi SMTP persistante : la réponse rend un
+    `job_id` tout de suite (suivi via GET /api/email/outbox/{job_id}). Le statut
+    de la facture ne passe à « sent » qu'une fois l'email réellement parti.
 
     Nécessite:
-    - Un compte email configuré (Phase 1 - Email)
+    - Un compte email IMAP/SMTP configuré
     - Une facture avec un contact ayant un email
     """
     invoice = await _get_invoice_with_lines(session, invoice_id)
@@ -874,18 +1000,77 @@ async def send_invoice_by_email(
     if not contact or not contact.email:
         raise HTTPException(status_code=400, detail="Contact has no email address")
 
-    # TODO: Intégration avec le service email (Phase 1)
-    # L'envoi par email n'est pas encore implémenté.
-    # Ne PAS changer le statut de la facture tant que l'email n'est pas réellement envoyé.
-    raise HTTPException(
-        status_code=501,
-        detail="L'envoi de factures par email n'est pas encore disponible. "
-        "Télécharge le PDF et envoie-le manuellement.",
+    if account_id:
+        account = await session.get(EmailAccount, account_id)
+        if not account:
+            raise HTTPException(status_code=404, detail="Email account not found")
+    else:
+        result = await session.execute(
+            select(EmailAccount)
+            .where(EmailAccount.provider == "imap")
+            .order_by(EmailAccount.created_at)
+            .limit(1)
+        )
+        account = result.scalar_one_or_none()
+    if account is None or account.provider != "imap":
+        raise HTTPException(
+            status_code=400,
+            detail="Configure un compte email IMAP/SMTP pour envoyer tes factures.",
+        )
+
+    _contact, invoice_data, contact_data, user_profile_data = await _invoice_pdf_payload(
+        session, invoice
+    )
+    try:
+        pdf_generator = InvoicePDFGenerator(output_dir=await _get_invoice_output_dir(session))
+        pdf_path = pdf_generator.generate_invoice_pdf(
+            invoice_data=invoice_data,
+            contact_data=contact_data,
+            user_profile=user_profile_data,
+            currency=invoice.currency,
+        )
+    except Exception as e:
+        logger.error(f"Erreur génération PDF facture {invoice_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la génération du PDF : {str(e)}",
+        )
+
+    label = {"devis": "Devis", "avoir": "Avoir"}.get(invoice.document_type, "Facture")
+    sender = user_profile_data["company"] or user_profile_data["name"]
+    body = (
+        f"Bonjour {contact.first_name or contact.display_name},\n\n"
+        f"Veuillez trouver ci-joint {label.lower()} {invoice.invoice_number} "
+        f"d'un montant de {invoice.total_ttc:.2f} {invoice.currency} TTC"
+        + (
+            f", à régler avant le {invoice.due_date.strftime('%d/%m/%Y')}.\n\n"
+            if invoice.document_type == "facture"
+            else ".\n\n"
+        )
+        + "Cordialement,\n"
+        + sender
     )
+    body, is_html = apply_signature(account, body, is_html=False)
+    job_id, _queued = await enqueue_emails(
+        session,
+        account.id,
+        [ProviderSendRequest(
+            to=[contact.email],
+            subject=f"{label} {invoice.invoice_number}" + (f" - {sender}" if sender else ""),
+            body=body,
+            is_html=is_html,
+        )],
+        attachment_paths=[pdf_path],
+        invoice_id=invoice.id,
+    )
+    await session.commit()
+    get_outbound_queue().wake()
+
+    logger.info(f"Invoice {invoice.invoice_number} queued for sending to {contact.email}")
 
     return {
-        "message": "Invoice send functionality not yet implemented (Phase 1 - Email required)",
+        "job_id": job_id,
         "invoice_number": invoice.invoice_number,
         "recipient": contact.email,
-        "pdf_path": str(invoice.id),
+        "pdf_path": pdf_path,
     }
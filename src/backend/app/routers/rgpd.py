@@ -28,6 +28,7 @@ from app.models.schemas import (
     RGPDStatsResponse,
     RGPDUpdateRequest,
 )
+from app.services import aggregates
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
@@ -509,56 +510,11 @@ async def get_rgpd_stats(
     - Contacts sans info RGPD
     - Contacts expirés ou bientôt (30 jours)
     - Contacts avec consentement
-    """
-    result = await session.execute(select(Contact))
-    contacts = result.scalars().all()
-
-    total = len(contacts)
-    par_base_legale = {
-        "consentement": 0,
-        "contrat": 0,
-        "interet_legitime": 0,
-        "obligation_legale": 0,
-        "non_defini": 0,
-    }
-    sans_info = 0
-    expires_ou_bientot = 0
-    avec_consentement = 0
 
-    now = datetime.now(UTC)
-    seuil_30j = now + timedelta(days=30)
-
-    for contact in contacts:
-        # Par base légale
-        base = contact.rgpd_base_legale
-        if base and base in par_base_legale:
-            par_base_legale[base] += 1
-        else:
-            par_base_legale["non_defini"] += 1
-
-        # Sans info RGPD
-        if not contact.rgpd_base_legale and not contact.rgpd_date_collecte:
-            sans_info += 1
-
-        # Expirés ou bientôt
-        if contact.rgpd_date_expiration:
-            exp = contact.rgpd_date_expiration
-            if exp.tzinfo is None:
-                exp = exp.replace(tzinfo=UTC)
-            if exp <= seuil_30j:
-                expires_ou_bientot += 1
-
-        # Avec consentement
-        if contact.rgpd_consentement:
-            avec_consentement += 1
-
-    return RGPDStatsResponse(
-        total_contacts=total,
-        par_base_legale=par_base_legale,
-        sans_info_rgpd=sans_info,
-        expires_ou_bientot=expires_ou_bientot,
-        avec_consentement=avec_consentement,
-    )
+    Compteurs servis depuis le cache d'agrégats tant que les contacts n'ont
+    pas changé ; seules les échéances sont réévaluées à chaque appel.
+    """
+    return RGPDStatsResponse(**await aggregates.get_rgpd_stats(session))
 
 
 # ============================================================
@@ -188,7 +188,7 @@ async def execute_skill(
             and result.success
             and result.file_id
         ):
-            cached_result = registry.get_file(result.file_id)
+            cached_result = await registry.get_file(result.file_id)
             if cached_result and cached_result.file_path.exists():
                 from app.services.skills.code_executor import _validate_document_content
                 if not _validate_document_content(
@@ -236,7 +236,7 @@ async def download_file(file_id: str):
         Le fichier en téléchargement
     """
     registry = get_skills_registry()
-    result = registry.get_file(file_id)
+    result = await registry.get_file(file_id)
 
     # Si pas en cache, chercher le fichier sur disque par son ID
     if not result:
@@ -0,0 +1,428 @@
+"""
+THÉRÈSE v2 - Agrégats en mémoire (pipeline CRM, RGPD, tableau de bord)
+
+Les écrans de synthèse relisaient toute la table des contacts à chaque
+chargement. Les agrégats sont désormais calculés une fois puis servis depuis la
+mémoire, tant que les tables dont ils dépendent n'ont pas changé :
+
+- chaque table porte un **compteur de version**, incrémenté au COMMIT de toute
+  transaction qui l'a modifiée (unité de travail ORM ou `insert`/`update`/
+  `delete` groupé). Un rollback n'incrémente rien ;
+- une entrée de cache est indexée par les versions de ses tables (et, pour le
+  tableau de bord, par la minute courante) : une écriture la rend
+  inaccessible, sans invalidation explicite ;
+- une instruction SQL textuelle qui écrit (`text("DELETE ...")`) incrémente
+  toutes les tables. `init_db`/`close_db` et `drop_all` vident le cache.
+
+Les écritures faites hors session ORM (connexion brute, autre process) ne sont
+pas vues : le cache se désactive avec `aggregates_cache=False`.
+"""
+
+import logging
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.config import settings
+from app.models.entities import Contact, Invoice
+from sqlalchemy import and_, case, event, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from sqlmodel import SQLModel, select
+
+logger = logging.getLogger(__name__)
+
+# Clé de Session.info où s'accumulent les tables modifiées d'une transaction
+_TOUCHED_KEY = "aggregates_touched_tables"
+# Marqueur « toutes les tables » (SQL textuel, effacement complet)
+_ALL_TABLES = "*"
+
+# julianday('1970-01-01')
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+RGPD_BASES_LEGALES = ("consentement", "contrat", "interet_legitime", "obligation_legale")
+
+
+class AggregateCache:
+    """Versions par table et agrégats calculés (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        # Incrémenté par les écritures non attribuables à une table
+        self._global_version = 0
+        self._entries: dict[str, tuple[tuple, Any]] = {}
+
+    def versions(self, tables: Iterable[str]) -> tuple:
+        with self._lock:
+            return (self._global_version, *(self._versions.get(table, 0) for table in tables))
+
+    def get(self, name: str, key: tuple) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry[1] if entry is not None and entry[0] == key else None
+
+    def fill(self, name: str, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[name] = (key, value)
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """Marque des tables modifiées : les agrégats qui en dépendent sont périmés."""
+        with self._lock:
+            for table in tables:
+                if table == _ALL_TABLES:
+                    self._global_version += 1
+                else:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._global_version += 1
+            self._entries.clear()
+
+
+_cache = AggregateCache()
+
+
+def get_aggregate_cache() -> AggregateCache:
+    """Cache global des agrégats (singleton du process)."""
+    return _cache
+
+
+async def cached_aggregate(
+    name: str,
+    tables: Iterable[str],
+    compute: Callable[[], Awaitable[Any]],
+    *key: Any,
+) -> Any:
+    """Valeur de l'agrégat `name`, recalculée seulement si `tables` ont changé.
+
+    Les versions sont lues AVANT le calcul : une écriture commitée pendant
+    celui-ci change la clé, et le résultat éventuellement périmé ne sera
+    jamais resservi. La valeur renvoyée est partagée : ne pas la modifier.
+    """
+    if not settings.aggregates_cache:
+        return await compute()
+
+    cache_key = (_cache.versions(tables), *key)
+    value = _cache.get(name, cache_key)
+    if value is None:
+        value = await compute()
+        _cache.fill(name, cache_key, value)
+    return value
+
+
+# ============================================================
+# Pipeline CRM
+# ============================================================
+
+
+async def _compute_pipeline_stats(session: AsyncSession) -> dict[str, Any]:
+    """Contacts et score moyen par stage, en UNE requête agrégée."""
+    result = await session.execute(
+        select(Contact.stage, func.count(Contact.id), func.avg(Contact.score))
+        .group_by(Contact.stage)
+    )
+    stages_data = {}
+    total_contacts = 0
+    for stage, count, avg_score in result.all():
+        total_contacts += count
+        stages_data[stage] = {
+            "count": count,
+            "avg_score": float(avg_score) if avg_score else 0.0,
+        }
+    return {"total_contacts": total_contacts, "stages": stages_data}
+
+
+async def get_pipeline_stats(session: AsyncSession) -> dict[str, Any]:
+    """Statistiques du pipeline commercial (GET /crm/pipeline/stats)."""
+    return await cached_aggregate(
+        "pipeline_stats",
+        (Contact.__tablename__,),
+        lambda: _compute_pipeline_stats(session),
+    )
+
+
+# ============================================================
+# RGPD
+# ============================================================
+
+
+async def _compute_rgpd_counters(session: AsyncSession) -> dict[str, Any]:
+    """Compteurs RGPD indépendants de l'heure, et échéances triées.
+
+    Les dates d'expiration sont gardées sous forme de timestamps triés : le
+    nombre de contacts expirés ou bientôt se lit ensuite par dichotomie pour
+    n'importe quel instant, sans requête.
+    """
+    sans_info = case(
+        (
+            and_(
+                or_(Contact.rgpd_base_legale == None, Contact.rgpd_base_legale == ""),  # noqa: E711
+                Contact.rgpd_date_collecte == None,  # noqa: E711
+            ),
+            1,
+        ),
+        else_=0,
+    )
+    consentement = case((Contact.rgpd_consentement == True, 1), else_=0)  # noqa: E712
+    result = await session.execute(
+        select(
+            Contact.rgpd_base_legale,
+            func.count(Contact.id),
+            func.sum(sans_info),
+            func.sum(consentement),
+        ).group_by(Contact.rgpd_base_legale)
+    )
+
+    par_base_legale = dict.fromkeys(RGPD_BASES_LEGALES, 0)
+    par_base_legale["non_defini"] = 0
+    counters = {"total_contacts": 0, "sans_info_rgpd": 0, "avec_consentement": 0}
+    for base, count, sans_info_count, consent_count in result.all():
+        counters["total_contacts"] += count
+        counters["sans_info_rgpd"] += sans_info_count or 0
+        counters["avec_consentement"] += consent_count or 0
+        par_base_legale[base if base in RGPD_BASES_LEGALES else "non_defini"] += count
+
+    # Timestamps calculés par SQLite (dates stockées en UTC) : pas de
+    # conversion en datetime Python ligne à ligne
+    expirations = array("d")
+    result = await session.stream_scalars(
+        select((func.julianday(Contact.rgpd_date_expiration) - _UNIX_EPOCH_JULIAN_DAY) * 86400.0)
+        .where(Contact.rgpd_date_expiration != None)  # noqa: E711
+        .order_by(Contact.rgpd_date_expiration)
+        .execution_options(yield_per=5000)
+    )
+    async for partition in result.partitions():
+        expirations.extend(partition)
+
+    return {
+        **counters,
+        "par_base_legale": par_base_legale,
+        "expirations": expirations,
+    }
+
+
+async def get_rgpd_stats(session: AsyncSession, now: datetime | None = None) -> dict[str, Any]:
+    """Statistiques RGPD globales (GET /rgpd/stats)."""
+    counters = await cached_aggregate(
+        "rgpd_stats",
+        (Contact.__tablename__,),
+        lambda: _compute_rgpd_counters(session),
+    )
+    seuil_30j = (now or datetime.now(UTC)) + timedelta(days=30)
+    return {
+        "total_contacts": counters["total_contacts"],
+        "par_base_legale": dict(counters["par_base_legale"]),
+        "sans_info_rgpd": counters["sans_info_rgpd"],
+        "expires_ou_bientot": bisect_right(counters["expirations"], seuil_30j.timestamp()),
+        "avec_consentement": counters["avec_consentement"],
+    }
+
+
+# ============================================================
+# Facturation : chiffre d'affaires, créances, clients
+# ============================================================
+
+# Documents qui comptent dans le chiffre d'affaires (un avoir le réduit)
+_REVENUE_TYPES = ("facture", "avoir")
+_NOT_ISSUED = ("draft", "cancelled")
+# Factures émises non réglées
+_OUTSTANDING = ("sent", "overdue")
+# Retard en jours -> tranche de l'échéancier (bornes hautes incluses)
+AGING_BUCKETS = (("a_echoir", 0), ("1_30", 30), ("31_60", 60), ("61_90", 90), ("plus_90", None))
+
+
+def _signed(amount):
+    return case((Invoice.document_type == "avoir", -amount), else_=amount)
+
+
+async def _compute_invoice_analytics(session: AsyncSession, now: datetime) -> dict[str, Any]:
+    """CA mensuel, créances par ancienneté et totaux par client, en trois requêtes.
+
+    Cumuls de l'année, rang et part de chaque client sont calculés par des
+    fonctions de fenêtre SQL, par devise (aucune conversion).
+    """
+    issued = and_(Invoice.document_type.in_(_REVENUE_TYPES), Invoice.status.notin_(_NOT_ISSUED))
+
+    month = func.strftime("%Y-%m", Invoice.issue_date)
+    total_ht = func.sum(_signed(Invoice.subtotal_ht))
+    total_ttc = func.sum(_signed(Invoice.total_ttc))
+    year_to_date = {"partition_by": (Invoice.currency, func.substr(month, 1, 4)), "order_by": month}
+    result = await session.execute(
+        select(
+            Invoice.currency,
+            month,
+            func.count(Invoice.id),
+            total_ht,
+            total_ttc,
+            func.sum(total_ht).over(**year_to_date),
+            func.sum(total_ttc).over(**year_to_date),
+        )
+        .where(issued)
+        .group_by(Invoice.currency, month)
+        .order_by(Invoice.currency, month)
+    )
+    revenue_by_month = [
+        {
+            "currency": currency,
+            "month": month_key,
+            "invoices": count,
+            "total_ht": round(ht, 2),
+            "total_ttc": round(ttc, 2),
+            "year_to_date_ht": round(ytd_ht, 2),
+            "year_to_date_ttc": round(ytd_ttc, 2),
+        }
+        for currency, month_key, count, ht, ttc, ytd_ht, ytd_ttc in result.all()
+    ]
+
+    # Ancienneté des créances (index ix_invoices_status_due_date)
+    days_late = func.julianday(now.astimezone(UTC).strftime("%Y-%m-%d %H:%M:%S")) - func.julianday(Invoice.due_date)
+    bucket = case(
+        *((days_late <= limit, name) for name, limit in AGING_BUCKETS if limit is not None),
+        else_=AGING_BUCKETS[-1][0],
+    )
+    result = await session.execute(
+        select(Invoice.currency, bucket, func.count(Invoice.id), func.sum(Invoice.total_ttc))
+        .where(Invoice.status.in_(_OUTSTANDING), Invoice.document_type == "facture")
+        .group_by(Invoice.currency, bucket)
+    )
+    receivables: dict[str, dict[str, Any]] = {}
+    for currency, bucket_name, count, amount in result.all():
+        entry = receivables.setdefault(currency, {
+            "currency": currency,
+            "invoices": 0,
+            "outstanding_ttc": 0.0,
+            "overdue_ttc": 0.0,
+            "aging": {name: 0.0 for name, _limit in AGING_BUCKETS},
+        })
+        entry["invoices"] += count
+        entry["outstanding_ttc"] = round(entry["outstanding_ttc"] + amount, 2)
+        if bucket_name != AGING_BUCKETS[0][0]:
+            entry["overdue_ttc"] = round(entry["overdue_ttc"] + amount, 2)
+        entry["aging"][bucket_name] = round(amount, 2)
+
+    # Totaux par client, rang et part du CA dans la devise
+    invoiced = func.sum(_signed(Invoice.total_ttc))
+    paid = func.sum(case((Invoice.status == "paid", _signed(Invoice.total_ttc)), else_=0.0))
+    outstanding = func.sum(case((Invoice.status.in_(_OUTSTANDING), _signed(Invoice.total_ttc)), else_=0.0))
+    result = await session.execute(
+        select(
+            Invoice.contact_id,
+            Contact.first_name,
+            Contact.last_name,
+            Contact.company,
+            Invoice.currency,
+            func.count(Invoice.id),
+            invoiced,
+            paid,
+            outstanding,
+            func.rank().over(partition_by=Invoice.currency, order_by=invoiced.desc()),
+            invoiced / func.nullif(func.sum(invoiced).over(partition_by=Invoice.currency), 0),
+        )
+        .outerjoin(Contact, Contact.id == Invoice.contact_id)
+        .where(issued)
+        .group_by(Invoice.contact_id, Invoice.currency, Contact.first_name, Contact.last_name, Contact.company)
+        .order_by(Invoice.currency, invoiced.desc())
+    )
+    clients = []
+    for contact_id, first_name, last_name, company, currency, count, total, paid_ttc, due, rank, share in result.all():
+        clients.append({
+            "contact_id": contact_id,
+            "name": Contact(first_name=first_name, last_name=last_name, company=company).display_name,
+            "currency": currency,
+            "invoices": count,
+            "invoiced_ttc": round(total, 2),
+            "paid_ttc": round(paid_ttc, 2),
+            "outstanding_ttc": round(due, 2),
+            "rank": rank,
+            "share": round(share or 0.0, 4),
+        })
+
+    return {
+        "revenue_by_month": revenue_by_month,
+        "receivables": list(receivables.values()),
+        "clients": clients,
+    }
+
+
+async def get_invoice_analytics(
+    session: AsyncSession,
+    months: int = 12,
+    top: int = 20,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """Tableau de bord facturation (GET /invoices/analytics).
+
+    Recalculé après toute écriture sur les factures ou les contacts, et au
+    changement de jour (ancienneté des créances).
+    """
+    now = now or datetime.now(UTC)
+    analytics = await cached_aggregate(
+        "invoice_analytics",
+        (Invoice.__tablename__, Contact.__tablename__),
+        lambda: _compute_invoice_analytics(session, now),
+        now.astimezone(UTC).date(),
+    )
+    # Les `months` derniers mois, mois courant compris
+    first = now.year * 12 + now.month - months
+    first_month = f"{first // 12:04d}-{first % 12 + 1:02d}"
+    return {
+        "revenue_by_month": [row for row in analytics["revenue_by_month"] if row["month"] >= first_month],
+        "receivables": analytics["receivables"],
+        "top_clients": [row for row in analytics["clients"] if row["rank"] <= top],
+    }
+
+
+# ============================================================
+# Écouteurs ORM : versions incrémentées au commit
+# ============================================================
+
+
+def _touched(session: Session) -> set[str]:
+    return session.info.setdefault(_TOUCHED_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context) -> None:
+    touched = _touched(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(instance), "__tablename__", None)
+        if table:
+            touched.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_tables(orm_execute_state) -> None:
+    if orm_execute_state.is_select:
+        return
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        if statement.text.lstrip()[:6].upper() not in ("SELECT", "PRAGMA"):
+            _touched(orm_execute_state.session).add(_ALL_TABLES)
+        return
+    table = getattr(statement, "table", None)
+    name = getattr(table, "name", None)
+    _touched(orm_execute_state.session).add(name or _ALL_TABLES)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session: Session) -> None:
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    if touched:
+        _cache.bump(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+@event.listens_for(SQLModel.metadata, "after_drop")
+def _invalidate_on_drop(target, connection, **kw) -> None:
+    """`drop_all` (effacement, tests) : tout agrégat connu est caduc."""
+    _cache.invalidate()
@@ -8,9 +8,11 @@ Persistance SQLite pour les décisions.
 import asyncio
 import json
 import logging
+from dataclasses import dataclass
 from typing import AsyncGenerator
 from uuid import uuid4
 
+from app.config import settings
 from app.models.board import (
     ADVISOR_CONFIG,
     AdvisorOpinion,
@@ -90,6 +92,40 @@ def _get_user_context() -> str:
     return ""
 
 
+BOARD_SHARED_PREAMBLE = """Tu sièges au Board de décision de THÉRÈSE : plusieurs conseillers aux angles complémentaires examinent le même dossier stratégique, présenté ci-dessous. Ton rôle de conseiller t'est attribué dans le message de l'utilisateur."""
+
+
+def _board_shared_prompt(context_msg: str, user_context: str) -> str:
+    """System prompt commun à tous les conseillers.
+
+    Le matériau coûteux (profil, THERESE.md, question, contexte, recherche
+    web) forme un préfixe identique d'un conseiller à l'autre, réutilisable
+    par le KV cache d'Ollama et le prompt caching des providers cloud ; seul
+    le rôle, dans le message utilisateur, varie.
+    """
+    parts = [BOARD_SHARED_PREAMBLE]
+    if user_context:
+        parts.append(user_context)
+    parts.append(f"## Dossier soumis au Board\n\n{context_msg}")
+    return "\n\n".join(parts)
+
+
+def _advisor_messages(role: AdvisorRole) -> list[LLMMessage]:
+    """Message propre au conseiller, placé après le préfixe commun."""
+    prompt = ADVISOR_CONFIG[role]["system_prompt"]
+    return [LLMMessage(role="user", content=f"{prompt}\n\nDonne ton avis sur le dossier soumis au Board.")]
+
+
+@dataclass(frozen=True)
+class _DraftSynthesis:
+    """Synthèse provisoire (mode cloud) et avis sur lesquels elle repose."""
+
+    roles: frozenset[AdvisorRole]
+    synthesis: BoardSynthesis
+    usage: dict[str, str | int | float]
+    duration: float
+
+
 class BoardService:
     """Service pour les délibérations du board."""
 
@@ -159,6 +195,14 @@ class BoardService:
         encore migrés, cf CLAUDE.md).
         conversation_id="board" : simple étiquette (le tracker ne pose pas de FK)."""
         usage_sink = usage_sink or {}
+        if "cached_input_tokens" in usage_sink or "prompt_eval_ms" in usage_sink:
+            logger.info(
+                "Board %s : prompt %s tokens dont %s en cache, évalué en %s ms",
+                llm_service.config.model,
+                usage_sink.get("input_tokens", "?"),
+                usage_sink.get("cached_input_tokens", "?"),
+                usage_sink.get("prompt_eval_ms", "?"),
+            )
         try:
             from app.services.token_tracker import get_token_tracker
             input_tokens = usage_sink.get("input_tokens") or len(input_text.split()) * 2
@@ -169,6 +213,8 @@ class BoardService:
                 provider=llm_service.config.provider.value,
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
+                cached_input_tokens=usage_sink.get("cached_input_tokens") or 0,
+                cache_creation_input_tokens=usage_sink.get("cache_creation_input_tokens") or 0,
             )
             return {
                 "provider": llm_service.config.provider.value,
@@ -226,8 +272,15 @@ class BoardService:
         if web_search_results:
             context_msg += f"\n\n{web_search_results}"
 
-        user_context = _get_user_context()
+        shared_system = _board_shared_prompt(context_msg, _get_user_context())
         opinions: list[AdvisorOpinion] = []
+        loop = asyncio.get_running_loop()
+        draft_task: asyncio.Task[_DraftSynthesis | None] | None = None
+        draft: _DraftSynthesis | None = None
+        draft_roles: frozenset[AdvisorRole] = frozenset()
+        timed_out: set[AdvisorRole] = set()
+        synthesis_announced = False
+        advisors_done = loop.time()
 
         if is_sovereign:
             # --- MODE SOUVERAIN : séquentiel via Ollama ---
@@ -245,84 +298,99 @@ class BoardService:
             except Exception as e:
                 logger.debug("LLM service non disponible pour Board: %s", e)
             if not default_ollama_model:
-                from app.services.llm import detect_default_ollama_model
-                default_ollama_model = detect_default_ollama_model()
-
-            for role in advisors:
-                config = ADVISOR_CONFIG[role]
-                ollama_model = (request.ollama_models or {}).get(role.value, default_ollama_model)
-
-                # Obtenir le service Ollama avec le modèle choisi
-                ollama_llm = get_llm_service_for_provider("ollama", model_override=ollama_model)
-                if not ollama_llm:
-                    ollama_llm = get_llm_service_for_provider("ollama")
-                if not ollama_llm:
-                    raise RuntimeError(
-                        "Mode souverain indisponible : aucun service Ollama local utilisable."
-                    )
-                llm_service = ollama_llm
-                actual_provider = f"ollama:{ollama_llm.config.model}"
-
-                yield BoardDeliberationChunk(
-                    type="advisor_start",
-                    role=role,
-                    name=config["name"],
-                    emoji=config["emoji"],
-                    provider=actual_provider,
-                )
-
-                advisor_system = config["system_prompt"]
-                if user_context:
-                    advisor_system = f"{config['system_prompt']}\n\n{user_context}"
-
-                messages = [LLMMessage(role="user", content=context_msg)]
-                context = llm_service.prepare_context(messages, system_prompt=advisor_system)
-
-                full_content = ""
-                usage_sink: dict = {}
-                try:
-                    async for chunk in llm_service.stream_response(context, usage_sink=usage_sink):
-                        full_content += chunk
-                        yield BoardDeliberationChunk(
-                            type="advisor_chunk",
-                            role=role,
-                            name=config["name"],
-                            emoji=config["emoji"],
-                            provider=actual_provider,
-                            content=chunk,
+                from app.services.llm import detect_default_ollama_model_async
+                default_ollama_model = await detect_default_ollama_model_async()
+
+            # Conseillers d'un même modèle enchaînés (un chargement par modèle),
+            # le modèle par défaut - déjà chargé pour le chat - en tête ; le
+            # modèle suivant est préchargé pendant que le conseiller répond.
+            from app.services.ollama_warmup import ModelPrefetcher, plan_model_runs
+
+            plan = plan_model_runs(
+                (
+                    (role, (request.ollama_models or {}).get(role.value, default_ollama_model))
+                    for role in advisors
+                ),
+                first_model=default_ollama_model,
+            )
+            prefetcher = ModelPrefetcher()
+            try:
+                for index, (role, ollama_model) in enumerate(plan):
+                    config = ADVISOR_CONFIG[role]
+
+                    # Obtenir le service Ollama avec le modèle choisi
+                    ollama_llm = get_llm_service_for_provider("ollama", model_override=ollama_model)
+                    if not ollama_llm:
+                        ollama_llm = get_llm_service_for_provider("ollama")
+                    if not ollama_llm:
+                        raise RuntimeError(
+                            "Mode souverain indisponible : aucun service Ollama local utilisable."
                         )
-                except Exception as e:
-                    logger.error(f"Sovereign advisor {config['name']} error: {e}")
-                    raise RuntimeError(
-                        f"Le conseiller {config['name']} n'a pas pu répondre via Ollama."
-                    ) from e
+                    llm_service = ollama_llm
+                    actual_provider = f"ollama:{ollama_llm.config.model}"
+
+                    yield BoardDeliberationChunk(
+                        type="advisor_start",
+                        role=role,
+                        name=config["name"],
+                        emoji=config["emoji"],
+                        provider=actual_provider,
+                    )
 
-                usage = self._track_usage(
-                    llm_service,
-                    advisor_system + context_msg,
-                    full_content,
-                    usage_sink,
-                ) or {}
-                opinions.append(AdvisorOpinion(
-                    role=role,
-                    name=config["name"],
-                    emoji=config["emoji"],
-                    content=full_content,
-                    provider=str(usage.get("provider") or llm_service.config.provider.value),
-                    model=str(usage.get("model") or llm_service.config.model),
-                    input_tokens=int(usage.get("input_tokens") or 0),
-                    output_tokens=int(usage.get("output_tokens") or 0),
-                    cost_eur=float(usage.get("cost_eur") or 0.0),
-                ))
+                    messages = _advisor_messages(role)
+                    context = llm_service.prepare_context(messages, system_prompt=shared_system, cache_system_prompt=True)
+                    if index + 1 < len(plan):
+                        prefetcher.prefetch(plan[index + 1][1], running=ollama_model)
 
-                yield BoardDeliberationChunk(
-                    type="advisor_done",
-                    role=role,
-                    name=config["name"],
-                    emoji=config["emoji"],
-                    provider=actual_provider,
-                    content=full_content,
-                )
+                    full_content = ""
+                    usage_sink: dict = {}
+                    try:
+                        async for chunk in llm_service.stream_response(context, usage_sink=usage_sink):
+                            full_content += chunk
+                            yield BoardDeliberationChunk(
+                                type="advisor_chunk",
+                                role=role,
+                                name=config["name"],
+                                emoji=config["emoji"],
+                                provider=actual_provider,
+                                content=chunk,
+                            )
+                    except Exception as e:
+                        logger.error(f"Sovereign advisor {config['name']} error: {e}")
+                        raise RuntimeError(
+                            f"Le conseiller {config['name']} n'a pas pu répondre via Ollama."
+                        ) from e
+
+                    usage = self._track_usage(
+                        llm_service,
+                        shared_system + messages[0].content,
+                        full_content,
+                        usage_sink,
+                    ) or {}
+                    opinions.append(AdvisorOpinion(
+                        role=role,
+                        name=config["name"],
+                        emoji=config["emoji"],
+                        content=full_content,
+                        provider=str(usage.get("provider") or llm_service.config.provider.value),
+                        model=str(usage.get("model") or llm_service.config.model),
+                        input_tokens=int(usage.get("input_tokens") or 0),
+                        output_tokens=int(usage.get("output_tokens") or 0),
+                        cost_eur=float(usage.get("cost_eur") or 0.0),
+                        cached_input_tokens=usage_sink.get("cached_input_tokens"),
+                        prompt_eval_ms=usage_sink.get("prompt_eval_ms"),
+                    ))
+
+                    yield BoardDeliberationChunk(
+                        type="advisor_done",
+                        role=role,
+                        name=config["name"],
+                        emoji=config["emoji"],
+                        provider=actual_provider,
+                        content=full_content,
+                    )
+            finally:
+                await prefetcher.close()
 
         else:
             # --- MODE CLOUD : parallèle multi-providers ---
@@ -371,12 +439,8 @@ class BoardService:
                     provider=actual_provider,
                 ))
 
-                advisor_system = config["system_prompt"]
-                if user_context:
-                    advisor_system = f"{config['system_prompt']}\n\n{user_context}"
-
-                messages = [LLMMessage(role="user", content=context_msg)]
-                context = llm_service.prepare_context(messages, system_prompt=advisor_system)
+                messages = _advisor_messages(role)
+                context = llm_service.prepare_context(messages, system_prompt=shared_system, cache_system_prompt=True)
 
                 full_content = ""
                 usage_sink: dict = {}
@@ -404,7 +468,7 @@ class BoardService:
 
                 usage = self._track_usage(
                     llm_service,
-                    advisor_system + context_msg,
+                    shared_system + messages[0].content,
                     full_content,
                     usage_sink,
                 ) or {}
@@ -418,6 +482,8 @@ class BoardService:
                     input_tokens=int(usage.get("input_tokens") or 0),
                     output_tokens=int(usage.get("output_tokens") or 0),
                     cost_eur=float(usage.get("cost_eur") or 0.0),
+                    cached_input_tokens=usage_sink.get("cached_input_tokens"),
+                    prompt_eval_ms=usage_sink.get("prompt_eval_ms"),
                 )
 
                 await chunk_queue.put(BoardDeliberationChunk(
@@ -429,50 +495,123 @@ class BoardService:
                     content=full_content,
                 ))
 
-            tasks = [asyncio.create_task(process_advisor(role)) for role in advisors]
+            tasks = {role: asyncio.create_task(process_advisor(role)) for role in advisors}
 
             task_results: list[object] = []
 
             async def monitor_tasks():
                 try:
-                    task_results.extend(await asyncio.gather(*tasks, return_exceptions=True))
+                    task_results.extend(await asyncio.gather(*tasks.values(), return_exceptions=True))
                 finally:
                     await chunk_queue.put(None)
 
+            async def draft_synthesis(draft_opinions: list[AdvisorOpinion]) -> _DraftSynthesis | None:
+                """Synthèse provisoire sur les avis déjà reçus (quorum atteint)."""
+                draft_started = loop.time()
+                try:
+                    synthesis, usage = await self._generate_synthesis(
+                        request.question, draft_opinions, default_llm
+                    )
+                except Exception as e:
+                    logger.warning(f"Synthèse provisoire du Board abandonnée : {e}")
+                    return None
+                await chunk_queue.put(BoardDeliberationChunk(
+                    type="synthesis_draft",
+                    content=json.dumps(synthesis.model_dump(), ensure_ascii=False),
+                ))
+                return _DraftSynthesis(
+                    roles=frozenset(op.role for op in draft_opinions),
+                    synthesis=synthesis,
+                    usage=usage,
+                    duration=loop.time() - draft_started,
+                )
+
+            # Synthèse incrémentale : dès `quorum` avis, une synthèse provisoire
+            # démarre en parallèle des retardataires, qui disposent ensuite de
+            # `board_straggler_timeout_seconds` avant d'être écartés.
+            quorum = settings.board_synthesis_quorum
+            early_synthesis = 0 < quorum < len(advisors)
+            straggler_deadline: float | None = None
             monitor = asyncio.create_task(monitor_tasks())
 
             try:
                 while True:
-                    chunk = await chunk_queue.get()
+                    remaining = None if straggler_deadline is None else max(0.0, straggler_deadline - loop.time())
+                    try:
+                        chunk = await asyncio.wait_for(chunk_queue.get(), remaining)
+                    except TimeoutError:
+                        straggler_deadline = None
+                        for role, task in tasks.items():
+                            if task.done():
+                                continue
+                            task.cancel()
+                            timed_out.add(role)
+                            yield BoardDeliberationChunk(
+                                type="advisor_timeout",
+                                role=role,
+                                name=ADVISOR_CONFIG[role]["name"],
+                                emoji=ADVISOR_CONFIG[role]["emoji"],
+                                provider=advisor_services[role][1],
+                                content="Avis non reçu à temps, écarté de la synthèse.",
+                            )
+                        continue
                     if chunk is None:
                         break
                     yield chunk
+                    if (
+                        chunk.type == "advisor_done"
+                        and early_synthesis
+                        and draft_task is None
+                        and len(opinions_dict) >= quorum
+                    ):
+                        draft_opinions = [opinions_dict[role] for role in advisors if role in opinions_dict]
+                        draft_roles = frozenset(op.role for op in draft_opinions)
+                        draft_task = asyncio.create_task(draft_synthesis(draft_opinions))
+                        straggler_deadline = loop.time() + settings.board_straggler_timeout_seconds
+                        synthesis_announced = True
+                        yield BoardDeliberationChunk(type="synthesis_start", content="")
 
                 await monitor
+                advisors_done = loop.time()
+                if draft_task is not None and not draft_task.done() and draft_roles != set(opinions_dict):
+                    # Le dernier avis est arrivé avant la fin de la provisoire :
+                    # l'attendre puis la réviser coûterait deux synthèses, on
+                    # l'abandonne au profit d'une seule, complète.
+                    draft_task.cancel()
+                    await asyncio.gather(draft_task, return_exceptions=True)
+                elif draft_task is not None:
+                    draft = await draft_task
+                    while not chunk_queue.empty():
+                        if (chunk := chunk_queue.get_nowait()) is not None:
+                            yield chunk
             finally:
                 # La fermeture du flux HTTP doit réellement interrompre les
                 # appels encore en cours. On attend leur annulation avant de
                 # quitter afin d'interdire synthèse et persistance tardives.
-                for task in tasks:
+                pending = [*tasks.values(), monitor, *([draft_task] if draft_task else [])]
+                for task in pending:
                     if not task.done():
                         task.cancel()
-                if not monitor.done():
-                    monitor.cancel()
-                await asyncio.gather(*tasks, return_exceptions=True)
-                await asyncio.gather(monitor, return_exceptions=True)
+                await asyncio.gather(*pending, return_exceptions=True)
 
             advisor_errors = [
-                result for result in task_results
-                if isinstance(result, BaseException)
+                result for role, result in zip(tasks, task_results, strict=False)
+                if isinstance(result, BaseException) and role not in timed_out
             ]
             if advisor_errors:
                 raise RuntimeError(
                     "La délibération est incomplète : au moins un conseiller a échoué."
                 ) from advisor_errors[0]
+            if timed_out:
+                logger.warning(
+                    "Board : %d conseiller(s) écarté(s) faute d'avis dans les %.0f s",
+                    len(timed_out), settings.board_straggler_timeout_seconds,
+                )
             opinions = [opinions_dict[role] for role in advisors if role in opinions_dict]
 
         # --- Synthèse ---
-        yield BoardDeliberationChunk(type="synthesis_start", content="")
+        if not synthesis_announced:
+            yield BoardDeliberationChunk(type="synthesis_start", content="")
 
         # En mode souverain, utiliser Ollama pour la synthèse aussi
         synthesis_llm = default_llm
@@ -485,7 +624,31 @@ class BoardService:
                 )
             synthesis_llm = ollama_synth
 
-        synthesis = await self._generate_synthesis(request.question, opinions, synthesis_llm)
+        if draft is not None and draft.roles == {op.role for op in opinions}:
+            # Aucun avis arrivé après la synthèse provisoire : elle fait foi
+            synthesis, synthesis_usage = draft.synthesis, dict(draft.usage)
+            synthesis_duration = draft.duration
+        else:
+            synthesis_started = loop.time()
+            synthesis, synthesis_usage = await self._generate_synthesis(
+                request.question, opinions, synthesis_llm,
+                draft=draft.synthesis if draft is not None else None,
+            )
+            synthesis_duration = loop.time() - synthesis_started
+            if draft is not None:
+                for key in ("input_tokens", "output_tokens", "cost_eur"):
+                    synthesis_usage[key] = (synthesis_usage.get(key) or 0) + (draft.usage.get(key) or 0)
+        if draft_task is not None:
+            # Gain par rapport à une synthèse lancée après le dernier avis,
+            # négatif si la provisoire a fait attendre
+            saved_ms = (advisors_done + synthesis_duration - loop.time()) * 1000
+            synthesis_usage["early_synthesis_saved_ms"] = round(saved_ms)
+            outcome = "abandonnée" if draft is None else "reprise" if draft.roles == {op.role for op in opinions} else "révisée"
+            logger.info(
+                "Board : synthèse provisoire sur %d/%d avis (%s), %.0f ms gagnées",
+                len(draft_roles), len(advisors), outcome, saved_ms,
+            )
+        self._last_synthesis_usage = synthesis_usage
 
         # --- Persistance SQLite ---
         decision_id = str(uuid4())
@@ -534,14 +697,25 @@ class BoardService:
         question: str,
         opinions: list[AdvisorOpinion],
         llm_service,
-    ) -> BoardSynthesis:
-        """Génère une synthèse à partir des avis des conseillers."""
+        draft: BoardSynthesis | None = None,
+    ) -> tuple[BoardSynthesis, dict[str, str | int | float]]:
+        """Génère une synthèse à partir des avis des conseillers.
+
+        `draft` : synthèse provisoire établie sur une partie des avis, à
+        réviser avec l'ensemble. Retourne la synthèse et son usage.
+        """
 
         # Build synthesis prompt
         opinions_text = "\n\n".join([
             f"**{op.emoji} {op.name}:**\n{op.content}"
             for op in opinions
         ])
+        draft_text = ""
+        if draft is not None:
+            draft_text = (
+                "\nSYNTHÈSE PROVISOIRE (établie avant les derniers avis, à réviser) :\n"
+                f"{json.dumps(draft.model_dump(), ensure_ascii=False)}\n"
+            )
 
         synthesis_prompt = f"""Analyse les avis des conseillers et génère une synthèse structurée.
 
@@ -550,7 +724,7 @@ QUESTION STRATÉGIQUE :
 
 AVIS DES CONSEILLERS :
 {opinions_text}
-
+{draft_text}
 GÉNÈRE UNE SYNTHÈSE AU FORMAT JSON :
 {{
   "consensus_points": ["Point 1 sur lequel tous s'accordent", "Point 2..."],
@@ -580,7 +754,7 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
         usage_sink: dict = {}
         async for chunk in llm_service.stream_response(context, usage_sink=usage_sink):
             full_response += chunk
-        self._last_synthesis_usage = self._track_usage(
+        usage = self._track_usage(
             llm_service,
             synthesis_prompt,
             full_response,
@@ -600,7 +774,7 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
             cleaned = cleaned.strip()
 
             data = json.loads(cleaned)
-            return BoardSynthesis(**data)
+            return BoardSynthesis(**data), usage
         except Exception as e:
             logger.error(f"Failed to parse synthesis JSON: {e}")
             logger.error(f"Raw response: {full_response}")
@@ -8,6 +8,8 @@ Supports Nextcloud, iCloud, Fastmail, cal.com, Radicale, etc.
 import asyncio
 import logging
 import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import UTC, date, datetime, timedelta
 from typing import Optional
 
@@ -22,6 +24,9 @@ from app.services.calendar.base_provider import (
     allday_end_from_wire,
     allday_end_to_wire,
 )
+from caldav.elements import dav
+from caldav.elements.base import ValuedBaseElement
+from caldav.lib.url import URL
 from icalendar import Calendar as ICalendar
 from icalendar import Event as IEvent
 from icalendar import vDate, vDatetime
@@ -29,6 +34,80 @@ from icalendar import vDate, vDatetime
 logger = logging.getLogger(__name__)
 
 
+class GetCTag(ValuedBaseElement):
+    """Propriété `getctag` (calendarserver.org) : change à chaque écriture."""
+
+    tag = "{http://calendarserver.org/ns/}getctag"
+
+
+@dataclass
+class CollectionChanges:
+    """Changements d'une collection depuis un jeton de synchronisation."""
+
+    changed: dict[str, str] = field(default_factory=dict)  # href -> ETag
+    deleted: list[str] = field(default_factory=list)
+    sync_token: str | None = None
+    # Liste complète (premier passage, jeton refusé, serveur sans
+    # sync-collection) : tout href connu absent de `changed` a disparu
+    complete: bool = False
+
+
+class CalDAVCollection:
+    """Vue « synchronisation » d'un calendrier CalDAV.
+
+    Appels BLOQUANTS (client caldav synchrone) : à lancer dans un executor.
+    """
+
+    def __init__(self, calendar: caldav.Calendar):
+        self._calendar = calendar
+
+    @classmethod
+    def open(cls, url: str, username: str, password: str, calendar_id: str) -> "CalDAVCollection":
+        """Collection `calendar_id` (id ou URL) du serveur `url`."""
+        provider = CalDAVProvider(url=url, username=username, password=password)
+        for cal in provider._get_principal().calendars():
+            if cal.id == calendar_id or str(cal.url) == calendar_id:
+                return cls(cal)
+        raise ValueError(f"Calendar {calendar_id} not found")
+
+    def ctag(self) -> str | None:
+        """ctag courant, None si le serveur ne l'expose pas."""
+        try:
+            props = self._calendar.get_properties([GetCTag()])
+        except Exception as e:
+            logger.debug("CalDAV getctag indisponible : %s", e)
+            return None
+        value = props.get(GetCTag.tag)
+        return str(value) if value else None
+
+    def changes(self, sync_token: str | None) -> CollectionChanges:
+        """REPORT sync-collection (RFC 6578) : href et ETag, sans les données.
+
+        La bibliothèque se replie d'elle-même sur une recherche complète
+        (jeton « fake-… ») si le serveur ne gère pas sync-collection.
+        """
+        collection = self._calendar.get_objects_by_sync_token(sync_token, load_objects=False)
+        token = collection.sync_token
+        result = CollectionChanges(
+            sync_token=str(token) if token else None,
+            complete=sync_token is None or str(token or "").startswith("fake-"),
+        )
+        for obj in collection:
+            href = str(obj.url.canonical())
+            etag = obj.props.get(dav.GetEtag.tag)
+            if etag:
+                result.changed[href] = str(etag)
+            else:
+                # Membre en 404 dans la réponse : ressource supprimée
+                result.deleted.append(href)
+        return result
+
+    def fetch(self, hrefs: Iterable[str]) -> dict[str, str]:
+        """Données iCalendar des ressources `hrefs` (un seul calendar-multiget)."""
+        objects = self._calendar.multiget([URL.objectify(href) for href in hrefs])
+        return {str(obj.url.canonical()): obj.data for obj in objects if obj.data}
+
+
 class CalDAVProvider(CalendarProvider):
     """
     CalDAV implementation of CalendarProvider.
@@ -0,0 +1,368 @@
+"""
+THERESE v2 - iCalendar en flux (import / export .ics, synchronisation CalDAV)
+
+Un agenda de plusieurs années compte des dizaines de milliers de VEVENT :
+le fichier n'est jamais chargé ni construit en entier.
+
+- `IcsStreamParser` découpe les octets reçus en VEVENT, analysés par lots
+  (les VTIMEZONE du fichier sont rejoints à chaque lot) ;
+- `IcsImporter` les écrit par lots d'INSERT ... ON CONFLICT : l'UID (et
+  RECURRENCE-ID pour une exception de série) identifie l'événement, un
+  événement déjà présent dans le calendrier est mis à jour ;
+- `ics_calendar` sérialise les événements lot par lot pour une
+  StreamingResponse.
+
+`vevent_fields` (VEVENT -> colonnes de `calendar_events`) sert aussi à la
+synchronisation CalDAV.
+"""
+
+import codecs
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import UTC, date, datetime
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.models.entities import Calendar, CalendarEvent, generate_uuid
+from app.services.calendar import recurrence
+from app.services.calendar.base_provider import allday_end_from_wire, allday_end_to_wire
+from icalendar import Calendar as ICalendar
+from icalendar import Event as IEvent
+from icalendar import vDDDTypes
+from icalendar.parser import foldline
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+# VEVENT analysés ensemble par icalendar
+PARSE_BATCH_SIZE = 500
+# Lignes par INSERT ... ON CONFLICT
+IMPORT_BATCH_SIZE = 500
+
+ICS_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "PRODID:-//THERESE v2//FR\r\n"
+    "VERSION:2.0\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+)
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+_RECURRENCE_PROPERTIES = ("RRULE", "EXDATE", "RDATE")
+_ICAL_STATUS = {"TENTATIVE": "tentative", "CANCELLED": "cancelled"}
+
+
+# ============================================================
+# VEVENT -> colonnes locales
+# ============================================================
+
+
+def _zone(tz_name: str | None) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or recurrence.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(recurrence.DEFAULT_TIMEZONE)
+
+
+def timing_fields(start: datetime | date, end: datetime | date | None) -> dict[str, Any]:
+    """Colonnes de début / fin (datetimes en UTC, dates au format ISO)."""
+    if isinstance(start, datetime):
+        return {
+            "all_day": False,
+            "start_datetime": start,
+            "end_datetime": end if isinstance(end, datetime) else start,
+            "start_date": None,
+            "end_date": None,
+        }
+    # BUG-144 : fin exclusive (RFC 5545, Google) -> inclusive (app)
+    last_day = allday_end_from_wire(start, end) if isinstance(end, date) and not isinstance(end, datetime) else start
+    return {
+        "all_day": True,
+        "start_datetime": None,
+        "end_datetime": None,
+        "start_date": start.isoformat(),
+        "end_date": last_day.isoformat(),
+    }
+
+
+def _ical_moment(value: datetime | date, tz_name: str | None) -> datetime | date:
+    """Date iCalendar -> date, ou datetime UTC (heure flottante : fuseau du calendrier)."""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=_zone(tz_name))
+    return value.astimezone(UTC)
+
+
+def vevent_fields(vevent, tz_name: str | None) -> dict[str, Any] | None:
+    """Colonnes locales d'un VEVENT (maître ou exception RECURRENCE-ID)."""
+    uid = str(vevent.get("uid", "")).strip()
+    dtstart = vevent.get("dtstart")
+    if not uid or dtstart is None:
+        return None
+
+    start = _ical_moment(dtstart.dt, tz_name)
+    if vevent.get("dtend") is not None:
+        end = _ical_moment(vevent.get("dtend").dt, tz_name)
+    elif vevent.get("duration") is not None:
+        end = start + vevent.get("duration").dt
+    else:
+        end = None
+
+    # Seules les lignes de récurrence sont resérialisées (TZID compris)
+    lines = []
+    for name in _RECURRENCE_PROPERTIES:
+        values = vevent.get(name)
+        if values is None:
+            continue
+        for value in values if isinstance(values, list) else [values]:
+            lines.append(str(vevent.content_line(name, value)))
+    attendees = vevent.get("attendee") or []
+    if not isinstance(attendees, list):
+        attendees = [attendees]
+    emails = [str(attendee).split(":", 1)[-1] for attendee in attendees]
+
+    fields = {
+        "id": uid,
+        "summary": str(vevent.get("summary", "")),
+        "description": str(vevent.get("description")) if vevent.get("description") else None,
+        "location": str(vevent.get("location")) if vevent.get("location") else None,
+        "attendees": json.dumps([email for email in emails if email]),
+        "recurrence": json.dumps(lines) if lines else None,
+        "status": _ICAL_STATUS.get(str(vevent.get("status", "")).upper(), "confirmed"),
+        "recurring_event_id": None,
+        "original_start": None,
+        **timing_fields(start, end),
+    }
+    recurrence_id = vevent.get("recurrence-id")
+    if recurrence_id is not None:
+        key = recurrence.occurrence_key(_ical_moment(recurrence_id.dt, tz_name))
+        fields.update(
+            id=recurrence.instance_id(uid, key),
+            recurring_event_id=uid,
+            original_start=key,
+            recurrence=None,
+        )
+    return fields
+
+
+# ============================================================
+# Lecture en flux
+# ============================================================
+
+
+class IcsStreamParser:
+    """Découpe un flux .ics en VEVENT, sans garder le fichier en mémoire.
+
+    `feed` reçoit des blocs d'octets quelconques (lignes et caractères UTF-8
+    coupés compris) et renvoie les VEVENT complets, analysés par lots de
+    `batch_size` ; `close` renvoie le reste. Erreur de syntaxe : ValueError.
+    """
+
+    def __init__(self, batch_size: int = PARSE_BATCH_SIZE):
+        self._batch_size = batch_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._tail = ""  # ligne physique incomplète
+        self._line: str | None = None  # ligne logique en cours de dépliage
+        self._depth = 0
+        self._block: list[str] | None = None  # composant de premier niveau
+        self._block_name = ""
+        self._timezones: list[str] = []
+        self._pending: list[str] = []
+        self._seen_calendar = False
+
+    def feed(self, chunk: bytes) -> list[IEvent]:
+        lines = (self._tail + self._decoder.decode(chunk)).split("\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._physical_line(line.rstrip("\r"))
+        return self._parse_pending(final=False)
+
+    def close(self) -> list[IEvent]:
+        rest = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        if rest:
+            self._physical_line(rest.rstrip("\r"))
+        self._logical_line()
+        if not self._seen_calendar:
+            raise ValueError("BEGIN:VCALENDAR introuvable")
+        return self._parse_pending(final=True)
+
+    def _physical_line(self, line: str) -> None:
+        # RFC 5545 3.1 : une ligne commençant par un blanc prolonge la précédente
+        if line[:1] in (" ", "\t") and self._line is not None:
+            self._line += line[1:]
+            return
+        self._logical_line()
+        self._line = line
+
+    def _logical_line(self) -> None:
+        line, self._line = self._line, None
+        if not line or not line.strip():
+            return
+        name, _, value = line.partition(":")
+        name = name.upper()
+        if name == "BEGIN":
+            self._depth += 1
+            if self._depth == 1:
+                self._seen_calendar = value.strip().upper() == "VCALENDAR"
+            elif self._depth == 2:
+                self._block, self._block_name = [], value.strip().upper()
+        if self._block is not None:
+            self._block.append(line)
+        if name == "END":
+            self._depth -= 1
+            if self._depth == 1 and self._block is not None:
+                text = "\r\n".join(self._block) + "\r\n"
+                if self._block_name == "VEVENT":
+                    self._pending.append(text)
+                elif self._block_name == "VTIMEZONE":
+                    self._timezones.append(text)
+                self._block = None
+
+    def _parse_pending(self, final: bool) -> list[IEvent]:
+        events: list[IEvent] = []
+        while len(self._pending) >= self._batch_size or (final and self._pending):
+            batch = self._pending[: self._batch_size]
+            del self._pending[: self._batch_size]
+            calendar = ICalendar.from_ical(
+                "BEGIN:VCALENDAR\r\n" + "".join(self._timezones) + "".join(batch) + "END:VCALENDAR\r\n"
+            )
+            events.extend(c for c in calendar.subcomponents if c.name == "VEVENT")
+        return events
+
+
+# ============================================================
+# Import par lots (upsert sur l'UID)
+# ============================================================
+
+
+class IcsImporter:
+    """Écrit les VEVENT d'un fichier dans un calendrier, par lots.
+
+    Un événement déjà présent DANS CE calendrier est mis à jour ; un
+    identifiant qui appartient à un autre calendrier, un doublon dans le
+    fichier ou un VEVENT sans début sont ignorés (`skipped`). Les bornes
+    indexées sont calculées ici : l'INSERT groupé ne passe pas par l'ORM.
+    """
+
+    def __init__(self, session: AsyncSession, calendar: Calendar, batch_size: int = IMPORT_BATCH_SIZE):
+        self._session = session
+        self._calendar = calendar
+        self._batch_size = batch_size
+        self._pending: list[dict[str, Any]] = []
+        self._seen: set[str] = set()
+        self.imported = 0
+        self.updated = 0
+        self.skipped = 0
+
+    @property
+    def total(self) -> int:
+        return self.imported + self.updated + self.skipped
+
+    async def add(self, vevent: IEvent) -> None:
+        if not vevent.get("uid"):
+            vevent.add("uid", generate_uuid())
+        fields = vevent_fields(vevent, self._calendar.timezone)
+        if fields is None or fields["id"] in self._seen:
+            self.skipped += 1
+            return
+        self._seen.add(fields["id"])
+
+        row = {
+            **fields,
+            "summary": (fields["summary"] or "Sans titre")[:200],
+            "calendar_id": self._calendar.id,
+            "etag": None,
+            "remote_href": None,
+            "synced_at": datetime.now(UTC),
+        }
+        # model_construct : pas de validation, la ligne ne sert qu'au calcul des bornes
+        row["range_start"], row["range_end"] = recurrence.series_bounds(
+            CalendarEvent.model_construct(**row), self._calendar.timezone
+        )
+        self._pending.append(row)
+        if len(self._pending) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        result = await self._session.execute(
+            select(CalendarEvent.id, CalendarEvent.calendar_id)
+            .where(CalendarEvent.id.in_([row["id"] for row in rows]))
+        )
+        existing = dict(result.all())
+        foreign = {event_id for event_id, calendar_id in existing.items() if calendar_id != self._calendar.id}
+        rows = [row for row in rows if row["id"] not in foreign]
+        self.skipped += len(foreign)
+        self.updated += len(existing) - len(foreign)
+        self.imported += len(rows) - (len(existing) - len(foreign))
+        if not rows:
+            return
+
+        statement = sqlite_insert(CalendarEvent)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CalendarEvent.id],
+            set_={column: statement.excluded[column] for column in rows[0] if column != "id"},
+        )
+        await self._session.execute(statement, rows)
+
+
+# ============================================================
+# Export en flux
+# ============================================================
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def event_to_ical(evt: CalendarEvent) -> str:
+    """VEVENT d'un événement stocké (une exception reprend l'UID de sa série)."""
+    ie = IEvent()
+    ie.add("uid", evt.recurring_event_id or evt.id)
+    if evt.recurring_event_id and evt.original_start:
+        original = recurrence.parse_occurrence_key(evt.original_start)
+        ie.add("recurrence-id", vDDDTypes(original))
+    ie.add("summary", evt.summary)
+    if evt.description:
+        ie.add("description", evt.description)
+    if evt.location:
+        ie.add("location", evt.location)
+    ie.add("status", evt.status.upper() if evt.status else "CONFIRMED")
+
+    if evt.all_day and evt.start_date:
+        ie.add("dtstart", date.fromisoformat(evt.start_date))
+        if evt.end_date:
+            # BUG-144 (F4 revue) : DTEND est EXCLUSIF (RFC 5545), la fin
+            # stockée est INCLUSIVE -> +1 jour à l'export.
+            ie.add("dtend", allday_end_to_wire(date.fromisoformat(evt.end_date)))
+    elif evt.start_datetime:
+        ie.add("dtstart", _as_utc(evt.start_datetime))
+        if evt.end_datetime:
+            ie.add("dtend", _as_utc(evt.end_datetime))
+
+    if evt.attendees:
+        try:
+            for attendee in json.loads(evt.attendees):
+                ie.add("attendee", f"mailto:{attendee}")
+        except (ValueError, TypeError):
+            pass
+
+    text = ie.to_ical().decode("utf-8")
+    # RRULE / EXDATE / RDATE recopiées telles quelles (TZID compris)
+    lines = recurrence.parse_recurrence(evt.recurrence) if not evt.recurring_event_id else []
+    if lines:
+        end = text.rindex("END:VEVENT")
+        text = text[:end] + "".join(foldline(line) + "\r\n" for line in lines) + text[end:]
+    return text
+
+
+async def ics_calendar(batches: AsyncIterator[Sequence[CalendarEvent]]) -> AsyncIterator[str]:
+    """Fichier .ics produit lot par lot (voir export_stream.iter_batches)."""
+    yield ICS_HEADER
+    async for batch in batches:
+        if batch:
+            yield "".join(event_to_ical(evt) for evt in batch)
+    yield ICS_FOOTER
@@ -6,11 +6,13 @@ No external dependencies, works completely offline.
 Part of the "Local First" architecture.
 """
 
+import json
 import logging
 from datetime import UTC, date, datetime
 
 import pytz
 from app.models.entities import Calendar, CalendarEvent, generate_uuid
+from app.services.calendar import recurrence
 from app.services.calendar.base_provider import (
     CalendarDTO,
     CalendarEventDTO,
@@ -173,51 +175,36 @@ class LocalCalendarProvider(CalendarProvider):
         max_results: int = 100,
         page_token: str | None = None,
     ) -> tuple[list[CalendarEventDTO], str | None]:
-        """List events from a local calendar."""
-        statement = select(CalendarEvent).where(CalendarEvent.calendar_id == calendar_id)
-
-        # Time filtering
-        if time_min:
-            statement = statement.where(
-                (CalendarEvent.start_datetime >= time_min) |
-                (CalendarEvent.start_date >= time_min.strftime("%Y-%m-%d"))
-            )
-        if time_max:
-            statement = statement.where(
-                (CalendarEvent.start_datetime <= time_max) |
-                (CalendarEvent.start_date <= time_max.strftime("%Y-%m-%d"))
-            )
+        """List events from a local calendar.
 
-        # Order by start time
-        statement = statement.order_by(
-            CalendarEvent.start_datetime.asc(),
-            CalendarEvent.start_date.asc(),
+        Les séries récurrentes sont dépliées sur [time_min, time_max] : chaque
+        occurrence a son identifiant (`<maître>_<clé>`). Sans time_max, une
+        série ne donne que sa prochaine occurrence.
+        """
+        occurrences = await recurrence.events_between(
+            self._session, time_min, time_max, calendar_ids=[calendar_id]
         )
 
-        # Pagination
+        # Pagination (sur les occurrences : une série compte pour plusieurs)
         offset = int(page_token) if page_token else 0
-        statement = statement.offset(offset).limit(max_results)
-
-        result = await self._session.execute(statement)
-        events = result.scalars().all()
-
-        # Calculate next page token
+        page = occurrences[offset:offset + max_results]
         next_token = None
-        if len(events) == max_results:
+        if len(occurrences) > offset + max_results:
             next_token = str(offset + max_results)
 
-        return [self._event_to_dto(event) for event in events], next_token
+        return [self._occurrence_to_dto(event, occ) for event, occ in page], next_token
 
     async def get_event(
         self,
         calendar_id: str,
         event_id: str,
     ) -> CalendarEventDTO:
-        """Get a single event."""
+        """Get a single event (or a single occurrence of a series)."""
         event = await self._session.get(CalendarEvent, event_id)
-        if not event or event.calendar_id != calendar_id:
-            raise ValueError(f"Event {event_id} not found in calendar {calendar_id}")
-        return self._event_to_dto(event)
+        if event and event.calendar_id == calendar_id:
+            return self._event_to_dto(event)
+        master, occurrence = await self._get_occurrence(calendar_id, event_id)
+        return self._occurrence_to_dto(master, occurrence)
 
     async def create_event(self, request: CreateEventRequest) -> CalendarEventDTO:
         """Create a new local event."""
@@ -249,12 +236,10 @@ class LocalCalendarProvider(CalendarProvider):
 
         # Set recurrence
         if request.recurrence:
-            import json
             event.recurrence = json.dumps(request.recurrence)
 
         # Set attendees
         if request.attendees:
-            import json
             event.attendees = json.dumps(request.attendees)
 
         self._session.add(event)
@@ -270,10 +255,15 @@ class LocalCalendarProvider(CalendarProvider):
         event_id: str,
         request: UpdateEventRequest,
     ) -> CalendarEventDTO:
-        """Update a local event."""
+        """Update a local event.
+
+        Modifier une occurrence d'une série crée une exception (événement
+        rattaché au maître) : les autres occurrences ne changent pas.
+        """
         event = await self._session.get(CalendarEvent, event_id)
         if not event or event.calendar_id != calendar_id:
-            raise ValueError(f"Event {event_id} not found in calendar {calendar_id}")
+            master, occurrence = await self._get_occurrence(calendar_id, event_id)
+            event = self._make_override(master, occurrence)
 
         if request.summary is not None:
             event.summary = request.summary
@@ -304,12 +294,10 @@ class LocalCalendarProvider(CalendarProvider):
                 event.end_datetime = request.end if isinstance(request.end, datetime) else datetime.combine(request.end, datetime.min.time())
                 event.end_date = None
 
-        if request.recurrence is not None:
-            import json
+        if request.recurrence is not None and not event.recurring_event_id:
             event.recurrence = json.dumps(request.recurrence) if request.recurrence else None
 
         if request.attendees is not None:
-            import json
             event.attendees = json.dumps(request.attendees) if request.attendees else None
 
         event.synced_at = datetime.now(UTC)
@@ -325,12 +313,27 @@ class LocalCalendarProvider(CalendarProvider):
         calendar_id: str,
         event_id: str,
     ) -> None:
-        """Delete a local event."""
+        """Delete a local event.
+
+        Supprimer une occurrence l'exclut de sa série (EXDATE sur le maître) ;
+        supprimer le maître supprime aussi ses exceptions.
+        """
         event = await self._session.get(CalendarEvent, event_id)
         if not event or event.calendar_id != calendar_id:
-            raise ValueError(f"Event {event_id} not found in calendar {calendar_id}")
-
-        await self._session.delete(event)
+            master, occurrence = await self._get_occurrence(calendar_id, event_id)
+            self._exclude_occurrence(master, occurrence.key)
+        elif event.recurring_event_id:
+            master = await self._session.get(CalendarEvent, event.recurring_event_id)
+            if master and event.original_start:
+                self._exclude_occurrence(master, event.original_start)
+            await self._session.delete(event)
+        else:
+            result = await self._session.execute(
+                select(CalendarEvent).where(CalendarEvent.recurring_event_id == event.id)
+            )
+            for override in result.scalars().all():
+                await self._session.delete(override)
+            await self._session.delete(event)
         await self._session.commit()
 
         logger.info(f"Deleted local event: {event_id}")
@@ -351,10 +354,84 @@ class LocalCalendarProvider(CalendarProvider):
             remote_id=None,
         )
 
+    async def _get_occurrence(
+        self,
+        calendar_id: str,
+        event_id: str,
+    ) -> tuple[CalendarEvent, recurrence.Occurrence]:
+        """Maître et occurrence désignés par un identifiant `<maître>_<clé>`."""
+        parts = recurrence.split_instance_id(event_id)
+        master = await self._session.get(CalendarEvent, parts[0]) if parts else None
+        if master and master.calendar_id == calendar_id and recurrence.is_series(master):
+            start = recurrence.parse_occurrence_key(parts[1])
+            moment = start if isinstance(start, datetime) else datetime.combine(start, datetime.min.time(), UTC)
+            calendar = await self._session.get(Calendar, calendar_id)
+            for occurrence in recurrence.expand(master, moment, moment, calendar.timezone if calendar else None):
+                if occurrence.key == parts[1]:
+                    return master, occurrence
+        raise ValueError(f"Event {event_id} not found in calendar {calendar_id}")
+
+    def _make_override(
+        self,
+        master: CalendarEvent,
+        occurrence: recurrence.Occurrence,
+    ) -> CalendarEvent:
+        """Exception d'une série : copie du maître figée sur une occurrence."""
+        override = CalendarEvent(
+            id=recurrence.instance_id(master.id, occurrence.key),
+            calendar_id=master.calendar_id,
+            summary=master.summary,
+            description=master.description,
+            location=master.location,
+            all_day=master.all_day,
+            attendees=master.attendees,
+            status=master.status,
+            recurring_event_id=master.id,
+            original_start=occurrence.key,
+        )
+        start, end = self._occurrence_bounds(master, occurrence)
+        if master.all_day:
+            override.start_date = start.strftime("%Y-%m-%d")
+            override.end_date = end.strftime("%Y-%m-%d") if end else None
+        else:
+            override.start_datetime, override.end_datetime = start, end
+        return override
+
+    def _exclude_occurrence(self, master: CalendarEvent, key: str) -> None:
+        """Retire une occurrence de la série (EXDATE)."""
+        lines = recurrence.parse_recurrence(master.recurrence)
+        exdate = recurrence.exdate_line(key)
+        if exdate not in lines:
+            master.recurrence = json.dumps([*lines, exdate])
+            master.synced_at = datetime.now(UTC)
+            self._session.add(master)
+
+    @staticmethod
+    def _occurrence_bounds(
+        event: CalendarEvent,
+        occurrence: recurrence.Occurrence,
+    ) -> tuple[datetime | date, datetime | date | None]:
+        """Début/fin d'une occurrence, naïfs (UTC) si le maître est stocké naïf."""
+        if event.all_day or (event.start_datetime and event.start_datetime.tzinfo):
+            return occurrence.start, occurrence.end
+        end = occurrence.end.replace(tzinfo=None) if occurrence.end else None
+        return occurrence.start.replace(tzinfo=None), end
+
+    def _occurrence_to_dto(
+        self,
+        event: CalendarEvent,
+        occurrence: recurrence.Occurrence,
+    ) -> CalendarEventDTO:
+        """DTO d'une occurrence (l'événement lui-même s'il n'est pas une série)."""
+        dto = self._event_to_dto(event)
+        if recurrence.is_series(event):
+            dto.id = recurrence.instance_id(event.id, occurrence.key)
+            dto.recurring_event_id = event.id
+            dto.start, dto.end = self._occurrence_bounds(event, occurrence)
+        return dto
+
     def _event_to_dto(self, event: CalendarEvent) -> CalendarEventDTO:
         """Convert CalendarEvent entity to CalendarEventDTO."""
-        import json
-
         # Parse attendees
         attendees = []
         if event.attendees:
@@ -364,10 +441,10 @@ class LocalCalendarProvider(CalendarProvider):
                 pass
 
         # Parse recurrence
-        recurrence = None
+        recurrence_lines = None
         if event.recurrence:
             try:
-                recurrence = json.loads(event.recurrence)
+                recurrence_lines = json.loads(event.recurrence)
             except json.JSONDecodeError:
                 pass
 
@@ -389,7 +466,8 @@ class LocalCalendarProvider(CalendarProvider):
             end=end,
             all_day=event.all_day,
             attendees=attendees,
-            recurrence=recurrence,
+            recurrence=recurrence_lines,
+            recurring_event_id=event.recurring_event_id,
             status=event.status,
             created_at=event.synced_at,
             updated_at=event.synced_at,
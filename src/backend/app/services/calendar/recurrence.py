@@ -0,0 +1,362 @@
+"""
+THERESE v2 - Recurrence expansion (RFC 5545)
+
+Les événements récurrents sont stockés une seule fois (événement « maître »,
+`recurrence` = JSON de lignes RRULE / EXDATE / RDATE). Les occurrences d'une
+fenêtre sont calculées à la demande :
+
+- la règle est évaluée dans le fuseau du calendrier (9h reste 9h après un
+  changement d'heure), puis ramenée en UTC comme le reste de la base ;
+- une occurrence modifiée individuellement est un événement à part entière
+  (`recurring_event_id` = maître, `original_start` = clé de l'occurrence
+  remplacée) ; une occurrence supprimée est une ligne EXDATE du maître ;
+- `range_start`/`range_end` (début de la première et de la dernière
+  occurrence, NULL = série sans fin) sont tenus à jour à chaque écriture ORM
+  et indexés : une fenêtre ne lit que les événements qui peuvent la couper.
+
+Les règles analysées et les occurrences calculées sont mises en cache par
+contenu (règle, début, fuseau, fenêtre) : modifier un événement change la clé,
+l'ancienne expansion n'est plus jamais servie.
+"""
+
+import json
+import logging
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.models.entities import Calendar, CalendarEvent
+from dateutil.rrule import rruleset, rrulestr
+from sqlalchemy import event, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = "Europe/Paris"
+
+# Marge de la présélection indexée : les bornes des événements sur la journée
+# entière sont stockées à minuit UTC, la fenêtre demandée peut être locale.
+RANGE_SLACK = timedelta(days=1)
+
+_UNTIL_RE = re.compile(r"UNTIL=(\d{8})(T\d{6})?(Z?)", re.IGNORECASE)
+_KEY_RE = re.compile(r"\d{8}(T\d{6}Z)?")
+
+
+@dataclass(frozen=True)
+class Occurrence:
+    """Une occurrence calculée d'un événement (début, fin, clé RECURRENCE-ID)."""
+
+    start: datetime | date
+    end: datetime | date | None
+    key: str
+
+
+def occurrence_key(start: datetime | date) -> str:
+    """Clé d'une occurrence : UTC `YYYYMMDDTHHMMSSZ`, ou `YYYYMMDD` (journée entière)."""
+    if isinstance(start, datetime):
+        return _as_utc(start).strftime("%Y%m%dT%H%M%SZ")
+    return start.strftime("%Y%m%d")
+
+
+def parse_occurrence_key(key: str) -> datetime | date:
+    """Inverse de `occurrence_key`."""
+    if len(key) == 8:
+        return datetime.strptime(key, "%Y%m%d").date()
+    return datetime.strptime(key, "%Y%m%dT%H%M%SZ").replace(tzinfo=UTC)
+
+
+def instance_id(master_id: str, key: str) -> str:
+    """Identifiant d'une occurrence (même forme que Google Calendar)."""
+    return f"{master_id}_{key}"
+
+
+def split_instance_id(event_id: str) -> tuple[str, str] | None:
+    """(maître, clé) d'un identifiant d'occurrence, None sinon."""
+    master_id, sep, key = event_id.rpartition("_")
+    if sep and master_id and _KEY_RE.fullmatch(key):
+        return master_id, key
+    return None
+
+
+def parse_recurrence(raw: str | None) -> list[str]:
+    """Lignes de récurrence stockées (JSON), liste vide si absente ou invalide."""
+    if not raw:
+        return []
+    try:
+        lines = json.loads(raw)
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(lines, list):
+        return []
+    return [line for line in lines if isinstance(line, str)]
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Les datetimes naïfs de la base sont en UTC."""
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def _zone(tz_name: str | None) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def _parse_value(value: str, params: dict[str, str], tz: ZoneInfo, all_day: bool) -> datetime:
+    """Une valeur EXDATE/RDATE, dans le repère de la règle (naïf si journée entière)."""
+    if len(value) == 8:
+        parsed = datetime.strptime(value, "%Y%m%d")
+        return parsed if all_day else parsed.replace(tzinfo=tz)
+    utc = value[-1:] in ("Z", "z")
+    parsed = datetime.strptime(value.rstrip("Zz"), "%Y%m%dT%H%M%S")
+    if all_day:
+        return datetime.combine(parsed.date(), time())
+    if utc:
+        return parsed.replace(tzinfo=UTC).astimezone(tz)
+    return parsed.replace(tzinfo=_zone(params["TZID"]) if "TZID" in params else tz)
+
+
+def _normalize_until(rule: str, all_day: bool, tz: ZoneInfo) -> str:
+    """UNTIL cohérent avec DTSTART (exigé par dateutil) : UTC si horaire, date sinon."""
+
+    def fix(match: re.Match) -> str:
+        day, clock, utc = match.groups()
+        if all_day:
+            return f"UNTIL={day}"
+        if utc:
+            return match.group(0)
+        local = datetime.strptime(day + (clock or "T235959"), "%Y%m%dT%H%M%S")
+        return "UNTIL=" + local.replace(tzinfo=tz).astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+    return _UNTIL_RE.sub(fix, rule)
+
+
+@lru_cache(maxsize=512)
+def _rule_set(recurrence: tuple[str, ...], dtstart: datetime, tz_name: str) -> rruleset | None:
+    """Règle analysée (cache par contenu). None si aucune RRULE/RDATE exploitable."""
+    tz = _zone(tz_name)
+    all_day = dtstart.tzinfo is None
+    rules = rruleset(cache=True)
+    has_dates = False
+    for line in recurrence:
+        head, _, values = line.strip().partition(":")
+        name, *raw_params = head.split(";")
+        params = dict(param.split("=", 1) for param in raw_params if "=" in param)
+        name = name.upper()
+        try:
+            if name == "RRULE":
+                rules.rrule(rrulestr(_normalize_until(values, all_day, tz), dtstart=dtstart))
+                has_dates = True
+            elif name in ("EXDATE", "RDATE"):
+                for value in filter(None, (v.strip() for v in values.split(","))):
+                    parsed = _parse_value(value, params, tz, all_day)
+                    if name == "EXDATE":
+                        rules.exdate(parsed)
+                    else:
+                        rules.rdate(parsed)
+                        has_dates = True
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("Ligne de récurrence ignorée (%s) : %s", line, e)
+    if not has_dates:
+        return None
+    # RFC 5545 : DTSTART est toujours la première occurrence
+    rules.rdate(dtstart)
+    return rules
+
+
+def _is_unbounded(rules: rruleset) -> bool:
+    return any(rule._count is None and rule._until is None for rule in rules._rrule)
+
+
+def _dtstart(ev: CalendarEvent, tz_name: str) -> datetime | None:
+    """DTSTART de la règle : local au calendrier (horaire) ou naïf (journée entière)."""
+    if ev.all_day:
+        return datetime.strptime(ev.start_date, "%Y-%m-%d") if ev.start_date else None
+    if ev.start_datetime is None:
+        return None
+    return _as_utc(ev.start_datetime).astimezone(_zone(tz_name))
+
+
+def _recurrence_of(ev: CalendarEvent) -> tuple[str, ...]:
+    # Une exception est une occurrence unique, même si elle copie la règle
+    return () if ev.recurring_event_id else tuple(parse_recurrence(ev.recurrence))
+
+
+def is_series(ev: CalendarEvent) -> bool:
+    """Événement maître d'une série (ses occurrences ont un identifiant propre)."""
+    return bool(_recurrence_of(ev))
+
+
+def exdate_line(key: str) -> str:
+    """Ligne EXDATE retirant l'occurrence `key` d'une série."""
+    return f"EXDATE;VALUE=DATE:{key}" if len(key) == 8 else f"EXDATE:{key}"
+
+
+def series_bounds(
+    ev: CalendarEvent,
+    tz_name: str | None = None,
+) -> tuple[datetime | None, datetime | None]:
+    """Début de la première et de la dernière occurrence, en UTC.
+
+    (None, None) si l'événement n'a pas de début ; fin None = série sans fin.
+    Une date (journée entière) est bornée à minuit UTC.
+    """
+    tz_name = tz_name or DEFAULT_TIMEZONE
+    dtstart = _dtstart(ev, tz_name)
+    if dtstart is None:
+        return None, None
+    recurrence = _recurrence_of(ev)
+    rules = _rule_set(recurrence, dtstart, tz_name) if recurrence else None
+    first = last = dtstart
+    if rules is not None:
+        if _is_unbounded(rules):
+            return _as_utc(dtstart), None
+        # Série finie, parcourue une fois à l'écriture (RDATE possibles avant DTSTART)
+        starts = list(rules)
+        first, last = min(starts), max(starts)
+    return _as_utc(first), _as_utc(last)
+
+
+@event.listens_for(CalendarEvent, "before_insert")
+@event.listens_for(CalendarEvent, "before_update")
+def _update_series_bounds(mapper, connection, target: CalendarEvent) -> None:
+    """Bornes indexées recalculées à chaque écriture ORM d'un événement."""
+    tz_name = connection.execute(
+        select(Calendar.timezone).where(Calendar.id == target.calendar_id)
+    ).scalar()
+    target.range_start, target.range_end = series_bounds(target, tz_name)
+
+
+@lru_cache(maxsize=2048)
+def _starts_between(
+    recurrence: tuple[str, ...],
+    dtstart: datetime,
+    tz_name: str,
+    lo: datetime,
+    hi: datetime | None,
+) -> tuple[datetime, ...]:
+    """Débuts d'occurrences dans [lo, hi] (cache par contenu et fenêtre).
+
+    Sans borne haute, rien n'est déplié : une série ne donne que sa prochaine
+    occurrence.
+    """
+    rules = _rule_set(recurrence, dtstart, tz_name) if recurrence else None
+    if rules is None:
+        return (dtstart,) if lo <= dtstart and (hi is None or dtstart <= hi) else ()
+    if hi is not None:
+        return tuple(rules.between(lo, hi, inc=True))
+    upcoming = rules.after(lo, inc=True)
+    return (upcoming,) if upcoming is not None else ()
+
+
+def expand(
+    ev: CalendarEvent,
+    time_min: datetime | None,
+    time_max: datetime | None,
+    tz_name: str | None = None,
+    skip: frozenset[str] = frozenset(),
+) -> list[Occurrence]:
+    """Occurrences de `ev` dont le début tombe dans [time_min, time_max].
+
+    Bornes incluses, comparaison à la date près pour les événements sur la
+    journée entière (comme le filtrage historique). Les clés de `skip`
+    (occurrences remplacées par une exception) sont omises.
+    """
+    tz_name = tz_name or DEFAULT_TIMEZONE
+    dtstart = _dtstart(ev, tz_name)
+    if dtstart is None:
+        return []
+    if ev.all_day:
+        lo = datetime.combine(_as_utc(time_min).date(), time()) if time_min else dtstart
+        hi = datetime.combine(_as_utc(time_max).date(), time()) if time_max else None
+        first = dtstart.date()
+        last = datetime.strptime(ev.end_date, "%Y-%m-%d").date() if ev.end_date else None
+    else:
+        lo = _as_utc(time_min) if time_min else dtstart
+        hi = _as_utc(time_max) if time_max else None
+        first = _as_utc(ev.start_datetime)
+        last = _as_utc(ev.end_datetime) if ev.end_datetime else None
+    duration = last - first if last is not None else None
+
+    occurrences = []
+    for start in _starts_between(_recurrence_of(ev), dtstart, tz_name, lo, hi):
+        stored = start.date() if ev.all_day else start.astimezone(UTC)
+        key = occurrence_key(stored)
+        if key in skip:
+            continue
+        end = stored + duration if duration is not None else None
+        occurrences.append(Occurrence(start=stored, end=end, key=key))
+    return occurrences
+
+
+def occurrence_sort_key(occurrence: Occurrence) -> datetime:
+    """Clé de tri commune aux occurrences horaires et sur la journée entière."""
+    start = occurrence.start
+    return start if isinstance(start, datetime) else datetime.combine(start, time(), UTC)
+
+
+async def events_between(
+    session: AsyncSession,
+    time_min: datetime | None,
+    time_max: datetime | None,
+    calendar_ids: Sequence[str] | None = None,
+    include_cancelled: bool = True,
+) -> list[tuple[CalendarEvent, Occurrence]]:
+    """Occurrences de la fenêtre, séries récurrentes dépliées, triées par début.
+
+    La présélection passe par l'index (calendar_id, range_start, range_end) ;
+    le filtrage exact est fait par `expand`. Un événement aux bornes encore
+    inconnues (base migrée, jamais réécrit) reste toujours candidat.
+    """
+    statement = select(CalendarEvent)
+    if calendar_ids is not None:
+        statement = statement.where(CalendarEvent.calendar_id.in_(calendar_ids))
+    if time_max is not None:
+        statement = statement.where(
+            or_(
+                CalendarEvent.range_start == None,  # noqa: E711
+                CalendarEvent.range_start <= _as_utc(time_max) + RANGE_SLACK,
+            )
+        )
+    if time_min is not None:
+        statement = statement.where(
+            or_(
+                CalendarEvent.range_end == None,  # noqa: E711
+                CalendarEvent.range_end >= _as_utc(time_min) - RANGE_SLACK,
+            )
+        )
+    if not include_cancelled:
+        statement = statement.where(CalendarEvent.status != "cancelled")
+    events = (await session.execute(statement)).scalars().all()
+    if not events:
+        return []
+
+    timezones = dict((await session.execute(select(Calendar.id, Calendar.timezone))).all())
+
+    # Occurrences remplacées par une exception (modifiée ou annulée)
+    overridden: dict[str, set[str]] = {}
+    masters = [ev.id for ev in events if ev.recurrence and not ev.recurring_event_id]
+    if masters:
+        result = await session.execute(
+            select(CalendarEvent.recurring_event_id, CalendarEvent.original_start)
+            .where(CalendarEvent.recurring_event_id.in_(masters))
+        )
+        for master_id, key in result.all():
+            if key:
+                overridden.setdefault(master_id, set()).add(key)
+
+    occurrences = []
+    for ev in events:
+        if ev.recurring_event_id and ev.status == "cancelled":
+            # Exception « annulée » : l'occurrence est retirée de la série
+            continue
+        skip = frozenset(overridden.get(ev.id, ()))
+        for occurrence in expand(ev, time_min, time_max, timezones.get(ev.calendar_id), skip):
+            occurrences.append((ev, occurrence))
+    occurrences.sort(key=lambda item: occurrence_sort_key(item[1]))
+    return occurrences
@@ -0,0 +1,408 @@
+"""
+THERESE v2 - Synchronisation incrémentale des calendriers distants
+
+`POST /calendar/sync` relisait chaque calendrier en entier, l'un après
+l'autre. Les calendriers CalDAV et Google sont désormais recopiés dans la
+table locale `calendar_events` en ne transférant que ce qui a changé :
+
+- CalDAV : le ctag de la collection dit si quoi que ce soit a bougé (un
+  PROPFIND, la collection découverte au premier passage étant gardée en
+  mémoire tant que l'URL et les identifiants ne changent pas) ; sinon le REPORT sync-collection (RFC 6578) donne les ressources
+  modifiées ou supprimées depuis le dernier jeton, avec leur ETag, et seules
+  celles dont l'ETag diffère du miroir sont téléchargées (calendar-multiget) ;
+- Google : `nextSyncToken` ne renvoie que les événements changés depuis le
+  passage précédent (suppressions en status "cancelled") ; un jeton expiré
+  (410) provoque une relecture complète.
+
+Les séries ne sont pas dépliées : maître (RRULE/EXDATE/RDATE) et exceptions
+sont stockés tels quels, `recurrence.events_between` les déplie par fenêtre.
+Les calendriers sont synchronisés en parallèle (au plus
+`calendar_sync_concurrency` à la fois), chacun dans sa propre session ; l'échec
+de l'un est consigné dans son `sync_status` sans interrompre les autres.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from typing import Any, TypeVar
+
+import httpx
+from app.config import settings
+from app.models.database import get_session_context
+from app.models.entities import Calendar, CalendarEvent, EmailAccount
+from app.services.calendar import recurrence
+from app.services.calendar.caldav_provider import CalDAVCollection
+from app.services.calendar.ics import timing_fields, vevent_fields
+from app.services.calendar_service import CalendarService
+from app.services.encryption import decrypt_value, is_value_encrypted
+from icalendar import Calendar as ICalendar
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+logger = logging.getLogger(__name__)
+
+SYNCED_PROVIDERS = ("caldav", "google")
+
+T = TypeVar("T")
+
+
+@dataclass
+class CalendarSyncResult:
+    """Bilan de la synchronisation d'un calendrier."""
+
+    calendar_id: str
+    provider: str
+    updated: int = 0
+    deleted: int = 0
+    unchanged: bool = False  # ctag identique : aucune autre requête
+    full: bool = False  # relecture complète (premier passage, jeton refusé)
+    error: str | None = None
+
+
+async def _run_blocking(func: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+def _apply(session: AsyncSession, event: CalendarEvent | None, fields: dict[str, Any]) -> None:
+    """Crée ou met à jour la ligne locale d'un événement distant."""
+    if event is None:
+        event = CalendarEvent(**fields)
+    else:
+        for name, value in fields.items():
+            setattr(event, name, value)
+    event.synced_at = datetime.now(UTC)
+    session.add(event)
+
+
+# ============================================================
+# CalDAV
+# ============================================================
+
+
+# Collections déjà découvertes, par calendrier : la découverte (principal,
+# liste des calendriers) coûte plusieurs allers-retours à chaque ouverture
+_collections: dict[str, tuple[tuple[str | None, ...], CalDAVCollection]] = {}
+
+
+def _caldav_collection(calendar: Calendar) -> CalDAVCollection:
+    """Collection CalDAV du calendrier (bloquant : connexion et découverte)."""
+    password = (
+        decrypt_value(calendar.caldav_password)
+        if calendar.caldav_password and is_value_encrypted(calendar.caldav_password)
+        else calendar.caldav_password
+    )
+    return CalDAVCollection.open(
+        calendar.caldav_url,
+        calendar.caldav_username,
+        password,
+        calendar.remote_id or calendar.id,
+    )
+
+
+async def _store_caldav_resource(
+    session: AsyncSession,
+    calendar: Calendar,
+    href: str,
+    etag: str | None,
+    data: str,
+) -> int:
+    """Remplace les lignes d'une ressource .ics (maître et exceptions)."""
+    rows = {}
+    for vevent in ICalendar.from_ical(data).walk("VEVENT"):
+        fields = vevent_fields(vevent, calendar.timezone)
+        if fields is not None:
+            rows[fields["id"]] = fields
+
+    existing = {
+        event.id: event
+        for event in (
+            await session.execute(
+                select(CalendarEvent).where(
+                    CalendarEvent.calendar_id == calendar.id,
+                    CalendarEvent.remote_href == href,
+                )
+            )
+        ).scalars()
+    }
+    for event_id, event in existing.items():
+        if event_id not in rows:
+            await session.delete(event)
+    for event_id, fields in rows.items():
+        event = existing.get(event_id) or await session.get(CalendarEvent, event_id)
+        _apply(session, event, {**fields, "calendar_id": calendar.id, "remote_href": href, "etag": etag})
+    return len(rows)
+
+
+async def _open_caldav(calendar: Calendar) -> CalDAVCollection:
+    """Collection du calendrier, découverte une seule fois par configuration."""
+    key = (calendar.caldav_url, calendar.caldav_username, calendar.caldav_password, calendar.remote_id)
+    cached = _collections.get(calendar.id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    collection = await _run_blocking(_caldav_collection, calendar)
+    _collections[calendar.id] = (key, collection)
+    return collection
+
+
+async def _sync_caldav(session: AsyncSession, calendar: Calendar, result: CalendarSyncResult) -> None:
+    collection = await _open_caldav(calendar)
+    ctag = await _run_blocking(collection.ctag)
+    if ctag and ctag == calendar.ctag and calendar.sync_token:
+        result.unchanged = True
+        return
+
+    changes = await _run_blocking(collection.changes, calendar.sync_token)
+    known = dict(
+        (
+            await session.execute(
+                select(CalendarEvent.remote_href, CalendarEvent.etag)
+                .where(
+                    CalendarEvent.calendar_id == calendar.id,
+                    CalendarEvent.remote_href != None,  # noqa: E711
+                )
+                .distinct()
+            )
+        ).all()
+    )
+    stale = [href for href, etag in changes.changed.items() if known.get(href) != etag]
+    gone = set(changes.deleted)
+    if changes.complete:
+        result.full = True
+        gone |= known.keys() - changes.changed.keys()
+    gone &= known.keys()
+
+    fetched = await _run_blocking(collection.fetch, stale) if stale else {}
+    if gone:
+        deleted = await session.execute(
+            delete(CalendarEvent).where(
+                CalendarEvent.calendar_id == calendar.id,
+                CalendarEvent.remote_href.in_(sorted(gone)),
+            )
+        )
+        result.deleted += deleted.rowcount
+    for href, data in fetched.items():
+        result.updated += await _store_caldav_resource(
+            session, calendar, href, changes.changed.get(href), data
+        )
+
+    calendar.ctag = ctag
+    calendar.sync_token = changes.sync_token
+
+
+# ============================================================
+# Google Calendar
+# ============================================================
+
+
+async def _google_service(
+    calendar: Calendar,
+    session: AsyncSession,
+    account_locks: dict[str, asyncio.Lock],
+) -> CalendarService:
+    """Client Google du compte du calendrier (jeton OAuth rafraîchi si besoin)."""
+    from app.routers.email import ensure_valid_access_token
+
+    account = await session.get(EmailAccount, calendar.account_id) if calendar.account_id else None
+    if account is None:
+        raise ValueError("Compte Google introuvable pour ce calendrier")
+    # Un seul rafraîchissement par compte, même si plusieurs de ses
+    # calendriers se synchronisent en même temps
+    async with account_locks[account.id]:
+        await session.refresh(account)
+        access_token = await ensure_valid_access_token(account, session)
+        await session.commit()
+    return CalendarService(access_token)
+
+
+def _google_moment(obj: dict[str, str] | None) -> datetime | date | None:
+    """`{"dateTime": ...}` -> datetime UTC, `{"date": ...}` -> date."""
+    if not obj:
+        return None
+    if obj.get("dateTime"):
+        value = datetime.fromisoformat(obj["dateTime"].replace("Z", "+00:00"))
+        return value.astimezone(UTC) if value.tzinfo else value.replace(tzinfo=UTC)
+    if obj.get("date"):
+        return date.fromisoformat(obj["date"])
+    return None
+
+
+def google_original_key(item: dict[str, Any]) -> str | None:
+    """Clé de l'occurrence remplacée par une exception Google, None sinon."""
+    if not item.get("recurringEventId"):
+        return None
+    original = _google_moment(item.get("originalStartTime"))
+    return recurrence.occurrence_key(original) if original is not None else None
+
+
+def google_event_fields(item: dict[str, Any]) -> dict[str, Any]:
+    """Colonnes locales d'un événement Google (séries non dépliées)."""
+    fields = {
+        "id": item["id"],
+        "summary": item.get("summary", ""),
+        "description": item.get("description"),
+        "location": item.get("location"),
+        "attendees": json.dumps([a["email"] for a in item.get("attendees", []) if a.get("email")]),
+        "recurrence": json.dumps(item["recurrence"]) if item.get("recurrence") else None,
+        "status": item.get("status", "confirmed"),
+        "etag": item.get("etag"),
+        "recurring_event_id": item.get("recurringEventId"),
+        "original_start": google_original_key(item),
+    }
+    start = _google_moment(item.get("start"))
+    if start is not None:
+        fields.update(timing_fields(start, _google_moment(item.get("end"))))
+    return fields
+
+
+async def _google_changes(
+    service: CalendarService,
+    calendar_id: str,
+    sync_token: str | None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Toutes les pages de changements, et le jeton du passage suivant."""
+    items: list[dict[str, Any]] = []
+    page_token = None
+    while True:
+        page = await service.sync_events(calendar_id, sync_token=sync_token, page_token=page_token)
+        items.extend(page.get("items", []))
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return items, page.get("nextSyncToken")
+
+
+async def _store_google_item(
+    session: AsyncSession,
+    calendar: Calendar,
+    item: dict[str, Any],
+    result: CalendarSyncResult,
+) -> None:
+    event_id = item["id"]
+    existing = await session.get(CalendarEvent, event_id)
+    if item.get("status") == "cancelled" and not item.get("recurringEventId"):
+        # Événement supprimé (une série emporte ses exceptions). Une exception
+        # annulée, elle, reste : elle retire son occurrence de la série.
+        if existing is not None:
+            await session.delete(existing)
+            result.deleted += 1
+        overrides = await session.execute(
+            delete(CalendarEvent).where(CalendarEvent.recurring_event_id == event_id)
+        )
+        result.deleted += overrides.rowcount
+        return
+    if existing is not None and item.get("etag") and existing.etag == item["etag"]:
+        return
+    _apply(session, existing, {**google_event_fields(item), "calendar_id": calendar.id})
+    result.updated += 1
+
+
+async def _sync_google(
+    session: AsyncSession,
+    calendar: Calendar,
+    result: CalendarSyncResult,
+    account_locks: dict[str, asyncio.Lock],
+) -> None:
+    service = await _google_service(calendar, session, account_locks)
+    remote_id = calendar.remote_id or calendar.id
+    sync_token = calendar.sync_token
+    try:
+        items, next_token = await _google_changes(service, remote_id, sync_token)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410 or not sync_token:
+            raise
+        logger.info("Jeton de synchronisation Google expiré (%s) : relecture complète", calendar.id)
+        sync_token = None
+        items, next_token = await _google_changes(service, remote_id, None)
+    result.full = sync_token is None
+
+    known: set[str] = set()
+    if result.full:
+        known = set(
+            (
+                await session.execute(
+                    select(CalendarEvent.id).where(CalendarEvent.calendar_id == calendar.id)
+                )
+            ).scalars()
+        )
+    for item in items:
+        known.discard(item["id"])
+        await _store_google_item(session, calendar, item, result)
+    if known:
+        # Liste complète : ce qui n'y figure plus a disparu chez Google
+        deleted = await session.execute(
+            delete(CalendarEvent).where(CalendarEvent.id.in_(sorted(known)))
+        )
+        result.deleted += deleted.rowcount
+
+    calendar.sync_token = next_token
+
+
+# ============================================================
+# Orchestration
+# ============================================================
+
+
+async def sync_calendar(
+    session: AsyncSession,
+    calendar_id: str,
+    account_locks: dict[str, asyncio.Lock] | None = None,
+) -> CalendarSyncResult:
+    """Synchronise un calendrier distant dans la table locale et commite.
+
+    Un calendrier local n'a rien à synchroniser. Une erreur (réseau,
+    authentification, données) est consignée dans `sync_status` /
+    `last_sync_error` et renvoyée dans le bilan, sans être levée.
+    """
+    calendar = await session.get(Calendar, calendar_id)
+    if calendar is None:
+        return CalendarSyncResult(calendar_id=calendar_id, provider="", error="Calendrier introuvable")
+    result = CalendarSyncResult(calendar_id=calendar.id, provider=calendar.provider)
+    if calendar.provider not in SYNCED_PROVIDERS:
+        result.unchanged = True
+        return result
+
+    try:
+        if calendar.provider == "caldav":
+            await _sync_caldav(session, calendar, result)
+        else:
+            await _sync_google(session, calendar, result, account_locks or defaultdict(asyncio.Lock))
+        calendar.sync_status = "idle"
+        calendar.last_sync_error = None
+        calendar.synced_at = datetime.now(UTC)
+        await session.commit()
+    except Exception as e:
+        message = str(getattr(e, "detail", None) or e) or type(e).__name__
+        logger.warning("Synchronisation du calendrier %s échouée : %s", calendar_id, message)
+        # Collection déplacée, serveur reconfiguré : redécouverte au prochain passage
+        _collections.pop(calendar_id, None)
+        await session.rollback()
+        calendar = await session.get(Calendar, calendar_id)
+        calendar.sync_status = "error"
+        calendar.last_sync_error = message[:500]
+        await session.commit()
+        return CalendarSyncResult(calendar_id=calendar_id, provider=calendar.provider, error=message)
+    return result
+
+
+async def sync_calendars(
+    calendar_ids: Iterable[str],
+    concurrency: int | None = None,
+) -> list[CalendarSyncResult]:
+    """Synchronise plusieurs calendriers en parallèle (pool borné).
+
+    Chaque calendrier a sa propre session : les appels réseau se chevauchent,
+    les écritures SQLite restent courtes. Le bilan suit l'ordre de `calendar_ids`.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or settings.calendar_sync_concurrency))
+    account_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def run(calendar_id: str) -> CalendarSyncResult:
+        async with semaphore, get_session_context() as session:
+            return await sync_calendar(session, calendar_id, account_locks)
+
+    return list(await asyncio.gather(*(run(calendar_id) for calendar_id in calendar_ids)))
@@ -191,6 +191,44 @@ class CalendarService:
         response.raise_for_status()
         return response.json()
 
+    async def sync_events(
+        self,
+        calendar_id: str = "primary",
+        sync_token: str | None = None,
+        page_token: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Page de synchronisation incrémentale (séries non dépliées).
+
+        Sans sync_token, liste complète ; la dernière page porte
+        'nextSyncToken', à repasser pour ne recevoir que les changements
+        (suppressions comprises, en status "cancelled"). Un jeton expiré
+        répond 410 (httpx.HTTPStatusError) : repartir d'une liste complète.
+
+        Args:
+            calendar_id: ID du calendrier (défaut: "primary")
+            sync_token: nextSyncToken de la synchronisation précédente
+            page_token: Token pagination
+
+        Returns:
+            Dict avec 'items', 'nextPageToken' ou 'nextSyncToken'
+        """
+        params: dict[str, Any] = {"maxResults": 250, "showDeleted": True}
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+
+        client = await get_http_client()
+        response = await client.get(
+            f"{self.BASE_URL}/calendars/{_enc(calendar_id)}/events",
+            headers=self.headers,
+            params=params,
+            timeout=30.0,
+        )
+        response.raise_for_status()
+        return response.json()
+
     async def get_event(self, calendar_id: str, event_id: str) -> dict[str, Any]:
         """
         Récupère un événement spécifique.
@@ -17,6 +17,9 @@ class ContextWindow:
     messages: list[Message]
     system_prompt: str | None = None
     max_tokens: int = 100000  # Reserve some space for response
+    # Prompt caching (Anthropic) : à réserver aux system prompts réutilisés
+    # tels quels d'un appel à l'autre, sinon chaque appel paie l'écriture
+    cache_system_prompt: bool = False
 
     def estimate_tokens(self, text: str) -> int:
         """Rough token estimation (4 chars = 1 token for most languages)."""
@@ -1,20 +1,32 @@
 """
 THERESE v2 - CRM Export Service
 
-Multi-format export for CRM data (CSV, Excel, JSON).
+Multi-format export for CRM data (CSV, Excel, JSON), streamed in batches.
 Part of the "Local First" architecture.
 """
 
+import asyncio
 import csv
 import io
 import json
 import logging
+import tempfile
+from collections.abc import AsyncIterator, Callable, Sequence
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Any, Literal
 
 from app.models.entities import Contact, Deliverable, Project
+from app.services.export_stream import (
+    EXPORT_BATCH_SIZE,
+    count_rows,
+    encode,
+    iter_batches,
+    json_array,
+    json_object,
+)
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -28,12 +40,20 @@ ExportFormat = Literal["csv", "xlsx", "json"]
 
 @dataclass
 class ExportResult:
-    """Result of an export operation."""
-    data: bytes
+    """Result of an export operation.
+
+    `chunks` est un flux consommable une seule fois (StreamingResponse) ;
+    `row_count` est compté en base avant la lecture.
+    """
+    chunks: AsyncIterator[bytes]
     filename: str
     content_type: str
     row_count: int
 
+    async def read(self) -> bytes:
+        """Consume the stream into memory (small exports, tests)."""
+        return b"".join([chunk async for chunk in self.chunks])
+
 
 # ============================================================
 # Export Configuration
@@ -130,30 +150,41 @@ def _entity_to_row(entity: Any, columns: list[tuple[str, str]]) -> dict[str, Any
 # ============================================================
 
 
-def export_to_csv(entities: list[Any], columns: list[tuple[str, str]]) -> bytes:
+async def export_to_csv(
+    batches: AsyncIterator[Sequence[Any]],
+    columns: list[tuple[str, str]],
+    type_label: str | None = None,
+) -> AsyncIterator[bytes]:
     """
-    Export entities to CSV format.
+    Export entities to CSV format, one chunk per batch.
 
     Args:
-        entities: List of SQLModel entities
+        batches: Batches of SQLModel entities (see `iter_batches`)
         columns: List of (attribute, header) tuples
+        type_label: If set, prepend a "Type" column with this value
 
-    Returns:
+    Yields:
         CSV content as bytes (UTF-8 with BOM for Excel compatibility)
     """
     output = io.StringIO()
     headers = [col[1] for col in columns]
+    if type_label:
+        headers = ["Type"] + headers
 
     writer = csv.DictWriter(output, fieldnames=headers, quoting=csv.QUOTE_ALL)
     writer.writeheader()
-
-    for entity in entities:
-        row = _entity_to_row(entity, columns)
-        writer.writerow(row)
-
     # Add BOM for Excel UTF-8 compatibility
-    csv_content = output.getvalue()
-    return ("\ufeff" + csv_content).encode("utf-8")
+    yield ("\ufeff" + output.getvalue()).encode("utf-8")
+
+    async for batch in batches:
+        output.seek(0)
+        output.truncate()
+        for entity in batch:
+            row = _entity_to_row(entity, columns)
+            if type_label:
+                row["Type"] = type_label
+            writer.writerow(row)
+        yield output.getvalue().encode("utf-8")
 
 
 # ============================================================
@@ -161,25 +192,47 @@ def export_to_csv(entities: list[Any], columns: list[tuple[str, str]]) -> bytes:
 # ============================================================
 
 
-def export_to_xlsx(
-    entities: list[Any],
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Taille des blocs lus dans le classeur temporaire
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+async def export_to_xlsx(
+    batches: AsyncIterator[Sequence[Any]],
     columns: list[tuple[str, str]],
     sheet_name: str = "Export",
-) -> bytes:
+) -> AsyncIterator[bytes]:
     """
     Export entities to Excel format with styling.
 
     Args:
-        entities: List of SQLModel entities
+        batches: Batches of SQLModel entities (see `iter_batches`)
         columns: List of (attribute, header) tuples
         sheet_name: Name of the Excel sheet
 
-    Returns:
+    Yields:
         Excel content as bytes
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name
+    wb = Workbook(write_only=True)
+    await _write_xlsx_sheet(wb, sheet_name, batches, columns)
+    async for chunk in _stream_workbook(wb):
+        yield chunk
+
+
+async def _write_xlsx_sheet(
+    wb: Workbook,
+    title: str,
+    batches: AsyncIterator[Sequence[Any]],
+    columns: list[tuple[str, str]],
+) -> None:
+    """Write a styled sheet in a write-only workbook.
+
+    Un classeur en écriture seule envoie chaque ligne sur disque dès son
+    ajout : les largeurs de colonnes, fixées avant la première ligne, sont
+    donc calculées sur le premier lot.
+    """
+    ws = wb.create_sheet(title)
 
     # Styles
     header_font = Font(bold=True, color="FFFFFF")
@@ -192,41 +245,54 @@ def export_to_xlsx(
         bottom=Side(style="thin"),
     )
 
-    # Headers
     headers = [col[1] for col in columns]
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-
-    # Data rows
-    for row_idx, entity in enumerate(entities, 2):
-        row_data = _entity_to_row(entity, columns)
-        for col_idx, header in enumerate(headers, 1):
-            value = row_data.get(header, "")
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.border = thin_border
+    first_batch = await anext(batches, [])
+    first_rows = [_entity_to_row(entity, columns) for entity in first_batch]
 
     # Auto-adjust column widths
     for col_idx, header in enumerate(headers, 1):
-        max_length = len(header)
-        for row_idx in range(2, len(entities) + 2):
-            cell_value = ws.cell(row=row_idx, column=col_idx).value
-            if cell_value:
-                max_length = max(max_length, len(str(cell_value)))
+        max_length = max(
+            [len(header)] + [len(row[header]) for row in first_rows if row[header]]
+        )
         adjusted_width = min(max_length + 2, 50)
         ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
 
     # Freeze header row
     ws.freeze_panes = "A2"
 
-    # Save to bytes
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output.read()
+    # Headers
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    def append_rows(rows: list[dict[str, str]]) -> None:
+        for row_data in rows:
+            row_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=row_data.get(header, ""))
+                cell.border = thin_border
+                row_cells.append(cell)
+            ws.append(row_cells)
+
+    # Data rows
+    append_rows(first_rows)
+    async for batch in batches:
+        append_rows([_entity_to_row(entity, columns) for entity in batch])
+
+
+async def _stream_workbook(wb: Workbook) -> AsyncIterator[bytes]:
+    """Save the workbook to a temporary file and stream it back."""
+    with tempfile.TemporaryFile() as output:
+        await asyncio.to_thread(wb.save, output)
+        output.seek(0)
+        while chunk := output.read(XLSX_CHUNK_SIZE):
+            yield chunk
 
 
 # ============================================================
@@ -234,33 +300,38 @@ def export_to_xlsx(
 # ============================================================
 
 
-def export_to_json(entities: list[Any], columns: list[tuple[str, str]]) -> bytes:
+def _json_row(entity: Any, columns: list[tuple[str, str]]) -> dict[str, Any]:
+    """Convert entity to a JSON-ready dict keyed by attribute name."""
+    row = {}
+    for attr, _ in columns:
+        value = getattr(entity, attr, None)
+        if attr == "tags" and value:
+            try:
+                value = json.loads(value)
+            except (json.JSONDecodeError, TypeError):
+                pass
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        row[attr] = value
+    return row
+
+
+async def export_to_json(
+    batches: AsyncIterator[Sequence[Any]],
+    columns: list[tuple[str, str]],
+) -> AsyncIterator[bytes]:
     """
-    Export entities to JSON format.
+    Export entities to JSON format (one array item per line).
 
     Args:
-        entities: List of SQLModel entities
+        batches: Batches of SQLModel entities (see `iter_batches`)
         columns: List of (attribute, header) tuples
 
-    Returns:
+    Yields:
         JSON content as bytes
     """
-    data = []
-    for entity in entities:
-        row = {}
-        for attr, _ in columns:
-            value = getattr(entity, attr, None)
-            if attr == "tags" and value:
-                try:
-                    value = json.loads(value)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            row[attr] = value
-        data.append(row)
-
-    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    async for chunk in encode(json_array(batches, lambda entity: _json_row(entity, columns))):
+        yield chunk
 
 
 # ============================================================
@@ -277,16 +348,59 @@ class CRMExportService:
     - Projects
     - Deliverables
     - Full CRM export (all entities)
+
+    Les fichiers sont produits en flux : les entités sont lues par lots de
+    `EXPORT_BATCH_SIZE` et chaque lot est écrit avant de lire le suivant.
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
         """
         Initialize export service.
 
         Args:
             session: AsyncSession for database access
+            batch_size: Number of entities loaded per batch
         """
         self.session = session
+        self.batch_size = batch_size
+
+    def _batches(self, statement) -> AsyncIterator[Sequence[Any]]:
+        return iter_batches(self.session, statement, self.batch_size)
+
+    async def _export(
+        self,
+        statement,
+        columns: list[tuple[str, str]],
+        format: ExportFormat,
+        name: str,
+        sheet_name: str,
+    ) -> ExportResult:
+        """Build the streamed export of a single entity type."""
+        row_count = await count_rows(self.session, statement)
+        timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
+        batches = self._batches(statement)
+
+        if format == "csv":
+            return ExportResult(
+                chunks=export_to_csv(batches, columns),
+                filename=f"{name}_{timestamp}.csv",
+                content_type="text/csv; charset=utf-8",
+                row_count=row_count,
+            )
+        elif format == "xlsx":
+            return ExportResult(
+                chunks=export_to_xlsx(batches, columns, sheet_name),
+                filename=f"{name}_{timestamp}.xlsx",
+                content_type=XLSX_CONTENT_TYPE,
+                row_count=row_count,
+            )
+        else:  # json
+            return ExportResult(
+                chunks=export_to_json(batches, columns),
+                filename=f"{name}_{timestamp}.json",
+                content_type="application/json",
+                row_count=row_count,
+            )
 
     async def export_contacts(
         self,
@@ -303,7 +417,7 @@ class CRMExportService:
             source: Filter by contact source
 
         Returns:
-            ExportResult with data and metadata
+            ExportResult with streamed data and metadata
         """
         # Build query
         statement = select(Contact)
@@ -313,35 +427,7 @@ class CRMExportService:
             statement = statement.where(Contact.source == source)
         statement = statement.order_by(Contact.created_at.desc())
 
-        result = await self.session.execute(statement)
-        contacts = result.scalars().all()
-
-        timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-
-        if format == "csv":
-            data = export_to_csv(contacts, CONTACT_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"contacts_{timestamp}.csv",
-                content_type="text/csv; charset=utf-8",
-                row_count=len(contacts),
-            )
-        elif format == "xlsx":
-            data = export_to_xlsx(contacts, CONTACT_COLUMNS, "Contacts")
-            return ExportResult(
-                data=data,
-                filename=f"contacts_{timestamp}.xlsx",
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                row_count=len(contacts),
-            )
-        else:  # json
-            data = export_to_json(contacts, CONTACT_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"contacts_{timestamp}.json",
-                content_type="application/json",
-                row_count=len(contacts),
-            )
+        return await self._export(statement, CONTACT_COLUMNS, format, "contacts", "Contacts")
 
     async def export_projects(
         self,
@@ -358,7 +444,7 @@ class CRMExportService:
             contact_id: Filter by linked contact
 
         Returns:
-            ExportResult with data and metadata
+            ExportResult with streamed data and metadata
         """
         statement = select(Project)
         if status:
@@ -367,35 +453,7 @@ class CRMExportService:
             statement = statement.where(Project.contact_id == contact_id)
         statement = statement.order_by(Project.created_at.desc())
 
-        result = await self.session.execute(statement)
-        projects = result.scalars().all()
-
-        timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-
-        if format == "csv":
-            data = export_to_csv(projects, PROJECT_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"projects_{timestamp}.csv",
-                content_type="text/csv; charset=utf-8",
-                row_count=len(projects),
-            )
-        elif format == "xlsx":
-            data = export_to_xlsx(projects, PROJECT_COLUMNS, "Projets")
-            return ExportResult(
-                data=data,
-                filename=f"projects_{timestamp}.xlsx",
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                row_count=len(projects),
-            )
-        else:  # json
-            data = export_to_json(projects, PROJECT_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"projects_{timestamp}.json",
-                content_type="application/json",
-                row_count=len(projects),
-            )
+        return await self._export(statement, PROJECT_COLUMNS, format, "projects", "Projets")
 
     async def export_deliverables(
         self,
@@ -412,7 +470,7 @@ class CRMExportService:
             project_id: Filter by linked project
 
         Returns:
-            ExportResult with data and metadata
+            ExportResult with streamed data and metadata
         """
         statement = select(Deliverable)
         if status:
@@ -421,192 +479,79 @@ class CRMExportService:
             statement = statement.where(Deliverable.project_id == project_id)
         statement = statement.order_by(Deliverable.created_at.desc())
 
-        result = await self.session.execute(statement)
-        deliverables = result.scalars().all()
-
-        timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-
-        if format == "csv":
-            data = export_to_csv(deliverables, DELIVERABLE_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"deliverables_{timestamp}.csv",
-                content_type="text/csv; charset=utf-8",
-                row_count=len(deliverables),
-            )
-        elif format == "xlsx":
-            data = export_to_xlsx(deliverables, DELIVERABLE_COLUMNS, "Livrables")
-            return ExportResult(
-                data=data,
-                filename=f"deliverables_{timestamp}.xlsx",
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                row_count=len(deliverables),
-            )
-        else:  # json
-            data = export_to_json(deliverables, DELIVERABLE_COLUMNS)
-            return ExportResult(
-                data=data,
-                filename=f"deliverables_{timestamp}.json",
-                content_type="application/json",
-                row_count=len(deliverables),
-            )
+        return await self._export(
+            statement, DELIVERABLE_COLUMNS, format, "deliverables", "Livrables"
+        )
 
     async def export_all(self, format: ExportFormat = "xlsx") -> ExportResult:
         """
         Export all CRM data to a single file.
 
         For Excel: Creates multiple sheets (Contacts, Projets, Livrables)
-        For CSV/JSON: Creates a combined structure
+        For JSON: Creates a combined structure
+        For CSV: Contacts only, with a type column
 
         Args:
             format: Export format (csv, xlsx, json)
 
         Returns:
-            ExportResult with data and metadata
+            ExportResult with streamed data and metadata
         """
-        # Fetch all data
-        contacts_result = await self.session.execute(
-            select(Contact).order_by(Contact.created_at.desc())
-        )
-        contacts = contacts_result.scalars().all()
-
-        projects_result = await self.session.execute(
-            select(Project).order_by(Project.created_at.desc())
-        )
-        projects = projects_result.scalars().all()
-
-        deliverables_result = await self.session.execute(
-            select(Deliverable).order_by(Deliverable.created_at.desc())
-        )
-        deliverables = deliverables_result.scalars().all()
+        contacts = select(Contact).order_by(Contact.created_at.desc())
+        projects = select(Project).order_by(Project.created_at.desc())
+        deliverables = select(Deliverable).order_by(Deliverable.created_at.desc())
 
         timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-        total_count = len(contacts) + len(projects) + len(deliverables)
+        total_count = (
+            await count_rows(self.session, contacts)
+            + await count_rows(self.session, projects)
+            + await count_rows(self.session, deliverables)
+        )
 
         if format == "xlsx":
-            # Create workbook with multiple sheets
-            wb = Workbook()
-
-            # Contacts sheet
-            ws_contacts = wb.active
-            ws_contacts.title = "Contacts"
-            _populate_xlsx_sheet(ws_contacts, contacts, CONTACT_COLUMNS)
-
-            # Projects sheet
-            ws_projects = wb.create_sheet("Projets")
-            _populate_xlsx_sheet(ws_projects, projects, PROJECT_COLUMNS)
-
-            # Deliverables sheet
-            ws_deliverables = wb.create_sheet("Livrables")
-            _populate_xlsx_sheet(ws_deliverables, deliverables, DELIVERABLE_COLUMNS)
-
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)
-
             return ExportResult(
-                data=output.read(),
+                chunks=self._export_all_xlsx(contacts, projects, deliverables),
                 filename=f"crm_export_{timestamp}.xlsx",
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                content_type=XLSX_CONTENT_TYPE,
                 row_count=total_count,
             )
 
         elif format == "json":
-            data = {
-                "export_date": datetime.now(UTC).isoformat(),
-                "contacts": [
-                    {attr: getattr(c, attr, None) for attr, _ in CONTACT_COLUMNS}
-                    for c in contacts
-                ],
-                "projects": [
-                    {attr: getattr(p, attr, None) for attr, _ in PROJECT_COLUMNS}
-                    for p in projects
-                ],
-                "deliverables": [
-                    {attr: getattr(d, attr, None) for attr, _ in DELIVERABLE_COLUMNS}
-                    for d in deliverables
-                ],
-            }
-
-            # Serialize datetime objects
-            def serialize(obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                return obj
-
-            json_str = json.dumps(data, default=serialize, ensure_ascii=False, indent=2)
 
+            def raw_row(columns: list[tuple[str, str]]) -> Callable[[Any], dict[str, Any]]:
+                return lambda entity: {attr: getattr(entity, attr, None) for attr, _ in columns}
+
+            document = json_object([
+                ("export_date", datetime.now(UTC).isoformat()),
+                ("contacts", json_array(self._batches(contacts), raw_row(CONTACT_COLUMNS))),
+                ("projects", json_array(self._batches(projects), raw_row(PROJECT_COLUMNS))),
+                (
+                    "deliverables",
+                    json_array(self._batches(deliverables), raw_row(DELIVERABLE_COLUMNS)),
+                ),
+            ])
             return ExportResult(
-                data=json_str.encode("utf-8"),
+                chunks=encode(document),
                 filename=f"crm_export_{timestamp}.json",
                 content_type="application/json",
                 row_count=total_count,
             )
 
-        else:  # csv - combine all with type column
-            output = io.StringIO()
-
-            # Combined CSV with entity type
-            all_columns = [("_type", "Type")] + CONTACT_COLUMNS
-            headers = [col[1] for col in all_columns]
-
-            writer = csv.DictWriter(output, fieldnames=headers, quoting=csv.QUOTE_ALL)
-            writer.writeheader()
-
-            for contact in contacts:
-                row = _entity_to_row(contact, CONTACT_COLUMNS)
-                row["Type"] = "Contact"
-                writer.writerow(row)
-
-            csv_content = output.getvalue()
-
+        else:  # csv - contacts with type column
             return ExportResult(
-                data=("\ufeff" + csv_content).encode("utf-8"),
+                chunks=export_to_csv(self._batches(contacts), CONTACT_COLUMNS, "Contact"),
                 filename=f"crm_export_{timestamp}.csv",
                 content_type="text/csv; charset=utf-8",
                 row_count=total_count,
             )
 
-
-def _populate_xlsx_sheet(ws, entities: list[Any], columns: list[tuple[str, str]]):
-    """Populate an Excel sheet with data and styling."""
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="2451FF", end_color="2451FF", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-
-    # Headers
-    headers = [col[1] for col in columns]
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-
-    # Data rows
-    for row_idx, entity in enumerate(entities, 2):
-        row_data = _entity_to_row(entity, columns)
-        for col_idx, header in enumerate(headers, 1):
-            value = row_data.get(header, "")
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.border = thin_border
-
-    # Auto-adjust column widths
-    for col_idx, header in enumerate(headers, 1):
-        max_length = len(header)
-        for row_idx in range(2, len(entities) + 2):
-            cell_value = ws.cell(row=row_idx, column=col_idx).value
-            if cell_value:
-                max_length = max(max_length, len(str(cell_value)))
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
-
-    # Freeze header row
-    ws.freeze_panes = "A2"
+    async def _export_all_xlsx(self, contacts, projects, deliverables) -> AsyncIterator[bytes]:
+        """Multi-sheet workbook, sheets written one after the other."""
+        wb = Workbook(write_only=True)
+        await _write_xlsx_sheet(wb, "Contacts", self._batches(contacts), CONTACT_COLUMNS)
+        await _write_xlsx_sheet(wb, "Projets", self._batches(projects), PROJECT_COLUMNS)
+        await _write_xlsx_sheet(
+            wb, "Livrables", self._batches(deliverables), DELIVERABLE_COLUMNS
+        )
+        async for chunk in _stream_workbook(wb):
+            yield chunk
@@ -5,23 +5,43 @@ Multi-format import for CRM data (CSV, Excel, JSON).
 Part of the "Local First" architecture.
 """
 
+import codecs
 import csv
 import io
 import json
 import logging
+import re
+import time
+from collections.abc import AsyncGenerator, Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from typing import Any, Literal
+from itertools import islice
+from typing import Any, BinaryIO, Literal
 
 from app.models.entities import Contact, Deliverable, Project, generate_uuid
 from openpyxl import load_workbook
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
+from sqlmodel import SQLModel, select
 
 logger = logging.getLogger(__name__)
 
 
 ImportFormat = Literal["csv", "xlsx", "json"]
+ImportEntity = Literal["contacts", "projects", "deliverables"]
+# Contenu importé : octets bruts ou fichier binaire (upload spoolé sur disque)
+ImportSource = bytes | BinaryIO
+
+# Lignes lues (mappées, validées) par l'aperçu
+PREVIEW_ROWS = 5
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Lignes écrites (puis commitées) par lot : le verrou d'écriture SQLite est
+# rendu entre deux lots au lieu d'être tenu tout l'import.
+IMPORT_BATCH_SIZE = 1000
+# SQLite limite le nombre de paramètres liés par requête
+_IN_CHUNK_SIZE = 500
 
 
 @dataclass
@@ -51,6 +71,21 @@ class ImportResult:
         return f"Import avec erreurs: {len(self.errors)} erreurs sur {self.total_rows} lignes"
 
 
+@dataclass
+class ImportProgress:
+    """Progress of a bulk import, emitted after each committed batch."""
+    processed: int
+    created: int
+    updated: int
+    skipped: int
+    errors: int
+    elapsed: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
 @dataclass
 class ImportPreview:
     """Preview of import before execution."""
@@ -202,8 +237,16 @@ DELIVERABLE_COLUMN_MAPPING = {
 # ============================================================
 
 
-def _detect_format(content: bytes, filename: str | None = None) -> ImportFormat:
-    """Detect file format from content or filename."""
+def _as_stream(source: ImportSource) -> BinaryIO:
+    """Fichier binaire positionné au début (les octets bruts sont enveloppés)."""
+    if isinstance(source, bytes | bytearray):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _detect_format(source: ImportSource, filename: str | None = None) -> ImportFormat:
+    """Detect file format from filename, or from the first bytes of content."""
     if filename:
         if filename.endswith(".csv"):
             return "csv"
@@ -212,75 +255,259 @@ def _detect_format(content: bytes, filename: str | None = None) -> ImportFormat:
         elif filename.endswith(".json"):
             return "json"
 
-    # Try to detect from content
-    try:
-        content.decode("utf-8")
-        # Check if JSON
-        stripped = content.strip()
-        if stripped.startswith(b"[") or stripped.startswith(b"{"):
-            return "json"
-        return "csv"
-    except UnicodeDecodeError:
+    stream = _as_stream(source)
+    head = stream.read(_READ_CHUNK_SIZE)
+    stream.seek(0)
+
+    # Un .xlsx est une archive ZIP ; tout le reste est du texte (CSV latin-1 compris)
+    if head.startswith(b"PK\x03\x04"):
         return "xlsx"
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if stripped.startswith(b"[") or stripped.startswith(b"{"):
+        return "json"
+    return "csv"
 
 
-def _parse_csv(content: bytes) -> list[dict]:
-    """Parse CSV content to list of dicts."""
-    # Try different encodings
+def _detect_encoding(stream: BinaryIO) -> str:
+    """Premier encodage qui décode tout le fichier (lecture par blocs)."""
     for encoding in ["utf-8-sig", "utf-8", "latin-1", "cp1252"]:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        stream.seek(0)
         try:
-            text = content.decode(encoding)
-            break
+            while chunk := stream.read(_READ_CHUNK_SIZE):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+            return encoding
         except UnicodeDecodeError:
             continue
-    else:
-        raise ValueError("Impossible de decoder le fichier CSV")
-
-    reader = csv.DictReader(io.StringIO(text))
-    return list(reader)
+        finally:
+            stream.seek(0)
+    raise ValueError("Impossible de decoder le fichier CSV")
 
 
-def _parse_xlsx(content: bytes, sheet_name: str | None = None) -> list[dict]:
-    """Parse Excel content to list of dicts."""
-    wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
-
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.active
-
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
-        return []
-
-    headers = [str(h).strip() if h else f"col_{i}" for i, h in enumerate(rows[0])]
-    data = []
+def _parse_csv(source: ImportSource) -> Iterator[dict]:
+    """Parse CSV content row by row."""
+    stream = _as_stream(source)
+    # Try different encodings
+    text = io.TextIOWrapper(stream, encoding=_detect_encoding(stream), newline="")
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()  # le fichier appartient à l'appelant
 
-    for row in rows[1:]:
-        if all(cell is None for cell in row):
-            continue
-        row_dict = {}
-        for i, cell in enumerate(row):
-            if i < len(headers):
-                row_dict[headers[i]] = cell
-        data.append(row_dict)
 
-    return data
+def _parse_xlsx(source: ImportSource, sheet_name: str | None = None) -> Iterator[dict]:
+    """Parse Excel content row by row (openpyxl read-only)."""
+    wb = load_workbook(_as_stream(source), read_only=True, data_only=True)
+    try:
+        if sheet_name and sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.active
+
+        rows = ws.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+
+        headers = [str(h).strip() if h else f"col_{i}" for i, h in enumerate(first)]
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue
+            row_dict = {}
+            for i, cell in enumerate(row):
+                if i < len(headers):
+                    row_dict[headers[i]] = cell
+            yield row_dict
+    finally:
+        wb.close()
+
+
+# Caractères qui comptent pour délimiter une valeur JSON sans la décoder
+_JSON_STOP = re.compile(r'["\[\]{},:\s]')
+_JSON_STRING_STOP = re.compile(r'["\\]')
+
+
+class _JSONReader:
+    """Lecture incrémentale d'un document JSON : un élément à la fois, par blocs."""
+
+    def __init__(self, text: io.TextIOBase):
+        self._text = text
+        self._buffer = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self._text.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Prochain caractère significatif ("" en fin de document)."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre coupé en fin de bloc se décoderait tronqué : on complète
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
 
+    def skip(self) -> None:
+        """Passe une valeur sans la décoder : suivi des chaînes et de la profondeur seulement."""
+        self.peek()
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _JSON_STRING_STOP if in_string else _JSON_STOP
+            match = pattern.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    return
+                continue
+            char = match.group()
+            self._pos = match.start()
+            if char == "\\":
+                # Échappement : le caractère suivant peut être dans le bloc d'après
+                if self._pos + 1 >= len(self._buffer) and not self._fill():
+                    return
+                self._pos += 2
+                continue
+            if in_string:
+                self._pos += 1
+                in_string = False
+                if depth == 0:
+                    return
+            elif char == '"':
+                self._pos += 1
+                in_string = True
+            elif char in "[{":
+                self._pos += 1
+                depth += 1
+            elif char in "]}" and depth:
+                self._pos += 1
+                depth -= 1
+                if depth == 0:
+                    return
+            elif depth == 0:
+                return  # fin d'un scalaire : séparateur ou fermeture du conteneur parent
+            else:
+                self._pos += 1
+
+    def items(self, decode: bool = True) -> Iterator[Any]:
+        """Éléments d'un tableau (le '[' ouvrant est consommé ici)."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value() if decode else self.skip()
+            separator = self.peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("JSON invalide : ',' ou ']' attendu")
+
+
+def _parse_json(source: ImportSource) -> Iterator[dict]:
+    """Parse JSON content row by row (array, or object wrapping an array)."""
+    return _json_items(source)
+
+
+def _json_items(source: ImportSource, decode: bool = True) -> Iterator[Any]:
+    """Éléments du tableau de lignes ; `decode=False` les passe sans les construire (comptage)."""
+    text = io.TextIOWrapper(_as_stream(source), encoding="utf-8-sig")
+    try:
+        reader = _JSONReader(text)
+        first = reader.peek()
+        if first == "[":
+            yield from reader.items(decode)
+            return
+        if first != "{":
+            raise ValueError("JSON invalide : tableau ou objet attendu")
 
-def _parse_json(content: bytes) -> list[dict]:
-    """Parse JSON content to list of dicts."""
-    data = json.loads(content.decode("utf-8"))
-    if isinstance(data, dict):
         # Check for nested structure
-        if "contacts" in data:
-            return data["contacts"]
-        elif "projects" in data:
-            return data["projects"]
-        elif "deliverables" in data:
-            return data["deliverables"]
-        return [data]
-    return data
+        reader.expect("{")
+        data = {}
+        while reader.peek() not in ("}", ""):
+            key = reader.value()
+            reader.expect(":")
+            if key in ("contacts", "projects", "deliverables") and reader.peek() == "[":
+                yield from reader.items(decode)
+                return
+            data[key] = reader.value()
+            if reader.peek() == ",":
+                reader.expect(",")
+        reader.expect("}")
+        yield data
+    finally:
+        text.detach()
+
+
+def _parse_rows(
+    source: ImportSource,
+    filename: str | None = None,
+    sheet_name: str | None = None,
+) -> Iterator[dict]:
+    """Lignes brutes du fichier, lues au fil de l'eau quel que soit le format."""
+    format_type = _detect_format(source, filename)
+    if format_type == "csv":
+        return _parse_csv(source)
+    elif format_type == "xlsx":
+        return _parse_xlsx(source, sheet_name=sheet_name)
+    return _parse_json(source)
+
+
+def _count_rows(source: ImportSource, filename: str | None = None) -> int:
+    """
+    Nombre de lignes de données, sans construire ni valider les lignes.
+
+    CSV : enregistrements comptés par le lecteur C (aucun dict) ;
+    Excel : dimension déclarée de la feuille ; JSON : éléments délimités
+    par un balayage des caractères structurants, sans décodage.
+    """
+    format_type = _detect_format(source, filename)
+    stream = _as_stream(source)
+    if format_type == "csv":
+        text = io.TextIOWrapper(stream, encoding=_detect_encoding(stream), newline="")
+        try:
+            return max(sum(1 for _ in csv.reader(text)) - 1, 0)
+        finally:
+            text.detach()
+    if format_type == "xlsx":
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            max_row = wb.active.max_row
+        finally:
+            wb.close()
+        if max_row is not None:
+            return max(max_row - 1, 0)
+        return sum(1 for _ in _parse_xlsx(source))
+    return sum(1 for _ in _json_items(source, decode=False))
 
 
 # Field length limits (SEC-017)
@@ -361,7 +588,7 @@ def _parse_value(value: Any, field_type: str) -> Any:
 
     if field_type == "datetime":
         if isinstance(value, datetime):
-            return value
+            return value if value.tzinfo else value.replace(tzinfo=UTC)
         if isinstance(value, str):
             for fmt in [
                 "%Y-%m-%dT%H:%M:%S.%fZ",
@@ -372,7 +599,7 @@ def _parse_value(value: Any, field_type: str) -> Any:
                 "%d-%m-%Y",
             ]:
                 try:
-                    return datetime.strptime(value.strip(), fmt)
+                    return datetime.strptime(value.strip(), fmt).replace(tzinfo=UTC)
                 except ValueError:
                     continue
         return None
@@ -443,7 +670,7 @@ class CRMImportService:
 
     async def preview_contacts(
         self,
-        content: bytes,
+        content: ImportSource,
         filename: str | None = None,
         custom_mapping: dict[str, str] | None = None,
     ) -> ImportPreview:
@@ -451,23 +678,21 @@ class CRMImportService:
         Preview contact import without executing.
 
         Args:
-            content: File content as bytes
+            content: File content (bytes or binary file)
             filename: Original filename for format detection
             custom_mapping: Custom column mapping to override defaults
 
         Returns:
             ImportPreview with sample data and validation results
         """
-        format_type = _detect_format(content, filename)
         mapping = {**CONTACT_COLUMN_MAPPING, **(custom_mapping or {})}
 
+        # Seules les premières lignes sont lues, mappées et validées
         try:
-            if format_type == "csv":
-                raw_data = _parse_csv(content)
-            elif format_type == "xlsx":
-                raw_data = _parse_xlsx(content)
-            else:
-                raw_data = _parse_json(content)
+            rows = _parse_rows(content, filename)
+            raw_data = list(islice(rows, PREVIEW_ROWS))
+            rows.close()
+            total_rows = len(raw_data) if len(raw_data) < PREVIEW_ROWS else _count_rows(content, filename)
         except Exception as e:
             return ImportPreview(
                 total_rows=0,
@@ -494,7 +719,7 @@ class CRMImportService:
         validation_errors = []
         sample_rows = []
 
-        for idx, row in enumerate(raw_data[:5]):
+        for idx, row in enumerate(raw_data):
             mapped = _map_columns(row, mapping)
             sample_rows.append(mapped)
 
@@ -503,11 +728,11 @@ class CRMImportService:
                 validation_errors.append(ImportError(row=idx + 1, column=None, message=error, data=mapped))
 
         can_import = len(validation_errors) == 0 or all(
-            err.row > 5 for err in validation_errors
+            err.row > PREVIEW_ROWS for err in validation_errors
         )
 
         return ImportPreview(
-            total_rows=len(raw_data),
+            total_rows=total_rows,
             sample_rows=sample_rows,
             detected_columns=detected_columns,
             column_mapping=used_mapping,
@@ -517,7 +742,7 @@ class CRMImportService:
 
     async def import_contacts(
         self,
-        content: bytes,
+        content: ImportSource,
         filename: str | None = None,
         custom_mapping: dict[str, str] | None = None,
         update_existing: bool = True,
@@ -526,7 +751,7 @@ class CRMImportService:
         Import contacts from file.
 
         Args:
-            content: File content as bytes
+            content: File content (bytes or binary file)
             filename: Original filename for format detection
             custom_mapping: Custom column mapping to override defaults
             update_existing: Whether to update existing contacts by ID
@@ -534,113 +759,13 @@ class CRMImportService:
         Returns:
             ImportResult with counts and errors
         """
-        format_type = _detect_format(content, filename)
-        mapping = {**CONTACT_COLUMN_MAPPING, **(custom_mapping or {})}
-
-        try:
-            if format_type == "csv":
-                raw_data = _parse_csv(content)
-            elif format_type == "xlsx":
-                raw_data = _parse_xlsx(content)
-            else:
-                raw_data = _parse_json(content)
-        except Exception as e:
-            return ImportResult(
-                success=False,
-                errors=[ImportError(row=0, column=None, message=str(e))],
-            )
-
-        result = ImportResult(success=True, total_rows=len(raw_data))
-
-        for idx, row in enumerate(raw_data):
-            try:
-                mapped = _map_columns(row, mapping)
-
-                # Validate
-                errors = _validate_contact(mapped)
-                if errors:
-                    result.errors.append(ImportError(
-                        row=idx + 1,
-                        column=None,
-                        message="; ".join(errors),
-                        data=mapped,
-                    ))
-                    result.skipped += 1
-                    continue
-
-                # Check for existing contact
-                contact_id = mapped.get("id")
-                existing = None
-
-                if contact_id:
-                    stmt = select(Contact).where(Contact.id == contact_id)
-                    db_result = await self.session.execute(stmt)
-                    existing = db_result.scalar_one_or_none()
-
-                if existing and update_existing:
-                    # Update existing
-                    if mapped.get("first_name"):
-                        existing.first_name = mapped["first_name"]
-                    if mapped.get("last_name"):
-                        existing.last_name = mapped["last_name"]
-                    if mapped.get("company"):
-                        existing.company = mapped["company"]
-                    if mapped.get("email"):
-                        existing.email = mapped["email"]
-                    if mapped.get("phone"):
-                        existing.phone = mapped["phone"]
-                    if mapped.get("stage"):
-                        existing.stage = mapped["stage"]
-                    if mapped.get("score"):
-                        existing.score = _parse_value(mapped["score"], "int") or existing.score
-                    if mapped.get("source"):
-                        existing.source = mapped["source"]
-                    if mapped.get("tags"):
-                        existing.tags = _parse_value(mapped["tags"], "tags")
-                    if mapped.get("notes"):
-                        existing.notes = mapped["notes"]
-
-                    existing.updated_at = datetime.now(UTC)
-                    self.session.add(existing)
-                    result.updated += 1
-
-                elif existing and not update_existing:
-                    result.skipped += 1
-
-                else:
-                    # Create new
-                    contact = Contact(
-                        id=contact_id or generate_uuid(),
-                        first_name=mapped.get("first_name"),
-                        last_name=mapped.get("last_name"),
-                        company=mapped.get("company"),
-                        email=mapped.get("email"),
-                        phone=mapped.get("phone"),
-                        stage=mapped.get("stage", "contact"),
-                        score=_parse_value(mapped.get("score"), "int") or 50,
-                        source=mapped.get("source"),
-                        tags=_parse_value(mapped.get("tags"), "tags"),
-                        notes=mapped.get("notes"),
-                        scope="global",
-                    )
-                    self.session.add(contact)
-                    result.created += 1
-
-            except Exception as e:
-                logger.error(f"Error importing contact row {idx + 1}: {e}")
-                result.errors.append(ImportError(row=idx + 1, column=None, message=str(e)))
-                result.skipped += 1
-
-        await self.session.commit()
-
-        result.success = len(result.errors) == 0
-        logger.info(f"Contact import: {result.message}")
-
-        return result
+        return await self._run_import(
+            self.stream_import("contacts", content, filename, custom_mapping, update_existing)
+        )
 
     async def import_projects(
         self,
-        content: bytes,
+        content: ImportSource,
         filename: str | None = None,
         custom_mapping: dict[str, str] | None = None,
         update_existing: bool = True,
@@ -649,7 +774,7 @@ class CRMImportService:
         Import projects from file.
 
         Args:
-            content: File content as bytes
+            content: File content (bytes or binary file)
             filename: Original filename for format detection
             custom_mapping: Custom column mapping to override defaults
             update_existing: Whether to update existing projects by ID
@@ -657,127 +782,13 @@ class CRMImportService:
         Returns:
             ImportResult with counts and errors
         """
-        format_type = _detect_format(content, filename)
-        mapping = {**PROJECT_COLUMN_MAPPING, **(custom_mapping or {})}
-
-        try:
-            if format_type == "csv":
-                raw_data = _parse_csv(content)
-            elif format_type == "xlsx":
-                raw_data = _parse_xlsx(content, sheet_name="Projets")
-            else:
-                raw_data = _parse_json(content)
-        except Exception as e:
-            return ImportResult(
-                success=False,
-                errors=[ImportError(row=0, column=None, message=str(e))],
-            )
-
-        result = ImportResult(success=True, total_rows=len(raw_data))
-
-        # Status mapping
-        status_map = {
-            "en_cours": "active",
-            "en cours": "active",
-            "actif": "active",
-            "active": "active",
-            "en_pause": "on_hold",
-            "en pause": "on_hold",
-            "pause": "on_hold",
-            "on_hold": "on_hold",
-            "termine": "completed",
-            "terminé": "completed",
-            "completed": "completed",
-            "annule": "cancelled",
-            "annulé": "cancelled",
-            "cancelled": "cancelled",
-        }
-
-        for idx, row in enumerate(raw_data):
-            try:
-                mapped = _map_columns(row, mapping)
-
-                errors = _validate_project(mapped)
-                if errors:
-                    result.errors.append(ImportError(
-                        row=idx + 1,
-                        column=None,
-                        message="; ".join(errors),
-                        data=mapped,
-                    ))
-                    result.skipped += 1
-                    continue
-
-                project_id = mapped.get("id")
-                existing = None
-
-                if project_id:
-                    stmt = select(Project).where(Project.id == project_id)
-                    db_result = await self.session.execute(stmt)
-                    existing = db_result.scalar_one_or_none()
-
-                # Validate contact_id exists
-                contact_id = mapped.get("contact_id")
-                if contact_id:
-                    stmt = select(Contact).where(Contact.id == contact_id)
-                    db_result = await self.session.execute(stmt)
-                    if not db_result.scalar_one_or_none():
-                        contact_id = None  # Don't link to non-existent contact
-
-                # Parse status
-                raw_status = str(mapped.get("status", "active")).lower().strip()
-                status = status_map.get(raw_status, "active")
-
-                if existing and update_existing:
-                    existing.name = mapped.get("name") or existing.name
-                    if mapped.get("description"):
-                        existing.description = mapped["description"]
-                    existing.contact_id = contact_id
-                    existing.status = status
-                    if mapped.get("budget"):
-                        existing.budget = _parse_value(mapped["budget"], "float")
-                    if mapped.get("notes"):
-                        existing.notes = mapped["notes"]
-                    if mapped.get("tags"):
-                        existing.tags = _parse_value(mapped["tags"], "tags")
-
-                    existing.updated_at = datetime.now(UTC)
-                    self.session.add(existing)
-                    result.updated += 1
-
-                elif existing and not update_existing:
-                    result.skipped += 1
-
-                else:
-                    project = Project(
-                        id=project_id or generate_uuid(),
-                        name=mapped.get("name", "Sans nom"),
-                        description=mapped.get("description"),
-                        contact_id=contact_id,
-                        status=status,
-                        budget=_parse_value(mapped.get("budget"), "float"),
-                        notes=mapped.get("notes"),
-                        tags=_parse_value(mapped.get("tags"), "tags"),
-                        scope="global",
-                    )
-                    self.session.add(project)
-                    result.created += 1
-
-            except Exception as e:
-                logger.error(f"Error importing project row {idx + 1}: {e}")
-                result.errors.append(ImportError(row=idx + 1, column=None, message=str(e)))
-                result.skipped += 1
-
-        await self.session.commit()
-
-        result.success = len(result.errors) == 0
-        logger.info(f"Project import: {result.message}")
-
-        return result
+        return await self._run_import(
+            self.stream_import("projects", content, filename, custom_mapping, update_existing)
+        )
 
     async def import_deliverables(
         self,
-        content: bytes,
+        content: ImportSource,
         filename: str | None = None,
         custom_mapping: dict[str, str] | None = None,
         update_existing: bool = True,
@@ -786,7 +797,7 @@ class CRMImportService:
         Import deliverables from file.
 
         Args:
-            content: File content as bytes
+            content: File content (bytes or binary file)
             filename: Original filename for format detection
             custom_mapping: Custom column mapping to override defaults
             update_existing: Whether to update existing deliverables by ID
@@ -794,118 +805,347 @@ class CRMImportService:
         Returns:
             ImportResult with counts and errors
         """
-        format_type = _detect_format(content, filename)
-        mapping = {**DELIVERABLE_COLUMN_MAPPING, **(custom_mapping or {})}
-
-        try:
-            if format_type == "csv":
-                raw_data = _parse_csv(content)
-            elif format_type == "xlsx":
-                raw_data = _parse_xlsx(content, sheet_name="Livrables")
-            else:
-                raw_data = _parse_json(content)
-        except Exception as e:
-            return ImportResult(
-                success=False,
-                errors=[ImportError(row=0, column=None, message=str(e))],
-            )
+        return await self._run_import(
+            self.stream_import("deliverables", content, filename, custom_mapping, update_existing)
+        )
 
-        result = ImportResult(success=True, total_rows=len(raw_data))
-
-        # Status mapping
-        status_map = {
-            "a_faire": "a_faire",
-            "a faire": "a_faire",
-            "todo": "a_faire",
-            "en_cours": "en_cours",
-            "en cours": "en_cours",
-            "in_progress": "en_cours",
-            "en_revision": "en_revision",
-            "en revision": "en_revision",
-            "review": "en_revision",
-            "valide": "valide",
-            "validé": "valide",
-            "done": "valide",
-            "completed": "valide",
-        }
+    @staticmethod
+    async def _run_import(events: AsyncGenerator[ImportProgress | ImportResult, None]) -> ImportResult:
+        result = ImportResult(success=False)
+        async for event in events:
+            if isinstance(event, ImportResult):
+                result = event
+        return result
 
-        for idx, row in enumerate(raw_data):
-            try:
-                mapped = _map_columns(row, mapping)
+    async def stream_import(
+        self,
+        entity: ImportEntity,
+        content: ImportSource,
+        filename: str | None = None,
+        custom_mapping: dict[str, str] | None = None,
+        update_existing: bool = True,
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> AsyncGenerator[ImportProgress | ImportResult, None]:
+        """
+        Import ensembliste, lot par lot, avec progression.
+
+        Pour chaque lot de `batch_size` lignes :
+        1. mapping + validation en une passe, sans aucune requête ;
+        2. IDs existants (et références contact/projet) préchargés par
+           requêtes `IN` découpées ;
+        3. créations en un `INSERT ... ON CONFLICT DO UPDATE`, mises à jour en
+           un UPDATE groupé par clé primaire ;
+        4. commit : le verrou d'écriture SQLite est rendu entre deux lots.
+
+        Yields:
+            Un ImportProgress par lot, puis l'ImportResult final.
+        """
+        spec = _IMPORT_SPECS[entity]
+        mapping = {**spec.mapping, **(custom_mapping or {})}
+        started = time.perf_counter()
+        result = ImportResult(success=True)
 
-                errors = _validate_deliverable(mapped)
-                if errors:
+        # Lignes lues au fil de l'eau : seul le lot courant est en mémoire
+        rows = _parse_rows(content, filename, sheet_name=spec.sheet_name)
+        try:
+            while True:
+                start = result.total_rows
+                try:
+                    batch = list(islice(rows, batch_size))
+                except Exception as e:
+                    # Fichier illisible (ligne 0) ou corrompu après la ligne `start`
+                    result.errors.append(ImportError(row=start + 1 if start else 0, column=None, message=str(e)))
+                    break
+                if not batch:
+                    break
+                result.total_rows += len(batch)
+
+                # Compteurs du lot : reportés dans `result` une fois le commit passé
+                batch_result = ImportResult(success=True)
+                try:
+                    await self._import_batch(spec, batch, start, mapping, update_existing, batch_result)
+                    await self.session.commit()
+                except Exception as e:
+                    await self.session.rollback()
+                    logger.error(f"Error importing {entity} rows {start + 1}-{start + len(batch)}: {e}")
+                    # Rien n'est écrit : toutes les lignes du lot sont ignorées,
+                    # celles déjà rejetées à la validation comprises (une seule fois)
+                    result.errors.extend(batch_result.errors)
                     result.errors.append(ImportError(
-                        row=idx + 1,
+                        row=start + 1,
                         column=None,
-                        message="; ".join(errors),
-                        data=mapped,
+                        message=f"Lignes {start + 1} a {start + len(batch)} non importees : {e}",
                     ))
+                    result.skipped += len(batch)
+                else:
+                    result.created += batch_result.created
+                    result.updated += batch_result.updated
+                    result.skipped += batch_result.skipped
+                    result.errors.extend(batch_result.errors)
+
+                yield ImportProgress(
+                    processed=result.total_rows,
+                    created=result.created,
+                    updated=result.updated,
+                    skipped=result.skipped,
+                    errors=len(result.errors),
+                    elapsed=time.perf_counter() - started,
+                )
+        finally:
+            rows.close()
+
+        result.success = len(result.errors) == 0
+        logger.info(
+            f"{entity.capitalize()} import: {result.message} "
+            f"({result.total_rows / max(time.perf_counter() - started, 1e-9):.0f} lignes/s)"
+        )
+        yield result
+
+    async def _existing_ids(self, model: type[SQLModel], ids: Iterable[str]) -> set[str]:
+        """IDs déjà présents en base, par requêtes IN découpées."""
+        wanted = list(dict.fromkeys(i for i in ids if i))
+        found: set[str] = set()
+        for start in range(0, len(wanted), _IN_CHUNK_SIZE):
+            chunk = wanted[start:start + _IN_CHUNK_SIZE]
+            db_result = await self.session.execute(select(model.id).where(model.id.in_(chunk)))
+            found.update(db_result.scalars().all())
+        return found
+
+    async def _import_batch(
+        self,
+        spec: "_ImportSpec",
+        batch: list[dict],
+        offset: int,
+        mapping: dict[str, str],
+        update_existing: bool,
+        result: ImportResult,
+    ) -> None:
+        # 1. Mapping + validation (pur Python, aucune requête)
+        rows: list[tuple[int, dict]] = []
+        for idx, row in enumerate(batch, start=offset + 1):
+            try:
+                mapped = _map_columns(row, mapping)
+                errors = spec.validate(mapped)
+            except Exception as e:
+                result.errors.append(ImportError(row=idx, column=None, message=str(e)))
+                result.skipped += 1
+                continue
+            if errors:
+                result.errors.append(ImportError(
+                    row=idx,
+                    column=None,
+                    message="; ".join(errors),
+                    data=mapped,
+                ))
+                result.skipped += 1
+                continue
+            rows.append((idx, mapped))
+
+        # 2. Préchargement des IDs existants et des références
+        existing = await self._existing_ids(spec.model, (mapped.get("id") for _, mapped in rows))
+        references: set[str] = set()
+        if spec.reference is not None:
+            ref_model, ref_field = spec.reference
+            references = await self._existing_ids(ref_model, (mapped.get(ref_field) for _, mapped in rows))
+
+        # 3. Répartition créations / mises à jour (doublons du fichier fusionnés)
+        now = datetime.now(UTC)
+        template = spec.insert_template()
+        inserts: dict[str, dict] = {}
+        updates: dict[str, dict] = {}
+        for idx, mapped in rows:
+            try:
+                values, errors = spec.prepare(mapped, references)
+            except Exception as e:
+                result.errors.append(ImportError(row=idx, column=None, message=str(e)))
+                result.skipped += 1
+                continue
+            if errors:
+                result.errors.append(errors[0])
+                errors[0].row = idx
+                errors[0].data = mapped
+                result.skipped += 1
+                continue
+
+            row_id = mapped.get("id")
+            if row_id and (row_id in existing or row_id in inserts):
+                if not update_existing:
                     result.skipped += 1
                     continue
+                target = inserts.get(row_id)
+                if target is not None:
+                    target.update(values)  # doublon d'une ligne créée dans ce lot
+                else:
+                    updates.setdefault(row_id, {"id": row_id}).update(values, updated_at=now)
+                result.updated += 1
+            else:
+                row_id = row_id or generate_uuid()
+                # Lignes homogènes : un seul executemany pour tout le lot
+                inserts[row_id] = {
+                    **template, **values, "id": row_id, "created_at": now, "updated_at": now,
+                }
+                result.created += 1
+
+        # 4. Écriture ensembliste
+        if inserts:
+            statement = sqlite_insert(spec.model)
+            if update_existing:
+                statement = statement.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={
+                        column: func.coalesce(statement.excluded[column], spec.model.__table__.c[column])
+                        for column in spec.updatable
+                    } | {"updated_at": statement.excluded.updated_at},
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=["id"])
+            await self.session.execute(statement, list(inserts.values()))
+        if updates:
+            await self.session.execute(update(spec.model), list(updates.values()))
 
-                deliverable_id = mapped.get("id")
-                existing = None
-
-                if deliverable_id:
-                    stmt = select(Deliverable).where(Deliverable.id == deliverable_id)
-                    db_result = await self.session.execute(stmt)
-                    existing = db_result.scalar_one_or_none()
-
-                # Validate project_id exists
-                project_id = mapped.get("project_id")
-                if project_id:
-                    stmt = select(Project).where(Project.id == project_id)
-                    db_result = await self.session.execute(stmt)
-                    if not db_result.scalar_one_or_none():
-                        result.errors.append(ImportError(
-                            row=idx + 1,
-                            column="project_id",
-                            message=f"Projet {project_id} non trouve",
-                            data=mapped,
-                        ))
-                        result.skipped += 1
-                        continue
-
-                raw_status = str(mapped.get("status", "a_faire")).lower().strip()
-                status = status_map.get(raw_status, "a_faire")
-
-                if existing and update_existing:
-                    existing.title = mapped.get("title") or existing.title
-                    if mapped.get("description"):
-                        existing.description = mapped["description"]
-                    existing.project_id = project_id
-                    existing.status = status
-                    if mapped.get("due_date"):
-                        existing.due_date = _parse_value(mapped["due_date"], "datetime")
-
-                    existing.updated_at = datetime.now(UTC)
-                    self.session.add(existing)
-                    result.updated += 1
-
-                elif existing and not update_existing:
-                    result.skipped += 1
 
-                else:
-                    deliverable = Deliverable(
-                        id=deliverable_id or generate_uuid(),
-                        title=mapped.get("title", "Sans titre"),
-                        description=mapped.get("description"),
-                        project_id=project_id,
-                        status=status,
-                        due_date=_parse_value(mapped.get("due_date"), "datetime"),
-                    )
-                    self.session.add(deliverable)
-                    result.created += 1
+# ============================================================
+# Entity specs (bulk import)
+# ============================================================
 
-            except Exception as e:
-                logger.error(f"Error importing deliverable row {idx + 1}: {e}")
-                result.errors.append(ImportError(row=idx + 1, column=None, message=str(e)))
-                result.skipped += 1
 
-        await self.session.commit()
+_PROJECT_STATUS_MAP = {
+    "en_cours": "active",
+    "en cours": "active",
+    "actif": "active",
+    "active": "active",
+    "en_pause": "on_hold",
+    "en pause": "on_hold",
+    "pause": "on_hold",
+    "on_hold": "on_hold",
+    "termine": "completed",
+    "terminé": "completed",
+    "completed": "completed",
+    "annule": "cancelled",
+    "annulé": "cancelled",
+    "cancelled": "cancelled",
+}
 
-        result.success = len(result.errors) == 0
-        logger.info(f"Deliverable import: {result.message}")
+_DELIVERABLE_STATUS_MAP = {
+    "a_faire": "a_faire",
+    "a faire": "a_faire",
+    "todo": "a_faire",
+    "en_cours": "en_cours",
+    "en cours": "en_cours",
+    "in_progress": "en_cours",
+    "en_revision": "en_revision",
+    "en revision": "en_revision",
+    "review": "en_revision",
+    "valide": "valide",
+    "validé": "valide",
+    "done": "valide",
+    "completed": "valide",
+}
 
-        return result
+
+def _prepare_contact(mapped: dict, references: set[str]) -> tuple[dict, list[ImportError]]:
+    """Valeurs fournies par la ligne (les champs vides ne remplacent rien)."""
+    values: dict[str, Any] = {}
+    for name in ("first_name", "last_name", "company", "email", "phone", "stage", "source", "notes"):
+        if mapped.get(name):
+            values[name] = mapped[name]
+    score = _parse_value(mapped.get("score"), "int") if mapped.get("score") else None
+    if score:
+        values["score"] = score
+    tags = _parse_value(mapped.get("tags"), "tags") if mapped.get("tags") else None
+    if tags:
+        values["tags"] = tags
+    return values, []
+
+
+def _prepare_project(mapped: dict, references: set[str]) -> tuple[dict, list[ImportError]]:
+    contact_id = mapped.get("contact_id")
+    values: dict[str, Any] = {
+        "name": mapped["name"],
+        # Pas de lien vers un contact inexistant
+        "contact_id": contact_id if contact_id in references else None,
+        "status": _PROJECT_STATUS_MAP.get(str(mapped.get("status", "active")).lower().strip(), "active"),
+    }
+    for name in ("description", "notes"):
+        if mapped.get(name):
+            values[name] = mapped[name]
+    if mapped.get("budget"):
+        values["budget"] = _parse_value(mapped["budget"], "float")
+    if mapped.get("tags"):
+        values["tags"] = _parse_value(mapped["tags"], "tags")
+    return values, []
+
+
+def _prepare_deliverable(mapped: dict, references: set[str]) -> tuple[dict, list[ImportError]]:
+    project_id = mapped["project_id"]
+    if project_id not in references:
+        return {}, [ImportError(row=0, column="project_id", message=f"Projet {project_id} non trouve")]
+    values: dict[str, Any] = {
+        "title": mapped["title"],
+        "project_id": project_id,
+        "status": _DELIVERABLE_STATUS_MAP.get(str(mapped.get("status", "a_faire")).lower().strip(), "a_faire"),
+    }
+    if mapped.get("description"):
+        values["description"] = mapped["description"]
+    if mapped.get("due_date"):
+        values["due_date"] = _parse_value(mapped["due_date"], "datetime")
+    return values, []
+
+
+@dataclass(frozen=True)
+class _ImportSpec:
+    """Description d'une entité importable par le moteur ensembliste."""
+
+    model: type[SQLModel]
+    mapping: dict[str, str]
+    sheet_name: str | None
+    validate: Callable[[dict], list[str]]
+    prepare: Callable[[dict, set[str]], tuple[dict, list[ImportError]]]
+    # Colonnes fusionnées sur conflit d'ID (INSERT ... ON CONFLICT DO UPDATE)
+    updatable: tuple[str, ...]
+    # Référence à précharger : (modèle, champ de la ligne)
+    reference: tuple[type[SQLModel], str] | None = None
+
+    def insert_template(self) -> dict[str, Any]:
+        """Ligne de création complète : défauts scalaires des colonnes, sinon NULL."""
+        template = {}
+        for column in self.model.__table__.c:
+            default = column.default
+            if default is None or not default.is_scalar:
+                template[column.name] = None
+            else:
+                template[column.name] = default.arg
+        return template
+
+
+_IMPORT_SPECS: dict[str, _ImportSpec] = {
+    "contacts": _ImportSpec(
+        model=Contact,
+        mapping=CONTACT_COLUMN_MAPPING,
+        sheet_name=None,
+        validate=_validate_contact,
+        prepare=_prepare_contact,
+        updatable=(
+            "first_name", "last_name", "company", "email", "phone",
+            "stage", "score", "source", "tags", "notes",
+        ),
+    ),
+    "projects": _ImportSpec(
+        model=Project,
+        mapping=PROJECT_COLUMN_MAPPING,
+        sheet_name="Projets",
+        validate=_validate_project,
+        prepare=_prepare_project,
+        updatable=("name", "description", "contact_id", "status", "budget", "notes", "tags"),
+        reference=(Contact, "contact_id"),
+    ),
+    "deliverables": _ImportSpec(
+        model=Deliverable,
+        mapping=DELIVERABLE_COLUMN_MAPPING,
+        sheet_name="Livrables",
+        validate=_validate_deliverable,
+        prepare=_prepare_deliverable,
+        updatable=("title", "description", "project_id", "status", "due_date"),
+        reference=(Project, "project_id"),
+    ),
+}
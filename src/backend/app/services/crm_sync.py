@@ -5,23 +5,38 @@ Synchronizes data from Google Sheets CRM to local SQLite database.
 Google Sheets is the source of truth.
 
 Sprint 2 - PERF-2.4: Migrated to AsyncSession for proper async DB operations.
-Refactored: utilise crm_utils pour les upserts partages.
+Refactored: utilise crm_utils pour l'extraction des champs partagee.
 """
 
+import asyncio
+import hashlib
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 
-from app.models.entities import Contact, Deliverable, Preference, Project
+from app.models.entities import (
+    Contact,
+    Deliverable,
+    Preference,
+    Project,
+    SheetChange,
+    SheetRowFingerprint,
+    Task,
+    generate_uuid,
+)
 from app.services.crm_utils import (
+    contact_fields_from_row,
     parse_datetime,
-    upsert_contact,
-    upsert_project,
-    upsert_task,
+    project_fields_from_row,
+    sanitize_row,
+    task_fields_from_row,
 )
+from app.services.sheets_change_log import suppress_change_log
 from app.services.sheets_service import GoogleSheetsService
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
+from sqlmodel import SQLModel, select
 
 logger = logging.getLogger(__name__)
 
@@ -68,17 +83,56 @@ CRM_SHEET_STRUCTURE = [
 ]
 
 
+# Onglets synchronisés, dans l'ordre d'application (les clés étrangères
+# des projets et livrables pointent vers les onglets précédents)
+SYNC_TABS = ("Clients", "Projects", "Deliverables", "Tasks")
+
+# SQLite limite le nombre de paramètres liés par requête
+_IN_CHUNK_SIZE = 500
+
+DELIVERABLE_STATUS_MAP = {
+    "a_faire": "a_faire",
+    "en_cours": "en_cours",
+    "en_revision": "en_revision",
+    "valide": "valide",
+    "todo": "a_faire",
+    "in_progress": "en_cours",
+    "review": "en_revision",
+    "done": "valide",
+}
+
+
+def row_fingerprint(row: dict, *extra: str | None) -> str:
+    """
+    Empreinte d'une ligne Sheets : cellules normalisées, ordre des colonnes ignoré.
+
+    Les cellules vides sont omises (ajouter une colonne vide ne change rien) ;
+    `extra` ajoute ce qui dépend d'autres onglets (ex. client résolu ou non).
+    """
+    parts = [
+        f"{str(key).strip()}={' '.join(str(value).split())}"
+        for key, value in sorted(row.items(), key=lambda item: str(item[0]))
+        if value is not None and str(value).strip()
+    ]
+    parts.extend(value or "" for value in extra)
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
 @dataclass
 class SyncStats:
     """Statistics from a sync operation."""
     contacts_created: int = 0
     contacts_updated: int = 0
+    contacts_unchanged: int = 0
     projects_created: int = 0
     projects_updated: int = 0
+    projects_unchanged: int = 0
     deliverables_created: int = 0
     deliverables_updated: int = 0
+    deliverables_unchanged: int = 0
     tasks_created: int = 0
     tasks_updated: int = 0
+    tasks_unchanged: int = 0
     errors: list[str] = None
 
     def __post_init__(self):
@@ -89,12 +143,16 @@ class SyncStats:
         return {
             "contacts_created": self.contacts_created,
             "contacts_updated": self.contacts_updated,
+            "contacts_unchanged": self.contacts_unchanged,
             "projects_created": self.projects_created,
             "projects_updated": self.projects_updated,
+            "projects_unchanged": self.projects_unchanged,
             "deliverables_created": self.deliverables_created,
             "deliverables_updated": self.deliverables_updated,
+            "deliverables_unchanged": self.deliverables_unchanged,
             "tasks_created": self.tasks_created,
             "tasks_updated": self.tasks_updated,
+            "tasks_unchanged": self.tasks_unchanged,
             "errors": self.errors,
             "total_synced": (
                 self.contacts_created + self.contacts_updated +
@@ -102,9 +160,24 @@ class SyncStats:
                 self.deliverables_created + self.deliverables_updated +
                 self.tasks_created + self.tasks_updated
             ),
+            "total_unchanged": (
+                self.contacts_unchanged + self.projects_unchanged +
+                self.deliverables_unchanged + self.tasks_unchanged
+            ),
         }
 
 
+@dataclass
+class _TabRow:
+    """Ligne d'onglet prête à écrire : ID, champs de l'entité, empreinte."""
+
+    row_id: str
+    fields: dict
+    fingerprint: str
+    # Champs posés à la création seulement (scope, created_at...)
+    create_fields: dict = field(default_factory=dict)
+
+
 # ============================================================
 # CRM Sync Service
 # ============================================================
@@ -117,8 +190,11 @@ class CRMSyncService:
     Google Sheets is the master data source.
     Sync is unidirectional: Sheets -> THERESE.
 
-    Sprint 2 - PERF-2.4: Uses AsyncSession for non-blocking DB operations.
-    Refactored: delegue les upserts a crm_utils.
+    Synchronisation par delta : les onglets sont téléchargés en parallèle,
+    chaque ligne est réduite à une empreinte (`row_fingerprint`) comparée à
+    celle de la dernière synchro (table sheet_row_fingerprints). Seules les
+    lignes modifiées (ou absentes en local) sont écrites ; les clés
+    étrangères sont résolues contre un ensemble d'IDs préchargé.
     """
 
     def __init__(self, session: AsyncSession, sheets_service: GoogleSheetsService):
@@ -146,184 +222,202 @@ class CRMSyncService:
         """
         stats = SyncStats()
 
-        # Sync Clients -> Contacts
-        try:
-            clients_data = await self.sheets.get_all_data_as_dicts(spreadsheet_id, "Clients")
-            logger.info(f"Found {len(clients_data)} clients in Google Sheets")
-            await self._sync_contacts(clients_data, stats)
-        except Exception as e:
-            logger.error(f"Error syncing clients: {e}")
-            stats.errors.append(f"Clients: {str(e)}")
-
-        # Sync Projects
-        try:
-            projects_data = await self.sheets.get_all_data_as_dicts(spreadsheet_id, "Projects")
-            logger.info(f"Found {len(projects_data)} projects in Google Sheets")
-            await self._sync_projects(projects_data, stats)
-        except Exception as e:
-            logger.error(f"Error syncing projects: {e}")
-            stats.errors.append(f"Projects: {str(e)}")
-
-        # Sync Deliverables
-        try:
-            deliverables_data = await self.sheets.get_all_data_as_dicts(spreadsheet_id, "Deliverables")
-            logger.info(f"Found {len(deliverables_data)} deliverables in Google Sheets")
-            await self._sync_deliverables(deliverables_data, stats)
-        except Exception as e:
-            logger.error(f"Error syncing deliverables: {e}")
-            stats.errors.append(f"Deliverables: {str(e)}")
-
-        # Sync Tasks
-        try:
-            tasks_data = await self.sheets.get_all_data_as_dicts(spreadsheet_id, "Tasks")
-            logger.info(f"Found {len(tasks_data)} tasks in Google Sheets")
-            await self._sync_tasks(tasks_data, stats)
-        except Exception as e:
-            logger.error(f"Error syncing tasks: {e}")
-            stats.errors.append(f"Tasks: {str(e)}")
-
-        # Commit all changes (Sprint 2 - PERF-2.4: async commit)
-        await self.session.commit()
+        fetched = await asyncio.gather(
+            *(self.sheets.get_all_data_as_dicts(spreadsheet_id, tab) for tab in SYNC_TABS),
+            return_exceptions=True,
+        )
+        data: dict[str, list[dict]] = {}
+        for tab, rows in zip(SYNC_TABS, fetched, strict=True):
+            if isinstance(rows, BaseException):
+                logger.error(f"Error fetching tab {tab}: {rows}")
+                stats.errors.append(f"{tab}: {str(rows)}")
+                continue
+            logger.info(f"Found {len(rows)} rows in Google Sheets tab {tab}")
+            data[tab] = [sanitize_row(row) for row in rows]
+
+        # Écritures venues de la feuille : pas de journal de push (pas d'écho)
+        with suppress_change_log(self.session):
+            # IDs locaux, chargés une fois : détection des lignes supprimées en
+            # local et résolution des clés étrangères sans requête par ligne
+            contact_ids = await self._load_ids(Contact)
+            project_ids = await self._load_ids(Project)
+
+            for tab, model, prepare, prefix, known_ids in (
+                ("Clients", Contact, self._prepare_contact, "contacts", contact_ids),
+                ("Projects", Project, self._prepare_project, "projects", project_ids),
+                ("Deliverables", Deliverable, self._prepare_deliverable, "deliverables", None),
+                ("Tasks", Task, self._prepare_task, "tasks", None),
+            ):
+                if tab not in data:
+                    continue
+                try:
+                    tab_rows = []
+                    for row in data[tab]:
+                        try:
+                            tab_row = prepare(row, contact_ids, project_ids)
+                        except ValueError:
+                            continue  # ID manquant
+                        except Exception as e:
+                            logger.error(f"Error syncing {tab} row {row.get('ID', 'unknown')}: {e}")
+                            stats.errors.append(f"{tab} {row.get('ID', 'unknown')}: {str(e)}")
+                            continue
+                        if tab_row is not None:
+                            tab_rows.append(tab_row)
+                    await self._apply_tab(tab, model, tab_rows, prefix, stats, known_ids)
+                except Exception as e:
+                    logger.error(f"Error syncing {tab}: {e}")
+                    stats.errors.append(f"{tab}: {str(e)}")
+
+            # Conflits de push : la feuille vient d'être relue, elle fait foi
+            await self.session.execute(delete(SheetChange).where(SheetChange.status == "conflict"))
+
+            # Commit all changes (Sprint 2 - PERF-2.4: async commit)
+            await self.session.commit()
 
         logger.info(f"CRM Sync completed: {stats.to_dict()}")
         return stats
 
-    async def _sync_contacts(self, clients_data: list[dict], stats: SyncStats):
-        """
-        Sync clients from Sheets to Contact entities.
-
-        Utilise upsert_contact() de crm_utils + gestion last_interaction specifique.
-        """
-        for row in clients_data:
-            try:
-                contact, created = await upsert_contact(self.session, row, safe_get=True)
-                # Champ specifique au sync service : last_interaction
-                last_interaction = parse_datetime(row.get("LastInteraction", ""))
-                contact.last_interaction = last_interaction
-                if created:
-                    stats.contacts_created += 1
-                else:
-                    stats.contacts_updated += 1
-            except ValueError:
-                continue  # ID manquant
-            except Exception as e:
-                logger.error(f"Error syncing contact {row.get('ID', 'unknown')}: {e}")
-                stats.errors.append(f"Contact {row.get('ID', 'unknown')}: {str(e)}")
-
-    async def _sync_projects(self, projects_data: list[dict], stats: SyncStats):
-        """
-        Sync projects from Sheets to Project entities.
-
-        Utilise upsert_project() de crm_utils + verification contact existant.
-        """
-        for row in projects_data:
-            try:
-                project, created = await upsert_project(self.session, row, safe_get=True)
-                # Verification specifique : le contact lie existe-t-il ?
-                if project.contact_id:
-                    contact = await self.session.get(Contact, project.contact_id)
-                    if not contact:
-                        project.contact_id = None  # Ne pas lier a un contact inexistant
-                if created:
-                    stats.projects_created += 1
-                else:
-                    stats.projects_updated += 1
-            except ValueError:
-                continue
-            except Exception as e:
-                logger.error(f"Error syncing project {row.get('ID', 'unknown')}: {e}")
-                stats.errors.append(f"Project {row.get('ID', 'unknown')}: {str(e)}")
-
-    async def _sync_deliverables(self, deliverables_data: list[dict], stats: SyncStats):
-        """
-        Sync deliverables from Sheets to Deliverable entities.
-
-        Ce mapping est specifique au service sync (statuts en francais, verification projet).
-        """
-        # Map status values
-        status_map = {
-            "a_faire": "a_faire",
-            "en_cours": "en_cours",
-            "en_revision": "en_revision",
-            "valide": "valide",
-            "todo": "a_faire",
-            "in_progress": "en_cours",
-            "review": "en_revision",
-            "done": "valide",
+    # ---------------------------------------------------------------
+    # Préparation des lignes (pur Python, aucune requête)
+    # ---------------------------------------------------------------
+
+    @staticmethod
+    def _prepare_contact(row: dict, contact_ids: set[str], project_ids: set[str]) -> _TabRow:
+        contact_id, fields = contact_fields_from_row(row, safe_get=True)
+        # Champ specifique au sync service : last_interaction
+        fields["last_interaction"] = parse_datetime(row.get("LastInteraction", ""))
+        return _TabRow(contact_id, fields, row_fingerprint(row), {"scope": "global"})
+
+    @staticmethod
+    def _prepare_project(row: dict, contact_ids: set[str], project_ids: set[str]) -> _TabRow:
+        project_id, fields = project_fields_from_row(row, safe_get=True)
+        if fields["contact_id"] not in contact_ids:
+            fields["contact_id"] = None  # Ne pas lier a un contact inexistant
+        # Le client résolu entre dans l'empreinte : s'il apparaît plus tard,
+        # la ligne est réécrite pour poser le lien
+        fingerprint = row_fingerprint(row, fields["contact_id"])
+        return _TabRow(project_id, fields, fingerprint, {"scope": "global"})
+
+    @staticmethod
+    def _prepare_deliverable(row: dict, contact_ids: set[str], project_ids: set[str]) -> _TabRow | None:
+        deliverable_id = (row.get("ID", "") or "").strip()
+        if not deliverable_id:
+            return None
+
+        project_id = (row.get("ProjectID", "") or "").strip()
+        if not project_id:
+            return None  # Skip deliverables without project
+        if project_id not in project_ids:
+            logger.warning(f"Deliverable {deliverable_id} references unknown project {project_id}")
+            return None
+
+        raw_status = (row.get("Status", "a_faire") or "a_faire").strip().lower()
+        fields = {
+            "title": (row.get("Title", "Sans titre") or "Sans titre").strip(),
+            "description": (row.get("Description", "") or "").strip() or None,
+            "project_id": project_id,
+            "status": DELIVERABLE_STATUS_MAP.get(raw_status, "a_faire"),
+            "due_date": parse_datetime(row.get("DueDate", "")),
+            "completed_at": parse_datetime(row.get("DeliveredDate", "")),
         }
+        return _TabRow(deliverable_id, fields, row_fingerprint(row))
+
+    @staticmethod
+    def _prepare_task(row: dict, contact_ids: set[str], project_ids: set[str]) -> _TabRow:
+        task_id, fields = task_fields_from_row(row, safe_get=True)
+        created_at = fields.pop("created_at") or datetime.now(UTC)
+        return _TabRow(task_id, fields, row_fingerprint(row), {"created_at": created_at})
+
+    # ---------------------------------------------------------------
+    # Écriture des lignes modifiées
+    # ---------------------------------------------------------------
+
+    async def _load_ids(self, model: type[SQLModel]) -> set[str]:
+        result = await self.session.execute(select(model.id))
+        return set(result.scalars().all())
+
+    async def _load_entities(self, model: type[SQLModel], ids: list[str]) -> dict[str, SQLModel]:
+        entities: dict[str, SQLModel] = {}
+        for start in range(0, len(ids), _IN_CHUNK_SIZE):
+            result = await self.session.execute(
+                select(model).where(model.id.in_(ids[start:start + _IN_CHUNK_SIZE]))
+            )
+            entities.update((entity.id, entity) for entity in result.scalars().all())
+        return entities
+
+    async def _apply_tab(
+        self,
+        tab: str,
+        model: type[SQLModel],
+        tab_rows: list[_TabRow],
+        prefix: str,
+        stats: SyncStats,
+        known_ids: set[str] | None,
+    ) -> None:
+        """Écrit les lignes dont l'empreinte a changé, puis mémorise les empreintes."""
+        result = await self.session.execute(
+            select(SheetRowFingerprint.row_id, SheetRowFingerprint.fingerprint)
+            .where(SheetRowFingerprint.tab == tab)
+        )
+        stored = dict(result.all())
+        local_ids = known_ids if known_ids is not None else await self._load_ids(model)
+
+        changed = [
+            tab_row for tab_row in tab_rows
+            if stored.get(tab_row.row_id) != tab_row.fingerprint or tab_row.row_id not in local_ids
+        ]
+        unchanged = len(tab_rows) - len(changed)
+        entities = await self._load_entities(
+            model, list({tab_row.row_id for tab_row in changed if tab_row.row_id in local_ids})
+        )
 
-        for row in deliverables_data:
-            try:
-                deliverable_id = (row.get("ID", "") or "").strip()
-                if not deliverable_id:
-                    continue
-
-                existing = await self.session.get(Deliverable, deliverable_id)
-
-                # Get project ID
-                project_id = (row.get("ProjectID", "") or "").strip()
-                if not project_id:
-                    continue  # Skip deliverables without project
-
-                # Verify project exists
-                project = await self.session.get(Project, project_id)
-                if not project:
-                    logger.warning(f"Deliverable {deliverable_id} references unknown project {project_id}")
-                    continue
-
-                # Parse status
-                raw_status = (row.get("Status", "a_faire") or "a_faire").strip().lower()
-                status = status_map.get(raw_status, "a_faire")
-
-                # Parse dates
-                due_date = parse_datetime(row.get("DueDate", ""))
-                completed_at = parse_datetime(row.get("DeliveredDate", ""))
-
-                if existing:
-                    existing.title = (row.get("Title", "Sans titre") or "Sans titre").strip()
-                    existing.description = (row.get("Description", "") or "").strip() or None
-                    existing.project_id = project_id
-                    existing.status = status
-                    existing.due_date = due_date
-                    existing.completed_at = completed_at
-                    existing.updated_at = datetime.now(UTC)
-                    self.session.add(existing)
-                    stats.deliverables_updated += 1
-                else:
-                    deliverable = Deliverable(
-                        id=deliverable_id,
-                        title=(row.get("Title", "Sans titre") or "Sans titre").strip(),
-                        description=(row.get("Description", "") or "").strip() or None,
-                        project_id=project_id,
-                        status=status,
-                        due_date=due_date,
-                        completed_at=completed_at,
-                    )
-                    self.session.add(deliverable)
-                    stats.deliverables_created += 1
-
-            except Exception as e:
-                logger.error(f"Error syncing deliverable {row.get('ID', 'unknown')}: {e}")
-                stats.errors.append(f"Deliverable {row.get('ID', 'unknown')}: {str(e)}")
-
-    async def _sync_tasks(self, tasks_data: list[dict], stats: SyncStats):
-        """
-        Sync tasks from Sheets to Task entities.
+        created = updated = 0
+        now = datetime.now(UTC)
+        for tab_row in changed:
+            entity = entities.get(tab_row.row_id)
+            if entity is not None:
+                for name, value in tab_row.fields.items():
+                    setattr(entity, name, value)
+                entity.updated_at = now
+                updated += 1
+            else:
+                entity = model(id=tab_row.row_id, **tab_row.fields, **tab_row.create_fields)
+                self.session.add(entity)
+                # Doublon d'ID plus bas dans l'onglet : mise à jour de cette entité
+                entities[tab_row.row_id] = entity
+                local_ids.add(tab_row.row_id)
+                created += 1
+
+        setattr(stats, f"{prefix}_created", created)
+        setattr(stats, f"{prefix}_updated", updated)
+        setattr(stats, f"{prefix}_unchanged", unchanged)
+
+        fingerprints = {tab_row.row_id: tab_row.fingerprint for tab_row in changed}
+        if fingerprints:
+            statement = sqlite_insert(SheetRowFingerprint)
+            statement = statement.on_conflict_do_update(
+                index_elements=["tab", "row_id"],
+                set_={
+                    "fingerprint": statement.excluded.fingerprint,
+                    "synced_at": statement.excluded.synced_at,
+                },
+            )
+            await self.session.execute(statement, [
+                {"id": generate_uuid(), "tab": tab, "row_id": row_id, "fingerprint": fingerprint, "synced_at": now}
+                for row_id, fingerprint in fingerprints.items()
+            ])
+
+        # Lignes disparues de l'onglet : leur empreinte ne sert plus
+        stale = list(stored.keys() - {tab_row.row_id for tab_row in tab_rows})
+        for start in range(0, len(stale), _IN_CHUNK_SIZE):
+            await self.session.execute(
+                delete(SheetRowFingerprint).where(
+                    SheetRowFingerprint.tab == tab,
+                    SheetRowFingerprint.row_id.in_(stale[start:start + _IN_CHUNK_SIZE]),
+                )
+            )
 
-        Utilise upsert_task() de crm_utils.
-        """
-        for row in tasks_data:
-            try:
-                _, created = await upsert_task(self.session, row, safe_get=True)
-                if created:
-                    stats.tasks_created += 1
-                else:
-                    stats.tasks_updated += 1
-            except ValueError:
-                continue
-            except Exception as e:
-                logger.error(f"Error syncing task {row.get('ID', 'unknown')}: {e}")
-                stats.errors.append(f"Task {row.get('ID', 'unknown')}: {str(e)}")
+        logger.info(f"Tab {tab}: {created} created, {updated} updated, {unchanged} unchanged")
 
 
 # ============================================================
@@ -519,20 +613,22 @@ async def auto_create_crm_spreadsheet(
     }
 
 
-def build_sync_message(total_synced: int, has_errors: bool) -> str:
+def build_sync_message(total_synced: int, has_errors: bool, unchanged: int = 0) -> str:
     """Message de fin de synchro CRM, actionnable quand la feuille est vide (BUG-B).
 
     0 element sans erreur = feuille vide : on guide l'utilisateur vers l'option
     'feuille existante' (au lieu de la feuille vide auto-creee a la connexion),
     au lieu de laisser un CRM vide sans explication.
     """
-    if total_synced == 0 and not has_errors:
+    if total_synced == 0 and unchanged == 0 and not has_errors:
         return (
             "Synchronisation terminee : 0 element. La feuille Google synchronisee "
             "est vide. Si tu as deja un CRM dans Google Sheets, renseigne son "
             "identifiant dans Reglages > Synchronisation CRM (champ ID de la "
             "feuille), puis resynchronise."
         )
+    if unchanged:
+        return f"Synchronisation terminee: {total_synced} elements, {unchanged} inchanges"
     return f"Synchronisation terminee: {total_synced} elements"
 
 
@@ -12,6 +12,7 @@ import logging
 from datetime import UTC, datetime
 
 from app.models.entities import Contact, Deliverable, Preference, Project, Task
+from app.services.crm_import import _sanitize_field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -77,12 +78,21 @@ def parse_datetime(value: str | None) -> datetime | None:
         "%d/%m/%Y",
     ]:
         try:
-            return datetime.strptime(value, fmt)
+            # Colonnes DateTime timezone-aware : les dates Sheets sont en UTC
+            return datetime.strptime(value, fmt).replace(tzinfo=UTC)
         except ValueError:
             continue
     return None
 
 
+def sanitize_row(row: dict) -> dict:
+    """Sanitize all string values in an import row (SEC-017)."""
+    sanitized = {}
+    for key, value in row.items():
+        sanitized[key] = _sanitize_field(value, key.lower()) if isinstance(value, str) else value
+    return sanitized
+
+
 def split_name(full_name: str) -> tuple[str, str | None]:
     """Separe un nom complet en prenom et nom de famille."""
     parts = full_name.split(" ", 1)
@@ -181,27 +191,17 @@ def normalize_task_status(raw_status: str | None, default: str = "todo") -> str:
 # =============================================================================
 
 
-async def upsert_contact(
-    session: AsyncSession,
+def contact_fields_from_row(
     row: dict,
     *,
     id_key: str = "ID",
     safe_get: bool = False,
-) -> tuple[Contact, bool]:
+) -> tuple[str, dict]:
     """
-    Cree ou met a jour un contact depuis un dictionnaire de donnees.
-
-    Le dictionnaire doit utiliser les cles Google Sheets :
-    ID, Nom, Entreprise, Email, Tel, Source, Stage, Score, Tags.
-
-    Args:
-        session: Session de base de donnees async
-        row: Dictionnaire avec les donnees du contact
-        id_key: Cle pour l'ID dans le dictionnaire
-        safe_get: Si True, utilise `(row.get(k, "") or "")` pour gerer les None
+    Extrait l'ID et les champs d'un contact depuis une ligne Google Sheets.
 
     Returns:
-        Tuple (contact, created) - l'entite et un booleen True si cree, False si mis a jour
+        Tuple (id, champs) - champs prets pour Contact(**champs) ou setattr
 
     Raises:
         ValueError: Si l'ID est vide ou absent
@@ -214,12 +214,6 @@ async def upsert_contact(
     if not crm_id:
         raise ValueError(f"ID manquant (cle: {id_key})")
 
-    # Verifier si le contact existe
-    result = await session.execute(
-        select(Contact).where(Contact.id == crm_id)
-    )
-    existing = result.scalar_one_or_none()
-
     # Parser le nom
     if safe_get:
         full_name = (row.get("Nom", "") or "").strip()
@@ -247,32 +241,59 @@ async def upsert_contact(
             val = row.get(key, default).strip()
         return val or None
 
+    return crm_id, {
+        "first_name": first_name,
+        "last_name": last_name,
+        "company": _get("Entreprise"),
+        "email": _get("Email"),
+        "phone": _get("Tel"),
+        "source": _get("Source"),
+        "stage": _get("Stage", "contact") or "contact",
+        "score": score,
+        "tags": tags_json,
+    }
+
+
+async def upsert_contact(
+    session: AsyncSession,
+    row: dict,
+    *,
+    id_key: str = "ID",
+    safe_get: bool = False,
+) -> tuple[Contact, bool]:
+    """
+    Cree ou met a jour un contact depuis un dictionnaire de donnees.
+
+    Le dictionnaire doit utiliser les cles Google Sheets :
+    ID, Nom, Entreprise, Email, Tel, Source, Stage, Score, Tags.
+
+    Args:
+        session: Session de base de donnees async
+        row: Dictionnaire avec les donnees du contact
+        id_key: Cle pour l'ID dans le dictionnaire
+        safe_get: Si True, utilise `(row.get(k, "") or "")` pour gerer les None
+
+    Returns:
+        Tuple (contact, created) - l'entite et un booleen True si cree, False si mis a jour
+
+    Raises:
+        ValueError: Si l'ID est vide ou absent
+    """
+    crm_id, fields = contact_fields_from_row(row, id_key=id_key, safe_get=safe_get)
+
+    # Verifier si le contact existe
+    result = await session.execute(
+        select(Contact).where(Contact.id == crm_id)
+    )
+    existing = result.scalar_one_or_none()
+
     if existing:
-        existing.first_name = first_name
-        existing.last_name = last_name
-        existing.company = _get("Entreprise")
-        existing.email = _get("Email")
-        existing.phone = _get("Tel")
-        existing.source = _get("Source")
-        existing.stage = _get("Stage", "contact") or "contact"
-        existing.score = score
-        existing.tags = tags_json
+        for name, value in fields.items():
+            setattr(existing, name, value)
         existing.updated_at = datetime.now(UTC)
         return existing, False
     else:
-        contact = Contact(
-            id=crm_id,
-            first_name=first_name,
-            last_name=last_name,
-            company=_get("Entreprise"),
-            email=_get("Email"),
-            phone=_get("Tel"),
-            source=_get("Source"),
-            stage=_get("Stage", "contact") or "contact",
-            score=score,
-            tags=tags_json,
-            scope="global",
-        )
+        contact = Contact(id=crm_id, **fields, scope="global")
         session.add(contact)
         return contact, True
 
@@ -282,29 +303,18 @@ async def upsert_contact(
 # =============================================================================
 
 
-async def upsert_project(
-    session: AsyncSession,
+def project_fields_from_row(
     row: dict,
     *,
     id_key: str = "ID",
     safe_get: bool = False,
     status_map: dict[str, str] | None = None,
-) -> tuple[Project, bool]:
+) -> tuple[str, dict]:
     """
-    Cree ou met a jour un projet depuis un dictionnaire de donnees.
-
-    Le dictionnaire doit utiliser les cles Google Sheets :
-    ID, ClientID, Name, Description, Status, Budget, Notes.
-
-    Args:
-        session: Session de base de donnees async
-        row: Dictionnaire avec les donnees du projet
-        id_key: Cle pour l'ID dans le dictionnaire
-        safe_get: Si True, gere les valeurs None dans le dictionnaire
-        status_map: Mapping de statuts additionnel (fusionne avec le defaut)
+    Extrait l'ID et les champs d'un projet depuis une ligne Google Sheets.
 
     Returns:
-        Tuple (project, created) - l'entite et un booleen True si cree, False si mis a jour
+        Tuple (id, champs) - `contact_id` est l'ID brut de la colonne ClientID
 
     Raises:
         ValueError: Si l'ID est vide ou absent
@@ -321,12 +331,6 @@ async def upsert_project(
     if not project_id:
         raise ValueError(f"ID manquant (cle: {id_key})")
 
-    # Verifier si le projet existe
-    result = await session.execute(
-        select(Project).where(Project.id == project_id)
-    )
-    existing = result.scalar_one_or_none()
-
     # Extraction de champs
     def _get(key: str, default: str = "") -> str | None:
         if safe_get:
@@ -335,8 +339,6 @@ async def upsert_project(
             val = row.get(key, default).strip()
         return val or None
 
-    client_id = _get("ClientID")
-
     raw_status = _get("Status", "active") or "active"
     status = effective_map.get(raw_status.lower(), raw_status.lower())
     if status not in VALID_PROJECT_STATUSES:
@@ -345,32 +347,61 @@ async def upsert_project(
     budget_raw = row.get("Budget", "")
     if isinstance(budget_raw, str):
         budget_raw = budget_raw.strip() if budget_raw else ""
-    budget = parse_budget(budget_raw)
 
-    name = _get("Name", "Sans nom") or "Sans nom"
-    description = _get("Description")
-    notes = _get("Notes")
+    return project_id, {
+        "name": _get("Name", "Sans nom") or "Sans nom",
+        "description": _get("Description"),
+        "contact_id": _get("ClientID"),
+        "status": status,
+        "budget": parse_budget(budget_raw),
+        "notes": _get("Notes"),
+    }
+
+
+async def upsert_project(
+    session: AsyncSession,
+    row: dict,
+    *,
+    id_key: str = "ID",
+    safe_get: bool = False,
+    status_map: dict[str, str] | None = None,
+) -> tuple[Project, bool]:
+    """
+    Cree ou met a jour un projet depuis un dictionnaire de donnees.
+
+    Le dictionnaire doit utiliser les cles Google Sheets :
+    ID, ClientID, Name, Description, Status, Budget, Notes.
+
+    Args:
+        session: Session de base de donnees async
+        row: Dictionnaire avec les donnees du projet
+        id_key: Cle pour l'ID dans le dictionnaire
+        safe_get: Si True, gere les valeurs None dans le dictionnaire
+        status_map: Mapping de statuts additionnel (fusionne avec le defaut)
+
+    Returns:
+        Tuple (project, created) - l'entite et un booleen True si cree, False si mis a jour
+
+    Raises:
+        ValueError: Si l'ID est vide ou absent
+    """
+    project_id, fields = project_fields_from_row(
+        row, id_key=id_key, safe_get=safe_get, status_map=status_map
+    )
+
+    # Verifier si le projet existe
+    result = await session.execute(
+        select(Project).where(Project.id == project_id)
+    )
+    existing = result.scalar_one_or_none()
 
     if existing:
-        existing.name = name
-        existing.description = description
-        existing.contact_id = client_id
-        existing.status = status
-        existing.budget = budget
-        existing.notes = notes
+        for name, value in fields.items():
+            setattr(existing, name, value)
         existing.updated_at = datetime.now(UTC)
         return existing, False
     else:
-        project = Project(
-            id=project_id,
-            name=name,
-            description=description,
-            contact_id=client_id,
-            status=status,
-            budget=budget,
-            notes=notes,
-            scope="global",
-        )
+        project = Project(id=project_id, **fields, scope="global")
         session.add(project)
         return project, True
 
@@ -380,27 +411,17 @@ async def upsert_project(
 # =============================================================================
 
 
-async def upsert_task(
-    session: AsyncSession,
+def task_fields_from_row(
     row: dict,
     *,
     id_key: str = "ID",
     safe_get: bool = False,
-) -> tuple[Task, bool]:
+) -> tuple[str, dict]:
     """
-    Cree ou met a jour une tache depuis un dictionnaire de donnees.
-
-    Le dictionnaire doit utiliser les cles Google Sheets :
-    ID, Title, Description, Priority, Status, DueDate, CreatedAt, CompletedAt.
-
-    Args:
-        session: Session de base de donnees async
-        row: Dictionnaire avec les donnees de la tache
-        id_key: Cle pour l'ID dans le dictionnaire
-        safe_get: Si True, gere les valeurs None dans le dictionnaire
+    Extrait l'ID et les champs d'une tache depuis une ligne Google Sheets.
 
     Returns:
-        Tuple (task, created) - l'entite et un booleen True si cree, False si mis a jour
+        Tuple (id, champs) - `created_at` n'est applique qu'a la creation
 
     Raises:
         ValueError: Si l'ID est vide ou absent
@@ -413,48 +434,60 @@ async def upsert_task(
     if not task_id:
         raise ValueError(f"ID manquant (cle: {id_key})")
 
-    existing = await session.get(Task, task_id)
-
     # Parser les champs
     def _get_str(key: str, default: str = "") -> str:
         if safe_get:
             return (row.get(key, default) or default).strip()
         return row.get(key, default).strip()
 
-    raw_priority = _get_str("Priority", "medium")
-    priority = normalize_task_priority(raw_priority)
+    return task_id, {
+        "title": _get_str("Title", "Sans titre") or "Sans titre",
+        "description": _get_str("Description") or None,
+        "priority": normalize_task_priority(_get_str("Priority", "medium")),
+        "status": normalize_task_status(_get_str("Status", "todo")),
+        "due_date": parse_datetime(_get_str("DueDate")),
+        "completed_at": parse_datetime(_get_str("CompletedAt")),
+        "created_at": parse_datetime(_get_str("CreatedAt")),
+    }
+
+
+async def upsert_task(
+    session: AsyncSession,
+    row: dict,
+    *,
+    id_key: str = "ID",
+    safe_get: bool = False,
+) -> tuple[Task, bool]:
+    """
+    Cree ou met a jour une tache depuis un dictionnaire de donnees.
+
+    Le dictionnaire doit utiliser les cles Google Sheets :
+    ID, Title, Description, Priority, Status, DueDate, CreatedAt, CompletedAt.
 
-    raw_status = _get_str("Status", "todo")
-    task_status = normalize_task_status(raw_status)
+    Args:
+        session: Session de base de donnees async
+        row: Dictionnaire avec les donnees de la tache
+        id_key: Cle pour l'ID dans le dictionnaire
+        safe_get: Si True, gere les valeurs None dans le dictionnaire
 
-    # Parser les dates
-    due_date = parse_datetime(_get_str("DueDate"))
-    created_at = parse_datetime(_get_str("CreatedAt"))
-    completed_at = parse_datetime(_get_str("CompletedAt"))
+    Returns:
+        Tuple (task, created) - l'entite et un booleen True si cree, False si mis a jour
+
+    Raises:
+        ValueError: Si l'ID est vide ou absent
+    """
+    task_id, fields = task_fields_from_row(row, id_key=id_key, safe_get=safe_get)
+    created_at = fields.pop("created_at")
 
-    title = _get_str("Title", "Sans titre") or "Sans titre"
-    description_val = _get_str("Description")
+    existing = await session.get(Task, task_id)
 
     if existing:
-        existing.title = title
-        existing.description = description_val or None
-        existing.priority = priority
-        existing.status = task_status
-        existing.due_date = due_date
-        existing.completed_at = completed_at
+        for name, value in fields.items():
+            setattr(existing, name, value)
         existing.updated_at = datetime.now(UTC)
         return existing, False
     else:
-        task = Task(
-            id=task_id,
-            title=title,
-            description=description_val or None,
-            priority=priority,
-            status=task_status,
-            due_date=due_date,
-            completed_at=completed_at,
-            created_at=created_at or datetime.now(UTC),
-        )
+        task = Task(id=task_id, **fields, created_at=created_at or datetime.now(UTC))
         session.add(task)
         return task, True
 
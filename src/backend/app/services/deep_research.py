@@ -13,11 +13,18 @@ import json
 import logging
 from dataclasses import dataclass, field
 from typing import AsyncGenerator
+from urllib.parse import urlsplit, urlunsplit
 
 from app.services.web_search import SearchResponse, get_web_search_service
 
 logger = logging.getLogger(__name__)
 
+# Sous-requêtes lancées simultanément (limites de débit Brave/DDG)
+SEARCH_CONCURRENCY = 4
+# Délai global de la phase de recherche : les sous-requêtes encore en cours
+# sont abandonnées et la synthèse part avec les sources déjà reçues
+SEARCH_DEADLINE_SECONDS = 45.0
+
 
 @dataclass
 class ResearchSource:
@@ -76,7 +83,7 @@ async def decompose_question(
     llm_service: object,
 ) -> list[str]:
     """Décompose une question en sous-requêtes de recherche via le LLM."""
-    from app.services.providers import LLMMessage
+    from app.services.providers import Message as LLMMessage
 
     prompt = DECOMPOSITION_PROMPT.format(question=question)
     messages = [LLMMessage(role="user", content=prompt)]
@@ -104,6 +111,32 @@ async def decompose_question(
     return [question]
 
 
+def _url_key(url: str) -> str:
+    """Clé de déduplication : même page malgré la casse de l'hôte, un
+    fragment (#...) ou un slash final."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def merge_sources(responses: list[SearchResponse]) -> list[ResearchSource]:
+    """Sources de plusieurs recherches, dédupliquées par URL (première occurrence)."""
+    sources: list[ResearchSource] = []
+    seen_urls: set[str] = set()
+    for resp in responses:
+        for result in resp.results:
+            key = _url_key(result.url)
+            if key not in seen_urls:
+                seen_urls.add(key)
+                sources.append(ResearchSource(
+                    title=result.title,
+                    url=result.url,
+                    snippet=result.snippet,
+                    query=resp.query,
+                ))
+    return sources
+
+
 async def search_parallel(
     queries: list[str],
     max_results_per_query: int = 5,
@@ -119,26 +152,13 @@ async def search_parallel(
     responses = await asyncio.gather(*tasks, return_exceptions=True)
 
     all_responses: list[SearchResponse] = []
-    all_sources: list[ResearchSource] = []
-    seen_urls: set[str] = set()
-
     for resp in responses:
         if isinstance(resp, Exception):
             logger.error(f"Erreur recherche : {resp}")
             continue
-
         all_responses.append(resp)
-        for result in resp.results:
-            if result.url not in seen_urls:
-                seen_urls.add(result.url)
-                all_sources.append(ResearchSource(
-                    title=result.title,
-                    url=result.url,
-                    snippet=result.snippet,
-                    query=resp.query,
-                ))
 
-    return all_responses, all_sources
+    return all_responses, merge_sources(all_responses)
 
 
 def format_search_results_for_synthesis(
@@ -163,18 +183,21 @@ async def deep_research(
     llm_service: object,
     max_queries: int = 6,
     max_results_per_query: int = 5,
+    max_concurrency: int = SEARCH_CONCURRENCY,
+    deadline_seconds: float = SEARCH_DEADLINE_SECONDS,
 ) -> AsyncGenerator[ResearchProgress, None]:
     """
     Exécute une recherche approfondie avec progression en temps réel.
 
     Workflow:
     1. Décomposer la question en sous-requêtes (LLM)
-    2. Lancer les recherches en parallèle (Brave/DDG)
+    2. Lancer les recherches en parallèle (Brave/DDG), sources dédupliquées
+       par URL, dans la limite de `deadline_seconds`
     3. Synthétiser les résultats en rapport structuré (LLM)
 
     Yields des ResearchProgress pour le streaming SSE.
     """
-    from app.services.providers import LLMMessage
+    from app.services.providers import Message as LLMMessage
 
     # Étape 1 : Décomposition
     yield ResearchProgress(
@@ -197,9 +220,14 @@ async def deep_research(
     )
 
     # Étape 2 : Recherches parallèles (avec progression)
+    # Sous-requêtes lancées ensemble (au plus `max_concurrency` à la fois) ;
+    # chaque fin de recherche est signalée dès qu'elle survient.
     service = get_web_search_service()
-    all_sources: list[ResearchSource] = []
-    seen_urls: set[str] = set()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_search(query: str) -> SearchResponse:
+        async with semaphore:
+            return await service.search(query, max_results=max_results_per_query)
 
     for i, query in enumerate(queries, 1):
         yield ResearchProgress(
@@ -210,27 +238,59 @@ async def deep_research(
             content=f"Recherche {i}/{total} : {query}",
         )
 
-        try:
-            resp = await service.search(query, max_results=max_results_per_query)
-            for result in resp.results:
-                if result.url not in seen_urls:
-                    seen_urls.add(result.url)
-                    all_sources.append(ResearchSource(
-                        title=result.title,
-                        url=result.url,
-                        snippet=result.snippet,
-                        query=query,
-                    ))
-        except Exception as e:
-            logger.error(f"Erreur recherche '{query}': {e}")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_seconds
+    steps = {asyncio.create_task(run_search(query)): i for i, query in enumerate(queries, 1)}
+    responses: dict[int, SearchResponse] = {}
+    seen_urls: set[str] = set()
+    completed = 0
+    pending = set(steps)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(0.0, deadline - loop.time()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                i = steps[task]
+                query = queries[i - 1]
+                completed += 1
+                try:
+                    resp = task.result()
+                    responses[i] = resp
+                    seen_urls.update(_url_key(result.url) for result in resp.results)
+                except Exception as e:
+                    logger.error(f"Erreur recherche '{query}': {e}")
+                yield ResearchProgress(
+                    type="search_done",
+                    step=i,
+                    total_steps=total,
+                    query=query,
+                    content=f"Recherche {completed}/{total} terminée ({len(seen_urls)} sources)",
+                )
+
+        # Délai global dépassé : les recherches restantes sont abandonnées
+        for task in pending:
+            task.cancel()
+            i = steps[task]
+            logger.warning(f"Recherche '{queries[i - 1]}' abandonnée après {deadline_seconds:.0f} s")
+            yield ResearchProgress(
+                type="search_done",
+                step=i,
+                total_steps=total,
+                query=queries[i - 1],
+                content=f"Recherche « {queries[i - 1]} » abandonnée (délai dépassé)",
+            )
+    finally:
+        for task in steps:
+            task.cancel()
+        await asyncio.gather(*steps, return_exceptions=True)
 
-        yield ResearchProgress(
-            type="search_done",
-            step=i,
-            total_steps=total,
-            query=query,
-            content=f"Recherche {i}/{total} terminée ({len(all_sources)} sources)",
-        )
+    # Ordre des sous-requêtes (et non d'arrivée) : numérotation stable des citations
+    all_sources = merge_sources([responses[i] for i in sorted(responses)])
 
     if not all_sources:
         yield ResearchProgress(
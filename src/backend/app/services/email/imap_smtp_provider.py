@@ -389,9 +389,8 @@ class ImapSmtpProvider(EmailProvider):
             operation_name="IMAP get_message",
         )
 
-    async def send_message(self, request: SendEmailRequest) -> str:
-        """Send an email via SMTP."""
-        # Create message
+    def _build_mime_message(self, request: SendEmailRequest) -> MIMEMultipart:
+        """Build the MIME message for a send request."""
         if request.is_html:
             msg = MIMEMultipart("alternative")
             msg.attach(MIMEText(request.body, "html", "utf-8"))
@@ -419,6 +418,58 @@ class ImapSmtpProvider(EmailProvider):
             part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
             msg.attach(part)
 
+        return msg
+
+    def _smtp_error(self, e: Exception) -> RuntimeError:
+        """Traduit une erreur SMTP (délai, refus...) en RuntimeError lisible."""
+        if isinstance(e, asyncio.TimeoutError):
+            hint = _smtp_security_hint(self._smtp_port, self._smtp_use_tls)
+            return RuntimeError(
+                f"SMTP : délai dépassé ({IMAP_OPERATION_TIMEOUT}s) pendant l'envoi. "
+                + (hint or "Vérifie la connexion et la configuration du serveur SMTP.")
+            )
+        return RuntimeError(_humanize_smtp_error(e, self._smtp_port, self._smtp_use_tls))
+
+    async def open_smtp(self) -> aiosmtplib.SMTP:
+        """
+        Open ONE authenticated SMTP session, reusable for many messages.
+
+        Used by the outbound queue: a campaign or a month-end invoice run pays
+        the TCP + TLS + AUTH handshake once per account instead of per email.
+        The caller owns the session and must `quit()` it.
+        """
+        # Mêmes options de sécurité que send_message / test_connection
+        smtp = aiosmtplib.SMTP(
+            hostname=self._smtp_host,
+            port=self._smtp_port,
+            use_tls=not self._smtp_use_tls,
+            start_tls=self._smtp_use_tls,
+            timeout=IMAP_OPERATION_TIMEOUT,
+        )
+        try:
+            await smtp.connect()
+            await smtp.login(self._email, self._password)
+        except (asyncio.TimeoutError, aiosmtplib.errors.SMTPException) as e:
+            if smtp.is_connected:
+                smtp.close()
+            raise self._smtp_error(e) from e
+        return smtp
+
+    async def send_message(
+        self,
+        request: SendEmailRequest,
+        smtp: aiosmtplib.SMTP | None = None,
+    ) -> str:
+        """
+        Send an email via SMTP.
+
+        Args:
+            request: Message to send
+            smtp: Already authenticated session from `open_smtp()` to reuse;
+                a one-shot connection is opened when omitted
+        """
+        msg = self._build_mime_message(request)
+
         # Send via SMTP
         all_recipients = request.to + request.cc + request.bcc
 
@@ -427,27 +478,24 @@ class ImapSmtpProvider(EmailProvider):
         # décoché) passait le TEST mais l'ENVOI partait en clair et expirait
         # (retour Dr_logic-3D, 05/07/2026).
         try:
-            await aiosmtplib.send(
-                msg,
-                hostname=self._smtp_host,
-                port=self._smtp_port,
-                username=self._email,
-                password=self._password,
-                use_tls=not self._smtp_use_tls,
-                start_tls=self._smtp_use_tls,
-                timeout=IMAP_OPERATION_TIMEOUT,
-                recipients=all_recipients,
-            )
-        except asyncio.TimeoutError:
-            hint = _smtp_security_hint(self._smtp_port, self._smtp_use_tls)
-            raise RuntimeError(
-                f"SMTP : délai dépassé ({IMAP_OPERATION_TIMEOUT}s) pendant l'envoi. "
-                + (hint or "Vérifie la connexion et la configuration du serveur SMTP.")
-            ) from None
+            if smtp is not None:
+                await smtp.send_message(msg, recipients=all_recipients)
+            else:
+                await aiosmtplib.send(
+                    msg,
+                    hostname=self._smtp_host,
+                    port=self._smtp_port,
+                    username=self._email,
+                    password=self._password,
+                    use_tls=not self._smtp_use_tls,
+                    start_tls=self._smtp_use_tls,
+                    timeout=IMAP_OPERATION_TIMEOUT,
+                    recipients=all_recipients,
+                )
+        except asyncio.TimeoutError as e:
+            raise self._smtp_error(e) from None
         except aiosmtplib.errors.SMTPException as e:
-            raise RuntimeError(
-                _humanize_smtp_error(e, self._smtp_port, self._smtp_use_tls)
-            ) from e
+            raise self._smtp_error(e) from e
 
         # Return a generated ID (SMTP doesn't return one)
         return f"sent_{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
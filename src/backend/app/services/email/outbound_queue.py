@@ -0,0 +1,443 @@
+"""
+THERESE v2 - File d'envoi SMTP persistante
+
+Les envois en masse (factures de fin de mois, campagnes de relance) ne
+passent plus par un `aiosmtplib.send` par email dans la requête HTTP :
+
+- l'API enregistre les messages dans `outbound_emails` (SQLite, survit aux
+  redémarrages) et rend la main tout de suite avec un `job_id` ;
+- un worker unique dépile les messages dus, compte par compte, sur UNE
+  session SMTP authentifiée (`ImapSmtpProvider.open_smtp`) réutilisée pour
+  tout le lot ;
+- débit limité par compte (`send_interval`), nouvelles tentatives avec
+  backoff exponentiel, échec définitif sur refus 5xx ou après `max_attempts` ;
+- chaque changement de statut est commité aussitôt : un message envoyé n'est
+  jamais renvoyé après un crash, un message resté « sending » repasse
+  « pending » au démarrage.
+
+Seuls les comptes IMAP/SMTP passent par la file (Gmail envoie via son API).
+"""
+
+import asyncio
+import html
+import json
+import logging
+import mimetypes
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import aiosmtplib
+from app.models.database import get_session_context
+from app.models.entities import EmailAccount, Invoice, OutboundEmail
+from app.services.email.base_provider import SendEmailRequest
+from app.services.email.provider_factory import get_email_provider
+from app.services.encryption import decrypt_value
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30.0  # secondes, doublé à chaque échec
+RETRY_MAX_DELAY = 3600.0
+# Délai minimal entre deux messages d'un même compte (limites fournisseur)
+SEND_INTERVAL = 1.0
+BATCH_SIZE = 100
+# Réveil de secours quand rien n'est dû (les enqueue réveillent le worker)
+IDLE_POLL_INTERVAL = 60.0
+
+
+@dataclass
+class _Pending:
+    """Instantané d'un message à envoyer (détaché de la session)."""
+
+    id: str
+    invoice_id: str | None
+    attempts: int
+    request: SendEmailRequest
+    attachment_paths: list[str]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def _retry_delay(attempts: int, base_delay: float) -> timedelta:
+    """Backoff exponentiel plafonné : base, 2*base, 4*base..."""
+    return timedelta(seconds=min(base_delay * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Refus définitif du serveur (5xx, destinataires refusés) : inutile de réessayer."""
+    cause = error.__cause__ or error
+    if isinstance(cause, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(cause, aiosmtplib.SMTPResponseException) and cause.code >= 500
+
+
+def _read_attachments(paths: list[str]) -> list[tuple[str, bytes, str]]:
+    attachments = []
+    for path in paths:
+        file_path = Path(path)
+        content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        attachments.append((file_path.name, file_path.read_bytes(), content_type))
+    return attachments
+
+
+def apply_signature(account: EmailAccount, body: str, is_html: bool) -> tuple[str, bool]:
+    """Ajoute la signature HTML du compte ; un corps texte est converti en HTML."""
+    if not account.signature_html:
+        return body, is_html
+    if is_html:
+        return body + "<br><br>" + account.signature_html, True
+    # Échapper le texte saisi (sinon < > & seraient interprétés comme du
+    # HTML) et restituer les sauts de ligne.
+    safe_body = html.escape(body).replace("\n", "<br>")
+    return f"<p>{safe_body}</p><br>" + account.signature_html, True
+
+
+async def enqueue_emails(
+    session: AsyncSession,
+    account_id: str,
+    requests: Iterable[SendEmailRequest],
+    attachment_paths: list[str] | None = None,
+    invoice_id: str | None = None,
+) -> tuple[str, int]:
+    """
+    Met des messages en file d'envoi (commit à la charge de l'appelant).
+
+    Args:
+        session: Session de base de données.
+        account_id: Compte IMAP/SMTP expéditeur.
+        requests: Messages prêts à partir (signature déjà appliquée).
+        attachment_paths: Fichiers joints à chaque message, lus à l'envoi.
+        invoice_id: Facture concernée, passée à « sent » une fois l'email parti.
+
+    Returns:
+        (job_id, nombre de messages mis en file)
+    """
+    job_id = str(uuid4())
+    paths = json.dumps(attachment_paths or [])
+    queued = 0
+    for request in requests:
+        session.add(OutboundEmail(
+            job_id=job_id,
+            account_id=account_id,
+            invoice_id=invoice_id,
+            to_emails=json.dumps(request.to),
+            cc_emails=json.dumps(request.cc),
+            bcc_emails=json.dumps(request.bcc),
+            subject=request.subject,
+            body=request.body,
+            is_html=request.is_html,
+            attachment_paths=paths,
+        ))
+        queued += 1
+    return job_id, queued
+
+
+async def get_job_status(session: AsyncSession, job_id: str) -> dict | None:
+    """Avancement d'un lot : compteurs par statut et détail par message."""
+    result = await session.execute(
+        select(OutboundEmail)
+        .where(OutboundEmail.job_id == job_id)
+        .order_by(OutboundEmail.created_at, OutboundEmail.id)
+        # Le worker écrit dans ses propres sessions : relire l'état en base
+        .execution_options(populate_existing=True)
+    )
+    rows = result.scalars().all()
+    if not rows:
+        return None
+
+    counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + 1
+    return {
+        "job_id": job_id,
+        "total": len(rows),
+        **counts,
+        "done": counts["pending"] == 0 and counts["sending"] == 0,
+        "messages": [
+            {
+                "id": row.id,
+                "to": json.loads(row.to_emails),
+                "subject": row.subject,
+                "status": row.status,
+                "attempts": row.attempts,
+                "last_error": row.last_error,
+                "next_attempt_at": row.next_attempt_at.isoformat() if row.status == "pending" else None,
+                "sent_at": row.sent_at.isoformat() if row.sent_at else None,
+                "invoice_id": row.invoice_id,
+            }
+            for row in rows
+        ],
+    }
+
+
+class OutboundEmailQueue:
+    """Worker d'envoi : une connexion SMTP par compte et par passage."""
+
+    def __init__(
+        self,
+        send_interval: float = SEND_INTERVAL,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.send_interval = send_interval
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake_event: asyncio.Event | None = None
+
+    # ------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Reprend les envois interrompus puis lance la boucle de fond."""
+        if self._task is not None and not self._task.done():
+            return
+        await self.recover()
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("File d'envoi email démarrée")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        self._wake_event = None
+
+    def wake(self) -> None:
+        """Signale de nouveaux messages (appelable depuis n'importe quel thread)."""
+        if self._loop is not None and self._wake_event is not None:
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    async def recover(self) -> int:
+        """Remet en file les messages « sending » d'un process interrompu."""
+        async with get_session_context() as session:
+            result = await session.execute(
+                update(OutboundEmail)
+                .where(OutboundEmail.status == "sending")
+                .values(status="pending")
+            )
+            recovered = result.rowcount or 0
+        if recovered:
+            logger.warning("File d'envoi : %d message(s) interrompu(s) remis en file", recovered)
+        return recovered
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.process_due()
+                delay = await self._next_due_delay()
+            except Exception as e:
+                logger.error(f"File d'envoi email : erreur du worker : {e}")
+                delay = IDLE_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=delay)
+            except TimeoutError:
+                pass
+            self._wake_event.clear()
+
+    async def _next_due_delay(self) -> float:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(OutboundEmail.next_attempt_at)
+                .where(OutboundEmail.status == "pending")
+                .order_by(OutboundEmail.next_attempt_at)
+                .limit(1)
+            )
+            next_at = result.scalar_one_or_none()
+        if next_at is None:
+            return IDLE_POLL_INTERVAL
+        return min(max((next_at - _utcnow()).total_seconds(), 0.0), IDLE_POLL_INTERVAL)
+
+    # ------------------------------------------------------------
+    # Envoi
+    # ------------------------------------------------------------
+
+    async def process_due(self) -> int:
+        """
+        Envoie les messages dus (un passage).
+
+        Returns:
+            Nombre de messages effectivement envoyés.
+        """
+        by_account: dict[str, list[_Pending]] = defaultdict(list)
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(OutboundEmail)
+                .where(OutboundEmail.status == "pending")
+                .where(OutboundEmail.next_attempt_at <= _utcnow())
+                .order_by(OutboundEmail.next_attempt_at, OutboundEmail.created_at)
+                .limit(self.batch_size)
+            )
+            for row in result.scalars().all():
+                row.status = "sending"
+                by_account[row.account_id].append(_Pending(
+                    id=row.id,
+                    invoice_id=row.invoice_id,
+                    attempts=row.attempts,
+                    request=SendEmailRequest(
+                        to=json.loads(row.to_emails),
+                        cc=json.loads(row.cc_emails),
+                        bcc=json.loads(row.bcc_emails),
+                        subject=row.subject,
+                        body=row.body,
+                        is_html=row.is_html,
+                    ),
+                    attachment_paths=json.loads(row.attachment_paths),
+                ))
+
+        if not by_account:
+            return 0
+        sent = await asyncio.gather(*(
+            self._send_for_account(account_id, pending)
+            for account_id, pending in by_account.items()
+        ))
+        return sum(sent)
+
+    async def _send_for_account(self, account_id: str, pending: list[_Pending]) -> int:
+        try:
+            return await self._send_batch(account_id, pending)
+        except Exception as e:
+            # Déchiffrement, construction du fournisseur, écriture en base... :
+            # l'erreur ne doit pas laisser le lot bloqué en « sending »
+            logger.error(f"File d'envoi : lot du compte {account_id} interrompu : {e}")
+            await self._release(pending, str(e))
+            return 0
+
+    async def _release(self, pending: list[_Pending], error: str) -> None:
+        """Remet en file (avec backoff) les messages du lot restés « sending »."""
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(OutboundEmail.id)
+                .where(OutboundEmail.id.in_([item.id for item in pending]))
+                .where(OutboundEmail.status == "sending")
+            )
+            stuck = set(result.scalars().all())
+        for item in pending:
+            if item.id in stuck:
+                # Un message parti dont le statut n'a pu être écrit sera renvoyé :
+                # préférable à un message perdu jusqu'au prochain redémarrage
+                await self._mark_failed(item, error, permanent=False)
+
+    async def _send_batch(self, account_id: str, pending: list[_Pending]) -> int:
+        async with get_session_context() as session:
+            account = await session.get(EmailAccount, account_id)
+            if account is None or account.provider != "imap":
+                for item in pending:
+                    await self._mark_failed(item, "Compte email introuvable ou non IMAP/SMTP", permanent=True)
+                return 0
+            provider = get_email_provider(
+                provider_type="imap",
+                email_address=account.email,
+                password=decrypt_value(account.imap_password),
+                imap_host=account.imap_host,
+                imap_port=account.imap_port,
+                smtp_host=account.smtp_host,
+                smtp_port=account.smtp_port,
+                smtp_use_tls=account.smtp_use_tls,
+            )
+
+        sent = 0
+        smtp: aiosmtplib.SMTP | None = None
+        try:
+            for index, item in enumerate(pending):
+                if smtp is None:
+                    try:
+                        smtp = await provider.open_smtp()
+                    except Exception as e:
+                        # Serveur injoignable ou identifiants refusés : tout le
+                        # reste du lot est reporté, sans marteler le serveur.
+                        for remaining in pending[index:]:
+                            await self._mark_failed(remaining, str(e), permanent=False)
+                        break
+                elif self.send_interval:
+                    await asyncio.sleep(self.send_interval)
+
+                try:
+                    item.request.attachments = _read_attachments(item.attachment_paths)
+                except OSError as e:
+                    await self._mark_failed(item, f"Pièce jointe illisible : {e}", permanent=True)
+                    continue
+
+                try:
+                    message_id = await provider.send_message(item.request, smtp=smtp)
+                except Exception as e:
+                    permanent = _is_permanent(e)
+                    if not permanent:
+                        # Connexion peut-être cassée : on repart d'une session neuve
+                        smtp.close()
+                        smtp = None
+                    await self._mark_failed(item, str(e), permanent=permanent)
+                    continue
+                await self._mark_sent(item, message_id)
+                sent += 1
+        finally:
+            if smtp is not None:
+                try:
+                    await smtp.quit()
+                except (aiosmtplib.SMTPException, TimeoutError):
+                    smtp.close()
+
+        logger.info("File d'envoi : %d/%d message(s) envoyé(s) pour le compte %s", sent, len(pending), account_id)
+        return sent
+
+    async def _mark_sent(self, item: _Pending, message_id: str) -> None:
+        async with get_session_context() as session:
+            row = await session.get(OutboundEmail, item.id)
+            if row is None:
+                return
+            row.status = "sent"
+            row.attempts = item.attempts + 1
+            row.last_error = None
+            row.provider_message_id = message_id
+            row.sent_at = _utcnow()
+            if item.invoice_id:
+                invoice = await session.get(Invoice, item.invoice_id)
+                if invoice is not None and invoice.status == "draft":
+                    invoice.status = "sent"
+                    invoice.updated_at = _utcnow()
+
+    async def _mark_failed(self, item: _Pending, error: str, permanent: bool) -> None:
+        attempts = item.attempts + 1
+        async with get_session_context() as session:
+            row = await session.get(OutboundEmail, item.id)
+            if row is None:
+                return
+            row.attempts = attempts
+            row.last_error = error[:1000]
+            if permanent or attempts >= self.max_attempts:
+                row.status = "failed"
+                logger.warning(f"Email {item.id} abandonné après {attempts} tentative(s) : {error}")
+            else:
+                row.status = "pending"
+                row.next_attempt_at = _utcnow() + _retry_delay(attempts, self.retry_base_delay)
+
+
+_queue: OutboundEmailQueue | None = None
+
+
+def get_outbound_queue() -> OutboundEmailQueue:
+    """File d'envoi globale (singleton du process)."""
+    global _queue
+    if _queue is None:
+        _queue = OutboundEmailQueue()
+    return _queue
@@ -12,9 +12,18 @@ Sources :
 - https://productivityparents.com/using-ai-to-auto-sort-and-prioritize-your-emails/
 """
 
+import hashlib
+import json
 import re
+from collections import OrderedDict
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from typing import Any
+
+# Taille max du cache de résultats (par message_id). Un miroir de 10k messages
+# tient entièrement ; au-delà, éviction LRU.
+_RESULT_CACHE_MAX = 20_000
 
 
 @dataclass
@@ -27,6 +36,27 @@ class ClassificationResult:
     signals: dict  # Détail des signaux détectés
 
 
+class _MultiPatternMatcher:
+    """Tables de motifs compilées une seule fois pour plusieurs catégories.
+
+    Les motifs communs à plusieurs tables ('urgent', 'échéance'...) ne sont
+    cherchés qu'une fois. La recherche reste `motif in texte` : sur des textes
+    courts (sujet + aperçu), la recherche de sous-chaîne de CPython est plus
+    rapide qu'une alternation `re` ou un automate écrit en Python (mesuré).
+    Le résultat est identique à `[kw for kw in table if kw in text]`.
+    """
+
+    def __init__(self, tables: dict[str, list[str]]):
+        self._tables = {name: tuple(table) for name, table in tables.items()}
+        self._words = tuple(dict.fromkeys(word for table in tables.values() for word in table))
+
+    def find(self, text: str) -> dict[str, list[str]]:
+        found = {word for word in self._words if word in text}
+        if not found:
+            return {name: [] for name in self._tables}
+        return {name: [word for word in table if word in found] for name, table in self._tables.items()}
+
+
 class EmailClassifierV2:
     """
     Classifieur d'emails optimisé 2026.
@@ -159,8 +189,80 @@ class EmailClassifierV2:
         r'(cette semaine|this week)',
     ]
 
+    # Tables compilées (voir _compiled) - construites au premier appel
+    _KEYWORD_MATCHER: _MultiPatternMatcher | None = None
+    _SENDER_MATCHER: _MultiPatternMatcher | None = None
+    _URGENT_RES: list[re.Pattern] = []
+    _TIME_SENSITIVE_RES: list[re.Pattern] = []
+
+    _result_cache: OrderedDict[str, tuple[str, ClassificationResult, datetime | None]] = OrderedDict()
+
+    @classmethod
+    def _compiled(cls) -> tuple[_MultiPatternMatcher, _MultiPatternMatcher]:
+        """Compile une fois les tables mots-clés / expéditeurs et les regex."""
+        if cls._KEYWORD_MATCHER is None or cls._SENDER_MATCHER is None:
+            cls._KEYWORD_MATCHER = _MultiPatternMatcher({
+                'transactional': cls.TRANSACTIONAL_KEYWORDS,
+                'administrative': cls.ADMINISTRATIVE_KEYWORDS,
+                'business': cls.BUSINESS_KEYWORDS,
+                'promotional': cls.PROMOTIONAL_KEYWORDS,
+                'newsletter': cls.NEWSLETTER_KEYWORDS,
+            })
+            cls._SENDER_MATCHER = _MultiPatternMatcher({
+                'transactional': cls.TRANSACTIONAL_SENDERS,
+                'administrative': cls.ADMINISTRATIVE_SENDERS,
+                'business': cls.BUSINESS_SENDERS,
+                'promotional': cls.PROMOTIONAL_SENDERS,
+                'newsletter': cls.NEWSLETTER_SENDERS,
+            })
+            # Le texte analysé est déjà en minuscules : IGNORECASE (coûteux en
+            # Unicode, ~70 % du temps de classification) est inutile.
+            cls._URGENT_RES = [re.compile(p) for p in cls.URGENT_PATTERNS]
+            cls._TIME_SENSITIVE_RES = [re.compile(p) for p in cls.TIME_SENSITIVE_PATTERNS]
+        return cls._KEYWORD_MATCHER, cls._SENDER_MATCHER
+
     @staticmethod
+    def content_hash(
+        subject: str,
+        from_email: str,
+        from_name: str,
+        snippet: str,
+        labels: list[str],
+        has_attachments: bool = False,
+        date: datetime | None = None,
+        contact_score: int | None = None,
+    ) -> str:
+        """Empreinte des entrées de classification (clé de cache avec le message_id)."""
+        payload = json.dumps(
+            [subject, from_email, from_name, snippet, list(labels), has_attachments,
+             date.isoformat() if date else None, contact_score],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Vide le cache de résultats (tests, changement de règles)."""
+        cls._result_cache.clear()
+
+    @classmethod
+    def classify_batch(cls, emails: Iterable[dict[str, Any]]) -> list[ClassificationResult]:
+        """
+        Classifie une liste d'emails (miroir de boîte complet, reclassement).
+
+        Chaque élément est un dict avec les arguments de `classify` et, en
+        option, `message_id`. Quand `message_id` est fourni, le résultat est mis
+        en cache par (message_id, empreinte du contenu) : un message inchangé
+        n'est pas reclassé.
+
+        Returns:
+            Les résultats, dans l'ordre des emails reçus
+        """
+        return [cls.classify(**email) for email in emails]
+
+    @classmethod
     def classify(
+        cls,
         subject: str,
         from_email: str,
         from_name: str,
@@ -169,6 +271,7 @@ class EmailClassifierV2:
         has_attachments: bool = False,
         date: datetime | None = None,
         contact_score: int | None = None,
+        message_id: str | None = None,
     ) -> ClassificationResult:
         """
         Classifie un email avec algorithme sophistiqué.
@@ -182,10 +285,49 @@ class EmailClassifierV2:
             has_attachments: Présence de pièces jointes
             date: Date de réception
             contact_score: Score du contact CRM (0-100)
+            message_id: Identifiant du message (active le cache de résultats)
 
         Returns:
             ClassificationResult avec priorité, catégorie et détails
         """
+        args = (subject, from_email, from_name, snippet, labels, has_attachments, date, contact_score)
+        if message_id is None:
+            return cls._classify(*args)
+
+        digest = cls.content_hash(*args)
+        cached = cls._result_cache.get(message_id)
+        if cached is not None:
+            cached_digest, cached_result, expires_at = cached
+            if cached_digest == digest and (expires_at is None or datetime.now(UTC) < expires_at):
+                cls._result_cache.move_to_end(message_id)
+                return cached_result
+
+        result = cls._classify(*args)
+        # Le signal 'recent' (<24h) dépend de l'heure : l'entrée expire avec lui
+        expires_at = None
+        if date and result.signals.get('recent'):
+            _date = date if date.tzinfo else date.replace(tzinfo=UTC)
+            expires_at = _date + timedelta(hours=24)
+        cls._result_cache[message_id] = (digest, result, expires_at)
+        cls._result_cache.move_to_end(message_id)
+        while len(cls._result_cache) > _RESULT_CACHE_MAX:
+            cls._result_cache.popitem(last=False)
+        return result
+
+    @classmethod
+    def _classify(
+        cls,
+        subject: str,
+        from_email: str,
+        from_name: str,
+        snippet: str,
+        labels: list[str],
+        has_attachments: bool,
+        date: datetime | None,
+        contact_score: int | None,
+    ) -> ClassificationResult:
+        """Classification sans cache (voir `classify`)."""
+        keyword_matcher, sender_matcher = cls._compiled()
         score = 50  # Score de base (neutre)
         signals = {}
         category = "unknown"
@@ -193,14 +335,16 @@ class EmailClassifierV2:
         # Texte complet pour analyse
         full_text = f"{subject} {snippet} {from_name}".lower()
         from_email_lower = from_email.lower()
+        keywords = keyword_matcher.find(full_text)
+        senders = sender_matcher.find(from_email_lower)
 
         # ============================================================
         # 1. DÉTECTION CATÉGORIE
         # ============================================================
 
         # Transactional (priorité haute)
-        transactional_found = [kw for kw in EmailClassifierV2.TRANSACTIONAL_KEYWORDS if kw in full_text]
-        sender_transactional = any(s in from_email_lower for s in EmailClassifierV2.TRANSACTIONAL_SENDERS)
+        transactional_found = keywords['transactional']
+        sender_transactional = bool(senders['transactional'])
 
         if transactional_found or sender_transactional:
             category = "transactional"
@@ -208,8 +352,8 @@ class EmailClassifierV2:
             signals['transactional'] = transactional_found[:3] if transactional_found else ['sender']
 
         # Administrative (priorité très haute)
-        admin_found = [kw for kw in EmailClassifierV2.ADMINISTRATIVE_KEYWORDS if kw in full_text]
-        sender_admin = any(s in from_email_lower for s in EmailClassifierV2.ADMINISTRATIVE_SENDERS)
+        admin_found = keywords['administrative']
+        sender_admin = bool(senders['administrative'])
 
         if admin_found or sender_admin:
             category = "administrative"
@@ -217,8 +361,8 @@ class EmailClassifierV2:
             signals['administrative'] = admin_found[:3] if admin_found else ['sender']
 
         # Business (priorité haute si urgent, moyenne sinon)
-        business_found = [kw for kw in EmailClassifierV2.BUSINESS_KEYWORDS if kw in full_text]
-        sender_business = any(s in from_email_lower for s in EmailClassifierV2.BUSINESS_SENDERS)
+        business_found = keywords['business']
+        sender_business = bool(senders['business'])
 
         if (business_found or sender_business) and category == "unknown":
             category = "business"
@@ -227,8 +371,8 @@ class EmailClassifierV2:
             signals['business'] = business_found[:3] if business_found else ['sender: business tool']
 
         # Promotional
-        promo_found = [kw for kw in EmailClassifierV2.PROMOTIONAL_KEYWORDS if kw in full_text]
-        sender_promo = any(s in from_email_lower for s in EmailClassifierV2.PROMOTIONAL_SENDERS)
+        promo_found = keywords['promotional']
+        sender_promo = bool(senders['promotional'])
 
         if (promo_found or sender_promo) and category == "unknown":
             category = "promotional"
@@ -236,8 +380,8 @@ class EmailClassifierV2:
             signals['promotional'] = promo_found[:2] if promo_found else ['sender']
 
         # Newsletter (priorité basse)
-        newsletter_found = [kw for kw in EmailClassifierV2.NEWSLETTER_KEYWORDS if kw in full_text]
-        sender_newsletter = any(s in from_email_lower for s in EmailClassifierV2.NEWSLETTER_SENDERS)
+        newsletter_found = keywords['newsletter']
+        sender_newsletter = bool(senders['newsletter'])
 
         if newsletter_found or sender_newsletter:
             category = "newsletter"
@@ -250,8 +394,8 @@ class EmailClassifierV2:
 
         # Urgence explicite (mots-clés)
         urgent_matches = []
-        for pattern in EmailClassifierV2.URGENT_PATTERNS:
-            matches = re.findall(pattern, full_text, re.IGNORECASE)
+        for pattern in cls._URGENT_RES:
+            matches = pattern.findall(full_text)
             urgent_matches.extend(matches)
 
         if urgent_matches:
@@ -260,8 +404,8 @@ class EmailClassifierV2:
 
         # Time-sensitive (dates proches)
         time_matches = []
-        for pattern in EmailClassifierV2.TIME_SENSITIVE_PATTERNS:
-            matches = re.findall(pattern, full_text, re.IGNORECASE)
+        for pattern in cls._TIME_SENSITIVE_RES:
+            matches = pattern.findall(full_text)
             time_matches.extend(matches)
 
         if time_matches:
@@ -2,16 +2,138 @@
 THERESE v2 - Email-Contact Matcher
 
 Auto-associe les emails aux contacts CRM par adresse email.
+
+La résolution se fait par lot : une liste d'emails, un classement ou le
+tableau de bord « Ma journée » résolvent toutes leurs adresses en une requête
+`lower(email) IN (...)`, servie par l'index d'expression `ix_contacts_email_lower`.
+Un petit cache TTL évite de refaire la requête d'un rafraîchissement à l'autre ;
+il est vidé au commit de toute écriture sur `contacts`.
 """
 
 import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
 
 from app.models.entities import Contact
+from sqlalchemy import event, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlmodel import select
 
 logger = logging.getLogger(__name__)
 
+# Durée de vie d'une résolution (hit ou absence de contact)
+_CACHE_TTL_SECONDS = 60.0
+_CACHE_MAX_ENTRIES = 5000
+# SQLite limite le nombre de paramètres liés par requête
+_IN_CHUNK_SIZE = 500
+
+_CONTACTS_CHANGED_KEY = "email_contact_matcher_dirty"
+
+
+@dataclass(frozen=True)
+class ContactMatch:
+    """Instantané d'un contact CRM résolu par email (partageable entre sessions)."""
+
+    id: str
+    email: str
+    display_name: str
+    company: str | None
+    score: int
+
+
+# email normalisé -> (contact ou None, échéance monotonic)
+_cache: dict[str, tuple[ContactMatch | None, float]] = {}
+# Incrémenté à chaque invalidation : une résolution lancée avant une écriture
+# concurrente ne doit pas remettre en cache des données périmées.
+_generation = 0
+
+
+def normalize_email(email_address: str | None) -> str:
+    """Forme canonique d'une adresse pour la comparaison (casse, espaces)."""
+    return (email_address or "").strip().lower()
+
+
+def invalidate_contact_cache() -> None:
+    """Vide le cache de résolution (écriture sur les contacts, nouvelle base)."""
+    global _generation
+    _generation += 1
+    _cache.clear()
+
+
+async def resolve_contacts_by_email(
+    session: AsyncSession,
+    email_addresses: Iterable[str | None],
+) -> dict[str, ContactMatch]:
+    """
+    Résout un ensemble d'adresses email vers les contacts CRM, en une requête.
+
+    Args:
+        email_addresses: Adresses à résoudre (doublons, casse et vides tolérés).
+        session: Session de base de données.
+
+    Returns:
+        Mapping email normalisé -> ContactMatch, pour les adresses connues du CRM.
+    """
+    wanted = {normalize_email(address) for address in email_addresses} - {""}
+    now = time.monotonic()
+
+    matches: dict[str, ContactMatch] = {}
+    missing: list[str] = []
+    for address in wanted:
+        cached = _cache.get(address)
+        if cached is not None and cached[1] > now:
+            if cached[0] is not None:
+                matches[address] = cached[0]
+        else:
+            missing.append(address)
+
+    if not missing:
+        return matches
+
+    generation = _generation
+    found: dict[str, ContactMatch] = {}
+    for start in range(0, len(missing), _IN_CHUNK_SIZE):
+        chunk = missing[start:start + _IN_CHUNK_SIZE]
+        statement = (
+            select(
+                Contact.id,
+                Contact.email,
+                Contact.first_name,
+                Contact.last_name,
+                Contact.company,
+                Contact.score,
+            )
+            .where(func.lower(Contact.email).in_(chunk))
+            .order_by(Contact.created_at)
+        )
+        for contact_id, email, first_name, last_name, company, score in (await session.execute(statement)).all():
+            address = normalize_email(email)
+            if address in found:
+                continue  # doublon d'email : le contact le plus ancien l'emporte
+            name = " ".join(part for part in (first_name, last_name) if part)
+            found[address] = ContactMatch(
+                id=contact_id,
+                email=email,
+                display_name=name or company or "Sans nom",
+                company=company,
+                score=score,
+            )
+
+    cacheable = generation == _generation
+    if cacheable and len(_cache) + len(missing) > _CACHE_MAX_ENTRIES:
+        _cache.clear()
+    expires_at = now + _CACHE_TTL_SECONDS
+    for address in missing:
+        match = found.get(address)
+        if cacheable:
+            _cache[address] = (match, expires_at)
+        if match is not None:
+            matches[address] = match
+
+    return matches
+
 
 async def match_email_to_contact(
     email_address: str,
@@ -30,14 +152,44 @@ async def match_email_to_contact(
     if not email_address:
         return None
 
-    email_lower = email_address.lower().strip()
+    email_lower = normalize_email(email_address)
+    match = (await resolve_contacts_by_email(session, [email_lower])).get(email_lower)
 
-    statement = select(Contact).where(Contact.email == email_lower)
-    result = await session.execute(statement)
-    contact = result.scalar_one_or_none()
-
-    if contact:
-        logger.debug("Email %s matched to contact %s", email_lower, contact.id)
-        return contact.id
+    if match:
+        logger.debug("Email %s matched to contact %s", email_lower, match.id)
+        return match.id
 
     return None
+
+
+# ============================================================
+# Invalidation : toute écriture sur contacts vide le cache au commit
+# ============================================================
+
+
+@event.listens_for(Session, "after_flush")
+def _detect_contact_writes(session: Session, flush_context) -> None:
+    for instances in (session.new, session.dirty, session.deleted):
+        if any(isinstance(instance, Contact) for instance in instances):
+            session.info[_CONTACTS_CHANGED_KEY] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_bulk_contact_writes(orm_execute_state) -> None:
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Contact:
+        orm_execute_state.session.info[_CONTACTS_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_CONTACTS_CHANGED_KEY, False):
+        invalidate_contact_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_CONTACTS_CHANGED_KEY, None)
@@ -0,0 +1,212 @@
+"""
+THÉRÈSE v2 - Compteurs d'emails par priorité (US-EMAIL-12)
+
+Le tableau de bord rafraîchit /email/messages/stats en continu. Deux étages :
+
+- **SQL** : une seule requête agrégée `GROUP BY priority, is_read`, couverte
+  par l'index `ix_email_messages_account_priority_read` ;
+- **mémoire** (optionnel, `email_stats_cache`) : les compteurs par compte sont
+  tenus à jour par des écouteurs d'ORM. Toute écriture d'`EmailMessage`
+  (synchronisation, classification, `update_message_priority`, suppression...)
+  applique son delta au COMMIT ; un rollback l'annule. Les `UPDATE`/`DELETE`
+  en masse (RGPD, effacement complet) invalident le cache.
+
+Un refresh du tableau de bord ne touche donc plus SQLite tant que le cache est
+chaud. `init_db`/`close_db` (restauration de sauvegarde, tests) le vident.
+"""
+
+import logging
+import threading
+from collections import Counter
+
+from app.config import settings
+from app.models.entities import EmailMessage
+from sqlalchemy import event, func, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("high", "medium", "low")
+
+# Clés de Session.info où s'accumulent les deltas d'une transaction
+_PENDING_KEY = "email_stats_pending"
+_INVALIDATE_KEY = "email_stats_invalidate"
+
+
+def _empty_counters() -> dict[str, int]:
+    return {"high": 0, "medium": 0, "low": 0, "total": 0}
+
+
+def _format(counters: dict[str, int]) -> dict[str, int]:
+    """Contrat de GET /messages/stats."""
+    return {
+        "high": counters["high"],
+        "medium": counters["medium"],
+        "low": counters["low"],
+        "total_unread": counters["high"] + counters["medium"] + counters["low"],
+        "total": counters["total"],
+    }
+
+
+class EmailStatsCache:
+    """Compteurs par compte email, en mémoire (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+        # Incrémenté à chaque écriture : un remplissage lancé AVANT une
+        # écriture concurrente ne doit pas écraser le delta appliqué depuis.
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, account_id: str) -> dict[str, int] | None:
+        with self._lock:
+            counters = self._counters.get(account_id)
+            return dict(counters) if counters is not None else None
+
+    def fill(self, account_id: str, counters: dict[str, int], generation: int) -> None:
+        """Stocke les compteurs lus en base, sauf si une écriture est passée entre-temps."""
+        with self._lock:
+            if generation == self._generation:
+                self._counters[account_id] = dict(counters)
+
+    def apply(self, deltas: Counter) -> None:
+        """Applique des deltas {(account_id, clé): n} aux comptes déjà en cache."""
+        with self._lock:
+            self._generation += 1
+            for (account_id, key), delta in deltas.items():
+                counters = self._counters.get(account_id)
+                if counters is not None:
+                    counters[key] += delta
+
+    def invalidate(self, account_id: str | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if account_id is None:
+                self._counters.clear()
+            else:
+                self._counters.pop(account_id, None)
+
+
+_cache = EmailStatsCache()
+
+
+def get_email_stats_cache() -> EmailStatsCache:
+    """Cache global des compteurs (singleton du process)."""
+    return _cache
+
+
+async def count_email_stats(session: AsyncSession, account_id: str) -> dict[str, int]:
+    """Compteurs d'un compte en UNE requête agrégée (index couvrant)."""
+    statement = (
+        select(EmailMessage.priority, EmailMessage.is_read, func.count())
+        .where(EmailMessage.account_id == account_id)
+        .group_by(EmailMessage.priority, EmailMessage.is_read)
+    )
+    counters = _empty_counters()
+    for priority, is_read, count in (await session.execute(statement)).all():
+        counters["total"] += count
+        if not is_read and priority in PRIORITIES:
+            counters[priority] += count
+    return counters
+
+
+async def get_email_stats(session: AsyncSession, account_id: str) -> dict[str, int]:
+    """Statistiques par priorité : cache mémoire si actif, sinon requête agrégée."""
+    if not settings.email_stats_cache:
+        return _format(await count_email_stats(session, account_id))
+
+    cached = _cache.get(account_id)
+    if cached is not None:
+        return _format(cached)
+
+    generation = _cache.generation
+    counters = await count_email_stats(session, account_id)
+    _cache.fill(account_id, counters, generation)
+    return _format(counters)
+
+
+# ============================================================
+# Écouteurs ORM : deltas appliqués au commit
+# ============================================================
+
+
+def _contributions(account_id: str | None, priority: str | None, is_read: bool | None) -> list[tuple]:
+    """Clés de compteur auxquelles contribue un message dans cet état."""
+    if account_id is None:
+        return []
+    keys = [(account_id, "total")]
+    if not is_read and priority in PRIORITIES:
+        keys.append((account_id, priority))
+    return keys
+
+
+def _state(message: EmailMessage, committed: bool) -> tuple:
+    """(account_id, priority, is_read) courant, ou tel que connu en base."""
+    if not committed:
+        return message.account_id, message.priority, message.is_read
+    attrs = inspect(message).attrs
+    values = []
+    for name in ("account_id", "priority", "is_read"):
+        history = attrs[name].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(getattr(message, name))
+    return tuple(values)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session: Session, flush_context) -> None:
+    pending: Counter = session.info.setdefault(_PENDING_KEY, Counter())
+    for message in session.new:
+        if isinstance(message, EmailMessage):
+            for key in _contributions(*_state(message, committed=False)):
+                pending[key] += 1
+    for message in session.deleted:
+        if isinstance(message, EmailMessage):
+            for key in _contributions(*_state(message, committed=True)):
+                pending[key] -= 1
+    for message in session.dirty:
+        if isinstance(message, EmailMessage):
+            before = _state(message, committed=True)
+            after = _state(message, committed=False)
+            if before == after:
+                continue
+            for key in _contributions(*before):
+                pending[key] -= 1
+            for key in _contributions(*after):
+                pending[key] += 1
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _watch_bulk_statements(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is EmailMessage:
+        orm_execute_state.session.info[_INVALIDATE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_deltas(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if session.info.pop(_INVALIDATE_KEY, False):
+        _cache.invalidate()
+    elif pending:
+        deltas = Counter({key: delta for key, delta in pending.items() if delta})
+        if deltas:
+            _cache.apply(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_INVALIDATE_KEY, None)
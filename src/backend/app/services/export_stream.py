@@ -0,0 +1,88 @@
+"""
+THERESE v2 - Export Stream
+
+Briques communes aux exports en flux (CRM, RGPD) : lecture par lots via un
+curseur serveur et sérialisation JSON incrémentale. La mémoire occupée dépend
+de la taille d'un lot, jamais du volume de la base.
+"""
+
+import json
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Lignes matérialisées à la fois par curseur
+EXPORT_BATCH_SIZE = 500
+
+
+async def iter_batches(
+    session: AsyncSession,
+    statement: Select,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Sequence[Any]]:
+    """Parcourt le résultat d'une requête ORM par lots de `batch_size` entités."""
+    result = await session.stream_scalars(
+        statement.execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def count_rows(session: AsyncSession, statement: Select) -> int:
+    """Nombre de lignes que renverra `statement` (sans les charger)."""
+    subquery = statement.order_by(None).subquery()
+    result = await session.execute(select(func.count()).select_from(subquery))
+    return result.scalar_one()
+
+
+def dumps(value: Any) -> str:
+    """Sérialisation JSON d'un élément d'export (dates en ISO 8601)."""
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _json_default(value: Any) -> str:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+async def json_array(
+    batches: AsyncIterator[Sequence[Any]],
+    serialize: Callable[[Any], Any],
+) -> AsyncIterator[str]:
+    """Tableau JSON produit lot par lot, un élément par ligne."""
+    yield "["
+    separator = "\n"
+    async for batch in batches:
+        if not batch:
+            continue
+        yield separator + ",\n".join(dumps(serialize(item)) for item in batch)
+        separator = ",\n"
+    yield "\n]"
+
+
+async def json_object(
+    fields: Sequence[tuple[str, Any]],
+) -> AsyncIterator[str]:
+    """Objet JSON dont les valeurs sont des scalaires ou des flux `json_array`.
+
+    Chaque valeur qui est un itérateur asynchrone est recopiée telle quelle :
+    elle doit déjà produire du JSON valide.
+    """
+    yield "{"
+    for index, (key, value) in enumerate(fields):
+        yield ("," if index else "") + f"\n{dumps(key)}: "
+        if hasattr(value, "__aiter__"):
+            async for chunk in value:
+                yield chunk
+        else:
+            yield dumps(value)
+    yield "\n}\n"
+
+
+async def encode(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Encode un flux de texte en UTF-8 pour une StreamingResponse."""
+    async for chunk in chunks:
+        yield chunk.encode("utf-8")
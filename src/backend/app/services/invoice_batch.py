@@ -0,0 +1,115 @@
+"""
+THERESE v2 - Rendu des factures PDF par lots
+
+Facturation de fin de mois : N factures rendues en parallèle dans un pool de
+processus (ReportLab est du calcul pur, le GIL interdit d'en tirer parti avec
+des threads). Chaque processus prépare une fois pour toutes les polices et
+les styles du thème (`pdf_theme.py`) puis rend les factures qu'on lui confie.
+
+Une facture dont le contenu n'a pas changé depuis le dernier rendu n'est pas
+envoyée au pool : le PDF existant est réutilisé (voir
+`InvoicePDFGenerator.cached_pdf`).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import settings
+from app.services.invoice_pdf import InvoicePDFGenerator, RenderedInvoice
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InvoiceRenderJob:
+    """Données d'une facture à rendre (voir routers/invoices._invoice_pdf_payload)."""
+
+    invoice_data: dict[str, Any]
+    contact_data: dict[str, Any]
+    user_profile: dict[str, Any]
+    currency: str = "EUR"
+
+
+# Générateur propre à chaque processus du pool
+_worker_generator: InvoicePDFGenerator | None = None
+
+
+def _init_worker(output_dir: str) -> None:
+    """Initialisation d'un processus : polices enregistrées, styles construits."""
+    global _worker_generator  # noqa: PLW0603
+    _worker_generator = InvoicePDFGenerator(output_dir=output_dir)
+
+
+def _render_in_worker(job: InvoiceRenderJob) -> RenderedInvoice:
+    assert _worker_generator is not None
+    return _worker_generator.render_invoice_pdf(
+        job.invoice_data, job.contact_data, job.user_profile, job.currency
+    )
+
+
+def _worker_count(workers: int | None, pending: int) -> int:
+    workers = workers or settings.invoice_pdf_workers or os.cpu_count() or 1
+    return max(1, min(workers, pending))
+
+
+async def render_invoices(
+    jobs: Sequence[InvoiceRenderJob],
+    output_dir: str,
+    workers: int | None = None,
+) -> list[RenderedInvoice | Exception]:
+    """Rend les factures de `jobs` (même ordre), en parallèle s'il y en a plusieurs à rendre.
+
+    L'échec d'une facture est renvoyé à sa place (Exception) sans interrompre
+    les autres.
+    """
+    generator = InvoicePDFGenerator(output_dir=output_dir)
+    results: list[RenderedInvoice | Exception | None] = [None] * len(jobs)
+    pending: list[int] = []
+    for index, job in enumerate(jobs):
+        number = job.invoice_data["invoice_number"]
+        key = generator.render_key(job.invoice_data, job.contact_data, job.user_profile, job.currency)
+        path = generator.cached_pdf(number, key)
+        if path is not None:
+            results[index] = RenderedInvoice(number, path, pages=0, cached=True)
+        else:
+            pending.append(index)
+
+    workers = _worker_count(workers, len(pending))
+    if len(pending) < 2 or workers < 2:
+        # Un seul rendu ou une seule unité de calcul : un pool ne ferait que coûter
+        for index in pending:
+            job = jobs[index]
+            try:
+                results[index] = await asyncio.to_thread(
+                    generator.render_invoice_pdf,
+                    job.invoice_data, job.contact_data, job.user_profile, job.currency,
+                )
+            except Exception as exc:
+                results[index] = exc
+    else:
+        loop = asyncio.get_running_loop()
+        # spawn : processus neufs, sans l'état (connexions, threads) du backend
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(generator.output_dir),),
+        ) as pool:
+            rendered = await asyncio.gather(
+                *(loop.run_in_executor(pool, _render_in_worker, jobs[index]) for index in pending),
+                return_exceptions=True,
+            )
+        for index, outcome in zip(pending, rendered, strict=True):
+            results[index] = outcome
+
+    for outcome in results:
+        if isinstance(outcome, Exception):
+            logger.error("Echec rendu PDF facture : %s", outcome)
+    logger.info("Invoice PDF batch: %d rendered, %d up to date", len(pending), len(jobs) - len(pending))
+    return results  # type: ignore[return-value]
@@ -8,8 +8,11 @@ Refonte visuelle : utilise PDFTheme pour un rendu professionnel
 avec la palette Synoptia (primary #2451FF, cyan #22D3EE, dark #0B1226).
 """
 
+import hashlib
+import json
 import logging
 import os
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -51,6 +54,19 @@ CURRENCY_SYMBOLS: dict[str, str] = {
 # Fallback par defaut (utilise uniquement si aucun dossier de travail configure)
 _DEFAULT_INVOICE_DIR = "~/.therese/invoices"
 
+# Version de la mise en page : l'incrementer invalide le cache de rendu
+RENDER_VERSION = 1
+
+
+@dataclass(frozen=True)
+class RenderedInvoice:
+    """Resultat du rendu d'une facture (ou du fichier deja a jour)."""
+
+    invoice_number: str
+    pdf_path: str
+    pages: int  # 0 si le PDF existant a ete reutilise
+    cached: bool
+
 
 def resolve_invoice_output_dir() -> str:
     """
@@ -610,6 +626,36 @@ class InvoicePDFGenerator:
     # Generation principale
     # -----------------------------------------------------------------
 
+    def render_key(
+        self,
+        invoice_data: dict[str, Any],
+        contact_data: dict[str, Any],
+        user_profile: dict[str, Any],
+        currency: str = "EUR",
+    ) -> str:
+        """Empreinte du contenu d'une facture (donnees, devise, theme, mise en page)."""
+        payload = json.dumps(
+            [RENDER_VERSION, asdict(self.theme), invoice_data, contact_data, user_profile, currency],
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _key_path(self, invoice_number: str) -> Path:
+        # Fichier cache a cote du PDF, masque dans le dossier de travail
+        return self.output_dir / f".{invoice_number}.pdf.sha256"
+
+    def cached_pdf(self, invoice_number: str, key: str) -> str | None:
+        """Chemin du PDF deja rendu pour cette empreinte, None s'il faut le (re)generer."""
+        filepath = self.output_dir / f"{invoice_number}.pdf"
+        try:
+            if filepath.exists() and self._key_path(invoice_number).read_text() == key:
+                return str(filepath.absolute())
+        except OSError:
+            pass
+        return None
+
     def generate_invoice_pdf(
         self,
         invoice_data: dict[str, Any],
@@ -620,6 +666,8 @@ class InvoicePDFGenerator:
         """
         Genere une facture PDF avec le theme Synoptia.
 
+        Un PDF deja genere pour le meme contenu est reutilise tel quel.
+
         Args:
             invoice_data: Donnees de la facture (invoice_number, lines, totals, etc.)
             contact_data: Donnees du client (name, email, company, address, etc.)
@@ -629,9 +677,27 @@ class InvoicePDFGenerator:
         Returns:
             Chemin absolu du fichier PDF genere
         """
+        return self.render_invoice_pdf(invoice_data, contact_data, user_profile, currency).pdf_path
+
+    def render_invoice_pdf(
+        self,
+        invoice_data: dict[str, Any],
+        contact_data: dict[str, Any],
+        user_profile: dict[str, Any],
+        currency: str = "EUR",
+    ) -> RenderedInvoice:
+        """Comme generate_invoice_pdf, avec le nombre de pages rendues."""
+        invoice_number = invoice_data["invoice_number"]
+        key = self.render_key(invoice_data, contact_data, user_profile, currency)
+        cached = self.cached_pdf(invoice_number, key)
+        if cached is not None:
+            logger.debug("Invoice PDF up to date: %s", cached)
+            return RenderedInvoice(invoice_number, cached, pages=0, cached=True)
+        key_path = self._key_path(invoice_number)
+        key_path.unlink(missing_ok=True)
+
         theme = self.theme
         currency_symbol = CURRENCY_SYMBOLS.get(currency, currency)
-        invoice_number = invoice_data["invoice_number"]
         filename = f"{invoice_number}.pdf"
         filepath = self.output_dir / filename
 
@@ -695,9 +761,10 @@ class InvoicePDFGenerator:
 
         # Build PDF
         doc.build(story, onFirstPage=on_first, onLaterPages=on_later)
+        key_path.write_text(key)
 
         logger.info("Invoice PDF generated: %s", filepath)
-        return str(filepath.absolute())
+        return RenderedInvoice(invoice_number, str(filepath.absolute()), pages=doc.page, cached=False)
 
     def delete_invoice_pdf(self, invoice_number: str) -> bool:
         """
@@ -712,6 +779,7 @@ class InvoicePDFGenerator:
         filename = f"{invoice_number}.pdf"
         filepath = self.output_dir / filename
 
+        self._key_path(invoice_number).unlink(missing_ok=True)
         if filepath.exists():
             filepath.unlink()
             logger.info("Invoice PDF deleted: %s", filepath)
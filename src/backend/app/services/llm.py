@@ -7,6 +7,7 @@ Supports Claude, OpenAI, Gemini, Mistral, Grok, and Ollama.
 Sprint 2 - PERF-2.1: Refactored to use modular providers.
 """
 
+import asyncio
 import logging
 import os
 import re
@@ -200,18 +201,37 @@ def _is_ollama_chat_model(name: str) -> bool:
     return bool(name) and not any(hint in lowered for hint in _OLLAMA_NON_CHAT_HINTS)
 
 
+def _catalog_chat_models(base_url: str) -> list[str] | None:
+    """Modèles de chat du catalogue ; None s'il ne fait pas (encore) foi."""
+    from app.services.ollama_catalog import get_ollama_catalog
+
+    catalog = get_ollama_catalog()
+    if not catalog.loaded or catalog.base_url != base_url.rstrip("/"):
+        return None
+    return [
+        model.name
+        for model in catalog.models()
+        if model.chat is not False and _is_ollama_chat_model(model.name)
+    ]
+
+
 def detect_default_ollama_model(
     base_url: str = "http://localhost:11434",
     fallback: str = "mistral-nemo",
 ) -> str:
     """Retourne le premier modèle Ollama conversationnel réellement installé.
 
-    Interroge `GET /api/tags`. Évite ainsi de réclamer un `ollama pull mistral-nemo`
-    alors que l'utilisateur a déjà un autre modèle (ex: gemma:2b) installé (BUG-098).
+    Lu dans le catalogue des modèles (`ollama_catalog`, tenu à jour en tâche
+    de fond) ; tant qu'il n'a jamais été chargé, interroge `GET /api/tags`.
+    Évite ainsi de réclamer un `ollama pull mistral-nemo` alors que
+    l'utilisateur a déjà un autre modèle (ex: gemma:2b) installé (BUG-098).
 
     Si Ollama est injoignable ou qu'aucun modèle de chat n'est installé, retourne
     `fallback` (une suggestion de modèle à installer).
     """
+    chat_models = _catalog_chat_models(base_url)
+    if chat_models is not None:
+        return chat_models[0] if chat_models else fallback
     try:
         import httpx
 
@@ -226,6 +246,20 @@ def detect_default_ollama_model(
     return fallback
 
 
+async def detect_default_ollama_model_async(
+    base_url: str = "http://localhost:11434",
+    fallback: str = "mistral-nemo",
+) -> str:
+    """Variante pour le code async : rafraîchit le catalogue sans bloquer la boucle."""
+    from app.services.ollama_catalog import get_ollama_catalog
+
+    catalog = get_ollama_catalog()
+    if catalog.base_url != base_url.rstrip("/"):
+        return await asyncio.to_thread(detect_default_ollama_model, base_url, fallback)
+    await catalog.ensure_fresh()
+    return detect_default_ollama_model(base_url, fallback)
+
+
 # -----------------------------------------------------------------------------
 # LLM Service (Facade)
 # -----------------------------------------------------------------------------
@@ -676,8 +710,14 @@ AUTORISÉ : les listes à puces (- point clé : valeur).
         messages: list[Message],
         system_prompt: str | None = None,
         memory_context: str | None = None,
+        cache_system_prompt: bool = False,
     ) -> ContextWindow:
-        """Prepare context window."""
+        """Prepare context window.
+
+        cache_system_prompt : system prompt réutilisé à l'identique par les
+        appels suivants (préfixe commun du Board), à mettre en cache chez le
+        provider. Le chat le recompose à chaque tour : pas de cache.
+        """
         full_system = system_prompt or self._get_system_prompt_with_identity()
         if memory_context:
             full_system += f"\n\n## Contexte mémoire:\n{memory_context}"
@@ -687,6 +727,7 @@ AUTORISÉ : les listes à puces (- point clé : valeur).
             messages=messages.copy(),
             system_prompt=full_system,
             max_tokens=max_msg_tokens,
+            cache_system_prompt=cache_system_prompt,
         )
         return context.trim_to_fit()
 
@@ -709,7 +750,9 @@ AUTORISÉ : les listes à puces (- point clé : valeur).
         entity_extractor, action_agents, runtime) qui tolèrent une réponse vide.
 
         usage_sink : dict optionnel rempli en effet de bord avec l'usage réel du
-        provider ("input_tokens"/"output_tokens", event type="done") quand
+        provider ("input_tokens"/"output_tokens", plus "cached_input_tokens"/
+        "cache_creation_input_tokens"/"prompt_eval_ms" selon le provider,
+        event type="done") quand
         disponible - ce générateur ne yield que du texte, donc pas d'autre moyen
         pour l'appelant de récupérer cette info après la boucle (dette 14/06,
         usage estimé ~2 tokens/mot au lieu du réel).
@@ -724,6 +767,12 @@ AUTORISÉ : les listes à puces (- point clé : valeur).
                     usage_sink["input_tokens"] = event.input_tokens
                 if event.output_tokens is not None:
                     usage_sink["output_tokens"] = event.output_tokens
+                if event.cached_input_tokens is not None:
+                    usage_sink["cached_input_tokens"] = event.cached_input_tokens
+                if event.cache_creation_input_tokens is not None:
+                    usage_sink["cache_creation_input_tokens"] = event.cache_creation_input_tokens
+                if event.prompt_eval_ms is not None:
+                    usage_sink["prompt_eval_ms"] = event.prompt_eval_ms
 
     async def stream_response_with_tools(
         self,
@@ -782,6 +831,16 @@ AUTORISÉ : les listes à puces (- point clé : valeur).
                         had_error = True
                         error_detail = event.content or "stream error"
                     yield event
+            elif self.config.provider == LLMProvider.ANTHROPIC:
+                async for event in self._provider.stream(
+                    system_prompt, messages, tools, cache_system_prompt=context.cache_system_prompt,
+                ):
+                    if event.type == "text" and event.content:
+                        had_content = True
+                    elif event.type == "error" and _is_provider_outage(event.content):
+                        had_error = True
+                        error_detail = event.content or "stream error"
+                    yield event
             else:
                 async for event in self._provider.stream(system_prompt, messages, tools):
                     if event.type == "text" and event.content:
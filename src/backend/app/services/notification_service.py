@@ -11,13 +11,15 @@ from datetime import UTC, datetime, timedelta
 
 from app.models.database import get_session_context
 from app.models.entities import (
-    CalendarEvent,
     Contact,
     Invoice,
     Notification,
     Task,
 )
+from app.services.calendar.recurrence import events_between, instance_id, is_series
+from sqlalchemy import and_, literal
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlmodel import func, select
 
 logger = logging.getLogger(__name__)
@@ -119,29 +121,32 @@ async def mark_all_read(session: AsyncSession) -> int:
 async def _check_overdue_invoices(session: AsyncSession) -> int:
     """Genere des notifications pour les factures impayees > 30 jours."""
     count = 0
-    threshold = datetime.now(UTC) - timedelta(days=30)
+    now = datetime.now(UTC)
+    threshold = now - timedelta(days=30)
 
+    # Anti-jointure : factures sans notification recente, en UNE requete
+    # (index ix_invoices_status_due_date) au lieu d'une recherche par facture
+    recent = aliased(Notification)
     result = await session.execute(
-        select(Invoice).where(
+        select(Invoice)
+        .outerjoin(
+            recent,
+            and_(
+                recent.source == "invoice",
+                recent.action_url == literal("/invoices/") + Invoice.id,
+                recent.created_at > now - timedelta(days=7),
+            ),
+        )
+        .where(
             Invoice.status.in_(["sent", "overdue"]),
             Invoice.due_date < threshold,
+            recent.id.is_(None),
         )
     )
     invoices = result.scalars().all()
 
     for inv in invoices:
-        days_overdue = (datetime.now(UTC) - _as_aware_utc(inv.due_date)).days
-        # Verifier quon na pas deja une notif recente pour cette facture
-        existing = await session.execute(
-            select(Notification).where(
-                Notification.source == "invoice",
-                Notification.action_url == f"/invoices/{inv.id}",
-                Notification.created_at > datetime.now(UTC) - timedelta(days=7),
-            )
-        )
-        if existing.scalar_one_or_none():
-            continue
-
+        days_overdue = (now - _as_aware_utc(inv.due_date)).days
         await create_notification(
             session,
             title="Facture impayee",
@@ -245,36 +250,36 @@ async def _check_upcoming_events(session: AsyncSession) -> int:
     tomorrow_start = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow_end = tomorrow_start + timedelta(days=1)
 
-    result = await session.execute(
-        select(CalendarEvent).where(
-            CalendarEvent.start_datetime != None,  # noqa: E711
-            CalendarEvent.start_datetime >= tomorrow_start,
-            CalendarEvent.start_datetime < tomorrow_end,
-            CalendarEvent.status == "confirmed",
-        )
-    )
-    events = result.scalars().all()
-
-    for event in events:
+    # Occurrences horaires de demain, séries récurrentes comprises
+    occurrences = [
+        (event, occurrence)
+        for event, occurrence in await events_between(session, tomorrow_start, tomorrow_end)
+        if not event.all_day
+        and event.status == "confirmed"
+        and occurrence.start < tomorrow_end
+    ]
+
+    for event, occurrence in occurrences:
+        event_id = instance_id(event.id, occurrence.key) if is_series(event) else event.id
         # Verifier quon na pas deja une notif pour cet evenement
         existing = await session.execute(
             select(Notification).where(
                 Notification.source == "calendar",
-                Notification.action_url == f"/calendar/events/{event.id}",
+                Notification.action_url == f"/calendar/events/{event_id}",
                 Notification.created_at > now - timedelta(hours=12),
             )
         )
         if existing.scalar_one_or_none():
             continue
 
-        time_str = event.start_datetime.strftime("%Hh%M") if event.start_datetime else ""
+        time_str = occurrence.start.strftime("%Hh%M")
         await create_notification(
             session,
             title="RDV demain",
             message=f"RDV demain a {time_str} : {event.summary}",
             type="reminder",
             source="calendar",
-            action_url=f"/calendar/events/{event.id}",
+            action_url=f"/calendar/events/{event_id}",
             action_label="Voir",
         )
         count += 1
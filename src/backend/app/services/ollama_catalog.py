@@ -0,0 +1,229 @@
+"""
+THÉRÈSE v2 - Catalogue des modèles Ollama
+
+Modèles installés (`GET /api/tags`) et capacités de chacun (`POST /api/show` :
+tools, thinking, longueur de contexte, quantification), conservés dans la
+table `ollama_models`. Le provider Ollama choisit ainsi la forme de la
+requête d'emblée (tools / think / num_ctx) au lieu de découvrir les limites
+d'un modèle par un HTTP 400 au premier message.
+
+Seuls les modèles dont le digest a changé (nouveau pull) sont re-sondés.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+from app.config import settings
+from app.models.database import get_session_context
+from app.models.entities import OllamaModel
+from app.services.http_client import get_http_client
+from sqlalchemy import delete
+from sqlmodel import select
+
+logger = logging.getLogger(__name__)
+
+# Sondes /api/show simultanées (chaque appel lit le manifeste du modèle)
+SHOW_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class OllamaModelCapabilities:
+    """Capacités d'un modèle ; None = inconnues (Ollama sans `capabilities`)."""
+
+    name: str
+    digest: str
+    capabilities: frozenset[str] | None = None
+    context_length: int | None = None
+    quantization: str | None = None
+    family: str | None = None
+    parameter_size: str | None = None
+    size: int | None = None  # octets sur disque (/api/tags), non persisté
+
+    def supports(self, capability: str) -> bool | None:
+        return None if self.capabilities is None else capability in self.capabilities
+
+    @property
+    def tools(self) -> bool | None:
+        return self.supports("tools")
+
+    @property
+    def thinking(self) -> bool | None:
+        return self.supports("thinking")
+
+    @property
+    def chat(self) -> bool | None:
+        return self.supports("completion")
+
+
+def _from_show(name: str, digest: str, size: int | None, show: dict[str, Any]) -> OllamaModelCapabilities:
+    details = show.get("details") or {}
+    model_info = show.get("model_info") or {}
+    architecture = model_info.get("general.architecture")
+    context_length = model_info.get(f"{architecture}.context_length") if architecture else None
+    capabilities = show.get("capabilities")
+    return OllamaModelCapabilities(
+        name=name,
+        digest=digest,
+        capabilities=frozenset(capabilities) if isinstance(capabilities, list) else None,
+        context_length=context_length if isinstance(context_length, int) else None,
+        quantization=details.get("quantization_level"),
+        family=details.get("family"),
+        parameter_size=details.get("parameter_size"),
+        size=size,
+    )
+
+
+def _from_row(row: OllamaModel) -> OllamaModelCapabilities:
+    return OllamaModelCapabilities(
+        name=row.name,
+        digest=row.digest,
+        capabilities=frozenset(json.loads(row.capabilities)) if row.capabilities is not None else None,
+        context_length=row.context_length,
+        quantization=row.quantization,
+        family=row.family,
+        parameter_size=row.parameter_size,
+    )
+
+
+def _to_row(model: OllamaModelCapabilities, position: int) -> OllamaModel:
+    return OllamaModel(
+        name=model.name,
+        digest=model.digest,
+        position=position,
+        capabilities=json.dumps(sorted(model.capabilities)) if model.capabilities is not None else None,
+        context_length=model.context_length,
+        quantization=model.quantization,
+        family=model.family,
+        parameter_size=model.parameter_size,
+        probed_at=datetime.now(UTC),
+    )
+
+
+class OllamaCatalog:
+    """Modèles installés, dans l'ordre de /api/tags, et leurs capacités."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._models: dict[str, OllamaModelCapabilities] = {}
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Vrai dès qu'une liste fait foi (base ou Ollama), même vide."""
+        return self._refreshed_at is not None
+
+    def models(self) -> list[OllamaModelCapabilities]:
+        return list(self._models.values())
+
+    def get(self, name: str) -> OllamaModelCapabilities | None:
+        """Capacités de `name` (« qwen3 » désigne « qwen3:latest »)."""
+        model = self._models.get(name)
+        if model is None and ":" not in name:
+            model = self._models.get(f"{name}:latest")
+        return model
+
+    async def load(self) -> None:
+        """Recharge le catalogue enregistré (démarrage, avant la première sonde)."""
+        async with get_session_context() as session:
+            rows = (await session.execute(
+                select(OllamaModel).order_by(OllamaModel.position)
+            )).scalars().all()
+        if rows and not self.loaded:
+            self._models = {row.name: _from_row(row) for row in rows}
+            self._refreshed_at = float("-inf")  # périmé : la prochaine ensure_fresh interroge Ollama
+
+    async def refresh(self) -> bool:
+        """Interroge Ollama ; False s'il est injoignable (catalogue conservé)."""
+        async with self._lock:
+            client = await get_http_client()
+            try:
+                response = await client.get(f"{self.base_url}/api/tags", timeout=2.0)
+                response.raise_for_status()
+                tags = response.json().get("models", [])
+            except (httpx.HTTPError, ValueError) as e:
+                logger.debug(f"Catalogue Ollama : /api/tags indisponible ({e})")
+                self._refreshed_at = time.monotonic()
+                return False
+
+            installed = [
+                (tag["name"], tag.get("digest", ""), tag.get("size")) for tag in tags if tag.get("name")
+            ]
+            semaphore = asyncio.Semaphore(SHOW_CONCURRENCY)
+
+            async def probe(name: str, digest: str, size: int | None) -> OllamaModelCapabilities:
+                known = self._models.get(name)
+                if known is not None and known.digest == digest:
+                    return known if known.size == size else replace(known, size=size)
+                async with semaphore:
+                    try:
+                        show = await client.post(
+                            f"{self.base_url}/api/show", json={"model": name}, timeout=10.0
+                        )
+                        show.raise_for_status()
+                        return _from_show(name, digest, size, show.json())
+                    except (httpx.HTTPError, ValueError) as e:
+                        logger.debug(f"Catalogue Ollama : /api/show {name} impossible ({e})")
+                        return OllamaModelCapabilities(name=name, digest="", size=size)
+
+            models = await asyncio.gather(*(probe(*tag) for tag in installed))
+            old_positions = {name: position for position, name in enumerate(self._models)}
+            changed = [
+                (position, model)
+                for position, model in enumerate(models)
+                if self._models.get(model.name) != model or old_positions.get(model.name) != position
+            ]
+            removed = set(self._models) - {model.name for model in models}
+            self._models = {model.name: model for model in models}
+            self._refreshed_at = time.monotonic()
+
+        if changed or removed:
+            async with get_session_context() as session:
+                if removed:
+                    await session.execute(delete(OllamaModel).where(OllamaModel.name.in_(removed)))
+                for position, model in changed:
+                    await session.merge(_to_row(model, position))
+            logger.info(
+                f"Catalogue Ollama : {len(models)} modèle(s), "
+                f"{len(changed)} mis à jour, {len(removed)} retiré(s)"
+            )
+        return True
+
+    async def ensure_fresh(self, max_age: float | None = None) -> None:
+        """Interroge Ollama si le catalogue n'a jamais été rafraîchi ou est périmé."""
+        if max_age is None:
+            max_age = settings.ollama_catalog_refresh_seconds
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at > max_age:
+            await self.refresh()
+
+
+_catalog: OllamaCatalog | None = None
+
+
+def get_ollama_catalog() -> OllamaCatalog:
+    """Catalogue partagé de l'instance Ollama configurée (`settings.ollama_base_url`)."""
+    global _catalog  # noqa: PLW0603
+    if _catalog is None:
+        _catalog = OllamaCatalog(settings.ollama_base_url)
+    return _catalog
+
+
+async def poll_ollama_catalog() -> None:
+    """Tâche de fond : catalogue enregistré puis interrogation périodique d'Ollama."""
+    catalog = get_ollama_catalog()
+    try:
+        await catalog.load()
+    except Exception as e:
+        logger.warning(f"Catalogue Ollama enregistré illisible : {e}")
+    while True:
+        try:
+            await catalog.refresh()
+        except Exception as e:
+            logger.error(f"Catalogue Ollama : erreur de rafraîchissement : {e}")
+        await asyncio.sleep(settings.ollama_catalog_refresh_seconds)
@@ -0,0 +1,131 @@
+"""
+THÉRÈSE v2 - Préchargement des modèles Ollama
+
+Un changement de modèle coûte un chargement complet depuis le disque. Deux
+leviers :
+
+- `keep_alive` : durée pendant laquelle Ollama garde un modèle en mémoire
+  après une requête, réglée selon le mode économie d'énergie
+  (`PowerSettings.battery_saver_mode`) ;
+- le préchargement : pendant qu'un modèle répond, le suivant est chargé en
+  tâche de fond (requête /api/generate sans prompt), si la RAM permet de
+  garder les deux modèles à la fois.
+
+`plan_model_runs` ordonne des exécutions pour enchaîner celles qui partagent
+un modèle (conseillers du Board en mode souverain).
+"""
+
+import asyncio
+import logging
+from collections.abc import Hashable, Iterable
+from typing import TypeVar
+
+import httpx
+from app.services.http_client import get_http_client
+from app.services.ollama_catalog import get_ollama_catalog
+from app.services.performance import get_power_settings
+from app.services.system_resources import OLLAMA_CONTEXT_MARGIN_BYTES, detect_system_memory
+
+logger = logging.getLogger(__name__)
+
+# Conservation en mémoire après la dernière requête (format durée Ollama)
+KEEP_ALIVE_DEFAULT = "30m"
+KEEP_ALIVE_BATTERY_SAVER = "1m"
+
+T = TypeVar("T", bound=Hashable)
+
+
+def ollama_keep_alive() -> str:
+    """Valeur `keep_alive` des requêtes Ollama selon le mode d'alimentation."""
+    if get_power_settings().battery_saver_mode:
+        return KEEP_ALIVE_BATTERY_SAVER
+    return KEEP_ALIVE_DEFAULT
+
+
+def plan_model_runs(runs: Iterable[tuple[T, str]], first_model: str | None = None) -> list[tuple[T, str]]:
+    """Regroupe les exécutions par modèle (ordre de première apparition).
+
+    `first_model` (modèle déjà chargé) passe en tête. L'ordre relatif des
+    exécutions d'un même modèle est conservé.
+    """
+    groups: dict[str, list[tuple[T, str]]] = {}
+    if first_model is not None:
+        groups[first_model] = []
+    for item, model in runs:
+        groups.setdefault(model, []).append((item, model))
+    return [run for group in groups.values() for run in group]
+
+
+def models_fit_in_memory(*models: str) -> bool:
+    """Vrai si les modèles tiennent ensemble dans la part de RAM réservée
+    aux modèles locaux (moitié de la RAM, marge de contexte par modèle)."""
+    total = detect_system_memory().total_bytes
+    if total is None:
+        return False
+    catalog = get_ollama_catalog()
+    sizes = [getattr(catalog.get(model), "size", None) for model in models]
+    if any(size is None for size in sizes):
+        return False
+    return sum(sizes) + OLLAMA_CONTEXT_MARGIN_BYTES * len(sizes) <= total // 2
+
+
+async def warm_model(model: str, base_url: str | None = None) -> bool:
+    """Charge `model` dans Ollama sans rien générer ; False en cas d'échec."""
+    base_url = (base_url or get_ollama_catalog().base_url).rstrip("/")
+    client = await get_http_client()
+    try:
+        response = await client.post(
+            f"{base_url}/api/generate",
+            json={"model": model, "keep_alive": ollama_keep_alive()},
+            timeout=httpx.Timeout(connect=5.0, read=None, write=None, pool=5.0),
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.debug(f"Préchargement Ollama de {model} impossible : {e}")
+        return False
+    return True
+
+
+async def warm_default_ollama_model() -> bool:
+    """Démarrage : précharge le modèle de chat Ollama choisi par l'utilisateur,
+    pour que le premier message ne paie pas le chargement à froid."""
+    if get_power_settings().battery_saver_mode:
+        return False
+    from app.services.llm import LLMProvider, get_llm_service
+
+    try:
+        # Lecture des préférences et, sans modèle choisi, détection bloquante
+        # du modèle par défaut : hors de la boucle d'événements
+        config = (await asyncio.to_thread(get_llm_service)).config
+        if config.provider != LLMProvider.OLLAMA:
+            return False
+        await get_ollama_catalog().ensure_fresh()
+        if not models_fit_in_memory(config.model):
+            return False
+        return await warm_model(config.model, config.base_url)
+    except Exception as e:
+        logger.warning(f"Préchargement du modèle Ollama par défaut impossible : {e}")
+        return False
+
+
+class ModelPrefetcher:
+    """Préchargements en tâche de fond, annulés à la fermeture."""
+
+    def __init__(self, base_url: str | None = None):
+        self.base_url = base_url
+        self._tasks: dict[str, asyncio.Task[bool]] = {}
+
+    def prefetch(self, model: str, running: str | None = None) -> bool:
+        """Précharge `model` pendant que `running` répond, si les deux tiennent en RAM."""
+        if model in self._tasks or model == running:
+            return False
+        if running is not None and not models_fit_in_memory(running, model):
+            return False
+        self._tasks[model] = asyncio.create_task(warm_model(model, self.base_url))
+        return True
+
+    async def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
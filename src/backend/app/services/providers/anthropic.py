@@ -53,6 +53,7 @@ class AnthropicProvider(BaseProvider):
         system_prompt: str | None,
         messages: list[dict[str, Any]],
         anthropic_tools: list[dict[str, Any]] | None,
+        cache_system_prompt: bool = False,
     ) -> dict[str, Any]:
         """Payload /v1/messages - `temperature` seulement sur les modèles qui
         l'acceptent (les récents la refusent avec un 400, cf. _NO_SAMPLING)."""
@@ -63,6 +64,14 @@ class AnthropicProvider(BaseProvider):
             "messages": messages,
             "stream": True,
         }
+        if system_prompt and cache_system_prompt:
+            # Prompt caching, sur demande de l'appelant : l'écriture coûte
+            # 1,25x l'entrée, rentable seulement si le même system prompt est
+            # relu (préfixe commun aux conseillers du Board). Sous le seuil
+            # minimal du modèle, l'API l'ignore.
+            request_body["system"] = [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}},
+            ]
         if not self.config.model.startswith(_NO_SAMPLING_PREFIXES):
             request_body["temperature"] = self.config.temperature
         if self.config.effort and self.config.model.startswith(_EFFORT_PREFIXES):
@@ -91,10 +100,11 @@ class AnthropicProvider(BaseProvider):
         system_prompt: str | None,
         messages: list[dict],
         tools: list[dict] | None = None,
+        cache_system_prompt: bool = False,
     ) -> AsyncGenerator[StreamEvent, None]:
         """Stream from Anthropic Claude API with tool support."""
         anthropic_tools = self._convert_tools(tools)
-        request_body = self._build_request_body(system_prompt, messages, anthropic_tools)
+        request_body = self._build_request_body(system_prompt, messages, anthropic_tools, cache_system_prompt)
 
         try:
             async with self.client.stream(
@@ -118,6 +128,8 @@ class AnthropicProvider(BaseProvider):
                 # message_start, output_tokens (cumulatif) dans chaque message_delta.
                 input_tokens: int | None = None
                 output_tokens: int | None = None
+                cached_input_tokens: int | None = None
+                cache_creation_input_tokens: int | None = None
 
                 async for line in response.aiter_lines():
                     if line.startswith("data: "):
@@ -129,9 +141,17 @@ class AnthropicProvider(BaseProvider):
                             event_type = event.get("type")
 
                             if event_type == "message_start":
-                                input_tokens = (
-                                    event.get("message", {}).get("usage", {}).get("input_tokens")
-                                )
+                                usage = event.get("message", {}).get("usage", {})
+                                input_tokens = usage.get("input_tokens")
+                                # input_tokens exclut le préfixe mis en cache
+                                # (lu ou écrit) : on le réintègre pour garder
+                                # le total du prompt, comme les autres providers ;
+                                # lectures et écritures restent détaillées pour
+                                # être facturées à leur tarif (token_tracker).
+                                cached_input_tokens = usage.get("cache_read_input_tokens")
+                                cache_creation_input_tokens = usage.get("cache_creation_input_tokens")
+                                if input_tokens is not None:
+                                    input_tokens += (cached_input_tokens or 0) + (cache_creation_input_tokens or 0)
 
                             elif event_type == "content_block_start":
                                 content_block = event.get("content_block", {})
@@ -184,6 +204,8 @@ class AnthropicProvider(BaseProvider):
                                     stop_reason=stop_reason or "end_turn",
                                     input_tokens=input_tokens,
                                     output_tokens=output_tokens,
+                                    cached_input_tokens=cached_input_tokens,
+                                    cache_creation_input_tokens=cache_creation_input_tokens,
                                 )
 
                         except json.JSONDecodeError:
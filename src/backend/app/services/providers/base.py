@@ -99,6 +99,13 @@ class StreamEvent:
     # l'estimation ~2 tokens/mot (cf chat.py/board.py).
     input_tokens: int | None = None
     output_tokens: int | None = None
+    # Cache de préfixe : tokens d'entrée servis depuis le cache du provider
+    # (prompt caching cloud), tokens écrits dans ce cache (Anthropic, facturés
+    # plus cher) et durée d'évaluation du prompt (Ollama). Tous deux sont
+    # inclus dans input_tokens.
+    cached_input_tokens: int | None = None
+    cache_creation_input_tokens: int | None = None
+    prompt_eval_ms: float | None = None
 
 
 class BaseProvider(ABC):
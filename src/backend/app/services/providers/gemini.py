@@ -225,6 +225,7 @@ class GeminiProvider(BaseProvider):
                 # dernière valeur vue, utilisée au yield "done" final.
                 input_tokens: int | None = None
                 output_tokens: int | None = None
+                cached_input_tokens: int | None = None
                 async for line in response.aiter_lines():
                     if line.startswith("data: "):
                         data = line[6:]
@@ -235,6 +236,8 @@ class GeminiProvider(BaseProvider):
                             if usage := event.get("usageMetadata"):
                                 input_tokens = usage.get("promptTokenCount", input_tokens)
                                 output_tokens = usage.get("candidatesTokenCount", output_tokens)
+                                # Cache implicite Gemini : préfixe commun réutilisé
+                                cached_input_tokens = usage.get("cachedContentTokenCount", cached_input_tokens)
                             candidates = event.get("candidates", [])
                             if candidates:
                                 content = candidates[0].get("content", {})
@@ -275,6 +278,7 @@ class GeminiProvider(BaseProvider):
                 stop_reason="tool_calls" if has_tool_calls else "end_turn",
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
+                cached_input_tokens=cached_input_tokens,
             )
 
         except httpx.HTTPStatusError as e:
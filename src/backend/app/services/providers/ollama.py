@@ -11,6 +11,8 @@ import logging
 from typing import Any, AsyncGenerator
 
 import httpx
+from app.services.ollama_catalog import OllamaModelCapabilities, get_ollama_catalog
+from app.services.ollama_warmup import ollama_keep_alive
 
 from .base import (
     BaseProvider,
@@ -26,6 +28,8 @@ logger = logging.getLogger(__name__)
 # modèle a répondu « does not support tools », on n'envoie plus de tools pour
 # lui (évite un aller-retour 400 + retry à CHAQUE message). Process-local,
 # se vide au redémarrage (un modèle re-pullé peut gagner le support).
+# Les capacités annoncées par /api/show (catalogue Ollama) priment : ce cache
+# ne sert plus qu'aux modèles absents du catalogue (Ollama trop ancien).
 _MODELS_WITHOUT_TOOLS: set[str] = set()
 
 # Sentinelle interne : « ce modèle ne supporte pas les tools, rejouer sans »
@@ -38,9 +42,27 @@ _MODELS_WITHOUT_THINK: set[str] = set()
 _THINK_UNSUPPORTED = StreamEvent(type="error", content="__ollama_think_unsupported__")
 
 
+def _tools_unsupported_notice(model: str) -> StreamEvent:
+    return StreamEvent(
+        type="text",
+        content=(
+            f"*(Le modèle {model} ne gère pas les outils - création de "
+            "contacts, calendrier, documents. Je réponds en texte seulement ; "
+            "pour les actions, installe un modèle compatible comme qwen3, "
+            "llama3.1 ou mistral.)*\n\n"
+        ),
+    )
+
+
 class OllamaProvider(BaseProvider):
     """Local Ollama API provider."""
 
+    def _capabilities(self) -> OllamaModelCapabilities | None:
+        """Capacités du modèle d'après le catalogue (None : inconnues)."""
+        base_url = (self.config.base_url or "http://localhost:11434").rstrip("/")
+        catalog = get_ollama_catalog()
+        return catalog.get(self.config.model) if catalog.base_url == base_url else None
+
     def _build_request_body(
         self,
         system_prompt: str | None,
@@ -58,11 +80,15 @@ class OllamaProvider(BaseProvider):
 
         # BUG-048 : transmettre num_predict + num_ctx pour les skills Office
         # (certains modèles Ollama ont des défauts trop petits : 128 tokens)
+        num_ctx = min(max(self.config.context_window, 2048), 8192)
+        capabilities = self._capabilities()
+        if capabilities is not None and capabilities.context_length:
+            num_ctx = min(num_ctx, capabilities.context_length)
         ollama_options: dict = {
             "num_predict": self.config.max_tokens,
-            # BUG-052 : cap à 8192 pour éviter l'OOM sur les machines <8 Go RAM
-            # Ollama respecte le context_window réel du modèle si inférieur
-            "num_ctx": min(max(self.config.context_window, 2048), 8192),
+            # BUG-052 : cap à 8192 pour éviter l'OOM sur les machines <8 Go RAM,
+            # et jamais au-delà du contexte d'entraînement du modèle (catalogue)
+            "num_ctx": num_ctx,
         }
 
         request_body: dict = {
@@ -70,11 +96,21 @@ class OllamaProvider(BaseProvider):
             "messages": chat_messages,
             "stream": True,
             "options": ollama_options,
+            # Modèle gardé chargé entre deux messages (court en économie d'énergie)
+            "keep_alive": ollama_keep_alive(),
         }
-        # US-009 : /api/chat accepte les tools au format OpenAI (type=function)
-        if tools and model not in _MODELS_WITHOUT_TOOLS:
+        # US-009 : /api/chat accepte les tools au format OpenAI (type=function).
+        # Capacité connue par le catalogue -> forme de requête choisie d'emblée,
+        # sans aller-retour 400 ; inconnue -> on tente, et stream() se rattrape.
+        if tools and model not in _MODELS_WITHOUT_TOOLS and (
+            capabilities is None or capabilities.tools is not False
+        ):
             request_body["tools"] = tools
-        if self.config.effort and model not in _MODELS_WITHOUT_THINK:
+        if (
+            self.config.effort
+            and model not in _MODELS_WITHOUT_THINK
+            and (capabilities is None or capabilities.thinking is not False)
+        ):
             request_body["think"] = (
                 "high" if self.config.effort == "max" else self.config.effort
             )
@@ -97,6 +133,17 @@ class OllamaProvider(BaseProvider):
         """
         base_url = (self.config.base_url or "http://localhost:11434").rstrip("/")
         model = self.config.model
+        capabilities = self._capabilities()
+        if (
+            tools
+            and capabilities is not None
+            and capabilities.tools is False
+            and model not in _MODELS_WITHOUT_TOOLS
+        ):
+            # Modèle sans tools d'après le catalogue : même avis honnête (une
+            # fois), mais sans la requête refusée qui le révélait
+            _MODELS_WITHOUT_TOOLS.add(model)
+            yield _tools_unsupported_notice(model)
         request_body = self._build_request_body(system_prompt, messages, tools)
 
         tools_rejected = False
@@ -128,15 +175,7 @@ class OllamaProvider(BaseProvider):
         # Dégradation gracieuse : prévenir (une fois) puis rejouer sans tools.
         _MODELS_WITHOUT_TOOLS.add(model)
         request_body.pop("tools", None)
-        yield StreamEvent(
-            type="text",
-            content=(
-                f"*(Le modèle {model} ne gère pas les outils - création de "
-                "contacts, calendrier, documents. Je réponds en texte seulement ; "
-                "pour les actions, installe un modèle compatible comme qwen3, "
-                "llama3.1 ou mistral.)*\n\n"
-            ),
-        )
+        yield _tools_unsupported_notice(model)
         async for event in self._stream_request(base_url, model, request_body):
             if event is _TOOLS_UNSUPPORTED:
                 # Sans tools dans la requête, ce signal n'a plus de sens
@@ -232,12 +271,18 @@ class OllamaProvider(BaseProvider):
                 # dernière valeur trouvée).
                 input_tokens: int | None = None
                 output_tokens: int | None = None
+                # prompt_eval_* ne couvre que la partie du prompt hors cache KV :
+                # un préfixe réutilisé (même modèle, même début de prompt) ne
+                # compte ni en tokens ni en durée.
+                prompt_eval_ms: float | None = None
                 async for line in response.aiter_lines():
                     if line:
                         try:
                             event = json.loads(line)
                             if (pe := event.get("prompt_eval_count")) is not None:
                                 input_tokens = pe
+                            if (ped := event.get("prompt_eval_duration")) is not None:
+                                prompt_eval_ms = ped / 1_000_000
                             if (ec := event.get("eval_count")) is not None:
                                 output_tokens = ec
                             # Vérifier si Ollama renvoie une erreur dans le flux
@@ -298,6 +343,7 @@ class OllamaProvider(BaseProvider):
                 stop_reason="tool_calls" if has_tool_calls else "end_turn",
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
+                prompt_eval_ms=prompt_eval_ms,
             )
 
         except httpx.ConnectError:
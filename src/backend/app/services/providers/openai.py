@@ -114,6 +114,8 @@ class OpenAIProvider(BaseProvider):
                 pending_stop_reason: str | None = None
                 input_tokens: int | None = None
                 output_tokens: int | None = None
+                # Prompt caching automatique (préfixes >= 1024 tokens)
+                cached_input_tokens: int | None = None
                 # Garde de robustesse : si la connexion se coupe après
                 # finish_reason mais avant [DONE]/le chunk usage, il faut
                 # quand même émettre "done" (sinon chat.py reste bloqué en
@@ -129,6 +131,7 @@ class OpenAIProvider(BaseProvider):
                                 stop_reason=pending_stop_reason or "stop",
                                 input_tokens=input_tokens,
                                 output_tokens=output_tokens,
+                                cached_input_tokens=cached_input_tokens,
                             )
                             done_emitted = True
                             break
@@ -137,6 +140,8 @@ class OpenAIProvider(BaseProvider):
                             if usage := event.get("usage"):
                                 input_tokens = usage.get("prompt_tokens", input_tokens)
                                 output_tokens = usage.get("completion_tokens", output_tokens)
+                                if (details := usage.get("prompt_tokens_details")) is not None:
+                                    cached_input_tokens = details.get("cached_tokens", cached_input_tokens)
                             choices = event.get("choices", [])
                             if choices:
                                 delta = choices[0].get("delta", {})
@@ -197,6 +202,7 @@ class OpenAIProvider(BaseProvider):
                     stop_reason=pending_stop_reason or "stop",
                     input_tokens=input_tokens,
                     output_tokens=output_tokens,
+                    cached_input_tokens=cached_input_tokens,
                 )
 
         except httpx.HTTPStatusError as e:
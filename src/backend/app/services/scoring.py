@@ -5,11 +5,13 @@ Système de scoring prospects/clients.
 Phase 5 - CRM Features
 """
 
+import json
 import logging
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 
-from app.models.entities import Activity, Contact
-from sqlalchemy import select
+from app.models.database import get_session_context
+from app.models.entities import Activity, Contact, Preference, generate_uuid
+from sqlalchemy import ColumnElement, Integer, case, cast, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -29,6 +31,13 @@ SCORING_RULES = {
     "decay_30days": -5,  # Si inactif 30 jours
 }
 
+# Inactivité comptée par tranches de 30 jours (decay_30days par tranche)
+DECAY_PERIOD_DAYS = 30
+# Contacts écrits par transaction lors d'un recalcul en masse
+SCORE_BATCH_SIZE = 1000
+# Date du dernier passage de decay (préférence)
+SCORING_LAST_DECAY_KEY = "scoring_last_decay_run"
+
 STAGE_SCORES = {
     "contact": 0,  # Nouveau lead, score de base
     "discovery": 10,  # Premier échange
@@ -80,14 +89,73 @@ def calculate_base_score(contact: Contact) -> int:
         if last.tzinfo is None:
             last = last.replace(tzinfo=UTC)
         days_inactive = (datetime.now(UTC) - last).days
-        if days_inactive >= 30:
+        if days_inactive >= DECAY_PERIOD_DAYS:
             # -5 points tous les 30 jours
-            decay_count = days_inactive // 30
+            decay_count = days_inactive // DECAY_PERIOD_DAYS
             score += SCORING_RULES["decay_30days"] * decay_count
 
     return max(0, score)  # Minimum 0
 
 
+# ============================================================
+# Scoring ensembliste (SQL)
+# ============================================================
+
+
+def _julian_day(moment: datetime) -> float:
+    """Jour julien d'un instant UTC, comparable à julianday() de SQLite."""
+    return moment.timestamp() / 86400 + 2440587.5
+
+
+def _filled(column) -> ColumnElement[bool]:
+    return func.coalesce(column, "") != ""
+
+
+def _decay_periods(at: datetime) -> ColumnElement[int]:
+    """Tranches de 30 jours d'inactivité à la date `at` (0 sans interaction)."""
+    days = cast(_julian_day(at) - func.julianday(Contact.last_interaction), Integer)
+    return case((days >= DECAY_PERIOD_DAYS, days // DECAY_PERIOD_DAYS), else_=0)
+
+
+def score_expression(at: datetime | None = None) -> ColumnElement[int]:
+    """
+    `calculate_base_score` exprimé en SQL (CASE par règle).
+
+    Permet de calculer le score de tous les contacts en une requête, sans
+    charger d'objets ORM.
+
+    Args:
+        at: Date de référence du decay (maintenant par défaut)
+    """
+    at = at or datetime.now(UTC)
+    sources = {
+        key.removeprefix("source_"): points
+        for key, points in SCORING_RULES.items()
+        if key.startswith("source_")
+    }
+    score = (
+        SCORING_RULES["base"]
+        + case((_filled(Contact.email), SCORING_RULES["email"]), else_=0)
+        + case((_filled(Contact.phone), SCORING_RULES["phone"]), else_=0)
+        + case((_filled(Contact.company), SCORING_RULES["company"]), else_=0)
+        + case(sources, value=func.lower(Contact.source), else_=0)
+        + case(STAGE_SCORES, value=Contact.stage, else_=0)
+        + SCORING_RULES["decay_30days"] * _decay_periods(at)
+    )
+    return func.max(score, 0)  # Minimum 0
+
+
+def _score_activity(contact_id: str, old_score: int, new_score: int, reason: str) -> dict:
+    """Champs de l'activité score_change."""
+    return {
+        "contact_id": contact_id,
+        "type": "score_change",
+        "title": f"Score: {old_score} → {new_score}",
+        "description": f"Raison: {reason}",
+        "extra_data": json.dumps({"old_score": old_score, "new_score": new_score, "reason": reason}),
+    }
+
+
 async def update_contact_score(session: AsyncSession, contact: Contact, reason: str = "recalculation") -> dict:
     """
     Met à jour le score d'un contact et crée une activité.
@@ -109,14 +177,7 @@ async def update_contact_score(session: AsyncSession, contact: Contact, reason:
         session.add(contact)
 
         # Créer une activité
-        activity = Activity(
-            contact_id=contact.id,
-            type="score_change",
-            title=f"Score: {old_score} → {new_score}",
-            description=f"Raison: {reason}",
-            extra_data=f'{{"old_score": {old_score}, "new_score": {new_score}, "reason": "{reason}"}}',
-        )
-        session.add(activity)
+        session.add(Activity(**_score_activity(contact.id, old_score, new_score, reason)))
 
         logger.info(f"Contact {contact.id} score updated: {old_score} → {new_score} ({reason})")
 
@@ -128,6 +189,51 @@ async def update_contact_score(session: AsyncSession, contact: Contact, reason:
     }
 
 
+async def _recalculate_scores(
+    session: AsyncSession,
+    reason: str,
+    *criteria: ColumnElement[bool],
+    at: datetime | None = None,
+    batch_size: int = SCORE_BATCH_SIZE,
+) -> tuple[int, int]:
+    """
+    Recalcule en SQL les scores des contacts filtrés par `criteria`.
+
+    Seuls les scores qui changent sont lus (id, ancien, nouveau) puis écrits
+    par lots : UPDATE groupé par clé primaire et activités insérées en un
+    executemany, un commit par lot.
+
+    Returns:
+        (contacts mis à jour, contacts examinés)
+    """
+    at = at or datetime.now(UTC)
+    new_score = score_expression(at)
+    examined = (await session.execute(
+        select(func.count()).select_from(Contact).where(*criteria)
+    )).scalar_one()
+    result = await session.execute(
+        select(Contact.id, Contact.score, new_score)
+        .where(Contact.score != new_score, *criteria)
+        .order_by(Contact.id)
+    )
+    changed = result.all()
+
+    now = datetime.now(UTC)
+    for start in range(0, len(changed), batch_size):
+        chunk = changed[start:start + batch_size]
+        await session.execute(update(Contact), [
+            {"id": contact_id, "score": score, "updated_at": now}
+            for contact_id, _, score in chunk
+        ])
+        await session.execute(insert(Activity), [
+            {"id": generate_uuid(), "created_at": now, **_score_activity(contact_id, old, score, reason)}
+            for contact_id, old, score in chunk
+        ])
+        await session.commit()
+
+    return len(changed), examined
+
+
 async def recalculate_all_scores(session: AsyncSession) -> int:
     """
     Recalcule tous les scores de tous les contacts.
@@ -140,19 +246,45 @@ async def recalculate_all_scores(session: AsyncSession) -> int:
     Returns:
         Nombre de contacts mis à jour
     """
-    statement = select(Contact)
-    result = await session.execute(statement)
-    contacts = result.scalars().all()
+    updated_count, total = await _recalculate_scores(session, "batch_recalculation")
+    logger.info(f"Recalculated scores for {updated_count}/{total} contacts")
+    return updated_count
 
-    updated_count = 0
 
-    for contact in contacts:
-        score_result = await update_contact_score(session, contact, reason="batch_recalculation")
-        if score_result["old_score"] != score_result["new_score"]:
-            updated_count += 1
+async def apply_score_decay(session: AsyncSession, at: datetime | None = None) -> int:
+    """
+    Applique le decay d'inactivité de façon incrémentale.
 
-    await session.commit()
+    Seuls les contacts qui ont franchi une tranche de 30 jours depuis le
+    passage précédent (date mémorisée en préférence) sont recalculés.
 
-    logger.info(f"Recalculated scores for {updated_count}/{len(contacts)} contacts")
+    Returns:
+        Nombre de contacts mis à jour
+    """
+    at = at or datetime.now(UTC)
+    result = await session.execute(select(Preference).where(Preference.key == SCORING_LAST_DECAY_KEY))
+    pref = result.scalar_one_or_none()
+
+    criteria = [
+        Contact.last_interaction.is_not(None),
+        Contact.last_interaction <= at - timedelta(days=DECAY_PERIOD_DAYS),
+    ]
+    if pref is not None:
+        criteria.append(_decay_periods(at) != _decay_periods(datetime.fromisoformat(pref.value)))
+    updated_count, examined = await _recalculate_scores(session, "decay_30days", *criteria, at=at)
+
+    if pref is None:
+        session.add(Preference(key=SCORING_LAST_DECAY_KEY, value=at.isoformat(), category="crm"))
+    else:
+        pref.value = at.isoformat()
+        pref.updated_at = datetime.now(UTC)
+    await session.commit()
 
+    logger.info(f"Score decay: {updated_count}/{examined} contacts updated")
     return updated_count
+
+
+async def run_score_decay() -> int:
+    """Passage de decay planifié (session dédiée)."""
+    async with get_session_context() as session:
+        return await apply_score_decay(session)
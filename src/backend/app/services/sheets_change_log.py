@@ -0,0 +1,148 @@
+"""
+THÉRÈSE v2 - Journal des modifications CRM à pousser vers Google Sheets
+
+Toute écriture locale sur un contact ou un projet (unité de travail ORM ou
+instruction groupée `insert`/`update`/`delete`) marque l'entité dans
+`sheet_changes`, tant qu'un spreadsheet CRM est configuré : sans cible, rien
+n'est journalisé (la première synchro complète fera l'état initial). Le journal est coalescé : une seule ligne par (onglet, ID),
+dont la version est incrémentée à chaque nouvelle modification. Le worker de
+push (`sheets_push`) le vide par lots.
+
+Les écritures faites par la synchro Sheets -> local ne doivent pas revenir
+vers Sheets : elles s'exécutent sous `suppress_change_log(session)`.
+"""
+
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+from app.models.entities import Contact, Preference, Project, SheetChange, generate_uuid
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Onglet Google Sheets de chaque entité poussée
+TRACKED_TABS: dict[type, str] = {Contact: "Clients", Project: "Projects"}
+
+_SUPPRESS_KEY = "sheets_change_log_suppressed"
+_LOGGED_KEY = "sheets_change_log_written"
+
+
+@contextmanager
+def suppress_change_log(session: AsyncSession | Session) -> Iterator[None]:
+    """N'enregistre pas les écritures de ce bloc (synchro Sheets -> local)."""
+    sync_session = session.sync_session if isinstance(session, AsyncSession) else session
+    sync_session.info[_SUPPRESS_KEY] = True
+    try:
+        yield
+    finally:
+        sync_session.info.pop(_SUPPRESS_KEY, None)
+
+
+def _sync_configured(session: Session) -> bool:
+    """Vrai si un spreadsheet CRM est configuré (lu dans la transaction en cours)."""
+    from app.services.crm_sync import CRM_SPREADSHEET_ID_KEY
+
+    spreadsheet_id = session.connection().execute(
+        select(Preference.value).where(Preference.key == CRM_SPREADSHEET_ID_KEY)
+    ).scalar_one_or_none()
+    return bool(spreadsheet_id)
+
+
+def _record(session: Session, changes: dict[tuple[str, str], str]) -> None:
+    """Upsert coalescé dans sheet_changes, sur la connexion de la transaction en cours."""
+    if not changes or not _sync_configured(session):
+        return
+    now = datetime.now(UTC)
+    table = SheetChange.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["tab", "row_id"],
+        set_={
+            "operation": statement.excluded.operation,
+            "status": "pending",
+            "version": table.c.version + 1,
+            "last_error": None,
+            "changed_at": statement.excluded.changed_at,
+        },
+    )
+    session.connection().execute(statement, [
+        {
+            "id": generate_uuid(),
+            "tab": tab,
+            "row_id": row_id,
+            "operation": operation,
+            "status": "pending",
+            "version": 1,
+            "changed_at": now,
+        }
+        for (tab, row_id), operation in changes.items()
+    ])
+    session.info[_LOGGED_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _log_unit_of_work(session: Session, flush_context) -> None:
+    if session.info.get(_SUPPRESS_KEY):
+        return
+    changes: dict[tuple[str, str], str] = {}
+    for instance in session.new:
+        tab = TRACKED_TABS.get(type(instance))
+        if tab:
+            changes[(tab, instance.id)] = "upsert"
+    for instance in session.dirty:
+        tab = TRACKED_TABS.get(type(instance))
+        if tab and session.is_modified(instance, include_collections=False):
+            changes[(tab, instance.id)] = "upsert"
+    for instance in session.deleted:
+        tab = TRACKED_TABS.get(type(instance))
+        if tab:
+            changes[(tab, instance.id)] = "delete"
+    _record(session, changes)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _log_bulk_statements(orm_execute_state) -> None:
+    """Instructions groupées (import CRM) : les IDs viennent des paramètres,
+    ou, pour un UPDATE/DELETE par critère, d'une lecture préalable des lignes
+    visées (même transaction, avant l'exécution)."""
+    if orm_execute_state.is_select or orm_execute_state.session.info.get(_SUPPRESS_KEY):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tab = TRACKED_TABS.get(mapper.class_) if mapper is not None else None
+    if tab is None:
+        return
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    operation = "delete" if orm_execute_state.is_delete else "upsert"
+    ids = [row["id"] for row in rows if isinstance(row, dict) and row.get("id")]
+    if not ids and (orm_execute_state.is_update or orm_execute_state.is_delete):
+        if not _sync_configured(orm_execute_state.session):
+            return
+        statement = orm_execute_state.statement
+        id_column = mapper.local_table.c.id
+        query = select(id_column)
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        ids = list(orm_execute_state.session.connection().execute(query).scalars())
+    if not ids:
+        logger.debug("Écriture groupée sans IDs sur %s : non journalisée pour Sheets", tab)
+        return
+    _record(orm_execute_state.session, {(tab, row_id): operation for row_id in ids})
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_push_worker(session: Session) -> None:
+    if session.info.pop(_LOGGED_KEY, False):
+        from app.services.sheets_push import get_sheets_push_worker
+
+        get_sheets_push_worker().wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_LOGGED_KEY, None)
@@ -0,0 +1,433 @@
+"""
+THÉRÈSE v2 - Push des modifications CRM locales vers Google Sheets
+
+Les contacts et projets modifiés en local sont journalisés dans
+`sheet_changes` (voir `sheets_change_log`). Le push les vide par lots :
+
+- une seule lecture `values:batchGet` des onglets Clients et Projects donne
+  le numéro de ligne de chaque ID et l'état actuel de la feuille ;
+- une ligne modifiée dans la feuille depuis la dernière synchro (empreinte
+  différente de `sheet_row_fingerprints`) est marquée « conflict » au lieu
+  d'être écrasée : la prochaine synchro Sheets -> local tranche (la feuille
+  reste la source maître) ;
+- les lignes existantes partent dans des `values:batchUpdate` (jusqu'à
+  `MAX_RANGES_PER_REQUEST` plages par requête), les nouvelles dans un seul
+  `append` par onglet, les suppressions vident la ligne ;
+- l'empreinte des lignes écrites est mémorisée : la synchro suivante les
+  voit inchangées et ne les réécrit pas en local.
+
+Le débit est borné par les seaux à jetons de `sheets_service`. Le worker
+`SheetsPushWorker` regroupe les écritures rapprochées (`PUSH_DEBOUNCE`).
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from app.models.database import get_session_context
+from app.models.entities import Contact, Project, SheetChange, SheetRowFingerprint, generate_uuid
+from app.services.crm_sync import (
+    _IN_CHUNK_SIZE,
+    CRM_SHEET_STRUCTURE,
+    ensure_valid_crm_token,
+    get_crm_config,
+    row_fingerprint,
+)
+from app.services.crm_utils import sanitize_row
+from app.services.sheets_change_log import TRACKED_TABS
+from app.services.sheets_service import GoogleSheetsService
+from sqlalchemy import bindparam, delete, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel, select
+
+logger = logging.getLogger(__name__)
+
+# Plafond de plages par values:batchUpdate (la requête reste sous quelques Mo)
+MAX_RANGES_PER_REQUEST = 500
+# Délai de regroupement après une écriture locale
+PUSH_DEBOUNCE = 5.0
+# Passage de secours (changements restés en file après une erreur réseau)
+PUSH_INTERVAL = 300.0
+
+_HEADERS = {tab["title"]: tab["headers"] for tab in CRM_SHEET_STRUCTURE}
+_MODELS = {tab: model for model, tab in TRACKED_TABS.items()}
+
+
+@dataclass
+class PushStats:
+    """Bilan d'un push local -> Sheets."""
+
+    updated: int = 0
+    appended: int = 0
+    deleted: int = 0
+    conflicts: int = 0
+    requests: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "updated": self.updated,
+            "appended": self.appended,
+            "deleted": self.deleted,
+            "conflicts": self.conflicts,
+            "requests": self.requests,
+            "errors": self.errors,
+            "total_pushed": self.updated + self.appended + self.deleted,
+        }
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _contact_cells(contact: Contact) -> dict[str, str]:
+    tags = ""
+    if contact.tags:
+        try:
+            tags = ", ".join(json.loads(contact.tags))
+        except (ValueError, TypeError):
+            tags = contact.tags
+    name = " ".join(part for part in (contact.first_name, contact.last_name) if part)
+    return {
+        "ID": contact.id,
+        "Nom": name,
+        "Entreprise": _cell(contact.company),
+        "Email": _cell(contact.email),
+        "Tel": _cell(contact.phone),
+        "Source": _cell(contact.source),
+        "Stage": _cell(contact.stage),
+        "Score": _cell(contact.score),
+        "Tags": tags,
+        "LastInteraction": _cell(contact.last_interaction),
+        "Notes": _cell(contact.notes),
+    }
+
+
+def _project_cells(project: Project) -> dict[str, str]:
+    return {
+        "ID": project.id,
+        "ClientID": _cell(project.contact_id),
+        "Name": _cell(project.name),
+        "Description": _cell(project.description),
+        "Status": _cell(project.status),
+        "Budget": _cell(project.budget),
+        "Notes": _cell(project.notes),
+    }
+
+
+_CELLS = {"Clients": _contact_cells, "Projects": _project_cells}
+
+
+def _quoted(tab: str) -> str:
+    return "'" + tab.replace("'", "''") + "'"
+
+
+@dataclass
+class _TabState:
+    """Onglet tel que lu dans la feuille : en-têtes, lignes, n° de ligne par ID."""
+
+    headers: list[str]
+    rows: dict[str, list[str]]
+    row_numbers: dict[str, int]
+
+    @classmethod
+    def from_values(cls, tab: str, values: list[list[str]]) -> "_TabState":
+        headers = list(values[0]) if values and values[0] else list(_HEADERS[tab])
+        rows: dict[str, list[str]] = {}
+        row_numbers: dict[str, int] = {}
+        for number, cells in enumerate(values[1:], start=2):
+            row_id = (cells[0] if cells else "").strip()
+            if row_id and row_id not in row_numbers:
+                rows[row_id] = list(cells)
+                row_numbers[row_id] = number
+        return cls(headers, rows, row_numbers)
+
+    def as_dict(self, cells: list[str]) -> dict:
+        return sanitize_row({
+            header: cells[index] if index < len(cells) else ""
+            for index, header in enumerate(self.headers)
+        })
+
+
+async def _load_by_ids(session: AsyncSession, model: type[SQLModel], ids: list[str]) -> dict:
+    entities: dict = {}
+    for start in range(0, len(ids), _IN_CHUNK_SIZE):
+        result = await session.execute(
+            select(model).where(model.id.in_(ids[start:start + _IN_CHUNK_SIZE]))
+        )
+        entities.update((entity.id, entity) for entity in result.scalars().all())
+    return entities
+
+
+async def _load_fingerprints(session: AsyncSession, tab: str, ids: list[str]) -> dict[str, str]:
+    stored: dict[str, str] = {}
+    for start in range(0, len(ids), _IN_CHUNK_SIZE):
+        result = await session.execute(
+            select(SheetRowFingerprint.row_id, SheetRowFingerprint.fingerprint).where(
+                SheetRowFingerprint.tab == tab,
+                SheetRowFingerprint.row_id.in_(ids[start:start + _IN_CHUNK_SIZE]),
+            )
+        )
+        stored.update(result.all())
+    return stored
+
+
+async def push_changes(
+    session: AsyncSession,
+    sheets: GoogleSheetsService,
+    spreadsheet_id: str,
+    max_ranges: int = MAX_RANGES_PER_REQUEST,
+) -> PushStats:
+    """
+    Pousse les modifications locales en attente vers la feuille CRM.
+
+    Args:
+        session: Session de base de données (commitée en fin de push)
+        sheets: Service Google Sheets authentifié
+        spreadsheet_id: ID de la feuille CRM
+        max_ranges: Plages par requête values:batchUpdate
+
+    Returns:
+        PushStats (lignes écrites, conflits, requêtes émises)
+    """
+    stats = PushStats()
+    result = await session.execute(select(SheetChange).where(SheetChange.status == "pending"))
+    changes = list(result.scalars().all())
+    if not changes:
+        return stats
+    # Instantané des versions : une modification arrivée pendant le push
+    # incrémente la version et garde la ligne en file
+    snapshot = {change.id: change.version for change in changes}
+
+    tabs = list(_CELLS)
+    try:
+        values = await sheets.batch_get_values(spreadsheet_id, [_quoted(tab) for tab in tabs])
+        stats.requests += 1
+    except Exception as e:
+        logger.error(f"Push Sheets : lecture de la feuille impossible : {e}")
+        stats.errors.append(str(e))
+        await _keep_pending(session, snapshot, str(e))
+        return stats
+    states = {
+        tab: _TabState.from_values(tab, values.get(_quoted(tab), []))
+        for tab in tabs
+    }
+
+    contact_ids = set((await session.execute(select(Contact.id))).scalars().all())
+    updates: list[dict] = []
+    appends: dict[str, list[list[str]]] = {tab: [] for tab in tabs}
+    pushed: dict[str, dict[str, str | None]] = {tab: {} for tab in tabs}
+    conflicts: dict[str, str] = {}
+    done: list[str] = []
+
+    for tab in tabs:
+        tab_changes = [change for change in changes if change.tab == tab]
+        if not tab_changes:
+            continue
+        state = states[tab]
+        ids = [change.row_id for change in tab_changes]
+        stored = await _load_fingerprints(session, tab, ids)
+        entities = await _load_by_ids(session, _MODELS[tab], ids)
+
+        for change in tab_changes:
+            number = state.row_numbers.get(change.row_id)
+            entity = entities.get(change.row_id)
+            if number is not None:
+                current = state.as_dict(state.rows[change.row_id])
+                client_id = (current.get("ClientID") or "").strip()
+                extra = (client_id if client_id in contact_ids else None,) if tab == "Projects" else ()
+                if stored.get(change.row_id) != row_fingerprint(current, *extra):
+                    conflicts[change.id] = "Ligne modifiée dans Google Sheets depuis la dernière synchro"
+                    continue
+
+            if change.operation == "delete" or entity is None:
+                if number is not None:
+                    updates.append({
+                        "range": f"{_quoted(tab)}!A{number}",
+                        "values": [[""] * len(state.headers)],
+                    })
+                    pushed[tab][change.row_id] = None
+                    stats.deleted += 1
+                done.append(change.id)
+                continue
+
+            by_header = _CELLS[tab](entity)
+            cells = [by_header.get(header, "") for header in state.headers]
+            extra = (entity.contact_id if entity.contact_id in contact_ids else None,) if tab == "Projects" else ()
+            pushed[tab][change.row_id] = row_fingerprint(state.as_dict(cells), *extra)
+            if number is not None:
+                updates.append({"range": f"{_quoted(tab)}!A{number}", "values": [cells]})
+                stats.updated += 1
+            else:
+                appends[tab].append(cells)
+                stats.appended += 1
+            done.append(change.id)
+
+    try:
+        for start in range(0, len(updates), max_ranges):
+            await sheets.batch_update_values(spreadsheet_id, updates[start:start + max_ranges])
+            stats.requests += 1
+        for tab, rows in appends.items():
+            if rows:
+                await sheets.append_rows(spreadsheet_id, _quoted(tab), rows)
+                stats.requests += 1
+    except Exception as e:
+        # Écritures partielles possibles : tout reste en file, le prochain
+        # passage relit la feuille et réécrit des valeurs identiques
+        logger.error(f"Push Sheets : écriture interrompue : {e}")
+        stats.errors.append(str(e))
+        stats.updated = stats.appended = stats.deleted = 0
+        await _keep_pending(session, snapshot, str(e))
+        return stats
+
+    now = datetime.now(UTC)
+    for tab, fingerprints in pushed.items():
+        written = {row_id: fp for row_id, fp in fingerprints.items() if fp is not None}
+        if written:
+            statement = sqlite_insert(SheetRowFingerprint)
+            statement = statement.on_conflict_do_update(
+                index_elements=["tab", "row_id"],
+                set_={
+                    "fingerprint": statement.excluded.fingerprint,
+                    "synced_at": statement.excluded.synced_at,
+                },
+            )
+            await session.execute(statement, [
+                {"id": generate_uuid(), "tab": tab, "row_id": row_id, "fingerprint": fp, "synced_at": now}
+                for row_id, fp in written.items()
+            ])
+        blanked = [row_id for row_id, fp in fingerprints.items() if fp is None]
+        for start in range(0, len(blanked), _IN_CHUNK_SIZE):
+            await session.execute(
+                delete(SheetRowFingerprint).where(
+                    SheetRowFingerprint.tab == tab,
+                    SheetRowFingerprint.row_id.in_(blanked[start:start + _IN_CHUNK_SIZE]),
+                )
+            )
+
+    table = SheetChange.__table__
+    if done:
+        await session.execute(
+            delete(table).where(
+                table.c.id == bindparam("change_id"),
+                table.c.version == bindparam("expected"),
+            ),
+            [{"change_id": change_id, "expected": snapshot[change_id]} for change_id in done],
+        )
+    if conflicts:
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("change_id"), table.c.version == bindparam("expected"))
+            .values(status="conflict", last_error=bindparam("error")),
+            [
+                {"change_id": change_id, "expected": snapshot[change_id], "error": error}
+                for change_id, error in conflicts.items()
+            ],
+        )
+    stats.conflicts = len(conflicts)
+    await session.commit()
+
+    logger.info(f"Push Sheets : {stats.to_dict()}")
+    return stats
+
+
+async def _keep_pending(session: AsyncSession, snapshot: dict[str, int], error: str) -> None:
+    table = SheetChange.__table__
+    await session.execute(
+        update(table)
+        .where(table.c.id == bindparam("change_id"))
+        .values(last_error=error[:1000]),
+        [{"change_id": change_id} for change_id in snapshot],
+    )
+    await session.commit()
+
+
+# ============================================================
+# Worker de fond
+# ============================================================
+
+
+class SheetsPushWorker:
+    """Pousse le journal vers Sheets peu après chaque écriture locale."""
+
+    def __init__(self, debounce: float = PUSH_DEBOUNCE, interval: float = PUSH_INTERVAL):
+        self.debounce = debounce
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake_event: asyncio.Event | None = None
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Push CRM -> Google Sheets démarré")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        self._wake_event = None
+
+    def wake(self) -> None:
+        """Signale des modifications journalisées (appelable depuis n'importe quel thread)."""
+        if self._loop is not None and self._wake_event is not None:
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.interval)
+                # Regroupe les écritures rapprochées en un seul push
+                await asyncio.sleep(self.debounce)
+            except TimeoutError:
+                pass
+            self._wake_event.clear()
+            try:
+                await self.push_once()
+            except Exception as e:
+                logger.error(f"Push CRM -> Google Sheets : erreur du worker : {e}")
+
+    async def push_once(self) -> PushStats | None:
+        """Un passage complet ; None si la synchro CRM n'est pas configurée."""
+        async with get_session_context() as session:
+            config = await get_crm_config(session)
+            if not config["spreadsheet_id"]:
+                # Plus de cible (déconnexion) : le journal n'a plus d'objet
+                await session.execute(delete(SheetChange))
+                return None
+            if not config["configured"]:
+                return None
+            access_token = await ensure_valid_crm_token(session)
+            if not access_token:
+                return None
+            sheets = GoogleSheetsService(access_token=access_token)
+            return await push_changes(session, sheets, config["spreadsheet_id"])
+
+
+_worker: SheetsPushWorker | None = None
+
+
+def get_sheets_push_worker() -> SheetsPushWorker:
+    """Worker de push global (singleton du process)."""
+    global _worker
+    if _worker is None:
+        _worker = SheetsPushWorker()
+    return _worker
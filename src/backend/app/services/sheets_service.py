@@ -5,7 +5,9 @@ Client for Google Sheets API operations.
 Used for CRM sync from Google Sheets.
 """
 
+import asyncio
 import logging
+import time
 
 import httpx
 from app.services.http_client import get_http_client
@@ -21,6 +23,46 @@ logger = logging.getLogger(__name__)
 
 SHEETS_API_BASE = "https://sheets.googleapis.com/v4/spreadsheets"
 
+# Quota Google Sheets : 60 lectures et 60 écritures par minute et par utilisateur
+SHEETS_REQUESTS_PER_MINUTE = 60
+
+
+# ============================================================
+# Quota (token bucket)
+# ============================================================
+
+
+class TokenBucket:
+    """
+    Seau à jetons : `rate` requêtes/s en régime établi, rafales jusqu'à `capacity`.
+
+    `acquire()` attend le prochain jeton au lieu de laisser l'API répondre 429.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+_read_quota = TokenBucket(SHEETS_REQUESTS_PER_MINUTE / 60, SHEETS_REQUESTS_PER_MINUTE)
+_write_quota = TokenBucket(SHEETS_REQUESTS_PER_MINUTE / 60, SHEETS_REQUESTS_PER_MINUTE)
+
 
 # ============================================================
 # Google Sheets Service
@@ -71,6 +113,8 @@ class GoogleSheetsService:
         if self.api_key and not self.access_token:
             params['key'] = self.api_key
 
+        await (_read_quota if method == "GET" else _write_quota).acquire()
+
         client = await get_http_client()
         try:
             kwargs: dict = {
@@ -97,6 +141,13 @@ class GoogleSheetsService:
                     detail="Permission denied. Make sure the spreadsheet is shared with your Google account."
                 )
 
+            if response.status_code == 429:
+                logger.error("Sheets API: quota exceeded")
+                raise HTTPException(
+                    status_code=429,
+                    detail="Google Sheets quota exceeded. Retry in a minute."
+                )
+
             if response.status_code == 404:
                 logger.error("Sheets API: Spreadsheet not found")
                 raise HTTPException(
@@ -268,3 +319,63 @@ class GoogleSheetsService:
             params={"valueInputOption": "USER_ENTERED", "insertDataOption": "INSERT_ROWS"},
             json_body=body,
         )
+
+    async def append_rows(
+        self,
+        spreadsheet_id: str,
+        sheet_name: str,
+        rows: list[list[str]],
+    ) -> dict:
+        """
+        Ajoute plusieurs lignes en une requête, après la dernière ligne remplie.
+
+        Les valeurs sont écrites telles quelles (RAW) : relues, elles donnent
+        les mêmes chaînes, donc la même empreinte de ligne.
+        """
+        endpoint = f"{spreadsheet_id}/values/{sheet_name}:append"
+        return await self._request(
+            "POST",
+            endpoint,
+            params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            json_body={"values": rows},
+        )
+
+    async def batch_get_values(
+        self,
+        spreadsheet_id: str,
+        ranges: list[str],
+    ) -> dict[str, list[list[str]]]:
+        """
+        Lit plusieurs plages (ex. onglets entiers) en une requête values:batchGet.
+
+        Returns:
+            Dict plage demandée -> lignes (listes de cellules)
+        """
+        result = await self._request(
+            "GET",
+            f"{spreadsheet_id}/values:batchGet",
+            params={"ranges": ranges},
+        )
+        value_ranges = result.get("valueRanges", [])
+        return {
+            requested: value_range.get("values", [])
+            for requested, value_range in zip(ranges, value_ranges, strict=False)
+        }
+
+    async def batch_update_values(
+        self,
+        spreadsheet_id: str,
+        data: list[dict],
+    ) -> dict:
+        """
+        Écrit plusieurs plages en une requête values:batchUpdate.
+
+        Args:
+            spreadsheet_id: The spreadsheet ID
+            data: Liste de {"range": "Onglet!A5", "values": [[...]]}
+        """
+        return await self._request(
+            "POST",
+            f"{spreadsheet_id}/values:batchUpdate",
+            json_body={"valueInputOption": "RAW", "data": data},
+        )
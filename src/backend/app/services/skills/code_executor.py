@@ -11,16 +11,24 @@ import logging
 import multiprocessing
 import queue
 import re
+import threading
 from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from app.config import settings
 from app.services.skills.base import BaseSkill, SkillParams, SkillResult
 
 logger = logging.getLogger(__name__)
 
 # Timeout d'exécution en secondes
 EXECUTION_TIMEOUT = 30
+# Délai maximal de démarrage d'un worker du sandbox (interpréteur + imports Office)
+WORKER_STARTUP_TIMEOUT = 60
+# Formats dont le worker pré-charge les bibliothèques et le namespace
+PRELOADED_FORMATS = ("xlsx", "docx", "pptx")
 
 # Palette Synoptia pour injection dans le namespace
 SYNOPTIA_COLORS = {
@@ -678,16 +686,28 @@ def _run_generation_in_subprocess(
     format_type: str,
     nb_slides: int,
     result_queue: Any,
+    namespace: dict[str, Any] | None = None,
 ) -> None:
-    """Cible du sous-process spawn (US-001).
+    """Exécution du code généré dans le sous-process spawn (US-001).
 
     Exécutée dans un interpréteur frais qui n'hérite pas de la mémoire du
     backend (token de session, clé Fernet) : une évasion éventuelle du
     namespace restreint ne donne donc pas accès aux secrets du process
     principal. Le résultat (ok / error) est remonté via la queue.
+
+    `namespace` : namespace pré-construit par le worker (`_sandbox_worker`),
+    complété ici avec les variables du job.
     """
     try:
-        namespace = _build_namespace(output_path, title, format_type, nb_slides)
+        if namespace is None:
+            namespace = _build_namespace(output_path, title, format_type, nb_slides)
+        else:
+            namespace.update(
+                output_path=output_path,
+                title=title,
+                nb_slides=nb_slides,
+                SYNOPTIA_COLORS=SYNOPTIA_COLORS.copy(),
+            )
         compiled = compile(code, "<llm_generated>", "exec")
         exec(compiled, namespace)  # noqa: S102
         result_queue.put(("ok", ""))
@@ -695,6 +715,137 @@ def _run_generation_in_subprocess(
         result_queue.put(("error", f"{type(e).__name__}: {e}"))
 
 
+def _sandbox_worker(job_queue: Any, result_queue: Any) -> None:
+    """Cible des processus spawn du pool de sandbox.
+
+    Le worker démarre AVANT qu'on ait besoin de lui : il importe
+    openpyxl / python-docx / python-pptx et construit le namespace de chaque
+    format, signale « ready », puis exécute UN SEUL job et se termine. Aucun
+    état ne survit d'une génération à l'autre.
+    """
+    namespaces: dict[str, dict[str, Any]] = {}
+    for format_type in PRELOADED_FORMATS:
+        try:
+            namespaces[format_type] = _build_namespace("", "", format_type)
+        except ImportError:
+            pass  # bibliothèque absente : namespace construit au moment du job
+    result_queue.put(("ready", ""))
+
+    code, output_path, title, format_type, nb_slides = job_queue.get()
+    _run_generation_in_subprocess(
+        code, output_path, title, format_type, nb_slides, result_queue,
+        namespace=namespaces.get(format_type),
+    )
+
+
+@dataclass
+class _SandboxWorker:
+    process: Any
+    jobs: Any
+    results: Any
+    ready: bool = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready:
+            try:
+                status, _ = self.results.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            self.ready = status == "ready"
+        return self.ready
+
+    def stop(self) -> None:
+        self.jobs.cancel_join_thread()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(5)
+
+
+class SandboxPool:
+    """Workers de sandbox pré-démarrés, à usage unique.
+
+    Chaque génération prend un worker déjà chaud (interpréteur lancé,
+    bibliothèques Office importées) au lieu de payer le spawn et les imports ;
+    un remplaçant est lancé aussitôt. Un worker n'exécute qu'un job : même
+    isolation qu'un process spawn dédié (US-001).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: deque[_SandboxWorker] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _spawn(self) -> _SandboxWorker:
+        ctx = multiprocessing.get_context("spawn")
+        jobs: Any = ctx.Queue()
+        results: Any = ctx.Queue()
+        process = ctx.Process(target=_sandbox_worker, args=(jobs, results), daemon=True)
+        process.start()
+        return _SandboxWorker(process, jobs, results)
+
+    def warm(self) -> None:
+        """Complète le pool jusqu'à `size` workers en attente."""
+        with self._lock:
+            self._idle = deque(worker for worker in self._idle if worker.process.is_alive())
+            missing = 0 if self._closed else self.size - len(self._idle)
+            for _ in range(missing):
+                self._idle.append(self._spawn())
+
+    def _acquire(self) -> _SandboxWorker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.popleft()
+                if worker.process.is_alive():
+                    return worker
+                worker.stop()
+        return self._spawn()
+
+    def run(self, job: tuple[str, str, str, str, int]) -> tuple[str, str]:
+        """Exécute `job` dans un worker ; bloquant (à appeler via to_thread)."""
+        worker = self._acquire()
+        try:
+            if not worker.wait_ready(WORKER_STARTUP_TIMEOUT):
+                return "error", "le worker du sandbox n'a pas démarré"
+            worker.jobs.put(job)
+            self.warm()
+            try:
+                return worker.results.get(timeout=EXECUTION_TIMEOUT)
+            except queue.Empty:
+                return "timeout", ""
+        finally:
+            worker.stop()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for worker in idle:
+            worker.stop()
+
+
+_sandbox_pool: SandboxPool | None = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Pool de sandbox partagé (`settings.code_sandbox_workers` workers en attente)."""
+    global _sandbox_pool  # noqa: PLW0603
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool(settings.code_sandbox_workers)
+        return _sandbox_pool
+
+
+def close_sandbox_pool() -> None:
+    """Arrête les workers en attente (shutdown du backend)."""
+    global _sandbox_pool  # noqa: PLW0603
+    with _sandbox_pool_lock:
+        pool, _sandbox_pool = _sandbox_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
 async def execute_sandboxed(
     code: str,
     output_path: str,
@@ -724,30 +875,12 @@ async def execute_sandboxed(
     if not is_valid_imports:
         raise CodeExecutionError(f"Validation imports échouée : {import_error}")
 
-    # 3. Exécuter dans un sous-process spawn isolé (US-001).
+    # 3. Exécuter dans un sous-process spawn isolé (US-001), pris dans le pool
+    # de workers pré-chauffés et jeté après usage.
     # spawn => interpréteur neuf sans la mémoire du backend ; combiné au blocage
     # des dunders, une évasion ne peut pas atteindre les secrets du process.
-    ctx = multiprocessing.get_context("spawn")
-    result_queue: Any = ctx.Queue()
-    process = ctx.Process(
-        target=_run_generation_in_subprocess,
-        args=(code, output_path, title, format_type, nb_slides, result_queue),
-        daemon=True,
-    )
-
-    def _run_and_wait() -> tuple[str, str]:
-        process.start()
-        try:
-            status, detail = result_queue.get(timeout=EXECUTION_TIMEOUT)
-        except queue.Empty:
-            status, detail = "timeout", ""
-        finally:
-            if process.is_alive():
-                process.terminate()
-            process.join(5)
-        return status, detail
-
-    status, detail = await asyncio.to_thread(_run_and_wait)
+    job = (code, output_path, title, format_type, nb_slides)
+    status, detail = await asyncio.to_thread(get_sandbox_pool().run, job)
 
     if status == "timeout":
         raise CodeExecutionError(
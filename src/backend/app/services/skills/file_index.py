@@ -0,0 +1,154 @@
+"""
+THÉRÈSE v2 - Index des fichiers générés par les skills
+
+Chaque document produit par un skill est enregistré dans la table
+`generated_files` : les liens /api/skills/download/{file_id} restent valides
+après un redémarrage du backend. Le répertoire de sortie est borné
+(`settings.skills_output_max_mb`) : au-delà, les fichiers les moins
+récemment téléchargés sont supprimés (LRU).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from app.config import settings
+from app.models.database import get_session_context
+from app.models.entities import GeneratedFile
+from app.services.skills.base import FileFormat, SkillResult
+from sqlalchemy import delete, select, update
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _StoredFile:
+    path: Path
+    size: int
+    last_used: datetime
+    file_id: str | None  # None : fichier antérieur à l'index
+
+
+def _sha256(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _scan_output_dir(output_dir: Path) -> dict[str, os.stat_result]:
+    """Fichiers du répertoire de sortie (hors dossiers et fichiers cachés)."""
+    with os.scandir(output_dir) as entries:
+        return {
+            os.path.normpath(entry.path): entry.stat()
+            for entry in entries
+            if entry.is_file() and not entry.name.startswith(".")
+        }
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def _to_result(row: GeneratedFile) -> SkillResult:
+    return SkillResult(
+        file_id=row.id,
+        file_path=Path(row.file_path),
+        file_name=row.file_name,
+        file_size=row.file_size,
+        mime_type=row.mime_type,
+        format=FileFormat(row.format),
+        created_at=_as_utc(row.created_at),
+    )
+
+
+async def record_file(result: SkillResult, skill_id: str, output_dir: Path) -> None:
+    """Indexe un fichier généré puis fait respecter le quota du répertoire."""
+    sha256 = await asyncio.to_thread(_sha256, result.file_path)
+    async with get_session_context() as session:
+        await session.merge(GeneratedFile(
+            id=result.file_id,
+            skill_id=skill_id,
+            file_path=str(result.file_path),
+            file_name=result.file_name,
+            mime_type=result.mime_type,
+            format=result.format.value,
+            file_size=result.file_size,
+            sha256=sha256,
+            created_at=result.created_at,
+            last_accessed_at=result.created_at,
+        ))
+    await enforce_output_quota(output_dir, settings.skills_output_max_mb * 1024 * 1024, keep=result.file_path)
+
+
+async def get_generated_file(file_id: str) -> SkillResult | None:
+    """Fichier indexé (et marqué comme utilisé), ou None s'il a disparu du disque."""
+    async with get_session_context() as session:
+        row = await session.get(GeneratedFile, file_id)
+        if row is None:
+            return None
+        if not Path(row.file_path).is_file():
+            await session.delete(row)
+            return None
+        await session.execute(
+            update(GeneratedFile)
+            .where(GeneratedFile.id == file_id)
+            .values(last_accessed_at=datetime.now(UTC))
+        )
+        return _to_result(row)
+
+
+async def enforce_output_quota(output_dir: Path, max_bytes: int, keep: Path | None = None) -> int:
+    """Supprime les fichiers les moins récemment utilisés au-delà de `max_bytes`.
+
+    Les fichiers antérieurs à l'index comptent dans le quota (date de
+    modification comme dernier usage) ; les lignes dont le fichier a disparu
+    sont purgées. Retourne le nombre de fichiers supprimés.
+    """
+    on_disk = await asyncio.to_thread(_scan_output_dir, output_dir)
+    async with get_session_context() as session:
+        rows = (await session.execute(
+            select(GeneratedFile.id, GeneratedFile.file_path, GeneratedFile.last_accessed_at)
+        )).all()
+        indexed = {
+            os.path.normpath(file_path): (file_id, last_used) for file_id, file_path, last_used in rows
+        }
+        missing = [
+            file_id for path, (file_id, _) in indexed.items()
+            if path not in on_disk and not os.path.isfile(path)
+        ]
+
+        stored = [
+            _StoredFile(Path(path), stat.st_size, _as_utc(indexed[path][1]), indexed[path][0])
+            if path in indexed
+            else _StoredFile(Path(path), stat.st_size, datetime.fromtimestamp(stat.st_mtime, UTC), None)
+            for path, stat in on_disk.items()
+        ]
+        total = sum(item.size for item in stored)
+        evicted: list[_StoredFile] = []
+        for item in sorted(stored, key=lambda item: item.last_used):
+            if total <= max_bytes:
+                break
+            if keep is not None and item.path == keep:
+                continue
+            evicted.append(item)
+            total -= item.size
+
+        await asyncio.to_thread(_unlink_all, [item.path for item in evicted])
+        stale = missing + [item.file_id for item in evicted if item.file_id]
+        if stale:
+            await session.execute(delete(GeneratedFile).where(GeneratedFile.id.in_(stale)))
+
+    if evicted:
+        logger.info(
+            "Répertoire des documents générés au-delà du quota : %d fichier(s) supprimé(s)",
+            len(evicted),
+        )
+    return len(evicted)
+
+
+def _unlink_all(paths: list[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
@@ -16,6 +16,8 @@ from app.services.skills.base import (
     SkillParams,
     SkillResult,
 )
+from app.services.skills.code_executor import close_sandbox_pool, get_sandbox_pool
+from app.services.skills.file_index import get_generated_file, record_file
 
 logger = logging.getLogger(__name__)
 
@@ -154,8 +156,11 @@ class SkillsRegistry:
             # Construire l'URL de téléchargement
             download_url = f"/api/skills/download/{result.file_id}"
 
-            # Enregistrer le fichier dans le cache pour téléchargement
-            self._file_cache[result.file_id] = result
+            # Indexer le fichier (lien valable après redémarrage, quota LRU)
+            try:
+                await record_file(result, skill_id, self._output_dir)
+            except Exception as e:
+                logger.warning(f"Indexation du fichier {result.file_id} impossible : {e}")
 
             return SkillExecuteResponse(
                 success=True,
@@ -174,9 +179,9 @@ class SkillsRegistry:
                 error=str(e),
             )
 
-    def get_file(self, file_id: str) -> SkillResult | None:
+    async def get_file(self, file_id: str) -> SkillResult | None:
         """
-        Récupère les informations d'un fichier généré.
+        Récupère les informations d'un fichier généré (index persistant).
 
         Args:
             file_id: Identifiant du fichier
@@ -184,7 +189,7 @@ class SkillsRegistry:
         Returns:
             Résultat du skill ou None
         """
-        return self._file_cache.get(file_id)
+        return await get_generated_file(file_id)
 
     def _extract_title_from_content(self, llm_content: str) -> str | None:
         """
@@ -333,13 +338,6 @@ class SkillsRegistry:
         fallback = first_line.strip()[:50]
         return fallback if fallback else "Document"
 
-    @property
-    def _file_cache(self) -> dict[str, SkillResult]:
-        """Cache des fichiers générés (simple en mémoire pour le MVP)."""
-        if not hasattr(self, "_cached_files"):
-            self._cached_files: dict[str, SkillResult] = {}
-        return self._cached_files
-
     @property
     def output_dir(self) -> Path:
         """Répertoire de sortie des fichiers."""
@@ -422,9 +420,13 @@ async def init_skills() -> None:
 
     logger.info(f"Initialized {len(registry.list_skills())} skills")
 
+    # Workers du sandbox pré-chauffés pour la première génération Office
+    get_sandbox_pool().warm()
+
 
 async def close_skills() -> None:
     """Ferme proprement le système de skills."""
     global _registry
     _registry = None
+    close_sandbox_pool()
     logger.info("Skills system closed")
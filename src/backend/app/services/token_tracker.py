@@ -17,10 +17,11 @@ logger = logging.getLogger(__name__)
 # ============================================================
 
 TOKEN_PRICES = {
-    # Anthropic (juin 2026) - USD / 1M tokens
-    "claude-opus-4-8": {"input": 5.00, "output": 25.00},
-    "claude-sonnet-4-6": {"input": 3.00, "output": 15.00},
-    "claude-haiku-4-5-20251001": {"input": 1.00, "output": 5.00},
+    # Anthropic (juin 2026) - USD / 1M tokens. Prompt caching : lecture à
+    # 0,1x l'entrée, écriture (cache 5 min) à 1,25x.
+    "claude-opus-4-8": {"input": 5.00, "output": 25.00, "cache_read": 0.50, "cache_write": 6.25},
+    "claude-sonnet-4-6": {"input": 3.00, "output": 15.00, "cache_read": 0.30, "cache_write": 3.75},
+    "claude-haiku-4-5-20251001": {"input": 1.00, "output": 5.00, "cache_read": 0.10, "cache_write": 1.25},
     # OpenAI (juin 2026)
     "gpt-5.5": {"input": 5.00, "output": 30.00},
     "gpt-5.5-pro": {"input": 30.00, "output": 180.00},
@@ -204,10 +205,17 @@ class TokenTracker:
         model: str,
         input_tokens: int,
         output_tokens: int,
+        cached_input_tokens: int = 0,
+        cache_creation_input_tokens: int = 0,
     ) -> float:
         """
         Estimate cost for a request (US-ESC-02).
 
+        `input_tokens` couvre tout le prompt, y compris les tokens lus depuis le
+        cache du provider (`cached_input_tokens`) ou écrits dedans
+        (`cache_creation_input_tokens`) : ceux-là sont facturés au tarif
+        "cache_read"/"cache_write" du modèle, au tarif d'entrée à défaut.
+
         Returns cost in EUR.
         """
         prices = TOKEN_PRICES.get(model)
@@ -216,7 +224,12 @@ class TokenTracker:
             prices = TOKEN_PRICES.get(model.split("/", 1)[1])
         if prices is None:
             prices = TOKEN_PRICES["default"]
-        input_cost = (input_tokens / 1_000_000) * prices["input"]
+        uncached = max(0, input_tokens - cached_input_tokens - cache_creation_input_tokens)
+        input_cost = (
+            uncached * prices["input"]
+            + cached_input_tokens * prices.get("cache_read", prices["input"])
+            + cache_creation_input_tokens * prices.get("cache_write", prices["input"])
+        ) / 1_000_000
         output_cost = (output_tokens / 1_000_000) * prices["output"]
         return input_cost + output_cost
 
@@ -229,6 +242,8 @@ class TokenTracker:
         output_tokens: int,
         context_truncated: bool = False,
         truncated_messages: int = 0,
+        cached_input_tokens: int = 0,
+        cache_creation_input_tokens: int = 0,
     ) -> TokenUsageRecord:
         """
         Record token usage for a request (US-ESC-04).
@@ -236,7 +251,9 @@ class TokenTracker:
         self._reset_daily_if_needed()
         self._reset_monthly_if_needed()
 
-        cost = self.estimate_cost(model, input_tokens, output_tokens)
+        cost = self.estimate_cost(
+            model, input_tokens, output_tokens, cached_input_tokens, cache_creation_input_tokens,
+        )
 
         record = TokenUsageRecord(
             timestamp=datetime.now(UTC),
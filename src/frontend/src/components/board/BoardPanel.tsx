@@ -297,10 +297,33 @@ export function BoardPanel({ isOpen, onClose }: BoardPanelProps) {
             }
             break;
 
+          case 'advisor_timeout':
+            // Avis non reçu à temps : écarté de la synthèse
+            if (chunk.role) {
+              setAdvisorStates((prev) => {
+                const next = new Map(prev);
+                const current = next.get(chunk.role!);
+                if (current) {
+                  next.set(chunk.role!, { ...current, isLoading: false });
+                }
+                return next;
+              });
+            }
+            break;
+
           case 'synthesis_start':
             setIsSynthesizing(true);
             break;
 
+          case 'synthesis_draft':
+            // Synthèse provisoire (quorum atteint), remplacée par la finale
+            try {
+              setSynthesis(JSON.parse(chunk.content) as BoardSynthesis);
+            } catch {
+              console.error('Failed to parse draft synthesis');
+            }
+            break;
+
           case 'synthesis_chunk':
             try {
               const synthesisData = JSON.parse(chunk.content) as BoardSynthesis;
@@ -177,6 +177,22 @@ export function usePrototypeBoardData(enabled = true) {
               },
             };
           });
+        } else if (chunk.type === 'advisor_timeout' && chunk.role) {
+          setRun((current) => {
+            const advisor = current.advisors[chunk.role!];
+            if (!advisor) return current;
+            return {
+              ...current,
+              advisors: { ...current.advisors, [chunk.role!]: { ...advisor, isRunning: false } },
+            };
+          });
+        } else if (chunk.type === 'synthesis_draft') {
+          try {
+            const synthesis = JSON.parse(chunk.content) as BoardSynthesis;
+            setRun((current) => ({ ...current, synthesis }));
+          } catch {
+            // Synthèse provisoire illisible : la finale fera foi
+          }
         } else if (chunk.type === 'synthesis_start') {
           setRun((current) => ({ ...current, phase: 'Synthèse en cours' }));
         } else if (chunk.type === 'synthesis_chunk') {
@@ -27,7 +27,7 @@ export interface BoardRequest {
 }
 
 export interface BoardDeliberationChunk {
-  type: 'web_search_start' | 'web_search_done' | 'advisor_start' | 'advisor_chunk' | 'advisor_done' | 'synthesis_start' | 'synthesis_chunk' | 'done' | 'error';
+  type: 'web_search_start' | 'web_search_done' | 'advisor_start' | 'advisor_chunk' | 'advisor_done' | 'advisor_timeout' | 'synthesis_start' | 'synthesis_draft' | 'synthesis_chunk' | 'done' | 'error';
   role?: AdvisorRole;
   name?: string;
   emoji?: string;
@@ -67,6 +67,8 @@ export interface BoardDecisionDetail {
     input_tokens?: number;
     output_tokens?: number;
     cost_eur?: number;
+    cached_input_tokens?: number | null;
+    prompt_eval_ms?: number | null;
   }>;
   synthesis: BoardSynthesis;
   mode?: string;
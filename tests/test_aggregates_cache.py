@@ -0,0 +1,183 @@
+"""Agrégats pipeline / RGPD / tableau de bord : cache versionné par table."""
+
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from app.models.entities import Contact, Task
+from app.routers import dashboard
+from app.services import aggregates
+from sqlalchemy import insert, text, update
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def computations(monkeypatch):
+    """Compte les recalculs effectifs de chaque agrégat."""
+    calls = {"pipeline": 0, "rgpd": 0, "today": 0}
+
+    def spy(module, name, key):
+        original = getattr(module, name)
+
+        async def counting(session):
+            calls[key] += 1
+            return await original(session)
+
+        monkeypatch.setattr(module, name, counting)
+
+    spy(aggregates, "_compute_pipeline_stats", "pipeline")
+    spy(aggregates, "_compute_rgpd_counters", "rgpd")
+    spy(dashboard, "_build_today_dashboard", "today")
+    return calls
+
+
+def _rgpd_stats_python(contacts: list[Contact], now: datetime) -> dict:
+    """Algorithme historique de GET /rgpd/stats (parcours de tous les contacts)."""
+    par_base_legale = dict.fromkeys(aggregates.RGPD_BASES_LEGALES, 0)
+    par_base_legale["non_defini"] = 0
+    sans_info = expires = consent = 0
+    for contact in contacts:
+        base = contact.rgpd_base_legale
+        par_base_legale[base if base in par_base_legale else "non_defini"] += 1
+        if not contact.rgpd_base_legale and not contact.rgpd_date_collecte:
+            sans_info += 1
+        if contact.rgpd_date_expiration and contact.rgpd_date_expiration <= now + timedelta(days=30):
+            expires += 1
+        if contact.rgpd_consentement:
+            consent += 1
+    return {
+        "total_contacts": len(contacts),
+        "par_base_legale": par_base_legale,
+        "sans_info_rgpd": sans_info,
+        "expires_ou_bientot": expires,
+        "avec_consentement": consent,
+    }
+
+
+async def test_pipeline_recalcule_seulement_apres_ecriture(db_session, computations):
+    db_session.add_all([
+        Contact(id="c-1", stage="contact", score=40),
+        Contact(id="c-2", stage="contact", score=60),
+        Contact(id="c-3", stage="active", score=90),
+    ])
+    await db_session.commit()
+
+    stats = await aggregates.get_pipeline_stats(db_session)
+    assert stats == {
+        "total_contacts": 3,
+        "stages": {
+            "active": {"count": 1, "avg_score": 90.0},
+            "contact": {"count": 2, "avg_score": 50.0},
+        },
+    }
+    assert await aggregates.get_pipeline_stats(db_session) is stats
+    assert computations["pipeline"] == 1
+
+    # Rollback : rien n'a changé en base, le cache reste valable
+    db_session.add(Contact(id="c-4", stage="active"))
+    await db_session.flush()
+    await db_session.rollback()
+    await aggregates.get_pipeline_stats(db_session)
+    assert computations["pipeline"] == 1
+
+    # Écriture sur une autre table : sans effet
+    db_session.add(Task(title="Relancer"))
+    await db_session.commit()
+    await aggregates.get_pipeline_stats(db_session)
+    assert computations["pipeline"] == 1
+
+    # Unité de travail, UPDATE groupé, SQL textuel : chacun invalide
+    (await db_session.get(Contact, "c-1")).stage = "active"
+    await db_session.commit()
+    assert (await aggregates.get_pipeline_stats(db_session))["stages"]["active"]["count"] == 2
+
+    await db_session.execute(update(Contact).values(stage="archive"))
+    await db_session.commit()
+    assert (await aggregates.get_pipeline_stats(db_session))["stages"] == {
+        "archive": {"count": 3, "avg_score": pytest.approx(63.33, abs=0.01)},
+    }
+
+    await db_session.execute(text("DELETE FROM contacts WHERE id = 'c-3'"))
+    await db_session.commit()
+    assert (await aggregates.get_pipeline_stats(db_session))["total_contacts"] == 2
+    assert computations["pipeline"] == 4
+
+
+async def test_rgpd_identique_au_parcours_et_echeances_sans_requete(db_session, computations):
+    contacts = [
+        Contact(id="c-consent", rgpd_base_legale="consentement", rgpd_consentement=True,
+                rgpd_date_collecte=NOW, rgpd_date_expiration=NOW + timedelta(days=10)),
+        Contact(id="c-contrat", rgpd_base_legale="contrat", rgpd_date_expiration=NOW + timedelta(days=45)),
+        Contact(id="c-expire", rgpd_base_legale="interet_legitime", rgpd_date_expiration=NOW - timedelta(days=1)),
+        Contact(id="c-inconnue", rgpd_base_legale="autre"),
+        Contact(id="c-vide", rgpd_base_legale=""),
+        Contact(id="c-collecte", rgpd_date_collecte=NOW),
+        Contact(id="c-rien"),
+    ]
+    db_session.add_all(contacts)
+    await db_session.commit()
+
+    for now in (NOW, NOW + timedelta(days=20)):
+        assert await aggregates.get_rgpd_stats(db_session, now=now) == _rgpd_stats_python(contacts, now)
+    assert computations["rgpd"] == 1
+
+
+async def test_endpoints_et_tableau_de_bord(client, db_session, computations):
+    db_session.add(Contact(id="c-1", stage="contact", first_name="Ada"))
+    await db_session.commit()
+
+    responses = []
+    for _ in range(3):
+        assert (await client.get("/api/crm/pipeline/stats")).json()["total_contacts"] == 1
+        assert (await client.get("/api/rgpd/stats")).json()["total_contacts"] == 1
+        responses.append((await client.get("/api/dashboard/today")).json())
+    assert responses[0] == responses[1] == responses[2]
+    assert computations == {"pipeline": 1, "rgpd": 1, "today": 1}
+
+    db_session.add(Task(title="Urgent"))
+    await db_session.commit()
+    assert (await client.get("/api/dashboard/today")).status_code == 200
+    # Le pipeline ne dépend pas des tâches
+    await client.get("/api/crm/pipeline/stats")
+    assert computations == {"pipeline": 1, "rgpd": 1, "today": 2}
+
+
+async def test_benchmark_50k_contacts(db_session):
+    """Benchmark : pipeline et RGPD sur 50k contacts, calcul SQL puis cache."""
+    stages = ("contact", "discovery", "proposition", "signature", "active", "archive")
+    bases = (*aggregates.RGPD_BASES_LEGALES, None)
+    await db_session.execute(insert(Contact), [
+        {
+            "id": f"c-{i:05d}",
+            "stage": stages[i % len(stages)],
+            "score": i % 100,
+            "rgpd_base_legale": bases[i % len(bases)],
+            "rgpd_consentement": i % 3 == 0,
+            "rgpd_date_expiration": NOW + timedelta(days=i % 1000),
+        }
+        for i in range(50_000)
+    ])
+    await db_session.commit()
+
+    timings = {}
+    for name, compute in (
+        ("pipeline", lambda: aggregates.get_pipeline_stats(db_session)),
+        ("rgpd", lambda: aggregates.get_rgpd_stats(db_session, now=NOW)),
+    ):
+        start = time.perf_counter()
+        cold_result = await compute()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(100):
+            warm_result = await compute()
+        warm = (time.perf_counter() - start) / 100
+        assert warm_result == cold_result
+        timings[name] = (cold, warm)
+        print(f"\n{name} 50k contacts : {cold * 1000:.1f} ms (SQL), {warm * 1e6:.1f} µs (cache)")
+
+    stats = await aggregates.get_rgpd_stats(db_session, now=NOW)
+    assert stats["total_contacts"] == 50_000
+    assert stats["expires_ou_bientot"] == 31 * 50
+    for cold, warm in timings.values():
+        assert warm < cold / 10
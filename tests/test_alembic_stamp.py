@@ -30,6 +30,19 @@ ATELIER_HISTORY_COLUMNS = (
     "base_branch",
     "commit_hash",
 )
+CALENDAR_RECURRENCE_COLUMNS = (
+    "recurring_event_id",
+    "original_start",
+    "range_start",
+    "range_end",
+)
+EVENT_SYNC_COLUMNS = ("etag", "remote_href")
+CALENDAR_SYNC_COLUMNS = ("sync_token", "ctag")
+ANALYTICS_INDEXES = (
+    ("ix_invoices_status_due_date", "invoices", "status, due_date"),
+    ("ix_invoices_contact_id_issue_date", "invoices", "contact_id, issue_date"),
+    ("ix_notifications_source_action_url", "notifications", "source, action_url"),
+)
 
 
 def _read_stamp(db_path: Path) -> str | None:
@@ -65,13 +78,32 @@ def _make_patched_tracked_db(db_path: Path, missing_column: str | None = None) -
         for column in ATELIER_HISTORY_COLUMNS
         if column != missing_column
     ]
+    event_columns = [
+        column
+        for column in (*CALENDAR_RECURRENCE_COLUMNS, *EVENT_SYNC_COLUMNS)
+        if column != missing_column
+    ]
+    calendar_columns = [
+        column
+        for column in CALENDAR_SYNC_COLUMNS
+        if column != missing_column
+    ]
     with sqlite3.connect(str(db_path)) as conn:
         conn.execute("CREATE TABLE contacts (id VARCHAR PRIMARY KEY)")
         conn.execute(
-            "CREATE TABLE invoices "
-            "(id VARCHAR PRIMARY KEY, currency TEXT, validite_jours INTEGER)"
+            "CREATE TABLE invoices (id VARCHAR PRIMARY KEY, currency TEXT, "
+            "validite_jours INTEGER, status TEXT, due_date DATETIME, "
+            "contact_id VARCHAR, issue_date DATETIME)"
         )
+        conn.execute(
+            "CREATE TABLE notifications (id VARCHAR PRIMARY KEY, source TEXT, action_url TEXT)"
+        )
+        for index_name, table_name, columns in ANALYTICS_INDEXES:
+            if index_name != missing_column:
+                conn.execute(f"CREATE INDEX {index_name} ON {table_name} ({columns})")
         conn.execute("CREATE TABLE variables (id VARCHAR PRIMARY KEY)")
+        if missing_column != "invoice_sequences":
+            conn.execute("CREATE TABLE invoice_sequences (prefix VARCHAR, year INTEGER)")
         conn.execute(
             "CREATE TABLE board_decisions (id VARCHAR PRIMARY KEY, "
             + ", ".join(f"{column} TEXT" for column in board_columns)
@@ -82,6 +114,16 @@ def _make_patched_tracked_db(db_path: Path, missing_column: str | None = None) -
             + ", ".join(f"{column} TEXT" for column in atelier_columns)
             + ")"
         )
+        conn.execute(
+            "CREATE TABLE calendar_events (id VARCHAR PRIMARY KEY, "
+            + ", ".join(f"{column} TEXT" for column in event_columns)
+            + ")"
+        )
+        conn.execute(
+            "CREATE TABLE calendars (id VARCHAR PRIMARY KEY, "
+            + ", ".join(f"{column} TEXT" for column in calendar_columns)
+            + ")"
+        )
         conn.execute("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)")
         conn.execute("INSERT INTO alembic_version VALUES ('c3d4e5f6a7b8')")
         conn.commit()
@@ -202,6 +244,11 @@ def test_realignement_db_trackee_ancienne_schema_patche(tmp_path):
     [
         *BOARD_HISTORY_COLUMNS,
         *ATELIER_HISTORY_COLUMNS,
+        *CALENDAR_RECURRENCE_COLUMNS,
+        *EVENT_SYNC_COLUMNS,
+        *CALENDAR_SYNC_COLUMNS,
+        "invoice_sequences",
+        *(index_name for index_name, _table, _columns in ANALYTICS_INDEXES),
     ],
 )
 def test_realignement_refuse_si_une_colonne_v040_manque(tmp_path, missing_column):
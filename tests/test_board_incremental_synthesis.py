@@ -0,0 +1,132 @@
+"""Board (mode cloud) : synthèse provisoire dès le quorum, révisée à l'arrivée
+des retardataires ou reprise telle quelle s'ils dépassent le délai."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.config import settings
+from app.models.board import ADVISOR_CONFIG, AdvisorRole, BoardMode, BoardRequest
+from app.services import board as board_module
+from app.services.board import BoardService
+from app.services.llm import LLMProvider
+
+ROLES = [AdvisorRole.ANALYST, AdvisorRole.STRATEGIST, AdvisorRole.DEVIL]
+
+
+def _synthesis(recommendation: str) -> str:
+    return json.dumps({
+        "consensus_points": ["Tester"],
+        "divergence_points": [],
+        "recommendation": recommendation,
+        "confidence": "medium",
+        "next_steps": [],
+    })
+
+
+class TimedLLM:
+    """Conseiller ou synthèse : répond après `delay` secondes (None = jamais)."""
+
+    def __init__(self, delay: float | None, answer: str = "Avis."):
+        self.config = SimpleNamespace(provider=LLMProvider.OPENAI, model="modele-test")
+        self.delay = delay
+        self.answer = answer
+        self.prompts: list[str] = []
+
+    def prepare_context(self, messages, system_prompt=None, cache_system_prompt=False):
+        self.prompts.append(messages[-1].content)
+        return messages, system_prompt
+
+    async def stream_response(self, context, usage_sink=None):
+        if self.delay is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        yield self.answer
+
+
+class SynthesisLLM(TimedLLM):
+    def __init__(self, delay: float = 0.05):
+        super().__init__(delay)
+
+    async def stream_response(self, context, usage_sink=None):
+        await asyncio.sleep(self.delay)
+        yield _synthesis(f"Synthèse {len(self.prompts)}")
+
+
+async def _deliberate(db_session, monkeypatch, straggler_delay: float | None, synthesis_delay: float = 0.05):
+    synthesis_llm = SynthesisLLM(synthesis_delay)
+    advisors = {
+        ADVISOR_CONFIG[AdvisorRole.ANALYST]["preferred_provider"]: TimedLLM(0.01),
+        ADVISOR_CONFIG[AdvisorRole.STRATEGIST]["preferred_provider"]: TimedLLM(0.02),
+        ADVISOR_CONFIG[AdvisorRole.DEVIL]["preferred_provider"]: TimedLLM(straggler_delay, "Avis tardif."),
+    }
+    monkeypatch.setattr(board_module, "get_llm_service", lambda: synthesis_llm)
+    monkeypatch.setattr(board_module, "get_llm_service_for_provider", lambda name, **kwargs: advisors[name])
+    monkeypatch.setattr(board_module, "_get_user_context", lambda: "")
+    monkeypatch.setattr(BoardService, "_search_web_for_context", _no_web)
+    monkeypatch.setattr(settings, "board_synthesis_quorum", 2)
+    monkeypatch.setattr(settings, "board_straggler_timeout_seconds", 0.3)
+
+    chunks = [chunk async for chunk in BoardService(db_session).deliberate(BoardRequest(
+        question="Faut-il recruter un premier salarié ?", mode=BoardMode.CLOUD, advisors=ROLES,
+    ))]
+    decision = await BoardService(db_session).get_decision(chunks[-1].content)
+    return chunks, decision, synthesis_llm
+
+
+async def _no_web(*args, **kwargs) -> str:
+    return ""
+
+
+def _types(chunks) -> list[str]:
+    return [f"{chunk.type}:{chunk.role.value}" if chunk.role else chunk.type for chunk in chunks
+            if chunk.type != "advisor_chunk"]
+
+
+async def test_synthese_provisoire_revisee_avec_le_retardataire(client, db_session, monkeypatch):
+    chunks, decision, synthesis_llm = await _deliberate(db_session, monkeypatch, straggler_delay=0.15)
+
+    types = _types(chunks)
+    # La synthèse démarre au 2e avis, avant la fin du 3e conseiller
+    assert types.index("synthesis_start") < types.index("advisor_done:devil")
+    assert types.index("synthesis_draft") < types.index("advisor_done:devil")
+    assert types.count("synthesis_start") == 1
+
+    # Synthèse finale sur les trois avis, à partir de la provisoire
+    assert len(synthesis_llm.prompts) == 2
+    assert "Avis tardif." not in synthesis_llm.prompts[0]
+    assert "Avis tardif." in synthesis_llm.prompts[1] and "SYNTHÈSE PROVISOIRE" in synthesis_llm.prompts[1]
+    assert decision.synthesis.recommendation == "Synthèse 2"
+    assert [op.role for op in decision.opinions] == ROLES
+    assert "early_synthesis_saved_ms" in decision.synthesis_usage
+
+
+async def test_retardataire_ecarte_la_provisoire_fait_foi(client, db_session, monkeypatch):
+    chunks, decision, synthesis_llm = await _deliberate(db_session, monkeypatch, straggler_delay=None)
+
+    types = _types(chunks)
+    assert "advisor_timeout:devil" in types and "advisor_done:devil" not in types
+    assert types[-2:] == ["synthesis_chunk", "done"]
+
+    # Aucun second appel : la synthèse provisoire couvrait tous les avis reçus
+    assert len(synthesis_llm.prompts) == 1
+    assert decision.synthesis.recommendation == "Synthèse 1"
+    assert [op.role for op in decision.opinions] == ROLES[:2]
+    assert decision.synthesis_usage["early_synthesis_saved_ms"] > 0
+
+
+async def test_dernier_avis_avant_la_provisoire_une_seule_synthese(client, db_session, monkeypatch):
+    chunks, decision, synthesis_llm = await _deliberate(
+        db_session, monkeypatch, straggler_delay=0.03, synthesis_delay=0.2,
+    )
+
+    types = _types(chunks)
+    # Provisoire abandonnée : ni publiée, ni révisée
+    assert "synthesis_draft" not in types and types.count("synthesis_start") == 1
+    assert len(synthesis_llm.prompts) == 2
+    assert "Avis tardif." not in synthesis_llm.prompts[0]
+    assert "Avis tardif." in synthesis_llm.prompts[1] and "SYNTHÈSE PROVISOIRE" not in synthesis_llm.prompts[1]
+    assert decision.synthesis.recommendation == "Synthèse 2"
+    assert [op.role for op in decision.opinions] == ROLES
+    # Synthèse lancée au dernier avis : aucun gain, mais aucune attente de la provisoire
+    assert -50 < decision.synthesis_usage["early_synthesis_saved_ms"] <= 0
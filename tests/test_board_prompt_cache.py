@@ -0,0 +1,134 @@
+"""Board : préfixe commun aux conseillers, réutilisable par les caches de
+prompt (KV cache Ollama, prompt caching cloud), et mesures remontées par
+conseiller (tokens en cache, durée d'évaluation du prompt)."""
+
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from app.models.board import AdvisorRole, BoardMode, BoardRequest
+from app.services import board as board_module
+from app.services.board import BoardService
+from app.services.llm import LLMProvider
+from app.services.providers.anthropic import AnthropicProvider
+from app.services.providers.base import LLMConfig
+from app.services.providers.ollama import OllamaProvider
+from app.services.token_tracker import TokenTracker
+
+SYNTHESIS = json.dumps({
+    "consensus_points": ["Tester"],
+    "divergence_points": [],
+    "recommendation": "Lancer un pilote.",
+    "confidence": "medium",
+    "next_steps": [],
+})
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.config = SimpleNamespace(provider=LLMProvider.OPENAI, model="modele-test")
+        self.contexts: list[tuple[str, str]] = []
+        self.cached: list[bool] = []
+
+    def prepare_context(self, messages, system_prompt=None, cache_system_prompt=False):
+        self.contexts.append((system_prompt, messages[-1].content))
+        self.cached.append(cache_system_prompt)
+        return messages, system_prompt
+
+    async def stream_response(self, context, usage_sink=None):
+        if "Donne ton avis" not in context[0][-1].content:
+            yield SYNTHESIS
+            return
+        usage_sink.update(input_tokens=1200, cached_input_tokens=1024, output_tokens=80)
+        yield "Avis."
+
+
+async def _no_web(*args, **kwargs) -> str:
+    return "## Recherche Web (informations actualisées)\n\n**1. Étude** marché en croissance"
+
+
+async def test_conseillers_partagent_le_prefixe_et_remontent_le_cache(client, db_session, monkeypatch):
+    llm = RecordingLLM()
+    monkeypatch.setattr(board_module, "get_llm_service", lambda: llm)
+    monkeypatch.setattr(board_module, "get_llm_service_for_provider", lambda *args, **kwargs: llm)
+    monkeypatch.setattr(board_module, "_get_user_context", lambda: "## Utilisateur\nConsultante")
+    monkeypatch.setattr(BoardService, "_search_web_for_context", _no_web)
+
+    roles = [AdvisorRole.ANALYST, AdvisorRole.STRATEGIST, AdvisorRole.DEVIL]
+    chunks = [chunk async for chunk in BoardService(db_session).deliberate(BoardRequest(
+        question="Faut-il ouvrir une offre de formation ?",
+        context="Activité de conseil, 3 clients récurrents",
+        mode=BoardMode.CLOUD,
+        advisors=roles,
+    ))]
+
+    advisor_contexts = llm.contexts[:len(roles)]
+    systems = {system for system, _ in advisor_contexts}
+    assert len(systems) == 1  # préfixe identique pour tous les conseillers
+    (system,) = systems
+    assert "Consultante" in system and "formation" in system and "marché en croissance" in system
+    # Le rôle, seule partie variable, vient après le préfixe commun
+    assert sorted(content.split("\n")[0] for _, content in advisor_contexts) == sorted(
+        board_module.ADVISOR_CONFIG[role]["system_prompt"].split("\n")[0] for role in roles
+    )
+    assert all(content not in system for _, content in advisor_contexts)
+    assert llm.cached[:len(roles)] == [True] * len(roles)  # préfixe commun : mis en cache
+
+    decision = await BoardService(db_session).get_decision(chunks[-1].content)
+    assert {(op.cached_input_tokens, op.input_tokens) for op in decision.opinions} == {(1024, 1200)}
+
+
+async def test_anthropic_met_le_system_en_cache_sur_demande_et_compte_les_lectures():
+    sent: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        events = [
+            {"type": "message_start", "message": {"usage": {
+                "input_tokens": 12, "cache_read_input_tokens": 1500, "cache_creation_input_tokens": 200,
+            }}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Avis"}},
+            {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 40}},
+            {"type": "message_stop"},
+        ]
+        return httpx.Response(200, content="".join(f"data: {json.dumps(e)}\n\n" for e in events).encode())
+
+    provider = AnthropicProvider(
+        LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude-sonnet-4-6", api_key="sk-ant-test"),
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    messages = [{"role": "user", "content": "Rôle"}]
+    events = [e async for e in provider.stream("Dossier commun", messages, cache_system_prompt=True)]
+    # Sans demande (chat : system prompt recomposé à chaque tour), pas de cache
+    [e async for e in provider.stream("Dossier commun", messages)]
+
+    assert sent[0]["system"] == [
+        {"type": "text", "text": "Dossier commun", "cache_control": {"type": "ephemeral"}},
+    ]
+    assert sent[1]["system"] == "Dossier commun"
+    (done,) = [e for e in events if e.type == "done"]
+    assert (done.input_tokens, done.cached_input_tokens, done.cache_creation_input_tokens) == (1712, 1500, 200)
+
+    # Lectures à 0,1x et écritures à 1,25x du tarif d'entrée
+    cost = TokenTracker().estimate_cost("claude-sonnet-4-6", 1712, 0, 1500, 200)
+    assert cost == pytest.approx((12 * 3.00 + 1500 * 0.30 + 200 * 3.75) / 1_000_000)
+
+
+async def test_ollama_remonte_la_duree_d_evaluation_du_prompt():
+    def handler(request: httpx.Request) -> httpx.Response:
+        lines = [
+            {"message": {"role": "assistant", "content": "Avis"}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True,
+             "prompt_eval_count": 18, "prompt_eval_duration": 42_500_000, "eval_count": 30},
+        ]
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+    provider = OllamaProvider(
+        LLMConfig(provider=LLMProvider.OLLAMA, model="qwen3:8b", base_url="http://localhost:11434"),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    events = [e async for e in provider.stream("Dossier commun", [{"role": "user", "content": "Rôle"}])]
+
+    (done,) = [e for e in events if e.type == "done"]
+    assert (done.input_tokens, done.prompt_eval_ms) == (18, 42.5)
@@ -25,7 +25,7 @@ class FakeLLM:
         self.calls = 0
         self.config = SimpleNamespace(provider=provider, model="modele-test")
 
-    def prepare_context(self, messages, system_prompt=None):
+    def prepare_context(self, messages, system_prompt=None, cache_system_prompt=False):
         return messages, system_prompt
 
     async def stream_response(self, context, usage_sink=None):
@@ -115,7 +115,7 @@ async def test_closing_stream_cancels_advisor_tasks(monkeypatch):
             self.config = SimpleNamespace(provider=LLMProvider.OPENAI, model="modele-test")
             self.cancelled = 0
 
-        def prepare_context(self, messages, system_prompt=None):
+        def prepare_context(self, messages, system_prompt=None, cache_system_prompt=False):
             return messages, system_prompt
 
         async def stream_response(self, context, usage_sink=None):
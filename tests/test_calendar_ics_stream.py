@@ -0,0 +1,199 @@
+"""Import / export .ics en flux : analyse par blocs, upsert par UID, débit."""
+
+import time
+from datetime import UTC, datetime, timedelta
+
+from app.models.entities import Calendar, CalendarEvent
+from app.services.calendar import recurrence
+from app.services.calendar.ics import IcsStreamParser
+from sqlmodel import select
+
+VTIMEZONE = """BEGIN:VTIMEZONE
+TZID:Europe/Paris
+BEGIN:STANDARD
+DTSTART:19701025T030000
+RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU
+TZOFFSETFROM:+0200
+TZOFFSETTO:+0100
+END:STANDARD
+BEGIN:DAYLIGHT
+DTSTART:19700329T020000
+RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU
+TZOFFSETFROM:+0100
+TZOFFSETTO:+0200
+END:DAYLIGHT
+END:VTIMEZONE
+"""
+
+
+def _ics(*vevents: str, timezone: str = "") -> bytes:
+    body = "".join(f"BEGIN:VEVENT\r\n{v.strip()}\r\nEND:VEVENT\r\n" for v in vevents)
+    text = f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//FR\r\n{timezone}{body}END:VCALENDAR\r\n"
+    return text.replace("\r\n", "\n").replace("\n", "\r\n").encode("utf-8")
+
+
+def _simple(uid: str, summary: str, day: int = 6) -> str:
+    return f"UID:{uid}\nDTSTART:202605{day:02d}T120000Z\nDTEND:202605{day:02d}T130000Z\nSUMMARY:{summary}"
+
+
+SERIE = (
+    """UID:serie
+DTSTART;TZID=Europe/Paris:20260504T090000
+DTEND;TZID=Europe/Paris:20260504T093000
+RRULE:FREQ=WEEKLY;COUNT=4
+EXDATE;TZID=Europe/Paris:20260518T090000
+SUMMARY:Hebdo""",
+    """UID:serie
+RECURRENCE-ID;TZID=Europe/Paris:20260511T090000
+DTSTART;TZID=Europe/Paris:20260511T140000
+DTEND;TZID=Europe/Paris:20260511T150000
+SUMMARY:Hebdo décalé""",
+)
+
+
+def _parse(data: bytes, chunk_size: int, batch_size: int = 2):
+    parser = IcsStreamParser(batch_size=batch_size)
+    events = []
+    for offset in range(0, len(data), chunk_size):
+        events.extend(parser.feed(data[offset:offset + chunk_size]))
+    return events + parser.close()
+
+
+def test_analyse_par_blocs_quelconques():
+    long_summary = "Réunion " + "é" * 120
+    data = _ics(
+        *SERIE,
+        _simple("simple", long_summary),
+        "UID:flottant\nDTSTART:20260507T090000\nSUMMARY:Heure locale",
+        timezone=VTIMEZONE,
+    )
+    # Ligne repliée (RFC 5545 3.1) au milieu d'un caractère accentué
+    folded = data.replace(b"SUMMARY:R\xc3\xa9union ", b"SUMMARY:R\xc3\xa9union\r\n  ")
+
+    reference = [str(ev.get("summary")) for ev in _parse(folded, len(folded))]
+    assert reference == ["Hebdo", "Hebdo décalé", long_summary, "Heure locale"]
+    for chunk_size in (1, 7, 64):
+        events = _parse(folded, chunk_size)
+        assert [str(ev.get("summary")) for ev in events] == reference
+        assert events[0].get("dtstart").dt.utcoffset() == timedelta(hours=2)
+
+    try:
+        _parse(b"BEGIN:VEVENT\r\nUID:x\r\nEND:VEVENT\r\n", 16)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("un fichier sans VCALENDAR doit être refusé")
+
+
+async def _import(client, data: bytes, **params):
+    return await client.post(
+        "/api/calendar/import-ics",
+        params=params,
+        files={"file": ("agenda.ics", data, "text/calendar")},
+    )
+
+
+async def test_import_upsert_par_uid_et_export_aller_retour(client, db_session):
+    db_session.add(Calendar(id="autre", summary="Autre", provider="local", timezone="Europe/Paris"))
+    db_session.add(CalendarEvent(
+        id="pris", calendar_id="autre", summary="Pas touche",
+        start_datetime=datetime(2026, 5, 1, 8, tzinfo=UTC), end_datetime=datetime(2026, 5, 1, 9, tzinfo=UTC),
+    ))
+    db_session.add(Calendar(id="cal-1", summary="Perso", provider="local", timezone="Europe/Paris"))
+    await db_session.commit()
+
+    first = await _import(client, _ics(*SERIE, _simple("simple", "Déjeuner")), calendar_id="cal-1")
+    assert first.status_code == 200, first.text
+    assert first.json() | {"message": None} == {
+        "imported": 3, "updated": 0, "skipped": 0, "calendar_id": "cal-1", "calendar_name": "Perso",
+        "message": None,
+    }
+
+    # Réimport : mise à jour ; doublon dans le fichier et UID d'un autre calendrier ignorés
+    second = await _import(client, _ics(
+        _simple("simple", "Déjeuner client", day=7),
+        _simple("simple", "Doublon"),
+        _simple("pris", "Collision"),
+        _simple("nouveau", "Nouveau"),
+    ), calendar_id="cal-1")
+    body = second.json()
+    assert (body["imported"], body["updated"], body["skipped"]) == (1, 1, 2)
+    assert body["message"] == "1 événement(s) importé(s), 1 mis à jour, 2 ignoré(s)"
+
+    db_session.expire_all()
+    simple = await db_session.get(CalendarEvent, "simple")
+    assert simple.summary == "Déjeuner client"
+    assert simple.range_start == datetime(2026, 5, 7, 12, tzinfo=UTC)
+    assert (await db_session.get(CalendarEvent, "pris")).summary == "Pas touche"
+
+    occurrences = await recurrence.events_between(
+        db_session, datetime(2026, 5, 1, tzinfo=UTC), datetime(2026, 6, 1, tzinfo=UTC), calendar_ids=["cal-1"]
+    )
+    assert [(ev.summary, occ.start) for ev, occ in occurrences if ev.id.startswith("serie")] == [
+        ("Hebdo", datetime(2026, 5, 4, 7, tzinfo=UTC)),
+        ("Hebdo décalé", datetime(2026, 5, 11, 12, tzinfo=UTC)),
+        ("Hebdo", datetime(2026, 5, 25, 7, tzinfo=UTC)),
+    ]
+
+    # Export puis réimport dans un calendrier vide : même dépliage
+    exported = await client.get("/api/calendar/export-ics", params={"calendar_id": "cal-1"})
+    assert exported.status_code == 200
+    assert exported.headers["content-type"].startswith("text/calendar")
+    text = exported.text
+    assert "EXDATE;TZID=Europe/Paris:20260518T090000" in text
+    assert "RECURRENCE-ID:20260511T070000Z" in text
+
+    db_session.add(Calendar(id="cal-2", summary="Copie", provider="local", timezone="Europe/Paris"))
+    await db_session.commit()
+    copy = (await _import(client, exported.content, calendar_id="cal-2")).json()
+    assert (copy["imported"], copy["skipped"]) == (0, 4)  # identifiants déjà pris par cal-1
+
+    await db_session.execute(CalendarEvent.__table__.delete().where(CalendarEvent.calendar_id == "cal-1"))
+    await db_session.commit()
+    copy = (await _import(client, exported.content, calendar_id="cal-2")).json()
+    assert (copy["imported"], copy["skipped"]) == (4, 0)
+    replayed = await recurrence.events_between(
+        db_session, datetime(2026, 5, 1, tzinfo=UTC), datetime(2026, 6, 1, tzinfo=UTC), calendar_ids=["cal-2"]
+    )
+    assert [(ev.summary, occ.start) for ev, occ in replayed] == [
+        (ev.summary, occ.start) for ev, occ in occurrences
+    ]
+
+
+async def test_import_refuse_fichier_invalide_sans_rien_ecrire(client, db_session):
+    response = await _import(client, b"pas du tout un calendrier")
+    assert response.status_code == 400
+
+    # Erreur au second lot : le premier n'est pas conservé
+    vevents = [_simple(f"ok-{i}", "Valide") for i in range(600)]
+    broken = _ics(*vevents, "UID:ko\nDTSTART:pas-une-date\nSUMMARY:Cassé")
+    response = await _import(client, broken)
+    assert response.status_code == 400
+
+    empty = await _import(client, _ics())
+    assert empty.json() == {"imported": 0, "message": "Aucun événement trouvé dans le fichier"}
+    assert (await db_session.execute(select(CalendarEvent))).scalars().all() == []
+
+
+async def test_debit_import_export(client, db_session):
+    count = 5_000
+    base = datetime(2020, 1, 1, 8, tzinfo=UTC)
+    vevents = [
+        f"UID:bench-{i}\nDTSTART:{(base + timedelta(hours=i)):%Y%m%dT%H%M%SZ}\n"
+        f"DTEND:{(base + timedelta(hours=i, minutes=30)):%Y%m%dT%H%M%SZ}\nSUMMARY:Rendez-vous {i}"
+        + ("\nRRULE:FREQ=WEEKLY;COUNT=10" if i % 10 == 0 else "")
+        for i in range(count)
+    ]
+    data = _ics(*vevents, timezone=VTIMEZONE)
+
+    started = time.perf_counter()
+    response = await _import(client, data)
+    elapsed = time.perf_counter() - started
+    assert response.json()["imported"] == count
+    print(f"\nimport .ics : {count / elapsed:,.0f} VEVENT/s ({len(data) / 1e6:.1f} Mo)")
+
+    started = time.perf_counter()
+    exported = await client.get("/api/calendar/export-ics")
+    elapsed = time.perf_counter() - started
+    assert exported.text.count("BEGIN:VEVENT") == count
+    print(f"export .ics : {count / elapsed:,.0f} VEVENT/s")
@@ -0,0 +1,201 @@
+"""Calendrier local : séries récurrentes dépliées par fenêtre, exceptions, index."""
+
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+from app.models.entities import Calendar, CalendarEvent, Notification
+from app.services import notification_service
+from app.services.calendar import recurrence
+from app.services.calendar.base_provider import CreateEventRequest, UpdateEventRequest
+from app.services.calendar.local_provider import LocalCalendarProvider
+from sqlalchemy import text
+from sqlmodel import select
+
+
+@pytest.fixture
+async def provider(db_session):
+    db_session.add(Calendar(id="cal-1", summary="Perso", timezone="Europe/Paris", provider="local"))
+    await db_session.commit()
+    return LocalCalendarProvider(db_session)
+
+
+async def _create(provider, start, end, rules, **kwargs):
+    return await provider.create_event(CreateEventRequest(
+        calendar_id="cal-1", summary="Point hebdo", start=start, end=end, recurrence=rules, **kwargs,
+    ))
+
+
+async def test_serie_hebdo_suit_l_heure_locale_et_borne_l_index(provider, db_session):
+    # 9h à Paris, de part et d'autre du passage à l'heure d'été (29 mars)
+    master = await _create(
+        provider,
+        datetime(2026, 3, 16, 8, 0, tzinfo=UTC),
+        datetime(2026, 3, 16, 9, 0, tzinfo=UTC),
+        ["RRULE:FREQ=WEEKLY;COUNT=4"],
+    )
+
+    events, token = await provider.list_events(
+        "cal-1", datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 4, 30, tzinfo=UTC)
+    )
+    assert token is None
+    assert [(ev.start, ev.end - ev.start) for ev in events] == [
+        (datetime(2026, 3, 16, 8, 0, tzinfo=UTC), timedelta(hours=1)),
+        (datetime(2026, 3, 23, 8, 0, tzinfo=UTC), timedelta(hours=1)),
+        (datetime(2026, 3, 30, 7, 0, tzinfo=UTC), timedelta(hours=1)),
+        (datetime(2026, 4, 6, 7, 0, tzinfo=UTC), timedelta(hours=1)),
+    ]
+    assert events[2].id == f"{master.id}_20260330T070000Z"
+    assert {ev.recurring_event_id for ev in events} == {master.id}
+
+    # Fenêtre ultérieure : seules les occurrences qui y tombent
+    events, _ = await provider.list_events(
+        "cal-1", datetime(2026, 3, 25, tzinfo=UTC), datetime(2026, 4, 1, tzinfo=UTC)
+    )
+    assert [ev.id for ev in events] == [f"{master.id}_20260330T070000Z"]
+
+    stored = await db_session.get(CalendarEvent, master.id)
+    assert (stored.range_start, stored.range_end) == (
+        datetime(2026, 3, 16, 8, 0, tzinfo=UTC),
+        datetime(2026, 4, 6, 7, 0, tzinfo=UTC),
+    )
+    events, _ = await provider.list_events("cal-1", datetime(2026, 6, 1, tzinfo=UTC), datetime(2026, 7, 1, tzinfo=UTC))
+    assert events == []
+
+    # Modifier la règle invalide l'expansion précédente
+    await provider.update_event("cal-1", master.id, UpdateEventRequest(recurrence=["RRULE:FREQ=WEEKLY;COUNT=2"]))
+    events, _ = await provider.list_events(
+        "cal-1", datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 4, 30, tzinfo=UTC)
+    )
+    assert len(events) == 2
+
+
+async def test_exdate_rdate_exceptions_et_suppressions(provider, db_session):
+    master = await _create(
+        provider,
+        datetime(2026, 5, 4, 7, 0, tzinfo=UTC),
+        datetime(2026, 5, 4, 7, 30, tzinfo=UTC),
+        [
+            "RRULE:FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+            "EXDATE;TZID=Europe/Paris:20260505T090000",
+            "RDATE:20260509T080000Z",
+        ],
+    )
+    window = (datetime(2026, 5, 4, tzinfo=UTC), datetime(2026, 5, 10, tzinfo=UTC))
+
+    async def days():
+        events, _ = await provider.list_events("cal-1", *window)
+        return [(ev.start.day, ev.summary) for ev in events]
+
+    assert await days() == [(4, "Point hebdo"), (6, "Point hebdo"), (7, "Point hebdo"),
+                            (8, "Point hebdo"), (9, "Point hebdo")]
+
+    # Une occurrence modifiée devient une exception, les autres ne bougent pas
+    instance = f"{master.id}_20260506T070000Z"
+    updated = await provider.update_event("cal-1", instance, UpdateEventRequest(
+        summary="Déplacé", start=datetime(2026, 5, 6, 14, 0, tzinfo=UTC), end=datetime(2026, 5, 6, 15, 0, tzinfo=UTC),
+    ))
+    assert updated.id == instance and updated.recurring_event_id == master.id
+    assert await days() == [(4, "Point hebdo"), (6, "Déplacé"), (7, "Point hebdo"),
+                            (8, "Point hebdo"), (9, "Point hebdo")]
+    assert (await provider.get_event("cal-1", instance)).summary == "Déplacé"
+    assert (await provider.get_event("cal-1", f"{master.id}_20260507T070000Z")).summary == "Point hebdo"
+    with pytest.raises(ValueError):
+        await provider.get_event("cal-1", f"{master.id}_20260505T070000Z")
+
+    # Supprimer une occurrence (simple ou modifiée) l'exclut de la série
+    await provider.delete_event("cal-1", f"{master.id}_20260507T070000Z")
+    await provider.delete_event("cal-1", instance)
+    assert await days() == [(4, "Point hebdo"), (8, "Point hebdo"), (9, "Point hebdo")]
+    assert (await db_session.get(CalendarEvent, master.id)).recurrence.count("EXDATE") == 3
+
+    # Série sans fin : sans borne haute, seule la prochaine occurrence
+    events, _ = await provider.list_events("cal-1", datetime(2027, 1, 1, tzinfo=UTC))
+    assert [ev.start for ev in events] == [datetime(2027, 1, 1, 8, 0, tzinfo=UTC)]
+
+    # Supprimer le maître emporte ses exceptions
+    await provider.update_event("cal-1", f"{master.id}_20260508T070000Z", UpdateEventRequest(summary="x"))
+    await provider.delete_event("cal-1", master.id)
+    assert (await db_session.execute(select(CalendarEvent))).scalars().all() == []
+
+
+async def test_journee_entiere_tableau_de_bord_et_rappels(client, provider, db_session):
+    today = date.today()
+    await _create(provider, today - timedelta(days=7), today - timedelta(days=7), ["RRULE:FREQ=DAILY"],
+                  all_day=True)
+    # Rendez-vous quotidien à 10h UTC, commencé il y a un mois
+    now = datetime.now(UTC)
+    start = (now - timedelta(days=30)).replace(hour=10, minute=0, second=0, microsecond=0)
+    await provider.create_event(CreateEventRequest(
+        calendar_id="cal-1", summary="Stand-up", start=start, end=start + timedelta(minutes=15),
+        recurrence=["RRULE:FREQ=DAILY"],
+    ))
+
+    occurrences = await recurrence.events_between(
+        db_session, datetime.combine(today, datetime.min.time()), datetime.combine(today, datetime.min.time())
+    )
+    assert [(ev.all_day, occ.start) for ev, occ in occurrences] == [(True, today)]
+
+    assert await notification_service._check_upcoming_events(db_session) == 1
+    await db_session.commit()
+    notification = (await db_session.execute(select(Notification))).scalar_one()
+    assert notification.message == "RDV demain a 10h00 : Stand-up"
+    assert notification.action_url.endswith((now + timedelta(days=1)).strftime("_%Y%m%dT100000Z"))
+
+    resp = await client.get("/api/dashboard/today")
+    assert resp.status_code == 200
+
+
+async def test_preselection_par_index(provider, db_session, monkeypatch):
+    for i in range(50):
+        day = datetime(2020, 1, 1, 9, 0, tzinfo=UTC) + timedelta(days=i)
+        await _create(provider, day, day + timedelta(hours=1), ["RRULE:FREQ=DAILY;COUNT=3"])
+    await _create(provider, datetime(2026, 1, 1, tzinfo=UTC), datetime(2026, 1, 1, 1, tzinfo=UTC), None)
+
+    plan = await db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM calendar_events WHERE calendar_id = 'cal-1' "
+        "AND range_start <= '2026-02-01' AND (range_end IS NULL OR range_end >= '2025-12-01')"
+    ))
+    assert any("ix_calendar_events_range" in row[-1] for row in plan.all())
+
+    loaded = []
+    original = recurrence.expand
+
+    def spy(ev, *args, **kwargs):
+        loaded.append(ev.id)
+        return original(ev, *args, **kwargs)
+
+    monkeypatch.setattr(recurrence, "expand", spy)
+    events, _ = await provider.list_events(
+        "cal-1", datetime(2025, 12, 1, tzinfo=UTC), datetime(2026, 2, 1, tzinfo=UTC)
+    )
+    assert len(events) == 1 and len(loaded) == 1
+
+
+def test_migration_adhoc_pose_les_bornes(tmp_path):
+    import sqlite3
+
+    from app.models.database import apply_adhoc_migrations
+
+    db = tmp_path / "therese.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE calendar_events (id TEXT PRIMARY KEY, calendar_id TEXT, "
+            "start_datetime DATETIME, start_date TEXT, recurrence TEXT)"
+        )
+        conn.executemany("INSERT INTO calendar_events VALUES (?, 'cal-1', ?, ?, ?)", [
+            ("simple", "2026-01-05 09:00:00.000000", None, "[]"),
+            ("journee", None, "2026-01-06", None),
+            ("serie", "2026-01-05 09:00:00.000000", None, '["RRULE:FREQ=DAILY"]'),
+        ])
+    apply_adhoc_migrations(db)
+    apply_adhoc_migrations(db)
+
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT id, range_start, range_end FROM calendar_events ORDER BY id").fetchall()
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(calendar_events)")}
+    assert rows == [
+        ("journee", "2026-01-06 00:00:00.000000", "2026-01-06 00:00:00.000000"),
+        ("serie", None, None),
+        ("simple", "2026-01-05 09:00:00.000000", "2026-01-05 09:00:00.000000"),
+    ]
+    assert {"ix_calendar_events_range", "ix_calendar_events_recurring_event_id"} <= indexes
@@ -0,0 +1,341 @@
+"""Synchronisation incrémentale CalDAV (ctag, sync-collection, ETag) et Google (syncToken)."""
+
+import threading
+import time
+from collections import Counter
+from datetime import UTC, date, datetime
+
+import httpx
+import pytest
+from app.config import settings
+from app.models.entities import Calendar, CalendarEvent
+from app.services.calendar import recurrence
+from app.services.calendar import sync as calendar_sync
+from app.services.calendar.caldav_provider import CollectionChanges
+from sqlmodel import select
+
+WINDOW = (datetime(2026, 5, 1, tzinfo=UTC), datetime(2026, 6, 1, tzinfo=UTC))
+
+
+def _ics(*vevents: str) -> str:
+    body = "".join(f"BEGIN:VEVENT\r\n{v.strip()}\r\nEND:VEVENT\r\n" for v in vevents)
+    return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//FR\r\n{body}END:VCALENDAR\r\n"
+
+
+SERIE = _ics(
+    """UID:serie
+DTSTART;TZID=Europe/Paris:20260504T090000
+DTEND;TZID=Europe/Paris:20260504T093000
+RRULE:FREQ=WEEKLY;COUNT=4
+EXDATE;TZID=Europe/Paris:20260518T090000
+SUMMARY:Hebdo""",
+    """UID:serie
+RECURRENCE-ID;TZID=Europe/Paris:20260511T090000
+DTSTART;TZID=Europe/Paris:20260511T140000
+DTEND;TZID=Europe/Paris:20260511T150000
+SUMMARY:Hebdo décalé""",
+)
+SIMPLE = _ics("""UID:simple
+DTSTART:20260506T120000Z
+DTEND:20260506T130000Z
+SUMMARY:Déjeuner
+ATTENDEE:mailto:ada@example.com""")
+JOURNEE = _ics("""UID:journee
+DTSTART;VALUE=DATE:20260508
+DTEND;VALUE=DATE:20260509
+SUMMARY:Férié""")
+
+
+class RadicaleStandIn:
+    """Collection CalDAV en mémoire, à la Radicale.
+
+    Chaque écriture crée une révision : le ctag et le jeton sync-collection
+    sont le numéro de révision, l'ETag d'une ressource celle qui l'a écrite.
+    Un jeton inconnu donne la liste complète.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.revision = 0
+        self.resources: dict[str, tuple[str, str]] = {}
+        self.log: list[tuple[int, str]] = []
+        self.requests: Counter = Counter()
+        self.fetched: list[str] = []
+        self.delay = delay
+        self.fail = False
+
+    def put(self, href: str, data: str) -> None:
+        self.revision += 1
+        self.resources[href] = (f'"{self.revision}"', data)
+        self.log.append((self.revision, href))
+
+    def remove(self, href: str) -> None:
+        self.revision += 1
+        del self.resources[href]
+        self.log.append((self.revision, href))
+
+    def ctag(self) -> str:
+        self.requests["ctag"] += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("Radicale injoignable")
+        return f"ctag-{self.revision}"
+
+    def changes(self, sync_token: str | None) -> CollectionChanges:
+        self.requests["changes"] += 1
+        since = int(sync_token) if sync_token and sync_token.isdigit() else None
+        hrefs = (
+            {href for revision, href in self.log if revision > since}
+            if since is not None
+            else set(self.resources)
+        )
+        return CollectionChanges(
+            changed={href: self.resources[href][0] for href in hrefs if href in self.resources},
+            deleted=sorted(href for href in hrefs if href not in self.resources),
+            sync_token=str(self.revision),
+            complete=since is None,
+        )
+
+    def fetch(self, hrefs) -> dict[str, str]:
+        self.requests["multiget"] += 1
+        self.fetched.extend(hrefs)
+        return {href: self.resources[href][1] for href in hrefs}
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """Un stand-in par calendrier CalDAV (clé : remote_id)."""
+    servers: dict[str, RadicaleStandIn] = {}
+    monkeypatch.setattr(calendar_sync, "_caldav_collection", lambda calendar: servers[calendar.remote_id])
+    monkeypatch.setattr(calendar_sync, "_collections", {})
+    return servers
+
+
+async def _caldav_calendar(db_session, servers, calendar_id="dav-1", **kwargs) -> RadicaleStandIn:
+    db_session.add(Calendar(
+        id=calendar_id, summary="Nextcloud", provider="caldav", remote_id=f"remote-{calendar_id}",
+        caldav_url="https://dav.example.com/", caldav_username="u", caldav_password="p",
+    ))
+    await db_session.commit()
+    server = servers[f"remote-{calendar_id}"] = RadicaleStandIn(**kwargs)
+    return server
+
+
+async def _window(db_session, calendar_id):
+    db_session.expire_all()
+    occurrences = await recurrence.events_between(db_session, *WINDOW, calendar_ids=[calendar_id])
+    return [(occ.start, ev.summary) for ev, occ in occurrences]
+
+
+async def test_caldav_ne_transfere_que_les_changements(db_session, servers):
+    server = await _caldav_calendar(db_session, servers)
+    server.put("/cal/serie.ics", SERIE)
+    server.put("/cal/simple.ics", SIMPLE)
+    server.put("/cal/journee.ics", JOURNEE)
+
+    result = await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert (result.full, result.updated, result.error) == (True, 4, None)
+    assert sorted(server.fetched) == ["/cal/journee.ics", "/cal/serie.ics", "/cal/simple.ics"]
+    assert await _window(db_session, "dav-1") == [
+        (datetime(2026, 5, 4, 7, 0, tzinfo=UTC), "Hebdo"),
+        (datetime(2026, 5, 6, 12, 0, tzinfo=UTC), "Déjeuner"),
+        (date(2026, 5, 8), "Férié"),
+        (datetime(2026, 5, 11, 12, 0, tzinfo=UTC), "Hebdo décalé"),
+        (datetime(2026, 5, 25, 7, 0, tzinfo=UTC), "Hebdo"),
+    ]
+    simple = await db_session.get(CalendarEvent, "simple")
+    assert (simple.etag, simple.remote_href, simple.attendees) == ('"2"', "/cal/simple.ics", '["ada@example.com"]')
+    journee = await db_session.get(CalendarEvent, "journee")
+    assert (journee.start_date, journee.end_date) == ("2026-05-08", "2026-05-08")
+
+    # Rien n'a changé : un seul PROPFIND getctag
+    server.requests.clear()
+    result = await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert result.unchanged and server.requests == Counter(ctag=1)
+
+    # Une modification, une suppression : seule la ressource modifiée est relue
+    server.put("/cal/serie.ics", SERIE.replace("COUNT=4", "COUNT=2").replace("Hebdo décalé", "Revue"))
+    server.remove("/cal/simple.ics")
+    server.fetched.clear()
+    result = await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert (result.full, result.updated, result.deleted) == (False, 2, 1)
+    assert server.fetched == ["/cal/serie.ics"]
+    assert await _window(db_session, "dav-1") == [
+        (datetime(2026, 5, 4, 7, 0, tzinfo=UTC), "Hebdo"),
+        (date(2026, 5, 8), "Férié"),
+        (datetime(2026, 5, 11, 12, 0, tzinfo=UTC), "Revue"),
+    ]
+
+    # Jeton refusé par le serveur : liste complète, ETags inchangés non relus,
+    # ressources disparues balayées
+    server.resources.pop("/cal/journee.ics")
+    calendar = await db_session.get(Calendar, "dav-1")
+    calendar.sync_token, calendar.ctag = "expiré", None
+    await db_session.commit()
+    server.fetched.clear()
+    result = await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert (result.full, result.deleted, server.fetched) == (True, 1, [])
+    assert await db_session.get(CalendarEvent, "journee") is None
+
+
+async def test_caldav_collection_decouverte_une_seule_fois(db_session, servers, monkeypatch):
+    server = await _caldav_calendar(db_session, servers)
+    server.put("/cal/simple.ics", SIMPLE)
+    discoveries: list[str] = []
+
+    def discover(calendar):
+        discoveries.append(calendar.caldav_username)
+        return servers[calendar.remote_id]
+
+    monkeypatch.setattr(calendar_sync, "_caldav_collection", discover)
+
+    await calendar_sync.sync_calendar(db_session, "dav-1")
+    await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert discoveries == ["u"]
+
+    # Échec : la collection est redécouverte au passage suivant
+    server.fail = True
+    assert (await calendar_sync.sync_calendar(db_session, "dav-1")).error == "Radicale injoignable"
+    server.fail = False
+    await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert discoveries == ["u", "u"]
+
+    # Identifiants modifiés : nouvelle découverte
+    calendar = await db_session.get(Calendar, "dav-1")
+    calendar.caldav_username = "v"
+    await db_session.commit()
+    await calendar_sync.sync_calendar(db_session, "dav-1")
+    assert discoveries == ["u", "u", "v"]
+
+
+class FakeGoogle:
+    """Events.list de Google Calendar : pages, nextSyncToken, 410 sur jeton expiré."""
+
+    def __init__(self):
+        self.responses: dict[str | None, list[dict]] = {}
+        self.calls: list[tuple[str, str | None, str | None]] = []
+        self.expired: set[str] = set()
+
+    async def sync_events(self, calendar_id, sync_token=None, page_token=None):
+        self.calls.append((calendar_id, sync_token, page_token))
+        if sync_token in self.expired:
+            request = httpx.Request("GET", "https://www.googleapis.com/calendar/v3")
+            raise httpx.HTTPStatusError("Gone", request=request, response=httpx.Response(410, request=request))
+        return self.responses[sync_token][int(page_token or 0)]
+
+
+def _google_event(event_id, etag, **kwargs):
+    return {"id": event_id, "etag": etag, "status": "confirmed", **kwargs}
+
+
+async def test_google_sync_token_et_exceptions(db_session, monkeypatch):
+    db_session.add(Calendar(id="g-1", summary="Pro", provider="google", remote_id="pro@example.com",
+                            timezone="Europe/Paris"))
+    db_session.add(CalendarEvent(id="ancien", calendar_id="g-1", summary="Plus chez Google",
+                                 start_datetime=datetime(2026, 5, 2, 8, 0, tzinfo=UTC)))
+    await db_session.commit()
+    google = FakeGoogle()
+
+    async def fake_service(calendar, session, account_locks):
+        return google
+
+    monkeypatch.setattr(calendar_sync, "_google_service", fake_service)
+
+    master = _google_event(
+        "daily", '"1"', summary="Stand-up",
+        start={"dateTime": "2026-05-04T09:00:00+02:00", "timeZone": "Europe/Paris"},
+        end={"dateTime": "2026-05-04T09:15:00+02:00", "timeZone": "Europe/Paris"},
+        recurrence=["RRULE:FREQ=DAILY;COUNT=3"],
+    )
+    moved = _google_event(
+        "daily_20260505T070000Z", '"2"', summary="Stand-up (tard)", recurringEventId="daily",
+        originalStartTime={"dateTime": "2026-05-05T09:00:00+02:00"},
+        start={"dateTime": "2026-05-05T11:00:00+02:00"}, end={"dateTime": "2026-05-05T11:15:00+02:00"},
+    )
+    off = _google_event("off", '"3"', summary="Congé", start={"date": "2026-05-15"}, end={"date": "2026-05-17"})
+    google.responses[None] = [{"items": [master, moved], "nextPageToken": "1"},
+                              {"items": [off], "nextSyncToken": "t1"}]
+
+    result = await calendar_sync.sync_calendar(db_session, "g-1")
+    assert (result.full, result.updated, result.deleted) == (True, 3, 1)
+    assert [call[2] for call in google.calls] == [None, "1"]
+    assert await _window(db_session, "g-1") == [
+        (datetime(2026, 5, 4, 7, 0, tzinfo=UTC), "Stand-up"),
+        (datetime(2026, 5, 5, 9, 0, tzinfo=UTC), "Stand-up (tard)"),
+        (datetime(2026, 5, 6, 7, 0, tzinfo=UTC), "Stand-up"),
+        (date(2026, 5, 15), "Congé"),
+    ]
+    assert (await db_session.get(CalendarEvent, "off")).end_date == "2026-05-16"
+    assert (await db_session.get(Calendar, "g-1")).sync_token == "t1"
+
+    # Changements seulement : occurrence annulée, événement supprimé, ETag inchangé
+    google.responses["t1"] = [{"items": [
+        {"id": "daily_20260506T070000Z", "status": "cancelled", "recurringEventId": "daily",
+         "originalStartTime": {"dateTime": "2026-05-06T09:00:00+02:00"}},
+        {"id": "off", "status": "cancelled"},
+        master,
+    ], "nextSyncToken": "t2"}]
+    result = await calendar_sync.sync_calendar(db_session, "g-1")
+    assert (result.full, result.updated, result.deleted) == (False, 1, 1)
+    assert google.calls[-1] == ("pro@example.com", "t1", None)
+    assert await _window(db_session, "g-1") == [
+        (datetime(2026, 5, 4, 7, 0, tzinfo=UTC), "Stand-up"),
+        (datetime(2026, 5, 5, 9, 0, tzinfo=UTC), "Stand-up (tard)"),
+    ]
+
+    # Jeton expiré (410) : relecture complète, la série supprimée emporte ses exceptions
+    google.expired.add("t2")
+    google.responses[None] = [{"items": [off], "nextSyncToken": "t3"}]
+    result = await calendar_sync.sync_calendar(db_session, "g-1")
+    assert result.full and result.error is None
+    assert await _window(db_session, "g-1") == [(date(2026, 5, 15), "Congé")]
+    ids = (await db_session.execute(select(CalendarEvent.id))).scalars().all()
+    assert ids == ["off"]
+    assert (await db_session.get(Calendar, "g-1")).sync_token == "t3"
+
+
+async def test_endpoint_sync_parallele_borne(client, db_session, servers, monkeypatch):
+    monkeypatch.setattr(settings, "calendar_sync_concurrency", 3)
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    for i in range(6):
+        server = await _caldav_calendar(db_session, servers, f"dav-{i}", delay=0.05)
+        server.put(f"/cal-{i}/simple.ics", SIMPLE.replace("UID:simple", f"UID:simple-{i}"))
+        original = server.ctag
+
+        def counting_ctag(original=original):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            try:
+                return original()
+            finally:
+                with lock:
+                    in_flight -= 1
+
+        server.ctag = counting_ctag
+    servers["remote-dav-5"].fail = True
+
+    response = await client.post("/api/calendar/sync")
+    assert response.status_code == 200
+    data = response.json()
+    # 5 calendriers CalDAV synchronisés, un en échec
+    assert data["calendars_synced"] == 5
+    assert data["events_synced"] == 5
+    assert peak == 3
+
+    db_session.expire_all()
+    failed = await db_session.get(Calendar, "dav-5")
+    assert (failed.sync_status, failed.last_sync_error) == ("error", "Radicale injoignable")
+    assert (await db_session.get(Calendar, "dav-0")).sync_status == "idle"
+
+    # Lecture d'un calendrier CalDAV : miroir local, rafraîchi par le seul ctag
+    servers["remote-dav-0"].requests.clear()
+    response = await client.get("/api/calendar/events", params={
+        "calendar_id": "dav-0", "time_min": "2026-05-01T00:00:00Z", "time_max": "2026-06-01T00:00:00Z",
+    })
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json()] == ["simple-0"]
+    assert servers["remote-dav-0"].requests == Counter(ctag=1)
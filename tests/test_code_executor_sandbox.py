@@ -72,12 +72,23 @@ async def test_execute_sandboxed_passe_par_un_sous_process_spawn(monkeypatch, tm
     du backend (sinon une évasion accéderait aux secrets en mémoire)."""
     import multiprocessing as mp
 
+    from app.services.skills import code_executor
+
     captured: dict = {}
     real_get_context = mp.get_context
 
     class _Q:
+        def __init__(self):
+            self.messages = [("ready", ""), ("ok", "")]
+
         def get(self, timeout=None):
-            return ("ok", "")
+            return self.messages.pop(0)
+
+        def put(self, item):
+            captured["job"] = item
+
+        def cancel_join_thread(self):
+            pass
 
     class _P:
         def __init__(self, target, args, daemon=False):
@@ -105,6 +116,8 @@ async def test_execute_sandboxed_passe_par_un_sous_process_spawn(monkeypatch, tm
     monkeypatch.setattr(
         mp, "get_context", lambda m: _Ctx() if m == "spawn" else real_get_context(m)
     )
+    monkeypatch.setattr(code_executor, "_sandbox_pool", code_executor.SandboxPool(0))
 
     await execute_sandboxed(XLSX_OK, str(tmp_path / "x.xlsx"), "T", "xlsx")
-    assert captured["target"].__name__ == "_run_generation_in_subprocess"
+    assert captured["target"].__name__ == "_sandbox_worker"
+    assert captured["job"][0] == XLSX_OK
@@ -0,0 +1,84 @@
+"""Pool de workers pré-chauffés pour le sandbox des skills Office (US-001).
+
+Chaque worker est un process spawn qui importe les bibliothèques Office à
+l'avance, exécute UN job puis disparaît : la latence de démarrage sort du
+chemin critique sans qu'aucun état ne passe d'une génération à l'autre.
+"""
+import time
+
+import pytest
+from app.services.skills import code_executor
+from app.services.skills.code_executor import SandboxPool
+
+XLSX_OK = "wb = Workbook()\nws = wb.active\nws['A1'] = title\nwb.save(output_path)"
+DOCX_OK = "doc = Document()\ndoc.add_heading(title)\ndoc.save(output_path)"
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(1)
+    yield pool
+    pool.shutdown()
+
+
+def _wait_warm(pool: SandboxPool) -> None:
+    pool.warm()
+    assert pool._idle[0].wait_ready(60)
+
+
+def test_worker_a_usage_unique_remplace_apres_le_job(pool, tmp_path):
+    _wait_warm(pool)
+    first = pool._idle[0]
+
+    status, detail = pool.run((XLSX_OK, str(tmp_path / "a.xlsx"), "Titre", "xlsx", 10))
+
+    assert (status, detail) == ("ok", "")
+    assert (tmp_path / "a.xlsx").stat().st_size > 0
+    assert not first.process.is_alive()
+    assert len(pool._idle) == 1
+    assert pool._idle[0].process.pid != first.process.pid
+
+    status, _ = pool.run((DOCX_OK, str(tmp_path / "b.docx"), "Titre", "docx", 10))
+    assert status == "ok"
+
+
+def test_aucun_etat_ne_survit_entre_deux_jobs(pool, tmp_path):
+    _wait_warm(pool)
+    status, _ = pool.run(("openpyxl.marque = title", str(tmp_path / "x.xlsx"), "secret", "xlsx", 10))
+    assert status == "ok"
+
+    _wait_warm(pool)
+    status, detail = pool.run(("x = openpyxl.marque", str(tmp_path / "x.xlsx"), "T", "xlsx", 10))
+    assert status == "error"
+    assert "marque" in detail
+
+
+def test_timeout_termine_le_worker(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(code_executor, "EXECUTION_TIMEOUT", 1)
+    _wait_warm(pool)
+    worker = pool._idle[0]
+
+    status, _ = pool.run(("while True:\n    pass", str(tmp_path / "x.xlsx"), "T", "xlsx", 10))
+
+    assert status == "timeout"
+    assert not worker.process.is_alive()
+
+
+def test_debit_workers_prechauffes_contre_spawn_a_froid(pool, tmp_path):
+    runs = 3
+    cold_pool = SandboxPool(0)
+    started = time.perf_counter()
+    for i in range(runs):
+        assert cold_pool.run((XLSX_OK, str(tmp_path / f"cold-{i}.xlsx"), "T", "xlsx", 10))[0] == "ok"
+    cold = (time.perf_counter() - started) / runs
+
+    warm = 0.0
+    for i in range(runs):
+        _wait_warm(pool)
+        started = time.perf_counter()
+        assert pool.run((XLSX_OK, str(tmp_path / f"warm-{i}.xlsx"), "T", "xlsx", 10))[0] == "ok"
+        warm += time.perf_counter() - started
+    warm /= runs
+
+    print(f"\nsandbox : spawn à froid {cold * 1000:.0f} ms/job, worker pré-chauffé {warm * 1000:.0f} ms/job")
+    assert warm < cold / 3
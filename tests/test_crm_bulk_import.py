@@ -0,0 +1,151 @@
+"""Import CRM ensembliste : lots commités, IDs préchargés, upsert, progression."""
+
+import json
+import time
+
+from app.models.entities import Contact, Deliverable, Project
+from app.services import crm_import
+from app.services.crm_import import CRMImportService, ImportProgress, ImportResult
+from sqlalchemy import event
+from sqlmodel import func, select
+
+
+def _csv(header: str, rows: list[str]) -> bytes:
+    return ("\n".join([header, *rows]) + "\n").encode()
+
+
+async def test_creation_mise_a_jour_et_doublons(db_session):
+    db_session.add(Contact(id="c-1", first_name="Ancien", company="Garde", score=80, stage="discovery"))
+    await db_session.commit()
+
+    content = _csv("id,Prenom,Nom,Entreprise,Score,Tags", [
+        "c-1,Alice,Legrand,,,vip",          # mise à jour partielle
+        ",Bob,Petit,BigCorp,,",             # création, valeurs par défaut
+        "c-3,Chloe,Durand,,70,",            # création avec ID
+        "c-3,Chloe,Durand,Nouvelle,,",      # doublon dans le fichier : fusionné
+        ",,,,,",                            # invalide
+    ])
+    result = await CRMImportService(db_session).import_contacts(content, filename="c.csv")
+
+    assert (result.created, result.updated, result.skipped) == (2, 2, 1)
+    assert len(result.errors) == 1 and result.errors[0].row == 5
+
+    db_session.expire_all()
+    alice = await db_session.get(Contact, "c-1")
+    assert (alice.first_name, alice.company, alice.score, alice.stage) == ("Alice", "Garde", 80, "discovery")
+    assert json.loads(alice.tags) == ["vip"]
+    chloe = await db_session.get(Contact, "c-3")
+    assert (chloe.company, chloe.score) == ("Nouvelle", 70)
+    bob = (await db_session.execute(select(Contact).where(Contact.first_name == "Bob"))).scalar_one()
+    assert (bob.stage, bob.score, bob.scope) == ("contact", 50, "global")
+
+
+async def test_update_existing_false_ignore_les_existants(db_session):
+    db_session.add(Contact(id="c-1", first_name="Ancien"))
+    await db_session.commit()
+
+    content = _csv("id,Prenom", ["c-1,Nouveau", "c-2,Autre"])
+    result = await CRMImportService(db_session).import_contacts(
+        content, filename="c.csv", update_existing=False
+    )
+    assert (result.created, result.updated, result.skipped) == (1, 0, 1)
+    db_session.expire_all()
+    assert (await db_session.get(Contact, "c-1")).first_name == "Ancien"
+
+
+async def test_references_projets_et_livrables(db_session):
+    db_session.add(Contact(id="c-1", first_name="Client"))
+    await db_session.commit()
+    service = CRMImportService(db_session)
+
+    result = await service.import_projects(_csv("id,Nom,contact_id,Statut", [
+        "p-1,Site web,c-1,en cours",
+        "p-2,Audit,c-inconnu,termine",
+    ]), filename="p.csv")
+    assert result.created == 2
+    db_session.expire_all()
+    p1, p2 = await db_session.get(Project, "p-1"), await db_session.get(Project, "p-2")
+    assert (p1.contact_id, p1.status) == ("c-1", "active")
+    assert (p2.contact_id, p2.status) == (None, "completed")
+
+    result = await service.import_deliverables(_csv("id,project_id,Titre,Statut,due_date", [
+        "d-1,p-1,Maquettes,todo,2026-11-30",
+        "d-2,p-inconnu,Orphelin,todo,",
+    ]), filename="d.csv")
+    assert (result.created, result.skipped) == (1, 1)
+    assert "p-inconnu" in result.errors[0].message and result.errors[0].row == 2
+    d1 = await db_session.get(Deliverable, "d-1")
+    assert d1.status == "a_faire" and d1.due_date.year == 2026
+
+
+async def test_commit_par_lot_et_progression(db_session):
+    commits = []
+    sync_session = db_session.sync_session
+
+    @event.listens_for(sync_session, "after_commit")
+    def _count(session):
+        commits.append(1)
+
+    content = _csv("Prenom,Email", [f"P{i},p{i}@example.test" for i in range(250)])
+    events = [
+        e async for e in CRMImportService(db_session).stream_import(
+            "contacts", content, filename="c.csv", batch_size=100
+        )
+    ]
+    event.remove(sync_session, "after_commit", _count)
+
+    progress = [e for e in events if isinstance(e, ImportProgress)]
+    assert [e.processed for e in progress] == [100, 200, 250]
+    assert progress[-1].created == 250
+    assert isinstance(events[-1], ImportResult) and events[-1].success
+    assert len(commits) == 3
+
+
+async def test_benchmark_20k_lignes(db_session):
+    rows = [f"Prenom{i},Nom{i},Societe{i % 50},p{i}@example.test,{i % 100}" for i in range(20000)]
+    content = _csv("Prenom,Nom,Entreprise,Email,Score", rows)
+
+    started = time.perf_counter()
+    result = await CRMImportService(db_session).import_contacts(content, filename="c.csv")
+    elapsed = time.perf_counter() - started
+    print(f"\nImport CRM : 20000 lignes en {elapsed:.2f}s ({20000 / elapsed:.0f} lignes/s)")
+
+    assert result.created == 20000 and result.success
+    count = (await db_session.execute(select(func.count()).select_from(Contact))).scalar_one()
+    assert count == 20000
+
+
+async def test_endpoint_stream_sse(client):
+    content = _csv("Prenom,Email", ["Alice,a@example.test", "Bob,b@example.test"])
+    resp = await client.post(
+        "/api/crm/import/contacts/stream",
+        files={"file": ("c.csv", content, "text/csv")},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[6:]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    assert events[0]["type"] == "progress" and events[0]["processed"] == 2
+    assert events[-1]["type"] == "done" and events[-1]["created"] == 2
+
+    resp = await client.post(
+        "/api/crm/import/inconnu/stream",
+        files={"file": ("c.csv", content, "text/csv")},
+    )
+    assert resp.status_code == 422
+
+
+async def test_lot_en_echec_compteurs_coherents(db_session, monkeypatch):
+    def _failing_insert(model):
+        raise RuntimeError("disque plein")
+
+    count = select(func.count()).select_from(Contact)
+    before = (await db_session.execute(count)).scalar_one()
+    monkeypatch.setattr(crm_import, "sqlite_insert", _failing_insert)
+    content = _csv("Prenom,Email", ["Alice,a@example.test", ",", "Bob,b@example.test"])
+    result = await CRMImportService(db_session).import_contacts(content, filename="c.csv")
+
+    # Rien n'est écrit : aucune création comptée, chaque ligne ignorée une seule fois
+    assert (result.created, result.updated, result.skipped, result.total_rows) == (0, 0, 3, 3)
+    assert [error.row for error in result.errors] == [2, 1]
+    assert "disque plein" in result.errors[-1].message
+    assert (await db_session.execute(count)).scalar_one() == before
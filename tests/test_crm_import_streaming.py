@@ -0,0 +1,154 @@
+"""Parseurs d'import en flux : lecture par blocs, aperçu partiel, mémoire constante."""
+
+import io
+import json
+import tempfile
+import tracemalloc
+
+import pytest
+from app.models.entities import Contact
+from app.services import crm_import
+from app.services.crm_import import (
+    CRMImportService,
+    ImportResult,
+    _count_rows,
+    _parse_csv,
+    _parse_json,
+    _parse_rows,
+    _parse_xlsx,
+)
+from openpyxl import Workbook
+from sqlmodel import func, select
+
+
+@pytest.fixture
+def petits_blocs(monkeypatch):
+    # Blocs minuscules : chaque valeur JSON est coupée entre plusieurs lectures
+    monkeypatch.setattr(crm_import, "_READ_CHUNK_SIZE", 7)
+
+
+def test_json_tableau_lu_par_blocs(petits_blocs):
+    rows = [
+        {"first_name": "Élodie", "score": 12345.5, "tags": ["a", "b"], "extra": {"x": [1, 2]}},
+        {"first_name": "Zoé", "score": 7, "notes": "ligne 1\nligne 2 \"citée\""},
+        {"first_name": "Max", "score": 1234567890},
+    ]
+    content = ("﻿" + json.dumps(rows, ensure_ascii=False, indent=2)).encode()
+    assert list(_parse_json(content)) == rows
+    assert list(_parse_json(b"[]")) == []
+
+
+def test_json_objet_englobant(petits_blocs):
+    content = json.dumps({"version": 2, "contacts": [{"first_name": "A"}, {"first_name": "B"}]})
+    assert list(_parse_json(content.encode())) == [{"first_name": "A"}, {"first_name": "B"}]
+    assert list(_parse_json(b'{"first_name": "Seul"}')) == [{"first_name": "Seul"}]
+
+    with pytest.raises(ValueError):
+        list(_parse_json(b'[{"a": 1} {"b": 2}]'))
+
+
+def test_csv_fichier_latin1_et_detection_du_format():
+    content = "Prenom,Nom\nHélène,Durand\nFrançois,Martin\n".encode("latin-1")
+    stream = io.BytesIO(content)
+    assert list(_parse_csv(stream)) == [
+        {"Prenom": "Hélène", "Nom": "Durand"},
+        {"Prenom": "François", "Nom": "Martin"},
+    ]
+    # Le fichier de l'appelant reste ouvert et réutilisable
+    assert not stream.closed
+    assert _count_rows(stream) == 2
+    assert list(_parse_rows(b'  [{"a": 1}]')) == [{"a": 1}]
+
+
+def test_xlsx_lu_en_mode_read_only():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Prenom", "Email"])
+    for i in range(30):
+        ws.append([f"P{i}", f"p{i}@example.test"])
+    ws.append([None, None])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    rows = _parse_xlsx(buffer)
+    assert next(rows) == {"Prenom": "P0", "Email": "p0@example.test"}
+    assert len(list(rows)) == 29
+    assert _count_rows(buffer.getvalue(), "c.xlsx") == 31  # dimension déclarée
+
+
+def test_memoire_constante_sur_gros_csv():
+    with tempfile.TemporaryFile() as stream:
+        stream.write(b"Prenom,Nom,Email,Notes\n")
+        line = b"Prenom,Nom,prenom.nom@example.test," + b"x" * 200 + b"\n"
+        for _ in range(50000):
+            stream.write(line)
+        size = stream.tell()
+
+        tracemalloc.start()
+        count = sum(1 for _ in _parse_csv(stream))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    assert count == 50000
+    assert size > 10_000_000
+    assert peak < 1_000_000
+
+
+async def test_apercu_ne_mappe_que_les_premieres_lignes(db_session, monkeypatch):
+    calls = []
+    real_map = crm_import._map_columns
+    monkeypatch.setattr(
+        crm_import, "_map_columns", lambda row, mapping: calls.append(1) or real_map(row, mapping)
+    )
+    content = ("Prenom,Email\n" + "".join(f"P{i},p{i}@example.test\n" for i in range(1000))).encode()
+
+    preview = await CRMImportService(db_session).preview_contacts(io.BytesIO(content), filename="c.csv")
+
+    assert len(calls) == crm_import.PREVIEW_ROWS
+    assert len(preview.sample_rows) == crm_import.PREVIEW_ROWS
+    assert preview.total_rows == 1000
+    assert preview.can_import
+
+
+async def test_import_depuis_un_fichier_et_fichier_tronque(db_session):
+    rows = [{"first_name": f"P{i}"} for i in range(250)]
+    content = json.dumps(rows).encode()
+    service = CRMImportService(db_session)
+
+    events = [
+        e async for e in service.stream_import(
+            "contacts", io.BytesIO(content[:-40]), filename="c.json", batch_size=100
+        )
+    ]
+    result = events[-1]
+    assert isinstance(result, ImportResult) and not result.success
+    # Les lots complets sont importés, l'erreur pointe la suite du fichier
+    assert result.created == 200
+    assert result.errors[0].row == 201
+
+    count = (await db_session.execute(select(func.count()).select_from(Contact))).scalar_one()
+    assert count == 200
+
+    result = await service.import_contacts(b"\xff\xfe\x00garbage", filename="c.json")
+    assert not result.success and result.errors[0].row == 0
+
+
+def test_comptage_json_sans_decoder_les_lignes(petits_blocs, monkeypatch):
+    rows = [
+        {"notes": 'crochet ] et accolade } dans "une" chaine \\', "n": [1, {"a": "]"}]},
+        {"first_name": "Zoé", "score": -12.5e3, "ok": True, "vide": None},
+        "texte",
+        42,
+    ]
+    decoded = []
+    real_value = crm_import._JSONReader.value
+    monkeypatch.setattr(
+        crm_import._JSONReader, "value", lambda self: decoded.append(1) or real_value(self)
+    )
+
+    assert _count_rows(json.dumps(rows, ensure_ascii=False).encode(), "c.json") == 4
+    assert decoded == []
+    assert _count_rows(json.dumps({"version": 2, "contacts": rows}).encode(), "c.json") == 4
+    # Seules la clé et la valeur qui précèdent le tableau sont décodées
+    assert len(decoded) == 3
+    assert _count_rows(b"[]", "c.json") == 0
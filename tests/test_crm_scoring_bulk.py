@@ -0,0 +1,106 @@
+"""Scoring ensembliste : règles en SQL, écritures groupées, decay incrémental."""
+
+import json
+from datetime import UTC, datetime, timedelta
+
+from app.models.entities import Activity, Contact
+from app.services.scoring import (
+    _recalculate_scores,
+    apply_score_decay,
+    calculate_base_score,
+    recalculate_all_scores,
+    score_expression,
+)
+from sqlalchemy import event
+from sqlmodel import select
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=UTC)
+
+
+def _contacts() -> list[Contact]:
+    return [
+        Contact(id="c-plein", email="a@example.test", phone="0600", company="ACME", source="Referral", stage="active"),
+        Contact(id="c-vide", email="", phone=None, source="", stage="contact"),
+        Contact(id="c-linkedin", source="linkedin", stage="discovery", last_interaction=NOW - timedelta(days=10)),
+        Contact(id="c-inconnu", source="salon", stage="inexistant", last_interaction=NOW - timedelta(days=45)),
+        Contact(id="c-inactif", email="b@example.test", stage="proposition", last_interaction=NOW - timedelta(days=95)),
+        Contact(id="c-futur", stage="signature", last_interaction=NOW + timedelta(days=3)),
+        Contact(id="c-archive", stage="archive", last_interaction=NOW - timedelta(days=400)),
+    ]
+
+
+async def test_regles_sql_identiques_au_calcul_python(db_session, monkeypatch):
+    contacts = _contacts()
+    db_session.add_all(contacts)
+    await db_session.commit()
+
+    result = await db_session.execute(select(Contact.id, score_expression(NOW)))
+    sql_scores = dict(result.all())
+
+    # calculate_base_score lit l'heure courante : figée à NOW
+    class _FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return NOW
+
+    monkeypatch.setattr("app.services.scoring.datetime", _FrozenDatetime)
+    assert sql_scores == {contact.id: calculate_base_score(contact) for contact in contacts}
+    assert sql_scores["c-archive"] == 0
+
+
+async def test_recalcul_ecrit_par_lots_les_seuls_scores_changes(db_session):
+    db_session.add_all(_contacts())
+    await db_session.commit()
+    # Un contact déjà juste : ni réécrit, ni activité
+    await recalculate_all_scores(db_session)
+    activities_before = len((await db_session.execute(select(Activity))).scalars().all())
+
+    for i in range(25):
+        db_session.add(Contact(id=f"c-lot-{i:02d}", email=f"p{i}@example.test", score=0))
+    await db_session.commit()
+
+    commits = []
+    sync_session = db_session.sync_session
+
+    @event.listens_for(sync_session, "after_commit")
+    def _count(session):
+        commits.append(1)
+
+    updated, examined = await _recalculate_scores(db_session, "batch_recalculation", batch_size=10)
+    event.remove(sync_session, "after_commit", _count)
+
+    assert (updated, examined) == (25, 32)
+    assert len(commits) == 3
+    db_session.expire_all()
+    assert (await db_session.get(Contact, "c-lot-07")).score == 70
+
+    activities = (await db_session.execute(select(Activity))).scalars().all()
+    assert len(activities) == activities_before + 25
+    extra = json.loads(next(a for a in activities if a.contact_id == "c-lot-07").extra_data)
+    assert extra == {"old_score": 0, "new_score": 70, "reason": "batch_recalculation"}
+
+
+async def test_decay_incremental_seulement_au_franchissement(db_session):
+    db_session.add_all([
+        Contact(id="c-bascule", last_interaction=NOW - timedelta(days=29, hours=12)),
+        Contact(id="c-ancien", last_interaction=NOW - timedelta(days=45)),
+        Contact(id="c-actif", last_interaction=NOW - timedelta(days=2)),
+    ])
+    await db_session.commit()
+
+    # Premier passage : tous les contacts inactifs depuis 30 jours ou plus
+    assert await apply_score_decay(db_session, at=NOW) == 1
+    assert (await db_session.get(Contact, "c-ancien")).score == 45
+
+    # Score faussé hors decay : le passage suivant ne le regarde pas
+    (await db_session.get(Contact, "c-ancien")).score = 999
+    await db_session.commit()
+
+    assert await apply_score_decay(db_session, at=NOW + timedelta(days=1)) == 1
+    db_session.expire_all()
+    assert (await db_session.get(Contact, "c-bascule")).score == 45
+    assert (await db_session.get(Contact, "c-ancien")).score == 999
+    assert (await db_session.get(Contact, "c-actif")).score == 50
+
+    # Même jour : rien ne franchit de tranche
+    assert await apply_score_decay(db_session, at=NOW + timedelta(days=1, hours=6)) == 0
@@ -0,0 +1,167 @@
+"""Push local -> Google Sheets : journal coalescé, batchUpdate groupé, conflits, quota."""
+
+import time
+
+import pytest
+from app.models.entities import Contact, Preference, SheetChange
+from app.services.crm_sync import CRMSyncService, set_crm_spreadsheet_id, set_crm_tokens
+from app.services.sheets_push import get_sheets_push_worker, push_changes
+from app.services.sheets_service import GoogleSheetsService, TokenBucket
+from sqlalchemy import delete, update
+from sqlmodel import func, select
+
+from tests.test_crm_sheets_sync import SPREADSHEET_ID, install_fake_sheets
+
+
+@pytest.fixture
+async def sheets_api(monkeypatch, db_session):
+    api = install_fake_sheets(monkeypatch)
+    # Journal actif seulement quand un spreadsheet est configuré
+    await set_crm_spreadsheet_id(db_session, SPREADSHEET_ID)
+    return api
+
+
+def _sheets() -> GoogleSheetsService:
+    return GoogleSheetsService(access_token="token")
+
+
+async def _pending(db_session) -> list[SheetChange]:
+    result = await db_session.execute(select(SheetChange).order_by(SheetChange.row_id))
+    return list(result.scalars().all())
+
+
+async def test_1000_modifications_en_quelques_requetes(db_session, sheets_api):
+    for i in range(1000):
+        sheets_api.add("Clients", ID=f"c-{i:04d}", Nom=f"Client {i}", Score="50")
+    await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+    # Écritures venues de la feuille : rien à renvoyer
+    assert await _pending(db_session) == []
+
+    contacts = (await db_session.execute(select(Contact))).scalars().all()
+    for contact in contacts:
+        contact.company = f"Societe {contact.id}"
+    db_session.add(Contact(id="c-new", first_name="Nouveau", last_name="Client"))
+    await db_session.commit()
+    assert len(await _pending(db_session)) == 1001
+
+    sheets_api.requests.clear()
+    stats = await push_changes(db_session, _sheets(), SPREADSHEET_ID, max_ranges=500)
+
+    assert (stats.updated, stats.appended, stats.conflicts) == (1000, 1, 0)
+    # 1 batchGet + 2 batchUpdate de 500 plages + 1 append
+    assert stats.requests == 4 and len(sheets_api.requests) == 4
+    assert sheets_api.cell("Clients", "c-0999", "Entreprise") == "Societe c-0999"
+    assert sheets_api.cell("Clients", "c-new", "Nom") == "Nouveau Client"
+    assert await _pending(db_session) == []
+
+    # La synchro suivante voit ses propres écritures comme inchangées
+    stats = await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+    assert stats.to_dict()["total_synced"] == 0
+    assert stats.contacts_unchanged == 1001
+
+
+async def test_conflit_si_la_feuille_a_change_depuis_la_synchro(db_session, sheets_api):
+    sheets_api.add("Clients", ID="c-1", Nom="Marie Curie", Entreprise="Radium")
+    sheets_api.add("Clients", ID="c-2", Nom="Pierre")
+    await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+
+    for contact_id in ("c-1", "c-2"):
+        (await db_session.get(Contact, contact_id)).company = "Locale"
+    await db_session.commit()
+    sheets_api.set_cell("Clients", "c-1", "Entreprise", "Modifiée dans Sheets")
+
+    stats = await push_changes(db_session, _sheets(), SPREADSHEET_ID)
+    assert (stats.updated, stats.conflicts) == (1, 1)
+    assert sheets_api.cell("Clients", "c-1", "Entreprise") == "Modifiée dans Sheets"
+    assert sheets_api.cell("Clients", "c-2", "Entreprise") == "Locale"
+    [conflict] = await _pending(db_session)
+    assert (conflict.row_id, conflict.status) == ("c-1", "conflict")
+
+    # La feuille reste maître : la synchro reprend sa valeur et solde le conflit
+    await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+    db_session.expire_all()
+    assert (await db_session.get(Contact, "c-1")).company == "Modifiée dans Sheets"
+    assert await _pending(db_session) == []
+
+
+async def test_journal_coalesce_et_suppression(db_session, sheets_api):
+    sheets_api.add("Clients", ID="c-1", Nom="Marie")
+    sheets_api.add("Clients", ID="c-2", Nom="Pierre")
+    await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+
+    contact = await db_session.get(Contact, "c-1")
+    for score in (60, 70, 80):
+        contact.score = score
+        await db_session.commit()
+    [change] = await _pending(db_session)
+    assert (change.operation, change.version) == ("upsert", 3)
+
+    await db_session.delete(await db_session.get(Contact, "c-2"))
+    await db_session.commit()
+    operations = {change.row_id: change.operation for change in await _pending(db_session)}
+    assert operations == {"c-1": "upsert", "c-2": "delete"}
+
+    stats = await push_changes(db_session, _sheets(), SPREADSHEET_ID)
+    assert (stats.updated, stats.deleted) == (1, 1)
+    assert sheets_api.cell("Clients", "c-1", "Score") == "80"
+    assert [row[0] for row in sheets_api.tabs["Clients"][1:] if row and row[0]] == ["c-1"]
+    count = (await db_session.execute(select(func.count()).select_from(SheetChange))).scalar_one()
+    assert count == 0
+
+
+async def test_update_par_critere_journalise_les_lignes_visees(db_session, sheets_api):
+    for contact_id, status in (("c-1", "prospect"), ("c-2", "prospect"), ("c-3", "client")):
+        db_session.add(Contact(id=contact_id, first_name=contact_id, stage=status))
+    await db_session.commit()
+    await db_session.execute(delete(SheetChange))
+    await db_session.commit()
+
+    await db_session.execute(update(Contact).where(Contact.stage == "prospect").values(score=90))
+    await db_session.commit()
+    assert [change.row_id for change in await _pending(db_session)] == ["c-1", "c-2"]
+
+
+async def test_rien_n_est_journalise_sans_spreadsheet(client, db_session, sheets_api):
+    await db_session.execute(delete(Preference).where(Preference.key == "crm_spreadsheet_id"))
+    await db_session.commit()
+
+    db_session.add(Contact(id="c-1", first_name="Marie"))
+    await db_session.commit()
+    await db_session.execute(update(Contact).values(score=10))
+    await db_session.commit()
+    assert await _pending(db_session) == []
+
+    # Journal hérité d'une configuration retirée : vidé par le worker
+    db_session.add(SheetChange(tab="Clients", row_id="c-1", operation="upsert"))
+    await db_session.commit()
+    assert await get_sheets_push_worker().push_once() is None
+    assert await _pending(db_session) == []
+
+
+async def test_endpoint_push(client, db_session, sheets_api):
+    sheets_api.add("Clients", ID="c-1", Nom="Marie")
+    await set_crm_spreadsheet_id(db_session, SPREADSHEET_ID)
+    await set_crm_tokens(db_session, "token")
+    await CRMSyncService(db_session, _sheets()).sync_all(SPREADSHEET_ID)
+    (await db_session.get(Contact, "c-1")).notes = "Rappeler lundi"
+    await db_session.commit()
+
+    resp = await client.post("/api/crm/sync/push")
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["updated"] == 1 and resp.json()["success"]
+    assert sheets_api.cell("Clients", "c-1", "Notes") == "Rappeler lundi"
+
+
+async def test_token_bucket_lisse_les_rafales():
+    bucket = TokenBucket(rate=20.0, capacity=2)
+    started = time.perf_counter()
+    await bucket.acquire()
+    await bucket.acquire()
+    burst = time.perf_counter() - started
+    await bucket.acquire()
+    await bucket.acquire()
+    elapsed = time.perf_counter() - started
+
+    assert burst < 0.02
+    # Deux jetons manquants à 20 jetons/s
+    assert elapsed >= 0.09
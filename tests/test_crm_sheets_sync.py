@@ -0,0 +1,208 @@
+"""Synchro Google Sheets par delta : onglets en parallèle, empreintes, clés préchargées."""
+
+import asyncio
+import json
+from urllib.parse import unquote
+
+import httpx
+import pytest
+from app.models.entities import Contact, Deliverable, Project, SheetRowFingerprint, Task
+from app.services import sheets_service
+from app.services.crm_sync import CRMSyncService, set_crm_spreadsheet_id, set_crm_tokens
+from app.services.sheets_service import GoogleSheetsService, TokenBucket
+from sqlalchemy import event
+from sqlmodel import func, select
+
+SPREADSHEET_ID = "sheet-123"
+
+HEADERS = {
+    "Clients": ["ID", "Nom", "Entreprise", "Email", "Tel", "Source", "Stage", "Score", "Tags", "LastInteraction", "Notes"],
+    "Projects": ["ID", "ClientID", "Name", "Description", "Status", "Budget", "Notes"],
+    "Deliverables": ["ID", "ProjectID", "Title", "Description", "Status", "DueDate", "DeliveredDate"],
+    "Tasks": ["ID", "Title", "Description", "Priority", "Status", "DueDate", "CreatedAt", "CompletedAt"],
+}
+
+
+class FakeSheetsAPI:
+    """Doublure HTTP de l'API Sheets (values.get, batchGet, batchUpdate, append), branchée via httpx.MockTransport."""
+
+    def __init__(self):
+        self.tabs: dict[str, list[list[str]]] = {tab: [headers] for tab, headers in HEADERS.items()}
+        self.requests: list[str] = []
+        self.failing_tabs: set[str] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def add(self, tab: str, **cells):
+        self.tabs[tab].append([cells.get(header, "") for header in HEADERS[tab]])
+
+    def set_cell(self, tab: str, row_id: str, header: str, value: str):
+        row = next(row for row in self.tabs[tab][1:] if row[0] == row_id)
+        row[HEADERS[tab].index(header)] = value
+
+    def cell(self, tab: str, row_id: str, header: str) -> str:
+        row = next(row for row in self.tabs[tab][1:] if row and row[0] == row_id)
+        return row[HEADERS[tab].index(header)]
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = unquote(request.url.path)
+        self.requests.append(f"{request.method} {path}")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        if path.endswith("/values:batchGet"):
+            ranges = request.url.params.get_list("ranges")
+            return httpx.Response(200, json={"valueRanges": [
+                {"range": name, "values": self.tabs[name.strip("'")]} for name in ranges
+            ]})
+        if path.endswith("/values:batchUpdate"):
+            for item in json.loads(request.content)["data"]:
+                tab, cell = item["range"].rsplit("!", 1)
+                rows = self.tabs[tab.strip("'")]
+                index = int(cell[1:]) - 1
+                rows.extend([] for _ in range(index + 1 - len(rows)))
+                rows[index] = list(item["values"][0])
+            return httpx.Response(200, json={"totalUpdatedRows": len(json.loads(request.content)["data"])})
+
+        tab = path.rsplit("/values/", 1)[1]
+        if tab.endswith(":append"):
+            self.tabs[tab[:-len(":append")].strip("'")].extend(json.loads(request.content)["values"])
+            return httpx.Response(200, json={"updates": {}})
+        if tab in self.failing_tabs:
+            return httpx.Response(500, text="backend error")
+        return httpx.Response(200, json={"range": tab, "values": self.tabs[tab]})
+
+
+def install_fake_sheets(monkeypatch) -> FakeSheetsAPI:
+    """Branche une FakeSheetsAPI à la place du client HTTP partagé."""
+    api = FakeSheetsAPI()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+
+    async def _client():
+        return client
+
+    monkeypatch.setattr(sheets_service, "get_http_client", _client)
+    # Quota hors sujet ici : seaux assez grands pour toute la suite
+    monkeypatch.setattr(sheets_service, "_read_quota", TokenBucket(rate=1000.0, capacity=1000))
+    monkeypatch.setattr(sheets_service, "_write_quota", TokenBucket(rate=1000.0, capacity=1000))
+    return api
+
+
+@pytest.fixture
+def sheets_api(monkeypatch):
+    return install_fake_sheets(monkeypatch)
+
+
+def _service(session) -> CRMSyncService:
+    return CRMSyncService(session, GoogleSheetsService(access_token="token"))
+
+
+def _seed(api: FakeSheetsAPI):
+    api.add("Clients", ID="c-1", Nom="Marie Curie", Entreprise="Radium", Score="80", Tags="vip, labo")
+    api.add("Clients", ID="c-2", Nom="Pierre", Email="pierre@example.test")
+    api.add("Clients", Nom="Sans ID")
+    api.add("Projects", ID="p-1", ClientID="c-1", Name="Site", Status="en_cours", Budget="1 500,50")
+    api.add("Projects", ID="p-2", ClientID="c-absent", Name="Audit")
+    api.add("Deliverables", ID="d-1", ProjectID="p-1", Title="Maquettes", Status="todo", DueDate="2026-11-30")
+    api.add("Deliverables", ID="d-2", ProjectID="p-absent", Title="Orphelin")
+    api.add("Tasks", ID="t-1", Title="Relancer", Priority="urgent", CreatedAt="2026-01-02")
+
+
+async def test_premiere_synchro_onglets_en_parallele(db_session, sheets_api):
+    _seed(sheets_api)
+    stats = await _service(db_session).sync_all(SPREADSHEET_ID)
+
+    assert stats.errors == []
+    assert len(sheets_api.requests) == 4
+    assert sheets_api.max_in_flight == 4
+    assert (stats.contacts_created, stats.projects_created) == (2, 2)
+    assert (stats.deliverables_created, stats.tasks_created) == (1, 1)
+
+    marie = await db_session.get(Contact, "c-1")
+    assert (marie.first_name, marie.last_name, marie.score) == ("Marie", "Curie", 80)
+    assert (await db_session.get(Project, "p-1")).contact_id == "c-1"
+    assert (await db_session.get(Project, "p-2")).contact_id is None
+    assert await db_session.get(Deliverable, "d-2") is None
+    assert (await db_session.get(Task, "t-1")).priority == "urgent"
+
+    count = (await db_session.execute(select(func.count()).select_from(SheetRowFingerprint))).scalar_one()
+    assert count == 6
+
+
+async def test_resynchro_n_ecrit_que_les_lignes_modifiees(db_session, sheets_api):
+    _seed(sheets_api)
+    await _service(db_session).sync_all(SPREADSHEET_ID)
+
+    writes = []
+
+    @event.listens_for(db_session.sync_session, "before_flush")
+    def _count(session, flush_context, instances):
+        writes.extend(session.new)
+        writes.extend(session.dirty)
+
+    stats = await _service(db_session).sync_all(SPREADSHEET_ID)
+    assert stats.to_dict()["total_synced"] == 0
+    assert stats.to_dict()["total_unchanged"] == 6
+    assert writes == []
+
+    # Une cellule modifiée (espaces ignorés ailleurs) : une seule ligne réécrite
+    sheets_api.set_cell("Clients", "c-2", "Entreprise", "NouvelleCo")
+    sheets_api.set_cell("Clients", "c-1", "Nom", "  Marie   Curie ")
+    stats = await _service(db_session).sync_all(SPREADSHEET_ID)
+    assert (stats.contacts_updated, stats.contacts_unchanged) == (1, 1)
+    assert [getattr(w, "id", None) for w in writes] == ["c-2"]
+    db_session.expire_all()
+    assert (await db_session.get(Contact, "c-2")).company == "NouvelleCo"
+    event.remove(db_session.sync_session, "before_flush", _count)
+
+
+async def test_suppression_locale_et_client_apparu_plus_tard(db_session, sheets_api):
+    _seed(sheets_api)
+    await _service(db_session).sync_all(SPREADSHEET_ID)
+
+    # Tâche supprimée en local : la ligne inchangée est tout de même recréée
+    await db_session.delete(await db_session.get(Task, "t-1"))
+    await db_session.commit()
+    # Le client référencé par p-2 arrive dans la feuille
+    sheets_api.add("Clients", ID="c-absent", Nom="Nouveau")
+
+    stats = await _service(db_session).sync_all(SPREADSHEET_ID)
+    assert stats.tasks_created == 1
+    assert (stats.projects_updated, stats.projects_unchanged) == (1, 1)
+    db_session.expire_all()
+    assert (await db_session.get(Project, "p-2")).contact_id == "c-absent"
+
+    # Ligne retirée de la feuille : son empreinte est oubliée
+    sheets_api.tabs["Tasks"] = [HEADERS["Tasks"]]
+    await _service(db_session).sync_all(SPREADSHEET_ID)
+    tabs = (await db_session.execute(select(SheetRowFingerprint.tab))).scalars().all()
+    assert "Tasks" not in tabs
+
+
+async def test_onglet_en_erreur_n_empeche_pas_les_autres(db_session, sheets_api):
+    _seed(sheets_api)
+    sheets_api.failing_tabs = {"Projects"}
+    stats = await _service(db_session).sync_all(SPREADSHEET_ID)
+
+    assert len(stats.errors) == 1 and stats.errors[0].startswith("Projects")
+    assert stats.contacts_created == 2 and stats.tasks_created == 1
+    # Livrables : projet inconnu en local, ignorés
+    assert stats.deliverables_created == 0
+
+
+async def test_endpoint_sync_rapporte_les_inchanges(client, db_session, sheets_api):
+    _seed(sheets_api)
+    await set_crm_spreadsheet_id(db_session, SPREADSHEET_ID)
+    await set_crm_tokens(db_session, "token")
+
+    resp = await client.post("/api/crm/sync")
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["stats"]["total_synced"] == 6
+
+    resp = await client.post("/api/crm/sync")
+    body = resp.json()
+    assert body["stats"]["total_synced"] == 0
+    assert body["stats"]["total_unchanged"] == 6
+    assert "6 inchanges" in body["message"]
@@ -0,0 +1,97 @@
+"""Deep research : sous-requêtes lancées en parallèle (concurrence bornée),
+progression à chaque fin de recherche, sources dédupliquées par URL et délai
+global de la phase de recherche."""
+
+import asyncio
+import json
+
+from app.services import deep_research as dr
+from app.services.deep_research import deep_research
+from app.services.web_search import SearchResponse, SearchResult
+
+QUERIES = ["marché formation", "concurrents", "prix"]
+
+
+class FakeSearch:
+    def __init__(self, delays: dict[str, float | None], results: dict[str, list[str]]):
+        self.delays = delays
+        self.results = results
+        self.running = 0
+        self.max_running = 0
+
+    async def search(self, query: str, max_results: int = 5) -> SearchResponse:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if self.delays[query] is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delays[query])
+        finally:
+            self.running -= 1
+        return SearchResponse(
+            query=query,
+            results=[SearchResult(title=url, url=url, snippet=f"extrait {url}") for url in self.results[query]],
+            total_results=len(self.results[query]),
+        )
+
+
+class FakeLLM:
+    def __init__(self):
+        self.synthesis_prompt = ""
+
+    def prepare_context(self, messages):
+        return messages[-1].content
+
+    async def stream_response(self, context, enable_grounding=True, raise_on_error=False):
+        if "sous-questions" in context:
+            yield json.dumps(QUERIES)
+        else:
+            self.synthesis_prompt = context
+            yield "Rapport."
+
+
+async def _run(monkeypatch, search: FakeSearch, **kwargs):
+    monkeypatch.setattr(dr, "get_web_search_service", lambda: search)
+    llm = FakeLLM()
+    events = [event async for event in deep_research("Faut-il lancer une formation ?", llm, **kwargs)]
+    return events, llm
+
+
+async def test_recherches_paralleles_bornees_et_dedupliquees(monkeypatch):
+    search = FakeSearch(
+        delays={"marché formation": 0.15, "concurrents": 0.01, "prix": 0.05},
+        results={
+            "marché formation": ["https://a.fr/etude", "https://b.fr/"],
+            "concurrents": ["https://A.fr/etude/", "https://c.fr"],
+            "prix": ["https://b.fr#tarifs", "https://d.fr"],
+        },
+    )
+    events, llm = await _run(monkeypatch, search, max_concurrency=2)
+
+    assert search.max_running == 2
+    done = [event for event in events if event.type == "search_done"]
+    # Progression dans l'ordre d'arrivée, pas celui des sous-requêtes
+    assert [event.query for event in done] == ["concurrents", "prix", "marché formation"]
+    assert done[-1].content.startswith("Recherche 3/3 terminée (4 sources)")
+
+    (final,) = [event for event in events if event.type == "done"]
+    # Ordre des sous-requêtes, une source par page
+    assert [source.url for source in final.sources] == [
+        "https://a.fr/etude", "https://b.fr/", "https://c.fr", "https://d.fr",
+    ]
+    assert "[4] https://d.fr - https://d.fr" in llm.synthesis_prompt and "[5]" not in llm.synthesis_prompt
+
+
+async def test_delai_global_abandonne_les_recherches_lentes(monkeypatch):
+    search = FakeSearch(
+        delays={"marché formation": 0.01, "concurrents": None, "prix": 0.02},
+        results={"marché formation": ["https://a.fr"], "concurrents": [], "prix": ["https://d.fr"]},
+    )
+    events, _ = await _run(monkeypatch, search, deadline_seconds=0.2)
+
+    done = [event for event in events if event.type == "search_done"]
+    assert len(done) == 3
+    assert "abandonnée" in done[-1].content and done[-1].query == "concurrents"
+    assert search.running == 0  # recherche annulée, pas laissée en fond
+    (final,) = [event for event in events if event.type == "done"]
+    assert [source.url for source in final.sources] == ["https://a.fr", "https://d.fr"]
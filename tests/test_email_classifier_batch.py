@@ -0,0 +1,99 @@
+"""Classifieur V2 : tables compilées, mode batch, cache par message et débit."""
+
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from app.services.email_classifier_v2 import EmailClassifierV2
+
+
+@pytest.fixture(autouse=True)
+def _cache_vide():
+    EmailClassifierV2.clear_cache()
+    yield
+    EmailClassifierV2.clear_cache()
+
+
+def _email(i: int, **overrides) -> dict:
+    email = {
+        "subject": f"Facture n°{i} - échéance 28/01",
+        "from_email": "compta@client.fr",
+        "from_name": "Marie Dupont",
+        "snippet": "Bonjour, veuillez trouver ci-joint la facture. Merci de confirmer avant le 28.",
+        "labels": [],
+        "has_attachments": True,
+        "message_id": f"msg-{i}",
+    }
+    email.update(overrides)
+    return email
+
+
+def test_mots_cles_dans_l_ordre_des_tables():
+    """Le résultat est identique à `[kw for kw in table if kw in text]`."""
+    result = EmailClassifierV2.classify(
+        subject="Nouvelle promotion : code promo -50%",
+        from_email="promo@boutique.fr",
+        from_name="Boutique",
+        snippet="Offre limitée",
+        labels=[],
+    )
+    assert result.category == "promotional"
+    assert result.signals["promotional"] == ["promotion", "promo"]
+
+
+def test_urgence_sans_ignorecase_sur_texte_en_minuscules():
+    result = EmailClassifierV2.classify(
+        subject="URGENT : Dernier RAPPEL",
+        from_email="contact@client.fr",
+        from_name="",
+        snippet="",
+        labels=[],
+    )
+    assert result.signals["urgent"] == ["urgent", "rappel"]
+
+
+def test_classify_batch_conserve_l_ordre():
+    emails = [
+        _email(1),
+        _email(2, subject="Newsletter hebdo", from_email="news@substack.com", snippet=""),
+    ]
+    results = EmailClassifierV2.classify_batch(emails)
+    assert [r.category for r in results] == ["transactional", "newsletter"]
+
+
+def test_cache_par_message_et_empreinte():
+    first = EmailClassifierV2.classify(**_email(1))
+    assert EmailClassifierV2.classify(**_email(1)) is first
+
+    # Contenu modifié : même message_id mais empreinte différente -> reclassé
+    changed = EmailClassifierV2.classify(**_email(1, labels=["IMPORTANT"]))
+    assert changed is not first
+    assert changed.signals.get("gmail_important") is True
+
+
+def test_cache_expire_avec_le_signal_recent():
+    date = datetime.now(UTC) - timedelta(hours=23, minutes=59, seconds=59)
+    first = EmailClassifierV2.classify(**_email(1, date=date))
+    assert first.signals.get("recent") is True
+
+    # Entrée expirée (date + 24h dépassée) -> recalcul sans le signal
+    digest, result, _expires = EmailClassifierV2._result_cache["msg-1"]
+    EmailClassifierV2._result_cache["msg-1"] = (digest, result, datetime.now(UTC) - timedelta(seconds=1))
+    again = EmailClassifierV2.classify(**_email(1, date=date))
+    assert again is not first
+
+
+def test_debit_batch_10k_messages():
+    """Benchmark : classification d'un miroir de 10k messages (messages/s)."""
+    emails = [_email(i, snippet=f"Message {i} : réunion projet demain, merci.") for i in range(10_000)]
+
+    start = time.perf_counter()
+    EmailClassifierV2.classify_batch(emails)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    EmailClassifierV2.classify_batch(emails)
+    warm = time.perf_counter() - start
+
+    print(f"\nclassify_batch : {len(emails) / cold:,.0f} msg/s (froid), {len(emails) / warm:,.0f} msg/s (cache)")
+    assert warm < cold
@@ -0,0 +1,113 @@
+"""Résolution email -> contact CRM par lot (liste, classement, tableau de bord)."""
+
+import json
+from datetime import UTC, datetime
+
+import pytest
+from app.models.entities import Contact, EmailAccount, EmailMessage
+from app.services import email_contact_matcher
+from app.services.email_contact_matcher import (
+    invalidate_contact_cache,
+    match_email_to_contact,
+    resolve_contacts_by_email,
+)
+from sqlalchemy import text
+
+
+@pytest.fixture(autouse=True)
+def _cache_vide():
+    invalidate_contact_cache()
+    yield
+    invalidate_contact_cache()
+
+
+@pytest.fixture
+async def contacts(db_session):
+    db_session.add(Contact(id="c-jean", first_name="Jean", last_name="Dupont", email="Jean@Synoptia.fr", score=85))
+    db_session.add(Contact(id="c-acme", company="ACME", email="contact@acme.test", score=40))
+    await db_session.commit()
+    return db_session
+
+
+async def test_resolution_par_lot_insensible_a_la_casse(contacts):
+    matches = await resolve_contacts_by_email(
+        contacts, ["jean@synoptia.fr", " CONTACT@acme.test ", "inconnu@example.test", None, ""]
+    )
+    assert set(matches) == {"jean@synoptia.fr", "contact@acme.test"}
+    assert matches["jean@synoptia.fr"].id == "c-jean"
+    assert matches["jean@synoptia.fr"].display_name == "Jean Dupont"
+    assert matches["contact@acme.test"].display_name == "ACME"
+    assert await match_email_to_contact("JEAN@synoptia.fr", contacts) == "c-jean"
+
+
+async def test_une_seule_requete_puis_cache(contacts, monkeypatch):
+    statements = []
+    original_execute = contacts.execute
+
+    async def _counting_execute(statement, *args, **kwargs):
+        statements.append(statement)
+        return await original_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(contacts, "execute", _counting_execute)
+
+    addresses = [f"user{i}@example.test" for i in range(50)] + ["jean@synoptia.fr"]
+    await resolve_contacts_by_email(contacts, addresses)
+    assert len(statements) == 1
+
+    # Hits et absences sont en cache : aucune nouvelle requête
+    matches = await resolve_contacts_by_email(contacts, addresses)
+    assert len(statements) == 1
+    assert set(matches) == {"jean@synoptia.fr"}
+
+
+async def test_ecriture_contact_invalide_le_cache(contacts):
+    assert "new@example.test" not in await resolve_contacts_by_email(contacts, ["new@example.test"])
+
+    contacts.add(Contact(id="c-new", first_name="Nouveau", email="new@example.test"))
+    await contacts.commit()
+    assert not email_contact_matcher._cache
+
+    matches = await resolve_contacts_by_email(contacts, ["new@example.test"])
+    assert matches["new@example.test"].id == "c-new"
+
+    jean = await contacts.get(Contact, "c-jean")
+    jean.score = 10
+    await contacts.commit()
+    assert (await resolve_contacts_by_email(contacts, ["jean@synoptia.fr"]))["jean@synoptia.fr"].score == 10
+
+
+async def test_index_lower_email_utilise(contacts):
+    plan = await contacts.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE lower(email) IN ('a@b.c', 'd@e.f')"
+    ))
+    assert "ix_contacts_email_lower" in " ".join(row[-1] for row in plan.all())
+
+
+async def test_classement_par_lot_utilise_le_score_crm(client, contacts):
+    contacts.add(EmailAccount(id="acc-batch", email="ludo@example.test", provider="imap"))
+    now = datetime.now(UTC)
+    for i, sender in enumerate(["jean@synoptia.fr", "Jean@Synoptia.fr", "news@substack.com"]):
+        contacts.add(EmailMessage(
+            id=f"batch-{i}", thread_id=f"t-{i}", account_id="acc-batch",
+            from_email=sender, to_emails="[]", date=now, internal_date=now,
+            labels=json.dumps(["INBOX"]), subject="Point projet", snippet="",
+        ))
+    await contacts.commit()
+
+    resp = await client.post(
+        "/api/email/messages/classify-batch", params={"account_id": "acc-batch"}, json={}
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["classified"] == 3
+
+    message = await contacts.get(EmailMessage, "batch-0")
+    await contacts.refresh(message)
+    assert message.priority == "high"
+    assert "Client VIP" in message.priority_reason
+
+    # Déjà classés : rien à refaire sans force_reclassify
+    resp = await client.post(
+        "/api/email/messages/classify-batch", params={"account_id": "acc-batch"}, json={}
+    )
+    assert resp.json()["classified"] == 0
@@ -0,0 +1,134 @@
+"""Résumé d'emails map-reduce : lots parallèles bornés, cache par message, flux."""
+
+import asyncio
+import re
+from datetime import UTC, datetime
+
+import pytest
+from app.services import email_digest
+from app.services.email.base_provider import EmailMessageDTO
+from app.services.email_digest import (
+    clear_digest_cache,
+    stream_email_summary,
+    summarize_email_messages,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache_vide():
+    clear_digest_cache()
+    yield
+    clear_digest_cache()
+
+
+class FakeLLM:
+    """LLM factice : une ligne `[n]` par email, synthèse streamée en 3 morceaux."""
+
+    def __init__(self, skip: set[str] | None = None):
+        self.map_calls: list[int] = []
+        self.partial_calls = 0
+        self.reduce_prompts: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.skip = skip or set()
+
+    async def generate_content(self, prompt, system_prompt=None, **kwargs):
+        if system_prompt == email_digest._PARTIAL_SYSTEM_PROMPT:
+            self.partial_calls += 1
+            return f"condense de {prompt.count('[Source: email]')} resumes"
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        numbers = re.findall(r"^\[(\d+)\]$", prompt, re.MULTILINE)
+        subjects = re.findall(r"— (Sujet \d+)", prompt)
+        self.map_calls.append(len(numbers))
+        return "\n".join(
+            f"[{n}] resume de {subject}"
+            for n, subject in zip(numbers, subjects, strict=True)
+            if subject not in self.skip
+        )
+
+    def prepare_context(self, messages, system_prompt=None):
+        self.reduce_prompts.append(messages[0].content)
+        return messages
+
+    async def stream_response(self, context, **kwargs):
+        for chunk in ("Resume : ", "3 points, ", "2 actions."):
+            yield chunk
+
+
+def _messages(count: int, start: int = 0) -> list[EmailMessageDTO]:
+    return [
+        EmailMessageDTO(
+            id=f"m-{i}",
+            subject=f"Sujet {i}",
+            from_email=f"client{i}@example.test",
+            date=datetime(2026, 10, 1, 9, 0, tzinfo=UTC),
+            body_plain=f"Corps du message {i}",
+        )
+        for i in range(start, start + count)
+    ]
+
+
+async def test_map_par_lots_concurrence_bornee_et_flux():
+    llm = FakeLLM()
+    events = [
+        event async for event in stream_email_summary(
+            _messages(40), llm=llm, batch_size=8, max_concurrency=2
+        )
+    ]
+
+    assert llm.map_calls == [8, 8, 8, 8, 8]
+    assert llm.max_in_flight == 2
+    progress = [event.processed for event in events if event.type == "progress"]
+    assert progress[0] == 0 and progress[-1] == 40 and progress == sorted(progress)
+    assert "".join(event.content for event in events if event.type == "chunk") == (
+        "Resume : 3 points, 2 actions."
+    )
+    # Aucun mail écarté : les 40 résumés, dans l'ordre, alimentent la synthèse
+    reduce_prompt = llm.reduce_prompts[0]
+    assert "40 email(s)" in reduce_prompt
+    positions = [reduce_prompt.index(f"resume de Sujet {i}\n") for i in range(40)]
+    assert positions == sorted(positions)
+
+
+async def test_cache_par_message_ne_traite_que_le_nouveau():
+    llm = FakeLLM()
+    await summarize_email_messages(_messages(10), llm=llm)
+    assert sum(llm.map_calls) == 10
+
+    llm = FakeLLM()
+    events = [event async for event in stream_email_summary(_messages(12), llm=llm)]
+    assert llm.map_calls == [2]
+    assert events[0].cached == 10
+
+    # Contenu modifié sous le même ID : résumé recalculé
+    changed = _messages(12)
+    changed[0].body_plain = "Nouveau corps"
+    llm = FakeLLM()
+    await summarize_email_messages(changed, llm=llm)
+    assert llm.map_calls == [1]
+
+
+async def test_message_oublie_par_le_llm_repli_non_mis_en_cache():
+    llm = FakeLLM(skip={"Sujet 1"})
+    await summarize_email_messages(_messages(3), llm=llm)
+    assert "Sujet 1 : Corps du message 1" in llm.reduce_prompts[0]
+
+    llm = FakeLLM()
+    await summarize_email_messages(_messages(3), llm=llm)
+    assert llm.map_calls == [1]
+
+
+async def test_reduce_hierarchique_au_dela_de_la_fenetre():
+    llm = FakeLLM()
+    events = [
+        event async for event in stream_email_summary(
+            _messages(30), llm=llm, max_reduce_chars=2000
+        )
+    ]
+    assert llm.partial_calls > 1
+    assert "condense de" in llm.reduce_prompts[0]
+    assert "resume de Sujet" not in llm.reduce_prompts[0]
+    assert any(event.type == "chunk" for event in events)
@@ -0,0 +1,327 @@
+"""File d'envoi SMTP persistante : connexion réutilisée, débit, reprises, statut."""
+
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+from email import message_from_bytes
+
+import aiosmtplib
+import pytest
+from app.models.entities import Contact, EmailAccount, Invoice, OutboundEmail
+from app.services.email import imap_smtp_provider
+from app.services.email.base_provider import SendEmailRequest
+from app.services.email.outbound_queue import (
+    OutboundEmailQueue,
+    enqueue_emails,
+    get_job_status,
+)
+from app.services.encryption import encrypt_value
+from sqlmodel import select
+
+ACCOUNT_ID = "outbox-account"
+
+
+class FakeSMTPServer:
+    """Serveur SMTP minimal (EHLO, AUTH, MAIL, RCPT, DATA, RSET, QUIT)."""
+
+    def __init__(self):
+        self.connections = 0
+        self.logins: list[str] = []
+        self.messages: list[tuple[list[str], bytes]] = []
+        # Codes à renvoyer au prochain DATA (puis 250)
+        self.data_failures: list[str] = []
+        self.refuse_connections = False
+        self._server: asyncio.AbstractServer | None = None
+        self.port = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        if self.refuse_connections:
+            writer.write(b"554 Service unavailable\r\n")
+            await writer.drain()
+            writer.close()
+            return
+        self.connections += 1
+        recipients: list[str] = []
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 fake.smtp ESMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    writer.write(b"250-fake.smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                    await writer.drain()
+                elif verb == "AUTH":
+                    self.logins.append(command)
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = b""
+                    while True:
+                        chunk = await reader.readline()
+                        if chunk == b".\r\n":
+                            break
+                        data += chunk
+                    if self.data_failures:
+                        await reply(self.data_failures.pop(0))
+                    else:
+                        self.messages.append((recipients, data))
+                        await reply("250 OK queued")
+                elif verb in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+async def smtp_server(monkeypatch):
+    server = FakeSMTPServer()
+    await server.start()
+
+    # Le serveur de test parle SMTP en clair : on neutralise TLS/STARTTLS,
+    # le reste d'open_smtp (connexion, AUTH) est exercé tel quel.
+    real_smtp = aiosmtplib.SMTP
+
+    def _plain_smtp(**kwargs):
+        return real_smtp(**{**kwargs, "use_tls": False, "start_tls": False})
+
+    monkeypatch.setattr(imap_smtp_provider.aiosmtplib, "SMTP", _plain_smtp)
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def account(db_session, smtp_server):
+    db_session.add(EmailAccount(
+        id=ACCOUNT_ID,
+        email="ludo@example.test",
+        provider="imap",
+        imap_host="127.0.0.1",
+        imap_password=encrypt_value("secret"),
+        smtp_host="127.0.0.1",
+        smtp_port=smtp_server.port,
+    ))
+    await db_session.commit()
+    return db_session
+
+
+def _requests(count: int) -> list[SendEmailRequest]:
+    return [
+        SendEmailRequest(to=[f"client{i}@example.test"], subject=f"Relance {i}", body=f"Bonjour {i}")
+        for i in range(count)
+    ]
+
+
+async def test_un_seul_login_pour_tout_le_lot(account, smtp_server):
+    job_id, queued = await enqueue_emails(account, ACCOUNT_ID, _requests(20))
+    await account.commit()
+    assert queued == 20
+
+    queue = OutboundEmailQueue(send_interval=0)
+    assert await queue.process_due() == 20
+
+    assert smtp_server.connections == 1
+    assert len(smtp_server.logins) == 1
+    assert [recipients for recipients, _ in smtp_server.messages] == [
+        [f"client{i}@example.test"] for i in range(20)
+    ]
+
+    status = await get_job_status(account, job_id)
+    assert status["sent"] == 20 and status["done"]
+    assert all(message["attempts"] == 1 for message in status["messages"])
+
+
+async def test_erreur_temporaire_reprise_avec_backoff(account, smtp_server):
+    job_id, _ = await enqueue_emails(account, ACCOUNT_ID, _requests(3))
+    await account.commit()
+    smtp_server.data_failures = ["451 4.3.0 Try again later"]
+
+    queue = OutboundEmailQueue(send_interval=0, retry_base_delay=30)
+    before = datetime.now(UTC)
+    assert await queue.process_due() == 2
+    # Reconnexion après l'erreur temporaire
+    assert smtp_server.connections == 2
+
+    status = await get_job_status(account, job_id)
+    assert (status["sent"], status["pending"]) == (2, 1)
+    retried = next(m for m in status["messages"] if m["status"] == "pending")
+    assert retried["attempts"] == 1
+    assert "451" in retried["last_error"]
+    assert datetime.fromisoformat(retried["next_attempt_at"]) >= before + timedelta(seconds=30)
+
+    # Pas encore dû : rien ne part
+    assert await queue.process_due() == 0
+
+    row = await account.get(OutboundEmail, retried["id"])
+    row.next_attempt_at = datetime.now(UTC) - timedelta(seconds=1)
+    await account.commit()
+    assert await queue.process_due() == 1
+    assert (await get_job_status(account, job_id))["sent"] == 3
+
+
+async def test_refus_definitif_et_abandon(account, smtp_server):
+    job_id, _ = await enqueue_emails(account, ACCOUNT_ID, _requests(2))
+    await account.commit()
+    smtp_server.data_failures = ["550 5.1.1 Mailbox unavailable"]
+
+    queue = OutboundEmailQueue(send_interval=0)
+    assert await queue.process_due() == 1
+    status = await get_job_status(account, job_id)
+    assert (status["sent"], status["failed"]) == (1, 1)
+    assert status["done"]
+
+    # Serveur injoignable : reporté, puis abandonné après max_attempts
+    smtp_server.refuse_connections = True
+    job_id, _ = await enqueue_emails(account, ACCOUNT_ID, _requests(1))
+    await account.commit()
+    queue = OutboundEmailQueue(send_interval=0, max_attempts=2, retry_base_delay=0)
+    assert await queue.process_due() == 0
+    assert (await get_job_status(account, job_id))["pending"] == 1
+    assert await queue.process_due() == 0
+    status = await get_job_status(account, job_id)
+    assert status["failed"] == 1 and status["messages"][0]["attempts"] == 2
+
+
+async def test_reprise_apres_crash(account, smtp_server):
+    _, _ = await enqueue_emails(account, ACCOUNT_ID, _requests(2))
+    await account.commit()
+    rows = (await account.execute(select(OutboundEmail))).scalars().all()
+    rows[0].status = "sending"  # process tué en plein envoi
+    await account.commit()
+
+    queue = OutboundEmailQueue(send_interval=0)
+    assert await queue.recover() == 1
+    assert await queue.process_due() == 2
+
+
+async def test_erreur_imprevue_ne_bloque_pas_le_lot(account, smtp_server, monkeypatch):
+    from app.services.email import outbound_queue
+
+    job_id, _ = await enqueue_emails(account, ACCOUNT_ID, _requests(2))
+    await account.commit()
+
+    def _broken_decrypt(value):
+        raise ValueError("clé de chiffrement indisponible")
+
+    real_decrypt = outbound_queue.decrypt_value
+    monkeypatch.setattr(outbound_queue, "decrypt_value", _broken_decrypt)
+    queue = OutboundEmailQueue(send_interval=0, retry_base_delay=0)
+    assert await queue.process_due() == 0
+
+    # Rien ne reste « sending » : remis en file avec l'erreur
+    status = await get_job_status(account, job_id)
+    assert status["pending"] == 2
+    assert all("chiffrement" in message["last_error"] for message in status["messages"])
+
+    # Échec d'écriture après envoi : le reste du lot repart en file
+    monkeypatch.setattr(outbound_queue, "decrypt_value", real_decrypt)
+    calls = []
+
+    async def _failing_mark_sent(item, message_id):
+        calls.append(item.id)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(queue, "_mark_sent", _failing_mark_sent)
+    assert await queue.process_due() == 0
+    assert len(calls) == 1
+    status = await get_job_status(account, job_id)
+    assert status["pending"] == 2 and not status["done"]
+
+
+async def test_api_outbox_et_envoi_de_facture(client, account, smtp_server, tmp_path, monkeypatch):
+    resp = await client.post(
+        "/api/email/outbox",
+        params={"account_id": ACCOUNT_ID},
+        json={"messages": [
+            {"to": ["a@example.test"], "subject": "Campagne", "body": "Bonjour <Ludo>"},
+            {"to": ["b@example.test"], "subject": "Campagne", "body": "<p>Salut</p>", "html": True},
+        ]},
+    )
+    assert resp.status_code == 200, resp.text
+    job_id = resp.json()["job_id"]
+    assert resp.json()["queued"] == 2
+
+    resp = await client.get(f"/api/email/outbox/{job_id}")
+    assert resp.json()["pending"] == 2
+    assert (await client.get("/api/email/outbox/inconnu")).status_code == 404
+
+    # Facture : PDF généré puis mis en file avec pièce jointe
+    account.add(Contact(id="c-fact", first_name="Marie", email="marie@client.test"))
+    account.add(Invoice(
+        id="inv-1", invoice_number="FACT-2026-001", contact_id="c-fact",
+        due_date=datetime.now(UTC) + timedelta(days=30), total_ttc=1200.0,
+    ))
+    await account.commit()
+
+    pdf = tmp_path / "FACT-2026-001.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+
+    async def _payload(session, invoice):
+        return None, {}, {}, {"company": "Synoptia", "name": "Ludo"}
+
+    from app.routers import invoices as invoices_router
+
+    monkeypatch.setattr(invoices_router, "_invoice_pdf_payload", _payload)
+    monkeypatch.setattr(
+        invoices_router.InvoicePDFGenerator, "generate_invoice_pdf", lambda self, **kwargs: str(pdf)
+    )
+    resp = await client.post("/api/invoices/inv-1/send")
+    assert resp.status_code == 200, resp.text
+    invoice_job = resp.json()["job_id"]
+
+    invoice = await account.get(Invoice, "inv-1")
+    await account.refresh(invoice)
+    assert invoice.status == "draft"  # pas avant l'envoi réel
+
+    assert await OutboundEmailQueue(send_interval=0).process_due() == 3
+    assert smtp_server.connections == 1
+
+    await account.refresh(invoice)
+    assert invoice.status == "sent"
+    assert (await get_job_status(account, invoice_job))["sent"] == 1
+
+    recipients, data = smtp_server.messages[-1]
+    assert recipients == ["marie@client.test"]
+    mime = message_from_bytes(data)
+    assert mime["Subject"] == "Facture FACT-2026-001 - Synoptia"
+    assert [part.get_filename() for part in mime.walk() if part.get_filename()] == ["FACT-2026-001.pdf"]
+
+    rows = (await account.execute(select(OutboundEmail).where(OutboundEmail.job_id == job_id))).scalars().all()
+    assert json.loads(rows[0].to_emails) == ["a@example.test"]
+
+
+async def test_outbox_refuse_les_comptes_gmail(client, db_session):
+    db_session.add(EmailAccount(id="gmail-acc", email="g@example.test", provider="gmail"))
+    await db_session.commit()
+    resp = await client.post(
+        "/api/email/outbox",
+        params={"account_id": "gmail-acc"},
+        json={"messages": [{"to": ["a@example.test"], "subject": "x", "body": "y"}]},
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,109 @@
+"""US-EMAIL-12 : statistiques d'emails agrégées et compteurs en mémoire."""
+
+import json
+from datetime import UTC, datetime
+
+import pytest
+from app.models.entities import EmailAccount, EmailMessage
+from app.services.email_stats import count_email_stats, get_email_stats_cache
+from sqlalchemy import delete, text
+
+ACCOUNT_ID = "stats-account"
+
+
+def _message(i: int, priority: str | None, is_read: bool = False) -> EmailMessage:
+    now = datetime.now(UTC)
+    return EmailMessage(
+        id=f"stats-msg-{i}",
+        thread_id=f"thread-{i}",
+        account_id=ACCOUNT_ID,
+        from_email="client@example.test",
+        to_emails=json.dumps(["ludo@example.test"]),
+        date=now,
+        internal_date=now,
+        labels=json.dumps(["INBOX"]),
+        is_read=is_read,
+        priority=priority,
+    )
+
+
+@pytest.fixture
+async def boite(db_session):
+    get_email_stats_cache().invalidate()
+    db_session.add(EmailAccount(id=ACCOUNT_ID, email="ludo@example.test", provider="imap"))
+    for i, (priority, is_read) in enumerate([
+        ("high", False), ("high", True), ("medium", False),
+        ("low", False), ("low", False), (None, False),
+    ]):
+        db_session.add(_message(i, priority, is_read))
+    await db_session.commit()
+    yield db_session
+    get_email_stats_cache().invalidate()
+
+
+async def test_requete_agregee_unique(boite):
+    counters = await count_email_stats(boite, ACCOUNT_ID)
+    assert counters == {"high": 1, "medium": 1, "low": 2, "total": 6}
+
+
+async def test_index_couvrant_utilise(boite):
+    plan = await boite.execute(text(
+        "EXPLAIN QUERY PLAN SELECT priority, is_read, count(*) FROM email_messages "
+        "WHERE account_id = :a GROUP BY priority, is_read"
+    ), {"a": ACCOUNT_ID})
+    details = " ".join(row[-1] for row in plan.all())
+    assert "COVERING INDEX ix_email_messages_account_priority_read" in details
+
+
+async def test_endpoint_puis_cache_tenu_a_jour(client, boite):
+    resp = await client.get("/api/email/messages/stats", params={"account_id": ACCOUNT_ID})
+    assert resp.status_code == 200
+    assert resp.json() == {"high": 1, "medium": 1, "low": 2, "total_unread": 4, "total": 6}
+    assert get_email_stats_cache().get(ACCOUNT_ID) is not None
+
+    # update_message_priority : le delta est appliqué au commit, sans recomptage
+    resp = await client.patch(
+        "/api/email/messages/stats-msg-3/priority",
+        params={"account_id": ACCOUNT_ID},
+        json={"priority": "high"},
+    )
+    assert resp.status_code == 200
+    assert get_email_stats_cache().get(ACCOUNT_ID) == {"high": 2, "medium": 1, "low": 1, "total": 6}
+
+    resp = await client.get("/api/email/messages/stats", params={"account_id": ACCOUNT_ID})
+    assert resp.json()["high"] == 2
+    assert resp.json()["total_unread"] == 4
+
+
+async def test_insertion_lecture_suppression(boite):
+    cache = get_email_stats_cache()
+    await count_email_stats(boite, ACCOUNT_ID)
+    cache.fill(ACCOUNT_ID, await count_email_stats(boite, ACCOUNT_ID), cache.generation)
+
+    boite.add(_message(10, "medium"))
+    await boite.commit()
+    assert cache.get(ACCOUNT_ID) == {"high": 1, "medium": 2, "low": 2, "total": 7}
+
+    message = await boite.get(EmailMessage, "stats-msg-0")
+    message.is_read = True
+    await boite.commit()
+    assert cache.get(ACCOUNT_ID)["high"] == 0
+
+    await boite.delete(await boite.get(EmailMessage, "stats-msg-4"))
+    await boite.commit()
+    assert cache.get(ACCOUNT_ID) == {"high": 0, "medium": 2, "low": 1, "total": 6}
+    assert cache.get(ACCOUNT_ID) == await count_email_stats(boite, ACCOUNT_ID)
+
+
+async def test_rollback_et_suppression_en_masse(boite):
+    cache = get_email_stats_cache()
+    cache.fill(ACCOUNT_ID, await count_email_stats(boite, ACCOUNT_ID), cache.generation)
+
+    boite.add(_message(11, "high"))
+    await boite.flush()
+    await boite.rollback()
+    assert cache.get(ACCOUNT_ID)["total"] == 6
+
+    await boite.execute(delete(EmailMessage).where(EmailMessage.account_id == ACCOUNT_ID))
+    await boite.commit()
+    assert cache.get(ACCOUNT_ID) is None
@@ -0,0 +1,139 @@
+"""Exports CRM et RGPD en flux : lecture par lots, fichiers valides, mémoire bornée."""
+
+import csv
+import io
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from app.models.entities import Contact, Conversation, Deliverable, Message, Project
+from app.routers import data as data_router
+from app.services import crm_export
+from app.services.crm_export import CRMExportService
+from app.services.export_stream import iter_batches
+from openpyxl import load_workbook
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def batch_sizes(monkeypatch):
+    """Enregistre la taille de chaque lot lu en base."""
+    sizes = []
+
+    def spy(target, batch_size):
+        async def recording(session, statement, *args):
+            async for batch in iter_batches(session, statement, batch_size):
+                sizes.append(len(batch))
+                yield batch
+
+        monkeypatch.setattr(target, "iter_batches", recording)
+
+    spy.sizes = sizes
+    return spy
+
+
+async def _seed_contacts(db_session, count: int = 10) -> None:
+    for i in range(count):
+        db_session.add(Contact(
+            id=f"c-{i:02d}",
+            first_name=f"Prenom{i}",
+            company="ACME",
+            tags='["vip", "2026"]',
+            created_at=T0 + timedelta(minutes=i),
+        ))
+    await db_session.commit()
+
+
+async def test_contacts_lus_par_lots_dans_les_trois_formats(db_session, batch_sizes):
+    await _seed_contacts(db_session)
+    service = CRMExportService(db_session, batch_size=3)
+    batch_sizes(crm_export, 3)
+
+    result = await service.export_contacts(format="csv")
+    assert result.row_count == 10
+    content = (await result.read()).decode("utf-8")
+    assert content.startswith("\ufeff")
+    rows = list(csv.DictReader(io.StringIO(content.lstrip("\ufeff"))))
+    assert [row["ID"] for row in rows] == [f"c-{i:02d}" for i in range(9, -1, -1)]
+    assert rows[0]["Tags"] == "vip, 2026"
+    assert batch_sizes.sizes == [3, 3, 3, 1]
+
+    result = await service.export_contacts(format="json")
+    data = json.loads(await result.read())
+    assert len(data) == 10 and data[0]["tags"] == ["vip", "2026"]
+    assert data[0]["created_at"] == (T0 + timedelta(minutes=9)).isoformat()
+
+    result = await service.export_contacts(format="xlsx", stage="contact")
+    ws = load_workbook(io.BytesIO(await result.read()))["Contacts"]
+    assert ws.freeze_panes == "A2"
+    assert ws["A1"].value == "ID" and ws["A1"].font.b
+    assert ws.max_row == 11 and ws["B2"].value == "Prenom9"
+    assert ws.column_dimensions["A"].width == len("c-09") + 2
+
+
+async def test_export_complet_multi_onglets_et_json(db_session):
+    await _seed_contacts(db_session, 4)
+    db_session.add(Project(id="p-1", name="Site", contact_id="c-01"))
+    db_session.add(Deliverable(id="d-1", project_id="p-1", title="Maquette"))
+    await db_session.commit()
+    service = CRMExportService(db_session, batch_size=2)
+
+    result = await service.export_all(format="xlsx")
+    assert result.row_count == 6
+    wb = load_workbook(io.BytesIO(await result.read()))
+    assert wb.sheetnames == ["Contacts", "Projets", "Livrables"]
+    assert [wb[name].max_row for name in wb.sheetnames] == [5, 2, 2]
+
+    data = json.loads(await (await service.export_all(format="json")).read())
+    assert [len(data[key]) for key in ("contacts", "projects", "deliverables")] == [4, 1, 1]
+    assert data["deliverables"][0]["title"] == "Maquette"
+
+    content = (await (await service.export_all(format="csv")).read()).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(content.lstrip("\ufeff"))))
+    assert {row["Type"] for row in rows} == {"Contact"} and len(rows) == 4
+
+
+async def test_endpoint_crm_diffuse_le_fichier(client, db_session):
+    await _seed_contacts(db_session, 3)
+
+    resp = await client.post("/api/crm/export/contacts?format=json")
+    assert resp.status_code == 200
+    assert resp.headers["x-row-count"] == "3"
+    assert "contacts_" in resp.headers["content-disposition"]
+    assert len(resp.json()) == 3
+
+
+async def test_export_rgpd_regroupe_les_messages_par_fusion(client, db_session, batch_sizes):
+    # Identifiants et dates entrelacés : les messages arrivent triés par
+    # conversation, les conversations par identifiant, sur plusieurs lots
+    for conv_id in ("conv-b", "conv-a", "conv-c", "conv-d"):
+        db_session.add(Conversation(id=conv_id, title=conv_id))
+    await db_session.flush()
+    for i in range(9):
+        conv_id = ("conv-a", "conv-b", "conv-d")[i % 3]
+        db_session.add(Message(
+            id=f"m-{i}",
+            conversation_id=conv_id,
+            role="user",
+            content=f"message {i}",
+            extra_data='{"n": %d}' % i,
+            created_at=T0 - timedelta(minutes=i),
+        ))
+    await db_session.commit()
+    batch_sizes(data_router, 2)
+
+    resp = await client.get("/api/data/export")
+    assert resp.status_code == 200
+    assert "therese-export-" in resp.headers["content-disposition"]
+    data = resp.json()
+
+    conversations = {conv["id"]: conv for conv in data["conversations"]}
+    assert list(conversations) == ["conv-a", "conv-b", "conv-c", "conv-d"]
+    assert [m["id"] for m in conversations["conv-a"]["messages"]] == ["m-6", "m-3", "m-0"]
+    assert [m["id"] for m in conversations["conv-b"]["messages"]] == ["m-7", "m-4", "m-1"]
+    assert conversations["conv-c"]["messages"] == []
+    assert conversations["conv-d"]["messages"][0]["extra_data"] == {"n": 8}
+    assert data["data_format_version"] == "1.2"
+    assert data["activity_logs"][0]["action"] == "data_exported"
+    assert batch_sizes.sizes and max(batch_sizes.sizes) <= 2
@@ -0,0 +1,148 @@
+"""Agrégats de facturation (CA mensuel, créances, clients) et relances par anti-jointure."""
+
+from datetime import UTC, datetime, timedelta
+
+from app.models.entities import Contact, Invoice, Notification
+from app.services import aggregates, notification_service
+from sqlalchemy import text
+from sqlmodel import select
+
+NOW = datetime(2026, 6, 15, 12, tzinfo=UTC)
+
+
+def _invoice(contact, number, issued, ttc, status="sent", due=None, document_type="facture", currency="EUR"):
+    return Invoice(
+        invoice_number=number, contact_id=contact.id, document_type=document_type, currency=currency,
+        issue_date=issued, due_date=due or issued + timedelta(days=30), status=status,
+        subtotal_ht=round(ttc / 1.2, 2), total_ttc=ttc,
+    )
+
+
+async def _seed(db_session):
+    acme = Contact(company="Acme")
+    marie = Contact(first_name="Marie", last_name="Martin")
+    db_session.add_all([acme, marie])
+    await db_session.flush()
+    db_session.add_all([
+        _invoice(acme, "FACT-2025-001", datetime(2025, 11, 3, tzinfo=UTC), 1200.0, "paid"),
+        _invoice(acme, "FACT-2026-001", datetime(2026, 1, 10, tzinfo=UTC), 600.0, "paid"),
+        # Échue depuis 106 jours
+        _invoice(acme, "FACT-2026-002", datetime(2026, 2, 1, tzinfo=UTC), 2400.0, "overdue",
+                 due=datetime(2026, 3, 1, tzinfo=UTC)),
+        _invoice(acme, "AV-2026-001", datetime(2026, 2, 20, tzinfo=UTC), 120.0, "paid", document_type="avoir"),
+        # Échue depuis 10 jours, puis à échoir
+        _invoice(marie, "FACT-2026-003", datetime(2026, 5, 6, tzinfo=UTC), 360.0,
+                 due=datetime(2026, 6, 5, tzinfo=UTC)),
+        _invoice(marie, "FACT-2026-004", datetime(2026, 6, 1, tzinfo=UTC), 240.0),
+        _invoice(marie, "FACT-2026-005", datetime(2026, 6, 2, tzinfo=UTC), 999.0, "draft"),
+        _invoice(marie, "FACT-2026-006", datetime(2026, 6, 3, tzinfo=UTC), 999.0, "cancelled"),
+        _invoice(marie, "DEV-2026-001", datetime(2026, 6, 4, tzinfo=UTC), 999.0, document_type="devis"),
+        _invoice(marie, "FACT-2026-007", datetime(2026, 4, 1, tzinfo=UTC), 500.0, "paid", currency="CHF"),
+    ])
+    await db_session.commit()
+    return acme, marie
+
+
+async def test_ca_mensuel_creances_et_clients(client, db_session):
+    acme, marie = await _seed(db_session)
+
+    analytics = await aggregates.get_invoice_analytics(db_session, months=12, now=NOW)
+
+    eur = [row for row in analytics["revenue_by_month"] if row["currency"] == "EUR"]
+    assert [(r["month"], r["invoices"], r["total_ttc"], r["year_to_date_ttc"]) for r in eur] == [
+        ("2025-11", 1, 1200.0, 1200.0),
+        ("2026-01", 1, 600.0, 600.0),  # cumul remis à zéro en janvier
+        ("2026-02", 2, 2280.0, 2880.0),  # avoir déduit
+        ("2026-05", 1, 360.0, 3240.0),
+        ("2026-06", 1, 240.0, 3480.0),
+    ]
+    recent = await aggregates.get_invoice_analytics(db_session, months=2, now=NOW)
+    assert [r["month"] for r in recent["revenue_by_month"] if r["currency"] == "EUR"] == ["2026-05", "2026-06"]
+
+    receivables = {r["currency"]: r for r in analytics["receivables"]}
+    assert receivables["EUR"] == {
+        "currency": "EUR",
+        "invoices": 3,
+        "outstanding_ttc": 3000.0,
+        "overdue_ttc": 2760.0,
+        "aging": {"a_echoir": 240.0, "1_30": 360.0, "31_60": 0.0, "61_90": 0.0, "plus_90": 2400.0},
+    }
+    assert "CHF" not in receivables
+
+    clients = [(c["name"], c["currency"], c["invoiced_ttc"], c["paid_ttc"], c["outstanding_ttc"], c["rank"])
+               for c in analytics["top_clients"]]
+    assert clients == [
+        ("Marie Martin", "CHF", 500.0, 500.0, 0.0, 1),
+        ("Acme", "EUR", 4080.0, 1680.0, 2400.0, 1),
+        ("Marie Martin", "EUR", 600.0, 0.0, 600.0, 2),
+    ]
+    assert analytics["top_clients"][1]["share"] == round(4080 / 4680, 4)
+    top = await aggregates.get_invoice_analytics(db_session, top=1, now=NOW)
+    assert [c["name"] for c in top["top_clients"]] == ["Marie Martin", "Acme"]
+
+
+async def test_endpoint_servi_du_cache_et_invalide_par_une_ecriture(client, db_session, monkeypatch):
+    acme, _marie = await _seed(db_session)
+    calls = []
+    original = aggregates._compute_invoice_analytics
+
+    async def spy(session, now):
+        calls.append(now)
+        return await original(session, now)
+
+    monkeypatch.setattr(aggregates, "_compute_invoice_analytics", spy)
+
+    first = await client.get("/api/invoices/analytics")
+    assert first.status_code == 200, first.text
+    assert (await client.get("/api/invoices/analytics", params={"top": 1})).status_code == 200
+    assert len(calls) == 1
+
+    invoice = (await db_session.execute(
+        select(Invoice).where(Invoice.invoice_number == "FACT-2026-004")
+    )).scalar_one()
+    paid = await client.patch(f"/api/invoices/{invoice.id}/mark-paid", json={})
+    assert paid.status_code == 200
+    second = (await client.get("/api/invoices/analytics")).json()
+    assert len(calls) == 2
+    assert second != first.json()
+
+
+async def test_relances_impayes_par_anti_jointure(client, db_session):
+    contact = Contact(company="Acme")
+    db_session.add(contact)
+    await db_session.flush()
+    today = datetime.now(UTC)
+    relancee = _invoice(contact, "FACT-2026-101", today - timedelta(days=90), 100.0, due=today - timedelta(days=60))
+    ancienne = _invoice(contact, "FACT-2026-102", today - timedelta(days=90), 100.0, due=today - timedelta(days=45))
+    db_session.add_all([
+        relancee,
+        ancienne,
+        _invoice(contact, "FACT-2026-103", today - timedelta(days=40), 100.0, due=today - timedelta(days=10)),
+        _invoice(contact, "FACT-2026-104", today - timedelta(days=90), 100.0, "paid", due=today - timedelta(days=60)),
+    ])
+    await db_session.flush()
+    db_session.add_all([
+        Notification(title="Facture impayee", message="...", source="invoice",
+                     action_url=f"/invoices/{relancee.id}", created_at=today - timedelta(days=3)),
+        # Relance de plus de 7 jours : ne bloque plus
+        Notification(title="Facture impayee", message="...", source="invoice",
+                     action_url=f"/invoices/{ancienne.id}", created_at=today - timedelta(days=8)),
+    ])
+    await db_session.commit()
+
+    assert await notification_service._check_overdue_invoices(db_session) == 1
+    await db_session.commit()
+    messages = (await db_session.execute(
+        select(Notification.message).where(Notification.message != "...")
+    )).scalars().all()
+    assert messages == ["Facture FACT-2026-102 impayee depuis 45 jours"]
+    assert await notification_service._check_overdue_invoices(db_session) == 0
+
+    plan = await db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT invoices.id FROM invoices LEFT OUTER JOIN notifications AS n "
+        "ON n.source = 'invoice' AND n.action_url = '/invoices/' || invoices.id "
+        "WHERE invoices.status IN ('sent', 'overdue') AND invoices.due_date < '2026-01-01' AND n.id IS NULL"
+    ))
+    details = " ".join(row[-1] for row in plan.all())
+    assert "ix_invoices_status_due_date" in details
+    assert "ix_notifications_source_action_url" in details
@@ -0,0 +1,93 @@
+"""Numérotation des documents : compteur par (type, année), continu et concurrent."""
+
+import asyncio
+import sqlite3
+from datetime import UTC, datetime
+
+from app.models.database import apply_adhoc_migrations
+from app.models.entities import Invoice, InvoiceSequence
+from httpx import AsyncClient
+
+YEAR = datetime.now(UTC).year
+
+
+async def _contact(client: AsyncClient) -> str:
+    response = await client.post("/api/memory/contacts", json={"first_name": "Marie", "last_name": "Martin"})
+    return response.json()["id"]
+
+
+async def _create(client: AsyncClient, contact_id: str, document_type: str = "facture") -> str:
+    response = await client.post("/api/invoices/", json={
+        "contact_id": contact_id,
+        "document_type": document_type,
+        "lines": [{"description": "Conseil", "unit_price_ht": 100.0}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["invoice_number"]
+
+
+async def test_creations_concurrentes_sans_trou_ni_doublon(client: AsyncClient, db_session):
+    contact_id = await _contact(client)
+
+    numbers = await asyncio.gather(*(_create(client, contact_id) for _ in range(20)))
+
+    assert sorted(numbers) == [f"FACT-{YEAR}-{n:03d}" for n in range(1, 21)]
+    assert await _create(client, contact_id, "devis") == f"DEV-{YEAR}-001"
+    sequence = await db_session.get(InvoiceSequence, ("FACT", YEAR))
+    assert sequence.last_number == 20
+
+
+async def test_au_dela_de_999_et_numero_rendu_si_echec(client: AsyncClient, db_session):
+    contact_id = await _contact(client)
+    # Historique sans compteur (base non amorcée) : reprise numérique, pas lexicale
+    for number in (999, 1000):
+        db_session.add(Invoice(
+            invoice_number=f"FACT-{YEAR}-{number:03d}", contact_id=contact_id, due_date=datetime.now(UTC),
+        ))
+    await db_session.commit()
+
+    assert await _create(client, contact_id) == f"FACT-{YEAR}-1001"
+
+    # Contact inconnu : la création échoue avant l'allocation, pas de trou
+    failed = await client.post("/api/invoices/", json={
+        "contact_id": "inconnu", "lines": [{"description": "x", "unit_price_ht": 1.0}],
+    })
+    assert failed.status_code == 404
+    assert await _create(client, contact_id) == f"FACT-{YEAR}-1002"
+
+    # Conversion devis -> facture : même compteur
+    devis = await client.post("/api/invoices/", json={
+        "contact_id": contact_id, "document_type": "devis",
+        "lines": [{"description": "Audit", "unit_price_ht": 100.0}],
+    })
+    converted = await client.post(f"/api/invoices/{devis.json()['id']}/convert-to-invoice")
+    assert converted.json()["invoice_number"] == f"FACT-{YEAR}-1003"
+
+
+async def test_rollback_rend_le_numero(client: AsyncClient, db_session):
+    from app.routers.invoices import _generate_invoice_number
+
+    contact_id = await _contact(client)
+    assert await _create(client, contact_id) == f"FACT-{YEAR}-001"
+
+    assert await _generate_invoice_number(db_session) == f"FACT-{YEAR}-002"
+    await db_session.rollback()
+    assert await _create(client, contact_id) == f"FACT-{YEAR}-002"
+
+
+def test_migration_amorce_les_compteurs(tmp_path):
+    db = tmp_path / "therese.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE invoices (id TEXT PRIMARY KEY, invoice_number TEXT)")
+        conn.executemany("INSERT INTO invoices VALUES (?, ?)", [
+            ("1", "FACT-2025-999"), ("2", "FACT-2025-1000"), ("3", "FACT-2026-007"),
+            ("4", "DEV-2026-012"), ("5", "AV-2026-001"), ("6", "IMPORT-ancien"),
+        ])
+    apply_adhoc_migrations(db)
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE invoice_sequences SET last_number = 9 WHERE prefix = 'FACT' AND year = 2026")
+    apply_adhoc_migrations(db)
+
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT prefix, year, last_number FROM invoice_sequences ORDER BY prefix, year").fetchall()
+    assert rows == [("AV", 2026, 1), ("DEV", 2026, 12), ("FACT", 2025, 1000), ("FACT", 2026, 9)]
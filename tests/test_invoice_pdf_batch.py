@@ -0,0 +1,132 @@
+"""Rendu des factures PDF par lots : pool de processus, cache par empreinte, débit."""
+
+import time
+from unittest.mock import patch
+
+from app.services.invoice_batch import InvoiceRenderJob, render_invoices
+from app.services.invoice_pdf import InvoicePDFGenerator
+from httpx import AsyncClient
+from pypdf import PdfReader
+
+CONTACT = {"name": "Marie Martin", "company": "Entreprise Test", "email": "", "phone": "", "address": ""}
+PROFILE = {
+    "name": "Ludovic Sanchez", "company": "Synoptia", "address": "Manosque",
+    "siren": "", "siret": "99160678100011", "code_ape": "", "tva_intra": "",
+}
+
+
+def _invoice(number: str, lines: int = 1, notes: str = "") -> dict:
+    return {
+        "invoice_number": number,
+        "document_type": "facture",
+        "tva_applicable": True,
+        "validite_jours": 30,
+        "issue_date": "2026-06-30T00:00:00",
+        "due_date": "2026-07-30T00:00:00",
+        "status": "draft",
+        "subtotal_ht": 100.0 * lines,
+        "total_tax": 20.0 * lines,
+        "total_ttc": 120.0 * lines,
+        "notes": notes,
+        "lines": [{
+            "description": f"Prestation {i}",
+            "quantity": 1,
+            "unit_price_ht": 100.0,
+            "tva_rate": 20.0,
+            "total_ht": 100.0,
+            "total_ttc": 120.0,
+        } for i in range(lines)],
+    }
+
+
+def test_cache_de_rendu_par_empreinte(tmp_path):
+    generator = InvoicePDFGenerator(output_dir=str(tmp_path))
+
+    first = generator.render_invoice_pdf(_invoice("FACT-2026-001", lines=60), CONTACT, PROFILE)
+    assert not first.cached
+    assert first.pages == len(PdfReader(first.pdf_path).pages) > 1
+    rendered_at = (tmp_path / "FACT-2026-001.pdf").stat().st_mtime_ns
+
+    again = generator.render_invoice_pdf(_invoice("FACT-2026-001", lines=60), CONTACT, PROFILE)
+    assert again.cached and again.pdf_path == first.pdf_path
+    assert (tmp_path / "FACT-2026-001.pdf").stat().st_mtime_ns == rendered_at
+
+    # Contenu, devise ou PDF supprimé : nouveau rendu
+    assert not generator.render_invoice_pdf(_invoice("FACT-2026-001", 60, "Merci"), CONTACT, PROFILE).cached
+    assert not generator.render_invoice_pdf(_invoice("FACT-2026-001", 60, "Merci"), CONTACT, PROFILE, "CHF").cached
+    generator.delete_invoice_pdf("FACT-2026-001")
+    assert list(tmp_path.iterdir()) == []
+    assert not generator.render_invoice_pdf(_invoice("FACT-2026-001", 60), CONTACT, PROFILE).cached
+
+
+async def test_pool_de_processus_ordre_et_echecs_isoles(tmp_path):
+    jobs = [InvoiceRenderJob(_invoice(f"FACT-2026-{i:03d}"), CONTACT, PROFILE) for i in range(4)]
+    broken = _invoice("FACT-2026-KO")
+    del broken["lines"]
+    jobs.insert(2, InvoiceRenderJob(broken, CONTACT, PROFILE))
+
+    results = await render_invoices(jobs, str(tmp_path), workers=2)
+
+    assert isinstance(results[2], KeyError)
+    ok = [r for r in results if not isinstance(r, Exception)]
+    assert [r.invoice_number for r in ok] == [f"FACT-2026-{i:03d}" for i in range(4)]
+    assert all(not r.cached and r.pages == 1 for r in ok)
+
+    # Relance : rien n'est envoyé au pool
+    with patch("app.services.invoice_batch.ProcessPoolExecutor", side_effect=AssertionError):
+        results = await render_invoices(jobs[:2], str(tmp_path), workers=2)
+    assert [r.cached for r in results] == [True, True]
+
+
+async def test_endpoint_lot_de_factures(client: AsyncClient, tmp_path):
+    from app.services.user_profile import UserProfile
+
+    contact = await client.post("/api/memory/contacts", json={"first_name": "Marie", "last_name": "Martin"})
+    ids = []
+    for amount in (100.0, 200.0, 300.0):
+        created = await client.post("/api/invoices/", json={
+            "contact_id": contact.json()["id"],
+            "lines": [{"description": "Conseil", "quantity": 1, "unit_price_ht": amount}],
+        })
+        ids.append(created.json()["id"])
+
+    profile = UserProfile(name="Ludovic Sanchez", company="Synoptia", address="Manosque", siret="99160678100011")
+    with (
+        patch("app.routers.invoices.get_cached_profile", return_value=profile),
+        patch("app.routers.invoices._get_invoice_output_dir", return_value=str(tmp_path)),
+    ):
+        response = await client.post("/api/invoices/pdf/batch", json={"invoice_ids": [*ids, "inconnue", ids[0]]})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert (body["rendered"], body["cached"]) == (3, 0)
+        assert [r["invoice_id"] for r in body["results"]] == ids
+        assert body["errors"] == [{"invoice_id": "inconnue", "detail": "Invoice not found"}]
+
+        # Une facture modifiée est la seule à être régénérée
+        await client.put(f"/api/invoices/{ids[1]}", json={"notes": "Acompte reçu"})
+        body = (await client.post("/api/invoices/pdf/batch", json={"invoice_ids": ids})).json()
+        assert [r["cached"] for r in body["results"]] == [True, False, True]
+
+        single = await client.get(f"/api/invoices/{ids[2]}/pdf")
+        assert single.json()["pdf_path"] == body["results"][2]["pdf_path"]
+
+    with patch("app.routers.invoices.get_cached_profile", return_value=None):
+        response = await client.post("/api/invoices/pdf/batch", json={"invoice_ids": ids})
+    assert response.status_code == 400
+
+
+async def test_debit_lot_de_fin_de_mois(tmp_path):
+    count = 500
+    jobs = [InvoiceRenderJob(_invoice(f"FACT-2026-{i:04d}", lines=1 + i % 5), CONTACT, PROFILE) for i in range(count)]
+
+    started = time.perf_counter()
+    results = await render_invoices(jobs, str(tmp_path))
+    elapsed = time.perf_counter() - started
+    pages = sum(r.pages for r in results)
+    assert pages >= count
+    print(f"\nlot de {count} factures : {pages / elapsed:,.1f} pages/s ({count / elapsed:,.1f} factures/s)")
+
+    started = time.perf_counter()
+    cached = await render_invoices(jobs, str(tmp_path))
+    assert all(r.cached for r in cached)
+    print(f"relance (cache) : {count / (time.perf_counter() - started):,.0f} factures/s")
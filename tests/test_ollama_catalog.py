@@ -0,0 +1,171 @@
+"""Catalogue des modèles Ollama : capacités sondées une fois, persistées,
+et utilisées par le provider pour choisir la forme de la requête d'emblée."""
+
+import json
+
+import httpx
+import pytest
+from app.config import settings
+from app.models.entities import OllamaModel
+from app.services import llm, ollama_catalog
+from app.services.ollama_catalog import OllamaCatalog, get_ollama_catalog
+from app.services.providers.base import LLMConfig, LLMProvider
+from app.services.providers.ollama import (
+    _MODELS_WITHOUT_THINK,
+    _MODELS_WITHOUT_TOOLS,
+    OllamaProvider,
+)
+from sqlmodel import select
+
+SHOW = {
+    "gemma3:4b": {
+        "capabilities": ["completion", "vision"],
+        "details": {"family": "gemma3", "parameter_size": "4.3B", "quantization_level": "Q4_K_M"},
+        "model_info": {"general.architecture": "gemma3", "gemma3.context_length": 4096},
+    },
+    "qwen3:8b": {
+        "capabilities": ["completion", "tools", "thinking"],
+        "details": {"family": "qwen3", "parameter_size": "8.2B", "quantization_level": "Q4_K_M"},
+        "model_info": {"general.architecture": "qwen3", "qwen3.context_length": 40960},
+    },
+    "nomic-embed-text:latest": {
+        "capabilities": ["embedding"],
+        "details": {"family": "nomic-bert", "quantization_level": "F16"},
+        "model_info": {"general.architecture": "nomic-bert", "nomic-bert.context_length": 2048},
+    },
+}
+
+
+class _FakeOllama:
+    """Serveur Ollama simulé (httpx.MockTransport) : /api/tags, /api/show, /api/chat."""
+
+    def __init__(self):
+        self.digests = {"nomic-embed-text:latest": "d0", "gemma3:4b": "d1", "qwen3:8b": "d2"}
+        self.requests: list[tuple[str, dict]] = []
+        self.up = True
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else {}
+        self.requests.append((request.url.path, body))
+        if not self.up:
+            raise httpx.ConnectError("connexion refusée", request=request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [
+                {"name": name, "digest": digest} for name, digest in self.digests.items()
+            ]})
+        if request.url.path == "/api/show":
+            return httpx.Response(200, json=SHOW[body["model"]])
+        line = {"message": {"role": "assistant", "content": "Bonjour"}, "done": True}
+        return httpx.Response(200, content=json.dumps(line).encode() + b"\n")
+
+    def paths(self) -> list[str]:
+        return [path for path, _ in self.requests]
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    fake = _FakeOllama()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+
+    async def _client():
+        return client
+
+    monkeypatch.setattr(ollama_catalog, "get_http_client", _client)
+    monkeypatch.setattr(ollama_catalog, "_catalog", OllamaCatalog(settings.ollama_base_url))
+    _MODELS_WITHOUT_TOOLS.clear()
+    _MODELS_WITHOUT_THINK.clear()
+    yield fake, client
+    _MODELS_WITHOUT_TOOLS.clear()
+    _MODELS_WITHOUT_THINK.clear()
+
+
+def _no_sync_probe(*args, **kwargs):
+    raise AssertionError("httpx.get synchrone appelé alors que le catalogue fait foi")
+
+
+async def test_sonde_une_fois_par_digest_et_persiste(client, db_session, ollama, monkeypatch):
+    fake, _ = ollama
+    catalog = get_ollama_catalog()
+
+    assert await catalog.refresh() is True
+    assert fake.paths().count("/api/show") == 3
+    qwen = catalog.get("qwen3:8b")
+    assert (qwen.tools, qwen.thinking, qwen.context_length, qwen.quantization) == (True, True, 40960, "Q4_K_M")
+    assert catalog.get("gemma3:4b").tools is False
+
+    # Rien n'a changé : aucune nouvelle sonde
+    fake.requests.clear()
+    await catalog.refresh()
+    assert fake.paths() == ["/api/tags"]
+
+    # gemma3 re-pullé, nomic supprimé
+    fake.digests["gemma3:4b"] = "d1-bis"
+    del fake.digests["nomic-embed-text:latest"]
+    fake.requests.clear()
+    await catalog.refresh()
+    assert fake.requests[1:] == [("/api/show", {"model": "gemma3:4b"})]
+
+    rows = (await db_session.execute(select(OllamaModel).order_by(OllamaModel.position))).scalars().all()
+    assert [(row.name, row.digest, row.position) for row in rows] == [("gemma3:4b", "d1-bis", 0), ("qwen3:8b", "d2", 1)]
+    assert json.loads(rows[1].capabilities) == ["completion", "thinking", "tools"]
+
+    # Redémarrage : catalogue relu en base, sans appel bloquant à Ollama
+    restarted = OllamaCatalog(settings.ollama_base_url)
+    monkeypatch.setattr(ollama_catalog, "_catalog", restarted)
+    await restarted.load()
+    monkeypatch.setattr(httpx, "get", _no_sync_probe)
+    assert restarted.get("qwen3:8b").thinking is True
+    assert llm.detect_default_ollama_model() == "gemma3:4b"
+
+
+async def test_modele_par_defaut_ignore_les_embeddings_et_ollama_eteint(client, ollama, monkeypatch):
+    fake, _ = ollama
+    monkeypatch.setattr(httpx, "get", _no_sync_probe)
+
+    assert await llm.detect_default_ollama_model_async() == "gemma3:4b"
+    assert fake.paths()[0] == "/api/tags"
+
+    fake.digests = {"nomic-embed-text:latest": "d0"}
+    await get_ollama_catalog().refresh()
+    assert llm.detect_default_ollama_model(fallback="mistral-nemo") == "mistral-nemo"
+
+    # Ollama arrêté : le catalogue fait foi (vide ou non), aucun appel bloquant
+    monkeypatch.setattr(ollama_catalog, "_catalog", OllamaCatalog(settings.ollama_base_url))
+    fake.up = False
+    assert await get_ollama_catalog().refresh() is False
+    assert llm.detect_default_ollama_model(fallback="mistral-nemo") == "mistral-nemo"
+
+
+async def _chat(client, model: str, effort: str | None = None) -> list:
+    provider = OllamaProvider(
+        LLMConfig(provider=LLMProvider.OLLAMA, model=model, base_url="http://localhost:11434", effort=effort),
+        client=client,
+    )
+    tools = [{"type": "function", "function": {"name": "create_contact", "parameters": {}}}]
+    return [event async for event in provider.stream(None, [{"role": "user", "content": "salut"}], tools=tools)]
+
+
+async def test_provider_choisit_la_forme_de_requete_d_emblee(client, ollama):
+    fake, http = ollama
+    await get_ollama_catalog().refresh()
+    fake.requests.clear()
+
+    events = await _chat(http, "gemma3:4b", effort="high")
+    chats = [body for path, body in fake.requests if path == "/api/chat"]
+    assert len(chats) == 1  # pas d'aller-retour 400
+    assert "tools" not in chats[0] and "think" not in chats[0]
+    assert chats[0]["options"]["num_ctx"] == 4096
+    texts = [e.content for e in events if e.type == "text"]
+    assert "outils" in texts[0] and texts[-1] == "Bonjour"
+
+    # Avis donné une seule fois par modèle
+    fake.requests.clear()
+    events = await _chat(http, "gemma3:4b")
+    assert [e.content for e in events if e.type == "text"] == ["Bonjour"]
+
+    fake.requests.clear()
+    await _chat(http, "qwen3:8b", effort="max")
+    (chat,) = [body for path, body in fake.requests if path == "/api/chat"]
+    assert chat["tools"][0]["function"]["name"] == "create_contact"
+    assert chat["think"] == "high"
+    assert chat["options"]["num_ctx"] == 8192
@@ -0,0 +1,144 @@
+"""Préchargement Ollama : regroupement par modèle, keep_alive selon le mode
+d'alimentation, préchargement du modèle suivant seulement si la RAM suffit."""
+
+import json
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from app.config import settings
+from app.services import ollama_catalog, ollama_warmup
+from app.services.ollama_catalog import OllamaCatalog, get_ollama_catalog
+from app.services.ollama_warmup import (
+    KEEP_ALIVE_BATTERY_SAVER,
+    KEEP_ALIVE_DEFAULT,
+    ModelPrefetcher,
+    models_fit_in_memory,
+    plan_model_runs,
+    warm_default_ollama_model,
+)
+from app.services.performance import PowerSettings, get_power_settings, set_power_settings
+from app.services.providers.base import LLMConfig, LLMProvider
+from app.services.providers.ollama import OllamaProvider
+from app.services.system_resources import GIB, SystemMemory
+
+SIZES = {"qwen3:8b": 5 * GIB, "gemma3:4b": 3 * GIB, "mistral-small:24b": 14 * GIB}
+
+
+class _FakeOllama:
+    def __init__(self):
+        self.requests: list[tuple[str, dict]] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else {}
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [
+                {"name": name, "digest": name, "size": size} for name, size in SIZES.items()
+            ]})
+        if request.url.path == "/api/show":
+            return httpx.Response(200, json={"capabilities": ["completion", "tools"]})
+        if request.url.path == "/api/generate":
+            return httpx.Response(200, json={"model": body["model"], "done": True})
+        line = {"message": {"role": "assistant", "content": "Bonjour"}, "done": True}
+        return httpx.Response(200, content=json.dumps(line).encode() + b"\n")
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    fake = _FakeOllama()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+
+    async def _client():
+        return client
+
+    monkeypatch.setattr(ollama_catalog, "get_http_client", _client)
+    monkeypatch.setattr(ollama_warmup, "get_http_client", _client)
+    monkeypatch.setattr(ollama_catalog, "_catalog", OllamaCatalog(settings.ollama_base_url))
+    power = get_power_settings()
+    yield fake, client
+    set_power_settings(power)
+
+
+def _ram(monkeypatch, gib: int | None):
+    total = gib * GIB if gib is not None else None
+    monkeypatch.setattr(ollama_warmup, "detect_system_memory", lambda: SystemMemory(total, "test"))
+
+
+def test_plan_regroupe_par_modele_en_commencant_par_le_modele_charge():
+    runs = [("analyste", "qwen3:8b"), ("stratege", "gemma3:4b"), ("avocat", "qwen3:8b"), ("pragmatique", "mistral")]
+
+    assert plan_model_runs(runs) == [
+        ("analyste", "qwen3:8b"), ("avocat", "qwen3:8b"), ("stratege", "gemma3:4b"), ("pragmatique", "mistral"),
+    ]
+    assert [item for item, _ in plan_model_runs(runs, first_model="gemma3:4b")] == [
+        "stratege", "analyste", "avocat", "pragmatique",
+    ]
+
+
+async def test_keep_alive_suit_le_mode_economie_d_energie(client, ollama):
+    fake, http = ollama
+    provider = OllamaProvider(
+        LLMConfig(provider=LLMProvider.OLLAMA, model="qwen3:8b", base_url=settings.ollama_base_url), client=http,
+    )
+
+    async def chat_body() -> dict:
+        fake.requests.clear()
+        [event async for event in provider.stream(None, [{"role": "user", "content": "salut"}])]
+        (body,) = [body for path, body in fake.requests if path == "/api/chat"]
+        return body
+
+    assert (await chat_body())["keep_alive"] == KEEP_ALIVE_DEFAULT
+    set_power_settings(PowerSettings.battery_saver())
+    assert (await chat_body())["keep_alive"] == KEEP_ALIVE_BATTERY_SAVER
+
+
+async def test_prechargement_seulement_si_les_deux_modeles_tiennent_en_ram(client, ollama, monkeypatch):
+    fake, _ = ollama
+    await get_ollama_catalog().refresh()
+
+    # 32 Go : moitié = 16 Go ; qwen3 (5+2) + gemma3 (3+2) = 12 Go
+    _ram(monkeypatch, 32)
+    assert models_fit_in_memory("qwen3:8b", "gemma3:4b") is True
+    assert models_fit_in_memory("qwen3:8b", "mistral-small:24b") is False
+    assert models_fit_in_memory("qwen3:8b", "inconnu") is False
+
+    fake.requests.clear()
+    prefetcher = ModelPrefetcher()
+    assert prefetcher.prefetch("gemma3:4b", running="qwen3:8b") is True
+    assert prefetcher.prefetch("gemma3:4b", running="qwen3:8b") is False  # déjà lancé
+    assert prefetcher.prefetch("mistral-small:24b", running="qwen3:8b") is False
+    await prefetcher._tasks["gemma3:4b"]
+    await prefetcher.close()
+    assert fake.requests == [("/api/generate", {"model": "gemma3:4b", "keep_alive": KEEP_ALIVE_DEFAULT})]
+
+    # RAM inconnue : aucun préchargement
+    _ram(monkeypatch, None)
+    assert ModelPrefetcher().prefetch("gemma3:4b", running="qwen3:8b") is False
+
+
+async def test_prechargement_au_demarrage_hors_boucle_et_sans_exception(client, ollama, monkeypatch):
+    fake, _ = ollama
+    from app.services import llm as llm_module
+
+    threads: list[str] = []
+
+    def slow_service():
+        # Détection du modèle par défaut : appel HTTP bloquant
+        threads.append(threading.current_thread().name)
+        return SimpleNamespace(config=LLMConfig(
+            provider=LLMProvider.OLLAMA, model="qwen3:8b", base_url=settings.ollama_base_url,
+        ))
+
+    monkeypatch.setattr(llm_module, "get_llm_service", slow_service)
+    _ram(monkeypatch, 32)
+    assert await warm_default_ollama_model() is True
+    assert threads and threads[0] != threading.main_thread().name
+    assert ("/api/generate", {"model": "qwen3:8b", "keep_alive": KEEP_ALIVE_DEFAULT}) in fake.requests
+
+    def broken_service():
+        raise RuntimeError("préférences illisibles")
+
+    monkeypatch.setattr(llm_module, "get_llm_service", broken_service)
+    assert await warm_default_ollama_model() is False
@@ -3413,6 +3413,14 @@ class TestBUG098_OllamaDefaultModelDetection:
     LLM_PY = SRC / "app" / "services" / "llm.py"
     BOARD_PY = SRC / "app" / "services" / "board.py"
 
+    @pytest.fixture(autouse=True)
+    def _catalogue_non_charge(self, monkeypatch):
+        """Catalogue Ollama jamais chargé (pas de tâche de fond) : la détection
+        interroge Ollama directement, quel que soit l'ordre des tests."""
+        from app.services import ollama_catalog
+
+        monkeypatch.setattr(ollama_catalog, "_catalog", None)
+
     @staticmethod
     def _fake_httpx_get(models):
         class _Resp:
@@ -5665,15 +5673,18 @@ class TestInvoiceCRUDRobustness:
                 break
         assert func_found, "mark_invoice_paid doit exister dans invoices.py"
 
-    def test_send_endpoint_returns_501(self):
-        """Le endpoint send doit retourner 501 (pas encore implémenté)."""
+    def test_send_endpoint_uses_outbound_queue(self):
+        """Le endpoint send passe par la file d'envoi, sans marquer la facture envoyée."""
         content = INVOICES_PY.read_text(encoding="utf-8")
         tree = ast.parse(content)
         for node in ast.walk(tree):
             if isinstance(node, ast.AsyncFunctionDef) and node.name == "send_invoice_by_email":
                 func_source = ast.get_source_segment(content, node)
-                assert "501" in func_source, (
-                    "send_invoice_by_email doit retourner 501 (non implémenté)"
+                assert "enqueue_emails" in func_source, (
+                    "send_invoice_by_email doit passer par la file d'envoi"
+                )
+                assert 'status = "sent"' not in func_source, (
+                    "Le statut « sent » n'est posé qu'une fois l'email réellement parti"
                 )
                 break
         else:
@@ -0,0 +1,88 @@
+"""Index persistant des documents générés par les skills (table generated_files)."""
+
+import os
+import time
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from app.models.entities import GeneratedFile
+from app.services.skills import file_index, registry
+from app.services.skills.base import FileFormat, SkillResult
+from sqlmodel import select
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _result(path, file_id=None) -> SkillResult:
+    return SkillResult(
+        file_id=file_id or str(uuid4()), file_path=path, file_name=path.name,
+        file_size=path.stat().st_size, mime_type=DOCX_MIME, format=FileFormat.DOCX,
+    )
+
+
+async def test_lien_valable_apres_redemarrage_avec_plages(client, db_session, monkeypatch):
+    output_dir = registry.get_skills_registry().output_dir
+    path = output_dir / f"Rapport_{uuid4().hex[:8]}.docx"
+    path.write_bytes(bytes(range(256)) * 40)
+    result = _result(path)
+    await file_index.record_file(result, "docx-pro", output_dir)
+
+    # Redémarrage : nouveau registre, plus rien en mémoire
+    monkeypatch.setattr(registry, "_registry", None)
+
+    full = await client.get(f"/api/skills/download/{result.file_id}")
+    assert full.status_code == 200
+    assert full.content == path.read_bytes()
+    assert full.headers["content-type"] == DOCX_MIME
+
+    partial = await client.get(f"/api/skills/download/{result.file_id}", headers={"Range": "bytes=256-511"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 256-511/{result.file_size}"
+    assert partial.content == bytes(range(256))
+
+    row = (await db_session.execute(
+        select(GeneratedFile).where(GeneratedFile.id == result.file_id)
+    )).scalar_one()
+    assert row.skill_id == "docx-pro"
+    assert len(row.sha256) == 64
+    assert row.last_accessed_at > row.created_at
+
+    # Fichier supprimé à la main : 404 et ligne purgée
+    path.unlink()
+    assert (await client.get(f"/api/skills/download/{result.file_id}")).status_code == 404
+    db_session.expire_all()
+    assert await db_session.get(GeneratedFile, result.file_id) is None
+
+
+async def test_quota_supprime_les_moins_recemment_utilises(client, db_session, tmp_path):
+    now = datetime.now(UTC)
+    files = {}
+    for name, age_days in (("ancien", 3), ("recent", 0), ("lu_hier", 1)):
+        path = tmp_path / f"{name}.docx"
+        path.write_bytes(b"x" * 1000)
+        files[name] = _result(path, file_id=name)
+        db_session.add(GeneratedFile(
+            id=name, skill_id="docx-pro", file_path=str(path), file_name=path.name, mime_type=DOCX_MIME,
+            format="docx", file_size=1000, sha256="0" * 64,
+            created_at=now - timedelta(days=10), last_accessed_at=now - timedelta(days=age_days),
+        ))
+    # Fichier antérieur à l'index : sa date de modification fait foi
+    legacy = tmp_path / "Legacy_abcd1234.pptx"
+    legacy.write_bytes(b"y" * 1000)
+    old = time.time() - 30 * 86400
+    os.utime(legacy, (old, old))
+    (tmp_path / ".cache").write_bytes(b"z" * 5000)
+    db_session.add(GeneratedFile(
+        id="disparu", skill_id="docx-pro", file_path=str(tmp_path / "disparu.docx"), file_name="disparu.docx",
+        mime_type=DOCX_MIME, format="docx", file_size=1, sha256="0" * 64,
+    ))
+    await db_session.commit()
+
+    removed = await file_index.enforce_output_quota(tmp_path, 2000, keep=files["ancien"].file_path)
+
+    assert removed == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".cache", "ancien.docx", "recent.docx"]
+    db_session.expire_all()
+    ids = (await db_session.execute(select(GeneratedFile.id))).scalars().all()
+    assert sorted(ids) == ["ancien", "recent"]
+    assert await file_index.enforce_output_quota(tmp_path, 2000) == 0
@@ -232,7 +232,18 @@ class TestMigration:
         conn = sqlite3.connect(db)
         conn.execute("CREATE TABLE contacts (id TEXT PRIMARY KEY)")
         conn.execute(
-            "CREATE TABLE invoices (id TEXT PRIMARY KEY, validite_jours INTEGER)"
+            "CREATE TABLE invoices (id TEXT PRIMARY KEY, validite_jours INTEGER, "
+            "status TEXT, due_date DATETIME, contact_id TEXT, issue_date DATETIME)"
+        )
+        conn.execute(
+            "CREATE TABLE notifications (id TEXT PRIMARY KEY, source TEXT, action_url TEXT)"
+        )
+        conn.execute("CREATE INDEX ix_invoices_status_due_date ON invoices (status, due_date)")
+        conn.execute(
+            "CREATE INDEX ix_invoices_contact_id_issue_date ON invoices (contact_id, issue_date)"
+        )
+        conn.execute(
+            "CREATE INDEX ix_notifications_source_action_url ON notifications (source, action_url)"
         )
         conn.execute(
             "CREATE TABLE board_decisions ("
@@ -244,6 +255,17 @@ class TestMigration:
             "explanation TEXT, events TEXT, agent_outputs TEXT, base_branch TEXT, "
             "commit_hash TEXT)"
         )
+        conn.execute(
+            "CREATE TABLE calendar_events ("
+            "id TEXT PRIMARY KEY, recurring_event_id TEXT, original_start TEXT, "
+            "range_start DATETIME, range_end DATETIME, etag TEXT, remote_href TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE calendars (id TEXT PRIMARY KEY, sync_token TEXT, ctag TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE invoice_sequences (prefix TEXT, year INTEGER, last_number INTEGER)"
+        )
         conn.execute(
             "CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"
         )